@@ -1,3 +1,4 @@
+from ._callback_scheduler import CallbackStats as CallbackStats
 from ._gui_api import GuiApi as GuiApi
 from ._gui_handles import GuiButtonGroupHandle as GuiButtonGroupHandle
 from ._gui_handles import GuiButtonHandle as GuiButtonHandle
@@ -24,6 +25,7 @@ from ._gui_handles import GuiVector3Handle as GuiVector3Handle
 from ._gui_handles import UploadedFile as UploadedFile
 from ._icons_enum import Icon as Icon
 from ._icons_enum import IconName as IconName
+from ._memory_budget import MessageMemoryUsage as MessageMemoryUsage
 from ._notification_handle import NotificationHandle as NotificationHandle
 from ._scene_api import SceneApi as SceneApi
 from ._scene_handles import AmbientLightHandle as AmbientLightHandle
@@ -47,6 +49,7 @@ from ._scene_handles import MeshHandle as MeshHandle
 from ._scene_handles import MeshSkinnedBoneHandle as MeshSkinnedBoneHandle
 from ._scene_handles import MeshSkinnedHandle as MeshSkinnedHandle
 from ._scene_handles import PointCloudHandle as PointCloudHandle
+from ._scene_handles import PointCloudLodHandle as PointCloudLodHandle
 from ._scene_handles import PointLightHandle as PointLightHandle
 from ._scene_handles import RectAreaLightHandle as RectAreaLightHandle
 from ._scene_handles import SceneNodeHandle as SceneNodeHandle
@@ -1,8 +1,19 @@
 from __future__ import annotations
 
 import abc
+import functools
 from functools import cached_property
-from typing import Any, Dict, Generic, Protocol, TypeVar, get_type_hints
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Generic,
+    Protocol,
+    Tuple,
+    TypeVar,
+    get_args,
+    get_type_hints,
+)
 
 import numpy as np
 import numpy.typing as npt
@@ -28,10 +39,135 @@ def colors_to_uint8(colors: np.ndarray) -> npt.NDArray[np.uint8]:
     return colors
 
 
+def cast_scalars(scalars: np.ndarray) -> np.ndarray:
+    """Cast per-point scalars to a dtype that can be sent to clients. uint8,
+    uint16, float16, and float32 arrays are kept as-is. Other integers are cast
+    to uint8 or uint16 if they fit, and everything else is cast to float32."""
+    scalars = np.asarray(scalars)
+    if scalars.dtype in (np.uint8, np.uint16, np.float16, np.float32):
+        return scalars
+    if np.issubdtype(scalars.dtype, np.integer) or scalars.dtype == np.bool_:
+        if scalars.size == 0 or (scalars.min() >= 0 and scalars.max() < 256):
+            return scalars.astype(np.uint8)
+        if scalars.min() >= 0 and scalars.max() < 65536:
+            return scalars.astype(np.uint16)
+    return scalars.astype(np.float32)
+
+
+Quantization = Tuple[Tuple[float, float, float], Tuple[float, float, float]]
+"""Offset and scale for positions that are quantized to uint16, as
+`(offset, scale)`. Positions are decoded as `offset + codes * scale`."""
+
+
+def quantize_positions(
+    positions: np.ndarray, quantization: Quantization | None = None
+) -> tuple[npt.NDArray[np.uint16], Quantization]:
+    """Encode positions with shape (N, 3) as uint16 offsets inside a bounding
+    box. If `quantization` is None, the bounding box of the positions is used.
+    Otherwise, positions must be inside the box that it describes."""
+    positions = np.asarray(positions)
+    assert len(positions.shape) == 2 and positions.shape[-1] == 3
+    if quantization is not None:
+        offset = np.asarray(quantization[0], dtype=np.float64)
+        scale = np.asarray(quantization[1], dtype=np.float64)
+    else:
+        if positions.shape[0] == 0:
+            offset = np.zeros(3)
+            upper = np.zeros(3)
+        else:
+            offset = positions.min(axis=0).astype(np.float64)
+            upper = positions.max(axis=0).astype(np.float64)
+        # Pad empty extents, so positions along flat axes are still decoded
+        # exactly.
+        scale = np.maximum(upper - offset, 1e-9) / 65535.0
+        quantization = (
+            (float(offset[0]), float(offset[1]), float(offset[2])),
+            (float(scale[0]), float(scale[1]), float(scale[2])),
+        )
+
+    # Positions are converted to float64 in chunks, so the offsets stay
+    # accurate for large coordinates without doubling peak memory.
+    codes = np.empty(positions.shape, dtype=np.uint16)
+    chunk_size = 1 << 20
+    for start in range(0, positions.shape[0], chunk_size):
+        scaled = (positions[start : start + chunk_size] - offset) / scale
+        if np.any(scaled < -0.5) or np.any(scaled > 65535.5):
+            raise ValueError("Positions are outside of the quantization bounds.")
+        codes[start : start + chunk_size] = np.clip(np.round(scaled), 0, 65535)
+    return codes, quantization
+
+
+def dequantize_positions(
+    codes: npt.NDArray[np.uint16], quantization: Quantization
+) -> npt.NDArray[np.float32]:
+    """Decode positions that were encoded by `quantize_positions()`."""
+    offset, scale = quantization
+    return (np.asarray(offset, dtype=np.float64) + codes * np.asarray(scale)).astype(
+        np.float32
+    )
+
+
+def readonly_view(array: np.ndarray) -> np.ndarray:
+    """Get a read-only view of an array, without copying it. The original array
+    stays writeable."""
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+def frozen_copy(array: np.ndarray) -> np.ndarray:
+    """Get a read-only array with the same contents, which can be shared with
+    messages. Arrays that are already read-only, and that can't be modified
+    through their base array either, are returned without copying."""
+    base = array.base
+    if not array.flags.writeable and not (
+        isinstance(base, np.ndarray) and base.flags.writeable
+    ):
+        return array
+    out = array.copy()
+    out.flags.writeable = False
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def _hinted_dtypes(hint: Any) -> FrozenSet[np.dtype]:
+    """Get the array dtypes allowed by a type hint, like
+    `npt.NDArray[np.float32]` or a union of array types."""
+    out = set()
+    for arg in get_args(hint):
+        # `npt.NDArray[T]` is `np.ndarray[Any, np.dtype[T]]`.
+        dtype_args = get_args(arg)
+        if len(dtype_args) == 1 and isinstance(dtype_args[0], type):
+            if not dtype_args[0].__subclasses__():
+                # Only concrete scalar types, not `np.generic` or `np.floating`.
+                out.add(np.dtype(dtype_args[0]))
+        else:
+            out |= _hinted_dtypes(arg)
+    return frozenset(out)
+
+
+def _changed_rows(old: np.ndarray, new: np.ndarray) -> npt.NDArray[np.uint32] | None:
+    """Get the indices of rows (along the first axis) that differ between two
+    arrays of the same shape. Returns None if sending only the changed rows
+    wouldn't be significantly smaller than sending the whole array."""
+    if old.ndim == 0 or old.shape[0] == 0:
+        return None
+    changed = np.flatnonzero(
+        np.any((old != new).reshape(old.shape[0], -1), axis=1)
+    ).astype(np.uint32)
+    row_nbytes = old.nbytes // old.shape[0]
+    if changed.nbytes + changed.shape[0] * row_nbytes >= old.nbytes // 2:
+        return None
+    return changed
+
+
 class AssignablePropsBase(Generic[TImpl]):
     """Base class for all API objects with assignable properties."""
 
     _impl: TImpl
+    _array_copies: Dict[str, Tuple[np.ndarray, np.ndarray]] | None = None
+    """Writeable copies of array props that have been read, by prop name. Each
+    entry also holds the array that was copied, so stale copies are ignored."""
 
     def _cast_array_dtypes(
         self, prop_hints: Dict[str, Any], prop_name: str, value: np.ndarray
@@ -47,6 +183,12 @@ class AssignablePropsBase(Generic[TImpl]):
             value = colors_to_uint8(value)
         return value
 
+    def _decode_array(self, prop_name: str, value: np.ndarray) -> np.ndarray:
+        """Helper to decode array values that are stored differently than
+        they're assigned, like quantized positions. Inverse of
+        `_cast_array_dtypes()`."""
+        return value
+
     @cached_property
     def _prop_hints(self) -> Dict[str, Any]:
         return get_type_hints(type(self._impl.props))
@@ -55,6 +197,21 @@ class AssignablePropsBase(Generic[TImpl]):
     def _queue_update(self, name: str, value: Any) -> None:
         """Queue an update message with the property change."""
 
+    def _array_patches_enabled(self) -> bool:
+        """Whether same-shape array assignments should be sent as partial
+        updates, which only include the rows that changed."""
+        return False
+
+    def _queue_array_patch(
+        self, name: str, indices: npt.NDArray[np.uint32], values: np.ndarray
+    ) -> None:
+        """Queue an update message that only includes some rows of an array
+        property. Only called if `_array_patches_enabled()` returns True.
+
+        By default, the whole array is sent."""
+        del indices, values
+        self._queue_update(name, getattr(self._impl.props, name))
+
 
 def props_setattr(self, name: str, value: Any) -> None:
     if name == "_impl":
@@ -68,14 +225,17 @@ def props_setattr(self, name: str, value: Any) -> None:
 
     # Try to handle as a props field.
     if name in self._prop_hints:
+        input_value = value
+
         # Handle array type casting.
         if isinstance(value, np.ndarray):
             value = self._cast_array_dtypes(self._prop_hints, name, value)
 
         current_value = getattr(self._impl.props, name)
 
-        # Skip update if value hasn't changed.
-        if isinstance(current_value, np.ndarray):
+        # Skip update if value hasn't changed. Optional arrays can be replaced
+        # by None, or the other way around.
+        if isinstance(current_value, np.ndarray) or isinstance(value, np.ndarray):
             if np.array_equal(current_value, value):
                 return
         elif current_value == value:
@@ -83,16 +243,32 @@ def props_setattr(self, name: str, value: Any) -> None:
 
         # Update the value based on type.
         if isinstance(value, np.ndarray):
-            if hasattr(current_value, "dtype"):
-                # Ensure consistent dtype.
-                if value.dtype != current_value.dtype:
-                    value = value.astype(current_value.dtype)
-
-            # In-place update for same shape arrays.
-            if hasattr(current_value, "shape") and value.shape == current_value.shape:
-                current_value[:] = value
-            else:
-                setattr(self._impl.props, name, value.copy())
+            # Arrays are shared with messages in the message buffer, so they're
+            # replaced instead of updated in place. The new array is a
+            # read-only copy, which the caller can't modify after it's sent.
+            if (
+                hasattr(current_value, "dtype")
+                and value.dtype != current_value.dtype
+                and value.dtype not in _hinted_dtypes(self._prop_hints[name])
+            ):
+                # Ensure consistent dtype. Props that allow several dtypes, like
+                # points with different precisions, can change dtype.
+                value = value.astype(current_value.dtype)
+            elif value is input_value:
+                value = value.copy()
+            value.flags.writeable = False
+            setattr(self._impl.props, name, value)
+
+            # Same-shape arrays can be sent as a patch.
+            if (
+                self._array_patches_enabled()
+                and hasattr(current_value, "shape")
+                and value.shape == current_value.shape
+            ):
+                changed_rows = _changed_rows(current_value, value)
+                if changed_rows is not None:
+                    self._queue_array_patch(name, changed_rows, value[changed_rows])
+                    return
         else:
             # Non-array properties
             setattr(self._impl.props, name, value)
@@ -104,7 +280,22 @@ def props_setattr(self, name: str, value: Any) -> None:
 
 def props_getattr(self, name: str) -> Any:
     if name in self._prop_hints:
-        return getattr(self._impl.props, name)
+        value = getattr(self._impl.props, name)
+        if isinstance(value, np.ndarray):
+            # Array props are shared with messages in the message buffer, so
+            # they're read-only. Callers get a writeable copy, which is reused
+            # until the prop changes.
+            if self._array_copies is None:
+                self._array_copies = {}
+            cached = self._array_copies.get(name, None)
+            if cached is not None and cached[0] is value:
+                return cached[1]
+            out = self._decode_array(name, value)
+            if not out.flags.writeable:
+                out = out.copy()
+            self._array_copies[name] = (value, out)
+            return out
+        return value
     else:
         raise AttributeError(
             f"'{self.__class__.__name__}' object has no attribute '{name}'"
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import heapq
+import sys
+import threading
+import time
+import traceback
+from asyncio import AbstractEventLoop
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from ._threadpool_exceptions import print_threadpool_errors
+
+
+@dataclasses.dataclass(frozen=True)
+class CallbackRateLimit:
+    """Rate limiting options for a callback."""
+
+    throttle_hz: Optional[float] = None
+    """Run the callback at most this many times per second. Events that arrive
+    in between are merged: the newest one runs at the end of the interval."""
+    debounce_sec: Optional[float] = None
+    """Wait until no events have arrived for this many seconds before running
+    the callback with the newest event."""
+
+    def __post_init__(self) -> None:
+        if self.throttle_hz is not None and self.debounce_sec is not None:
+            raise ValueError("Only one of throttle_hz and debounce_sec can be set.")
+        if self.throttle_hz is not None and self.throttle_hz <= 0.0:
+            raise ValueError(f"throttle_hz must be positive, got {self.throttle_hz}.")
+        if self.debounce_sec is not None and self.debounce_sec < 0.0:
+            raise ValueError(
+                f"debounce_sec must be non-negative, got {self.debounce_sec}."
+            )
+
+    @staticmethod
+    def make(
+        throttle_hz: Optional[float], debounce_sec: Optional[float]
+    ) -> Optional[CallbackRateLimit]:
+        """Returns a rate limit, or None if no options are set."""
+        if throttle_hz is None and debounce_sec is None:
+            return None
+        return CallbackRateLimit(throttle_hz=throttle_hz, debounce_sec=debounce_sec)
+
+
+@dataclasses.dataclass
+class CallbackStats:
+    """Counters for the callbacks attached to a handle."""
+
+    num_invoked: int = 0
+    """Number of times that callbacks were run."""
+    num_dropped: int = 0
+    """Number of events that didn't run a callback, because a newer event
+    replaced them. This happens when a callback is still running when new
+    events arrive, or when callbacks are throttled or debounced."""
+
+
+@dataclasses.dataclass
+class _KeyState:
+    inflight: bool = False
+    pending: Optional[Tuple[Callable[[Any], Any], Any, CallbackStats]] = None
+    deadline: Optional[float] = None
+    """Time when the pending event can start, if it's waiting for a timer."""
+    last_start: float = float("-inf")
+    min_interval: float = 0.0
+    """Minimum time between starts, for throttling."""
+    task: Optional[asyncio.Task[None]] = None
+    """In-flight invocation of an async callback."""
+
+
+class CallbackScheduler:
+    """Runs callbacks for client events in a thread pool.
+
+    Callbacks are coalesced by key, unless `coalesce=False` is passed without a
+    rate limit: at most one invocation is queued or running at a time. If more
+    events arrive in the meantime, only the newest is kept, and it runs as soon
+    as the in-flight invocation finishes (or, if rate limited, when its timer
+    expires). Slow callbacks therefore see the latest state, instead of working
+    through a growing backlog of stale events.
+
+    Callbacks registered with ``throttle_hz`` or ``debounce_sec``, via methods
+    like `on_update()` and `on_click()`, are rate limited too. Throttled
+    callbacks start at most ``throttle_hz`` times per second. Debounced
+    callbacks start once no events have arrived for ``debounce_sec`` seconds.
+    Either way, the callback receives the newest event, and replaced events are
+    counted in `CallbackStats.num_dropped`.
+
+    Timers for all keys share a single thread."""
+
+    def __init__(
+        self, thread_executor: ThreadPoolExecutor, event_loop: AbstractEventLoop
+    ) -> None:
+        self._thread_executor = thread_executor
+        self._event_loop = event_loop
+        self._lock = threading.Lock()
+        self._timer_cond = threading.Condition(self._lock)
+        self._timer_thread: Optional[threading.Thread] = None
+        self._timer_heap: List[Tuple[float, int, Hashable]] = []
+        self._timer_counter = 0
+        self._state_from_key: Dict[Hashable, _KeyState] = {}
+
+    def submit(
+        self,
+        key: Hashable,
+        callback: Callable[[Any], Any],
+        event: Any,
+        stats: CallbackStats,
+        rate_limit: Optional[CallbackRateLimit] = None,
+        coalesce: bool = True,
+    ) -> None:
+        """Run `callback(event)` in the thread pool. If the callback is async,
+        it's run as a task in the event loop.
+
+        Args:
+            key: Key for coalescing. Typically identifies a handle and callback.
+            callback: Function to run.
+            event: Argument to pass to the callback.
+            stats: Counters to update.
+            rate_limit: Optional throttling or debouncing.
+            coalesce: If False and there's no rate limit, every event runs the
+                callback. For example, for button clicks.
+        """
+        if not coalesce and rate_limit is None:
+            with self._lock:
+                stats.num_invoked += 1
+            self._thread_executor.submit(self._call, callback, event).add_done_callback(
+                print_threadpool_errors
+            )
+            return
+
+        with self._lock:
+            state = self._state_from_key.get(key, None)
+            if state is None:
+                state = self._state_from_key[key] = _KeyState()
+            if state.pending is not None:
+                state.pending[2].num_dropped += 1
+            state.pending = (callback, event, stats)
+
+            if rate_limit is not None and rate_limit.debounce_sec is not None:
+                # Each new event restarts the timer.
+                self._set_timer(key, state, time.monotonic() + rate_limit.debounce_sec)
+            elif rate_limit is not None and rate_limit.throttle_hz is not None:
+                state.min_interval = 1.0 / rate_limit.throttle_hz
+                next_start = state.last_start + state.min_interval
+                if state.deadline is None and next_start > time.monotonic():
+                    self._set_timer(key, state, next_start)
+            self._maybe_start(key, state)
+
+    def count_invoked(self, stats: CallbackStats) -> None:
+        """Count an invocation that isn't run by the scheduler, for example an
+        async callback that's awaited directly in the event loop."""
+        with self._lock:
+            stats.num_invoked += 1
+
+    def _set_timer(self, key: Hashable, state: _KeyState, deadline: float) -> None:
+        """Delay the pending event for a key until `deadline`. Should be called
+        with `_lock` held."""
+        state.deadline = deadline
+        self._timer_counter += 1
+        heapq.heappush(self._timer_heap, (deadline, self._timer_counter, key))
+        if self._timer_thread is None:
+            self._timer_thread = threading.Thread(
+                target=self._timer_loop, name="viser-callback-timers", daemon=True
+            )
+            self._timer_thread.start()
+        self._timer_cond.notify()
+
+    def _timer_loop(self) -> None:
+        with self._lock:
+            while True:
+                if len(self._timer_heap) == 0:
+                    self._timer_cond.wait()
+                    continue
+                deadline, _, key = self._timer_heap[0]
+                now = time.monotonic()
+                if deadline > now:
+                    self._timer_cond.wait(timeout=deadline - now)
+                    continue
+                heapq.heappop(self._timer_heap)
+
+                # Timers are never cancelled. Instead, entries that don't match
+                # the key's current deadline are stale and skipped.
+                state = self._state_from_key.get(key, None)
+                if state is None or state.deadline != deadline:
+                    continue
+                state.deadline = None
+                self._maybe_start(key, state)
+
+    def _maybe_start(self, key: Hashable, state: _KeyState) -> None:
+        """Start the pending event for a key, if it's ready. Should be called
+        with `_lock` held."""
+        if state.inflight or state.deadline is not None:
+            return
+        if state.pending is None:
+            # Once idle, we can forget about a key. Throttled keys are kept
+            # until their interval ends.
+            if time.monotonic() - state.last_start >= state.min_interval:
+                self._state_from_key.pop(key)
+            return
+        callback, event, stats = state.pending
+        state.pending = None
+        state.inflight = True
+        state.last_start = time.monotonic()
+        stats.num_invoked += 1
+        if asyncio.iscoroutinefunction(callback):
+            # Async callbacks run as tasks in the event loop. The key stays in
+            # flight until the task finishes, so events are coalesced and
+            # throttled the same way as for other callbacks.
+            self._event_loop.call_soon_threadsafe(
+                self._start_task, key, state, callback, event
+            )
+            return
+        self._thread_executor.submit(self._run, key, callback, event).add_done_callback(
+            print_threadpool_errors
+        )
+
+    def _start_task(
+        self,
+        key: Hashable,
+        state: _KeyState,
+        callback: Callable[[Any], Coroutine],
+        event: Any,
+    ) -> None:
+        # Tasks are referenced by the key's state, so they aren't garbage
+        # collected while they're running.
+        state.task = self._event_loop.create_task(self._run_async(key, callback, event))
+
+    async def _run_async(
+        self, key: Hashable, callback: Callable[[Any], Coroutine], event: Any
+    ) -> None:
+        try:
+            await callback(event)
+        except Exception as e:
+            print("Task failed with exception:", file=sys.stderr)
+            traceback.print_exception(type(e), e, e.__traceback__)
+
+        with self._lock:
+            state = self._state_from_key[key]
+            state.inflight = False
+            state.task = None
+            self._maybe_start(key, state)
+
+    def _run(self, key: Hashable, callback: Callable[[Any], Any], event: Any) -> None:
+        try:
+            self._call(callback, event)
+        except Exception as e:
+            # Keep going, so pending events aren't dropped.
+            print("Task failed with exception:", file=sys.stderr)
+            traceback.print_exception(type(e), e, e.__traceback__)
+
+        with self._lock:
+            state = self._state_from_key[key]
+            state.inflight = False
+            self._maybe_start(key, state)
+
+    def _call(self, callback: Callable[[Any], Any], event: Any) -> None:
+        out = callback(event)
+        if isinstance(out, Coroutine):
+            # Async callbacks are run in the event loop. We wait for them to
+            # finish, so at most one invocation per key is in flight.
+            asyncio.run_coroutine_threadsafe(out, self._event_loop).result()
+
+
+TCallback = TypeVar("TCallback", bound=Callable)
+
+
+def make_callback_registrar(
+    callbacks: List[TCallback],
+    rate_limit_from_cb: Dict[Callable, CallbackRateLimit],
+    throttle_hz: Optional[float],
+    debounce_sec: Optional[float],
+) -> Callable[[TCallback], TCallback]:
+    """Returns a function that appends a callback to `callbacks`, with
+    optional rate limiting. Used to implement `on_update()`-style methods."""
+    rate_limit = CallbackRateLimit.make(throttle_hz, debounce_sec)
+
+    def register(func: TCallback) -> TCallback:
+        callbacks.append(func)
+        if rate_limit is not None:
+            rate_limit_from_cb[func] = rate_limit
+        return func
+
+    return register
@@ -7,6 +7,8 @@ from pathlib import Path
 import rich
 import tyro
 
+from .infra._static_files import precompress_directory
+
 client_dir = Path(__file__).absolute().parent / "client"
 build_dir = client_dir / "build"
 
@@ -115,6 +117,11 @@ def _build_viser_client(out_dir: Path, cached: bool = True) -> None:
         check=False,
     )
 
+    # Write compressed copies of the bundle, so the HTTP server can send them
+    # without compressing anything at runtime.
+    if (out_dir / "index.html").exists():
+        precompress_directory(out_dir)
+
 
 build_client_entrypoint = lambda: tyro.cli(_build_viser_client)
 
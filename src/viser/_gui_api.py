@@ -72,6 +72,7 @@ from ._threadpool_exceptions import print_threadpool_errors
 if TYPE_CHECKING:
     import plotly.graph_objects as go
 
+    from ._callback_scheduler import CallbackScheduler
     from ._viser import ClientHandle, ViserServer
     from .infra import ClientId
 
@@ -189,12 +190,14 @@ class GuiApi:
         owner: ViserServer | ClientHandle,  # Who do I belong to?
         thread_executor: ThreadPoolExecutor,
         event_loop: AbstractEventLoop,
+        callback_scheduler: CallbackScheduler,
     ) -> None:
         from ._viser import ViserServer
 
         self._owner = owner
         """Entity that owns this API."""
         self._thread_executor = thread_executor
+        self._callback_scheduler = callback_scheduler
         self._event_loop = event_loop
 
         self._websock_interface = (
@@ -284,12 +287,27 @@ class GuiApi:
             else:
                 assert False
 
-            if asyncio.iscoroutinefunction(cb):
+            rate_limit = handle_state.rate_limit_from_cb.get(cb, None)
+            if (
+                handle_state.is_button
+                and rate_limit is None
+                and asyncio.iscoroutinefunction(cb)
+            ):
+                self._callback_scheduler.count_invoked(handle_state.callback_stats)
                 await cb(GuiEvent(client, client_id, handle))
             else:
-                self._thread_executor.submit(
-                    cb, GuiEvent(client, client_id, handle)
-                ).add_done_callback(print_threadpool_errors)
+                # Values can update at drag rate, for example for sliders. Slow
+                # callbacks, including async ones, should only see the latest
+                # value. Every button click runs the callback, unless it's rate
+                # limited.
+                self._callback_scheduler.submit(
+                    ("gui", handle_state.uuid, cb),
+                    cb,
+                    GuiEvent(client, client_id, handle),
+                    handle_state.callback_stats,
+                    rate_limit,
+                    coalesce=not handle_state.is_button,
+                )
 
         if handle_state.sync_cb is not None:
             handle_state.sync_cb(client_id, updates_cast)
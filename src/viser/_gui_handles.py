@@ -17,6 +17,7 @@ from typing import (
     Literal,
     Tuple,
     TypeVar,
+    overload,
 )
 
 import imageio.v3 as iio
@@ -24,6 +25,11 @@ import numpy as np
 from typing_extensions import Protocol, override
 
 from ._assignable_props_api import AssignablePropsBase
+from ._callback_scheduler import (
+    CallbackRateLimit,
+    CallbackStats,
+    make_callback_registrar,
+)
 from ._icons import svg_from_icon
 from ._icons_enum import IconName
 from ._messages import (
@@ -108,6 +114,11 @@ class _GuiHandleState(Generic[T]):
     sync_cb: Callable[[ClientId, dict[str, Any]], None] | None = None
     """Callback for synchronizing inputs across clients."""
 
+    rate_limit_from_cb: dict[Callable, CallbackRateLimit] = dataclasses.field(
+        default_factory=dict
+    )
+    callback_stats: CallbackStats = dataclasses.field(default_factory=CallbackStats)
+
     removed: bool = False
 
 
@@ -142,11 +153,6 @@ class _GuiHandle(Generic[T], AssignablePropsBase[_GuiHandleState]):
 
         # Send remove to client(s) + update internal state.
         gui_api = self._impl.gui_api
-        gui_api._websock_interface.get_message_buffer().remove_from_buffer(
-            # Don't send outdated GUI updates to new clients.
-            # This is brittle...
-            lambda message: getattr(message, "uuid", None) == self._impl.uuid
-        )
         gui_api._websock_interface.queue_message(GuiRemoveMessage(self._impl.uuid))
         parent = gui_api._container_handle_from_uuid[self._impl.parent_container_id]
         parent._children.pop(self._impl.uuid)
@@ -203,6 +209,11 @@ class _GuiInputHandle(
         """Read-only timestamp when this input was last updated."""
         return self._impl.update_timestamp
 
+    @property
+    def callback_stats(self) -> CallbackStats:
+        """Read-only counters for callbacks triggered by clients."""
+        return self._impl.callback_stats
+
 
 StringType = TypeVar("StringType", bound=str)
 
@@ -220,9 +231,34 @@ class GuiInputHandle(_GuiInputHandle[T], Generic[T]):
     :attr:`ClientHandle.gui`, state is local to a specific client.
     """
 
+    @overload
     def on_update(
-        self: TGuiHandle, func: Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]
-    ) -> Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]:
+        self: TGuiHandle,
+        func: Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine],
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]: ...
+
+    @overload
+    def on_update(
+        self: TGuiHandle,
+        func: None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[
+        [Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]],
+        Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine],
+    ]: ...
+
+    def on_update(
+        self,
+        func: Callable | None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable:
         """Attach a function to call when a GUI input is updated.
 
         Note:
@@ -230,9 +266,17 @@ class GuiInputHandle(_GuiInputHandle[T], Generic[T]):
         - If `func` is an async function (defined with `async def`), it will be executed in the event loop.
 
         Using async functions can be useful for reducing race conditions.
+
+        Use ``throttle_hz`` or ``debounce_sec`` to rate limit expensive callbacks;
+        see :doc:`/events`.
         """
-        self._impl.update_cb.append(func)
-        return func
+        register = make_callback_registrar(
+            self._impl.update_cb,
+            self._impl.rate_limit_from_cb,
+            throttle_hz,
+            debounce_sec,
+        )
+        return register if func is None else register(func)
 
     def remove_update_callback(
         self, callback: Literal["all"] | Callable = "all"
@@ -244,8 +288,10 @@ class GuiInputHandle(_GuiInputHandle[T], Generic[T]):
         """
         if callback == "all":
             self._impl.update_cb.clear()
+            self._impl.rate_limit_from_cb.clear()
         else:
             self._impl.update_cb = [cb for cb in self._impl.update_cb if cb != callback]
+            self._impl.rate_limit_from_cb.pop(callback, None)
 
 
 class GuiCheckboxHandle(GuiInputHandle[bool], GuiCheckboxProps):
@@ -366,9 +412,34 @@ class GuiButtonHandle(_GuiInputHandle[bool], GuiButtonProps):
        Value of the button. Set to `True` when the button is pressed. Can be manually set back to `False`.
     """
 
+    @overload
     def on_click(
-        self: TGuiHandle, func: Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]
-    ) -> Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]:
+        self: TGuiHandle,
+        func: Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine],
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]: ...
+
+    @overload
+    def on_click(
+        self: TGuiHandle,
+        func: None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[
+        [Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]],
+        Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine],
+    ]: ...
+
+    def on_click(
+        self,
+        func: Callable | None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable:
         """Attach a function to call when a button is pressed.
 
         Note:
@@ -376,9 +447,17 @@ class GuiButtonHandle(_GuiInputHandle[bool], GuiButtonProps):
         - If `func` is an async function (defined with `async def`), it will be executed in the event loop.
 
         Using async functions can be useful for reducing race conditions.
+
+        Use ``throttle_hz`` or ``debounce_sec`` to rate limit expensive callbacks;
+        see :doc:`/events`.
         """
-        self._impl.update_cb.append(func)
-        return func
+        register = make_callback_registrar(
+            self._impl.update_cb,
+            self._impl.rate_limit_from_cb,
+            throttle_hz,
+            debounce_sec,
+        )
+        return register if func is None else register(func)
 
 
 @dataclasses.dataclass
@@ -426,9 +505,34 @@ class GuiButtonGroupHandle(_GuiInputHandle[str], GuiButtonGroupProps):
        Value of the input. Represents the currently selected button in the group.
     """
 
+    @overload
     def on_click(
-        self: TGuiHandle, func: Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]
-    ) -> Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]:
+        self: TGuiHandle,
+        func: Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine],
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]: ...
+
+    @overload
+    def on_click(
+        self: TGuiHandle,
+        func: None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[
+        [Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine]],
+        Callable[[GuiEvent[TGuiHandle]], NoneOrCoroutine],
+    ]: ...
+
+    def on_click(
+        self,
+        func: Callable | None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable:
         """Attach a function to call when a button in the group is clicked.
 
         Note:
@@ -436,9 +540,17 @@ class GuiButtonGroupHandle(_GuiInputHandle[str], GuiButtonGroupProps):
         - If `func` is an async function (defined with `async def`), it will be executed in the event loop.
 
         Using async functions can be useful for reducing race conditions.
+
+        Use ``throttle_hz`` or ``debounce_sec`` to rate limit expensive callbacks;
+        see :doc:`/events`.
         """
-        self._impl.update_cb.append(func)
-        return func
+        register = make_callback_registrar(
+            self._impl.update_cb,
+            self._impl.rate_limit_from_cb,
+            throttle_hz,
+            debounce_sec,
+        )
+        return register if func is None else register(func)
 
     @property
     def disabled(self) -> bool:
@@ -534,11 +646,6 @@ class GuiTabGroupHandle(_GuiHandle[None], GuiTabGroupProps):
         for tab in tuple(self._tab_handles):
             tab.remove()
         gui_api = self._impl.gui_api
-        gui_api._websock_interface.get_message_buffer().remove_from_buffer(
-            # Don't send outdated GUI updates to new clients.
-            lambda message: isinstance(message, GuiUpdateMessage)
-            and message.uuid == self._impl.uuid
-        )
         gui_api._websock_interface.queue_message(GuiRemoveMessage(self._impl.uuid))
         parent = gui_api._container_handle_from_uuid[self._impl.parent_container_id]
         parent._children.pop(self._impl.uuid)
@@ -645,11 +752,6 @@ class GuiFolderHandle(_GuiHandle, GuiFolderProps):
 
         # Remove children, then self.
         gui_api = self._impl.gui_api
-        gui_api._websock_interface.get_message_buffer().remove_from_buffer(
-            # Don't send outdated GUI updates to new clients.
-            lambda message: isinstance(message, GuiUpdateMessage)
-            and message.uuid == self._impl.uuid
-        )
         gui_api._websock_interface.queue_message(GuiRemoveMessage(self._impl.uuid))
         for child in tuple(self._children.values()):
             child.remove()
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import dataclasses
+import fnmatch
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from .infra._async_message_buffer import AsyncMessageBuffer
+
+if TYPE_CHECKING:
+    from ._scene_api import SceneApi
+
+
+@dataclasses.dataclass(frozen=True)
+class MessageMemoryUsage:
+    """Estimated memory used by the messages that a server keeps to send to
+    newly connected clients. Sizes count arrays and bytes exactly, which
+    dominate the size of large messages."""
+
+    total_bytes: int
+    """Estimated size of all persisted messages."""
+    bytes_from_message_type: Dict[str, int]
+    """Estimated size of persisted messages, by message type."""
+    bytes_from_scene_node: Dict[str, int]
+    """Estimated size of persisted messages for each scene node, not including
+    its children."""
+
+    def bytes_under(self, prefix: str) -> int:
+        """Get the estimated size of persisted messages for a scene node and its
+        descendants. For example, `bytes_under("/images")` includes
+        `/images/frame_0` and `/images/frame_1`."""
+        child_prefix = prefix.rstrip("/") + "/"
+        return sum(
+            nbytes
+            for name, nbytes in self.bytes_from_scene_node.items()
+            if name == prefix or name.startswith(child_prefix)
+        )
+
+
+def _scene_node_name(dependency_key: Optional[Tuple[str, ...]]) -> Optional[str]:
+    """Get the scene node that a message belongs to from its dependency key."""
+    if dependency_key is None or dependency_key[0] != "scene":
+        return None
+    return "/".join(dependency_key[1:])
+
+
+def get_memory_usage(buffer: AsyncMessageBuffer) -> MessageMemoryUsage:
+    bytes_from_message_type: Dict[str, int] = {}
+    bytes_from_scene_node: Dict[str, int] = {}
+    total_bytes = 0
+    for _, message, dependency_key, nbytes in buffer.get_message_sizes():
+        total_bytes += nbytes
+        message_type = type(message).__name__
+        bytes_from_message_type[message_type] = (
+            bytes_from_message_type.get(message_type, 0) + nbytes
+        )
+        name = _scene_node_name(dependency_key)
+        if name is not None:
+            bytes_from_scene_node[name] = bytes_from_scene_node.get(name, 0) + nbytes
+    return MessageMemoryUsage(
+        total_bytes=total_bytes,
+        bytes_from_message_type=bytes_from_message_type,
+        bytes_from_scene_node=bytes_from_scene_node,
+    )
+
+
+def evict_oldest_scene_nodes(
+    buffer: AsyncMessageBuffer, scene: SceneApi, pattern: str, num_bytes: int
+) -> None:
+    """Remove scene nodes whose names match a glob pattern, oldest first, until
+    at least `num_bytes` of persisted messages have been freed."""
+    first_id_from_name: Dict[str, int] = {}
+    for message_id, _, dependency_key, _ in buffer.get_message_sizes():
+        name = _scene_node_name(dependency_key)
+        if name is not None and name not in first_id_from_name:
+            first_id_from_name[name] = message_id
+
+    start_bytes = buffer.message_bytes
+    for name in sorted(first_id_from_name, key=first_id_from_name.__getitem__):
+        if start_bytes - buffer.message_bytes >= num_bytes:
+            break
+        if not fnmatch.fnmatchcase(name, pattern):
+            continue
+        # Handles can be missing for nodes that have already been removed as
+        # descendants of an evicted node.
+        handle = scene._handle_from_node_name.get(name, None)
+        if handle is not None:
+            handle.remove()
@@ -3,8 +3,11 @@
 
 from __future__ import annotations
 
+import copy
 import dataclasses
+import threading
 import uuid
+import weakref
 from typing import Any, ClassVar, Dict, Optional, Tuple, Type, TypeVar, Union
 
 import numpy as np
@@ -45,7 +48,7 @@ class Message(infra.Message):
     _tags: ClassVar[Tuple[TagLiteral, ...]] = tuple()
 
     @override
-    def redundancy_key(self) -> str:
+    def redundancy_key(self) -> Optional[str]:
         """Returns a unique key for this message, used for detecting redundant
         messages.
 
@@ -66,6 +69,19 @@ class Message(infra.Message):
 
         return "_".join(parts)
 
+    @override
+    def dependency_key(self) -> Optional[Tuple[str, ...]]:
+        """Returns a key for the scene node, GUI element, or notification that
+        this message belongs to. Scene node keys follow the node hierarchy, so
+        removing a node also drops messages for its children."""
+        node_name = getattr(self, "name", None)
+        if node_name is not None:
+            return ("scene",) + tuple(node_name.split("/"))
+        uuid = getattr(self, "uuid", None)
+        if uuid is not None:
+            return ("uuid", uuid)
+        return None
+
     @classmethod
     def __init_subclass__(cls, tag: TagLiteral | None = None):
         """Tag will be used to create a union type in TypeScript."""
@@ -83,6 +99,21 @@ class _CreateSceneNodeMessage(Message, tag="SceneNodeMessage"):
         """All scene nodes will have the same redundancy key."""
         return f"create-or-remove-scene-{self.name}"
 
+    @override
+    def as_serializable_dict(self) -> Dict[str, Any]:
+        # Arrays of compacted messages are written in place by later
+        # compactions. Encodings and the asset store get copies instead. This
+        # happens outside of the message buffer's lock.
+        props = getattr(self, "props", None)
+        if props is None:
+            return super().as_serializable_dict()
+        snapshot = _snapshot_row_buffers(props)
+        if snapshot is props:
+            return super().as_serializable_dict()
+        out = copy.copy(self)
+        out.props = snapshot  # type: ignore
+        return super(_CreateSceneNodeMessage, out).as_serializable_dict()
+
 
 @dataclasses.dataclass
 class RemoveSceneNodeMessage(Message):
@@ -97,6 +128,10 @@ class RemoveSceneNodeMessage(Message):
         # message for creating the scene node will automatically be culled.
         return f"create-or-remove-scene-{self.name}"
 
+    @override
+    def removes_dependents(self) -> bool:
+        return True
+
 
 @dataclasses.dataclass
 class _CreateGuiComponentMessage(Message, tag="GuiComponentMessage"):
@@ -119,6 +154,10 @@ class GuiRemoveMessage(Message):
         # _CreateGuiComponentMessage.
         return f"create-or-remove-gui-{self.uuid}"
 
+    @override
+    def removes_dependents(self) -> bool:
+        return True
+
 
 T = TypeVar("T", bound=Type[Message])
 
@@ -168,6 +207,10 @@ class RemoveNotificationMessage(Message):
 
     uuid: str
 
+    @override
+    def removes_dependents(self) -> bool:
+        return True
+
 
 @dataclasses.dataclass
 class ViewerCameraMessage(Message):
@@ -184,6 +227,10 @@ class ViewerCameraMessage(Message):
     look_at: Tuple[float, float, float]
     up_direction: Tuple[float, float, float]
 
+    @override
+    def coalesce_key(self) -> Optional[str]:
+        return self.redundancy_key()
+
 
 # The list of scene pointer events supported by the viser frontend.
 ScenePointerEventType = Literal["click", "rect-select"]
@@ -254,6 +301,10 @@ class GlbMessage(_CreateSceneNodeMessage):
 
     props: GlbProps
 
+    @override
+    def is_bulk(self) -> bool:
+        return True
+
 
 @dataclasses.dataclass
 class GlbProps:
@@ -389,31 +440,84 @@ class PointCloudMessage(_CreateSceneNodeMessage):
 
 @dataclasses.dataclass
 class PointCloudProps:
-    points: Union[npt.NDArray[np.float16], npt.NDArray[np.float32]]
-    """Location of points. Should have shape (N, 3). Synchronized automatically when assigned."""
+    points: Union[
+        npt.NDArray[np.float16], npt.NDArray[np.float32], npt.NDArray[np.uint16]
+    ]
+    """Location of points. Should have shape (N, 3). For quantized precision,
+    points are sent as uint16 codes, which are decoded using `quantization`.
+    Handles return decoded float32 positions. Synchronized automatically when
+    assigned."""
     colors: npt.NDArray[np.uint8]
-    """Colors of points. Should have shape (N, 3) or (3,). Synchronized automatically when assigned."""
+    """Colors of points. Should have shape (N, 3) or (3,). Ignored if `scalars`
+    is set. Synchronized automatically when assigned."""
+    scalars: Optional[
+        Union[
+            npt.NDArray[np.uint8],
+            npt.NDArray[np.uint16],
+            npt.NDArray[np.float16],
+            npt.NDArray[np.float32],
+        ]
+    ]
+    """Per-point scalar values or labels, like intensities or segmentation
+    labels. Should have shape (N,). If set, points are colored by mapping
+    scalars to colors on the client. Synchronized automatically when
+    assigned."""
+    scalars_dtype: Literal["uint8", "uint16", "float16", "float32"]
+    """Data type of `scalars`. Set automatically when `scalars` is assigned."""
+    colormap: Literal["viridis", "plasma", "inferno", "magma", "turbo", "gray", "tab10"]
+    """Colormap for `scalars`. Ignored if `colormap_lut` is set. Synchronized
+    automatically when assigned."""
+    colormap_lut: Optional[npt.NDArray[np.uint8]]
+    """Lookup table for `scalars`, which overrides `colormap`. Should have shape
+    (K, 3). Entries are not interpolated, so labels can be mapped to colors by
+    setting `scalar_range` to (0, K - 1). Synchronized automatically when
+    assigned."""
+    scalar_range: Tuple[float, float]
+    """Scalars that are mapped to the first and last colors of the colormap.
+    Scalars outside of this range are clamped. Synchronized automatically when
+    assigned."""
     point_size: float
     """Size of each point. Synchronized automatically when assigned."""
     point_shape: Literal["square", "diamond", "circle", "rounded", "sparkle"]
     """Shape to draw each point. Synchronized automatically when assigned."""
-    precision: Literal["float16", "float32"]
+    precision: Literal["float16", "float32", "quantized"]
     """Precision of the point cloud. Assignments to `points` are automatically casted
-    based on the current precision value. Updates to `points` should therefore happen
-    *after* updates to `precision`. Synchronized automatically when assigned."""
+    based on the current precision value, and assigning `precision` re-encodes the
+    current points. Quantized points are stored as uint16 offsets inside their
+    bounding box. Synchronized automatically when assigned."""
+    quantization: Optional[
+        Tuple[Tuple[float, float, float], Tuple[float, float, float]]
+    ]
+    """Offset and scale for quantized points, as `(offset, scale)`. Positions are
+    `offset + points * scale`. None unless `precision` is "quantized". Set
+    automatically when `points` is assigned."""
+    max_points: Optional[int]
+    """Maximum number of points, for point clouds that are streamed with
+    `append()`. Clients preallocate buffers of this size. Synchronized
+    automatically when assigned."""
 
     def __post_init__(self):
         # Check shapes.
         assert len(self.points.shape) == 2
         assert self.colors.shape in ((3,), (self.points.shape[0], 3))
         assert self.points.shape[-1] == 3
+        assert self.max_points is None or self.points.shape[0] <= self.max_points
+        assert self.scalars is None or self.scalars.shape == self.points.shape[:1]
+        assert self.colormap_lut is None or (
+            len(self.colormap_lut.shape) == 2 and self.colormap_lut.shape[-1] == 3
+        )
 
         # Check dtypes.
         if self.precision == "float16":
             assert self.points.dtype == np.float16
+        elif self.precision == "quantized":
+            assert self.points.dtype == np.uint16
+            assert self.quantization is not None
         else:
             assert self.points.dtype == np.float32
         assert self.colors.dtype == np.uint8
+        assert self.scalars is None or self.scalars.dtype == self.scalars_dtype
+        assert self.colormap_lut is None or self.colormap_lut.dtype == np.uint8
 
 
 @dataclasses.dataclass
@@ -594,8 +698,12 @@ class IcosphereMessage(_CreateSceneNodeMessage):
 
 @dataclasses.dataclass
 class MeshProps:
-    vertices: npt.NDArray[np.float32]
-    """A numpy array of vertex positions. Should have shape (V, 3). Synchronized automatically when assigned."""
+    vertices: Union[npt.NDArray[np.float32], npt.NDArray[np.uint16]]
+    """A numpy array of vertex positions. Should have shape (V, 3). Quantized vertices are sent as uint16 codes, which are decoded using `vertices_quantization`. Handles return decoded float32 positions. Synchronized automatically when assigned."""
+    vertices_quantization: Optional[
+        Tuple[Tuple[float, float, float], Tuple[float, float, float]]
+    ]
+    """Offset and scale for quantized vertices, as `(offset, scale)`. Positions are `offset + vertices * scale`. None if vertices are float32. Synchronized automatically when assigned."""
     faces: npt.NDArray[np.uint32]
     """A numpy array of faces, where each face is represented by indices of vertices. Should have shape (F, 3). Synchronized automatically when assigned."""
     color: Tuple[int, int, int]
@@ -620,6 +728,12 @@ class MeshProps:
         assert self.vertices.shape[-1] == 3
         assert self.faces.shape[-1] == 3
 
+        # Check dtypes.
+        if self.vertices_quantization is None:
+            assert self.vertices.dtype == np.float32
+        else:
+            assert self.vertices.dtype == np.uint16
+
 
 @dataclasses.dataclass
 class BoxProps:
@@ -749,6 +863,10 @@ class BatchedGlbMessage(_CreateSceneNodeMessage):
 
     props: BatchedGlbProps
 
+    @override
+    def is_bulk(self) -> bool:
+        return True
+
 
 @dataclasses.dataclass
 class BatchedGlbProps(GlbProps, _BatchedMeshExtraProps):
@@ -892,6 +1010,43 @@ class SetPositionMessage(Message):
     position: Tuple[float, float, float]
 
 
+@dataclasses.dataclass
+class SetPosesMessage(Message):
+    """Server -> client message to set the orientations and positions of many
+    scene nodes at once.
+
+    As with all other messages, transforms take the `T_parent_local` convention."""
+
+    names: Tuple[str, ...]
+    wxyzs: npt.NDArray[np.float32]
+    """Orientations, as a float32 array of shape (N, 4)."""
+    positions: npt.NDArray[np.float32]
+    """Positions, as a float32 array of shape (N, 3)."""
+
+    @override
+    def redundancy_key(self) -> str:
+        return type(self).__name__ + "_" + ",".join(self.names)
+
+    @override
+    def dependency_key(self) -> Optional[Tuple[str, ...]]:
+        # Keyed by the deepest common ancestor of all nodes, so the message is
+        # dropped when the subtree is removed (for example, a whole robot).
+        # Nodes without a common ancestor below the root aren't keyed: the root
+        # key belongs to messages like `SetSceneNodeVisibilityMessage("")`.
+        parts = [tuple(name.split("/")) for name in self.names]
+        if len(parts) == 0:
+            return None
+        common = parts[0]
+        for p in parts[1:]:
+            i = 0
+            while i < min(len(common), len(p)) and common[i] == p[i]:
+                i += 1
+            common = common[:i]
+        if common in ((), ("",)):
+            return None
+        return ("scene",) + common
+
+
 @dataclasses.dataclass
 class TransformControlsUpdateMessage(Message):
     """Client -> server message when a transform control is updated.
@@ -902,6 +1057,10 @@ class TransformControlsUpdateMessage(Message):
     wxyz: Tuple[float, float, float, float]
     position: Tuple[float, float, float]
 
+    @override
+    def coalesce_key(self) -> Optional[str]:
+        return self.redundancy_key()
+
 
 @dataclasses.dataclass
 class TransformControlsDragStartMessage(Message):
@@ -1144,6 +1303,10 @@ class GuiCloseModalMessage(Message):
     def redundancy_key(self) -> str:
         return f"modal-{self.uuid}"
 
+    @override
+    def removes_dependents(self) -> bool:
+        return True
+
 
 @dataclasses.dataclass
 class GuiButtonProps(GuiBaseProps):
@@ -1354,6 +1517,28 @@ class GuiButtonGroupMessage(_CreateGuiComponentMessage):
     props: GuiButtonGroupProps
 
 
+def _apply_updates(base: Message, updates: Dict[str, Any]) -> Optional[Message]:
+    """Apply a props update to a copy of the message that created a scene node
+    or GUI element. Returns None if the update has unknown keys."""
+    props = getattr(base, "props", None)
+    if props is None:
+        return None
+    props = copy.copy(props)
+    out = copy.copy(base)
+    prop_names = {field.name for field in dataclasses.fields(props)}
+    message_field_names = set(vars(out).keys())
+    for k, v in updates.items():
+        if k in prop_names:
+            setattr(props, k, v)
+        elif k in message_field_names:
+            # For example, the `value` field of GUI inputs.
+            setattr(out, k, v)
+        else:
+            return None
+    out.props = props  # type: ignore
+    return out
+
+
 @dataclasses.dataclass
 class GuiUpdateMessage(Message):
     """Sent client<->server when any property of a GUI component is changed."""
@@ -1372,6 +1557,12 @@ class GuiUpdateMessage(Message):
             + ",".join(list(self.updates.keys()))
         )
 
+    @override
+    def compact_into(self, base: infra.Message) -> Optional[infra.Message]:
+        if not isinstance(base, _CreateGuiComponentMessage):
+            return None
+        return _apply_updates(base, self.updates)
+
 
 @dataclasses.dataclass
 class SceneNodeUpdateMessage(Message):
@@ -1391,6 +1582,170 @@ class SceneNodeUpdateMessage(Message):
             + ",".join(list(self.updates.keys()))
         )
 
+    @override
+    def compact_into(self, base: infra.Message) -> Optional[infra.Message]:
+        if not isinstance(base, _CreateSceneNodeMessage):
+            return None
+        return _apply_updates(base, self.updates)
+
+
+_row_buffers_lock = threading.Lock()
+"""Held while rows of buffers in `_row_buffers` are written or copied."""
+_row_buffers: weakref.WeakValueDictionary[int, np.ndarray] = (
+    weakref.WeakValueDictionary()
+)
+"""Buffers allocated by `_get_row_buffer()`, by ID. Arrays of compacted messages
+are views of the first rows of these. The buffers are only referenced by
+compacted messages, so rows are written in place; encodings copy them."""
+
+
+def _get_row_buffer(base: np.ndarray, min_rows: int, capacity: int) -> np.ndarray:
+    """Get a buffer with at least `min_rows` rows whose first rows are `base`,
+    for writing rows of a compacted array.
+
+    If `base` is a view of a buffer from this function that's large enough, the
+    buffer is reused. Otherwise, `base` is copied into a new buffer with
+    `capacity` rows, because it may be shared with handles or other messages.
+    Should be called with `_row_buffers_lock` held."""
+    buffer = base.base
+    if (
+        isinstance(buffer, np.ndarray)
+        and _row_buffers.get(id(buffer), None) is buffer
+        and base.ctypes.data == buffer.ctypes.data
+        and min_rows <= buffer.shape[0]
+    ):
+        return buffer
+    buffer = np.empty((max(capacity, min_rows),) + base.shape[1:], dtype=base.dtype)
+    buffer[: base.shape[0]] = base
+    _row_buffers[id(buffer)] = buffer
+    return buffer
+
+
+def _snapshot_row_buffers(props: Any) -> Any:
+    """Copy the arrays in some props that are views of buffers from
+    `_get_row_buffer()`, so they can be encoded while later compactions write
+    into the buffers. Returns `props` itself if there aren't any."""
+    snapshots: Dict[str, np.ndarray] = {}
+    with _row_buffers_lock:
+        for k, v in vars(props).items():
+            if (
+                isinstance(v, np.ndarray)
+                and v.base is not None
+                and _row_buffers.get(id(v.base), None) is v.base
+            ):
+                snapshots[k] = v.copy()
+    if len(snapshots) == 0:
+        return props
+    props = copy.copy(props)
+    for k, v in snapshots.items():
+        setattr(props, k, v)
+    return props
+
+
+def _write_rows(
+    base: np.ndarray, offset: int, rows: np.ndarray, capacity: int
+) -> np.ndarray:
+    """Write rows into an array starting at `offset`, extending it if the rows
+    go past its end. Only the written rows are copied, unless `base` isn't a
+    view of a buffer from `_get_row_buffer()` with room for them."""
+    stop = offset + rows.shape[0]
+    with _row_buffers_lock:
+        buffer = _get_row_buffer(base, stop, capacity)
+        buffer[offset:stop] = rows
+    return buffer[: max(base.shape[0], stop)]
+
+
+@dataclasses.dataclass
+class SceneNodeArrayPatchMessage(Message):
+    """Sent server->client to update some rows of an array property of a scene
+    node in place. Rows are indexed along the first axis of the array."""
+
+    name: str
+    prop_name: str
+    indices: npt.NDArray[np.uint32]
+    """Indices of the rows to update."""
+    values: npt.NDArray[np.generic]
+    """New values for each row, with the same dtype as the property."""
+
+    @override
+    def redundancy_key(self) -> Optional[str]:
+        # Patches for the same property don't supersede each other.
+        return None
+
+    @override
+    def compact_into(self, base: infra.Message) -> Optional[infra.Message]:
+        if not isinstance(base, _CreateSceneNodeMessage):
+            return None
+        array = getattr(getattr(base, "props", None), self.prop_name, None)
+        if not isinstance(array, np.ndarray) or array.dtype != self.values.dtype:
+            return None
+        num_rows = array.shape[0]
+        with _row_buffers_lock:
+            buffer = _get_row_buffer(array, num_rows, num_rows)
+            buffer[self.indices] = self.values
+        return _apply_updates(base, {self.prop_name: buffer[:num_rows]})
+
+
+@dataclasses.dataclass
+class PointCloudAppendMessage(Message):
+    """Sent server->client to write points into a point cloud that has
+    `max_points` set. Points are written starting at row `offset`, and the
+    point cloud grows if they go past its current end."""
+
+    name: str
+    offset: int
+    points: Union[
+        npt.NDArray[np.float16], npt.NDArray[np.float32], npt.NDArray[np.uint16]
+    ]
+    """New points, with the same dtype as the point cloud."""
+    colors: Optional[npt.NDArray[np.uint8]]
+    """Colors of the new points, or None if the point cloud has a single color."""
+    scalars: Optional[
+        Union[
+            npt.NDArray[np.uint8],
+            npt.NDArray[np.uint16],
+            npt.NDArray[np.float16],
+            npt.NDArray[np.float32],
+        ]
+    ]
+    """Scalars of the new points, or None if the point cloud has no scalars."""
+
+    @override
+    def redundancy_key(self) -> Optional[str]:
+        # Appends don't supersede each other.
+        return None
+
+    @override
+    def compact_into(self, base: infra.Message) -> Optional[infra.Message]:
+        if (
+            not isinstance(base, PointCloudMessage)
+            or base.props.max_points is None
+            or base.props.points.dtype != self.points.dtype
+            or (self.colors is None) != (base.props.colors.shape == (3,))
+            or (self.scalars is None) != (base.props.scalars is None)
+            or (
+                self.scalars is not None
+                and base.props.scalars is not None
+                and self.scalars.dtype != base.props.scalars.dtype
+            )
+        ):
+            return None
+        max_points = base.props.max_points
+        updates: Dict[str, Any] = {
+            "points": _write_rows(
+                base.props.points, self.offset, self.points, max_points
+            )
+        }
+        if self.colors is not None:
+            updates["colors"] = _write_rows(
+                base.props.colors, self.offset, self.colors, max_points
+            )
+        if self.scalars is not None and base.props.scalars is not None:
+            updates["scalars"] = _write_rows(
+                base.props.scalars, self.offset, self.scalars, max_points
+            )
+        return _apply_updates(base, updates)
+
 
 @dataclasses.dataclass
 class ThemeConfigurationMessage(Message):
@@ -1477,6 +1832,10 @@ class GaussianSplatsMessage(_CreateSceneNodeMessage):
 
     props: GaussianSplatsProps
 
+    @override
+    def is_bulk(self) -> bool:
+        return True
+
 
 @dataclasses.dataclass
 class GaussianSplatsProps:
@@ -1493,7 +1852,121 @@ class GaussianSplatsProps:
     - cov5 (f16), cov6 (f16)
     - rgba (int32)
 
-    Where cov1-6 are the upper-triangular terms of covariance matrices."""
+    Where cov1-6 are the upper-triangular terms of covariance matrices.
+
+    Empty for splats that are streamed with `GaussianSplatsChunkMessage`."""
+
+
+@dataclasses.dataclass
+class GaussianSplatsChunkMessage(Message):
+    """Sent server->client to stream a chunk of compressed Gaussian splats.
+    Chunks are decoded into rows `offset` to `offset + N` of the buffer, and
+    clients start drawing splats before every chunk has arrived. Splats in
+    each chunk are spatially coherent, and share quantization bounds in
+    blocks of 256."""
+
+    name: str
+    chunk_index: int
+    offset: int
+    num_gaussians: int
+    """Total number of splats in the scene node, across all chunks."""
+    bounds: npt.NDArray[np.float32]
+    """Quantization bounds for each block of 256 splats, with shape
+    (ceil(N / 256), 12). Each row contains minimum and maximum centers, then
+    minimum and maximum log-scales."""
+    packed: npt.NDArray[np.uint32]
+    """Compressed splats, with shape (N, 4). Each row contains:
+    - Center, as 11, 10, and 11 bits inside the block's bounds.
+    - Rotation, as the index of the largest wxyz term (2 bits), followed by
+      the other terms (10 bits each, scaled from [-1/sqrt(2), 1/sqrt(2)]).
+    - Log-scales, as 11, 10, and 11 bits inside the block's bounds.
+    - RGBA, as 8 bits each."""
+
+    @override
+    def redundancy_key(self) -> str:
+        # Re-streaming a chunk replaces it. Chunks are identified by index
+        # instead of offset, because pruning splats moves chunks.
+        return f"{type(self).__name__}-{self.name}-{self.chunk_index}"
+
+    @override
+    def is_bulk(self) -> bool:
+        return True
+
+
+@dataclasses.dataclass
+class GaussianSplatsUpdateMessage(Message):
+    """Sent server->client to write some words of some rows of a Gaussian
+    splat buffer, in place. For example, updating colors only sends the RGBA
+    word of each updated splat. Splats grow if rows go past the current end.
+
+    For compressed splats, updates are uncompressed rows of one chunk, which
+    are written over the decoded chunk."""
+
+    name: str
+    num_gaussians: int
+    """Number of splats after the update."""
+    start: int
+    """First row to write, if `indices` is None."""
+    indices: Optional[npt.NDArray[np.uint32]]
+    """Rows to write, or None to write consecutive rows from `start`."""
+    word_range: Tuple[int, int]
+    """Start and end of the words to write in each row, in the layout of
+    `GaussianSplatsProps.buffer`."""
+    values: npt.NDArray[np.uint32]
+    """Words to write, with shape (M, end - start)."""
+    chunk_index: Optional[int] = None
+    """For compressed splats: the chunk that the rows belong to. Each update
+    carries every row of the chunk that was updated since the chunk was
+    streamed, so it replaces the previous update."""
+
+    @override
+    def redundancy_key(self) -> Optional[str]:
+        if self.chunk_index is not None:
+            return f"{type(self).__name__}-{self.name}-chunk-{self.chunk_index}"
+        # Updates to uncompressed splats don't supersede each other.
+        return None
+
+    @override
+    def compact_into(self, base: infra.Message) -> Optional[infra.Message]:
+        # Updates to compressed splats aren't part of the scene node's buffer.
+        if not isinstance(base, GaussianSplatsMessage) or self.chunk_index is not None:
+            return None
+        buffer = base.props.buffer
+        out = np.zeros((self.num_gaussians, 8), dtype=np.uint32)
+        out[: min(buffer.shape[0], self.num_gaussians)] = buffer[: self.num_gaussians]
+        rows = (
+            np.arange(self.start, self.start + self.values.shape[0])
+            if self.indices is None
+            else self.indices
+        )
+        out[rows, self.word_range[0] : self.word_range[1]] = self.values
+        return _apply_updates(base, {"buffer": out})
+
+
+@dataclasses.dataclass
+class GaussianSplatsPruneMessage(Message):
+    """Sent server->client to remove some rows of a Gaussian splat buffer.
+    Remaining splats keep their order."""
+
+    name: str
+    mask: npt.NDArray[np.uint8]
+    """Bit-packed mask with one bit per splat, set for splats to remove. Bits
+    are ordered from the most significant bit of each byte."""
+
+    @override
+    def redundancy_key(self) -> Optional[str]:
+        return None
+
+    @override
+    def compact_into(self, base: infra.Message) -> Optional[infra.Message]:
+        if not isinstance(base, GaussianSplatsMessage):
+            return None
+        buffer = base.props.buffer
+        # Compressed splats are streamed in chunks, so their buffer is empty.
+        if self.mask.shape[0] != (buffer.shape[0] + 7) // 8:
+            return None
+        removed = np.unpackbits(self.mask, count=buffer.shape[0]).astype(bool)
+        return _apply_updates(base, {"buffer": buffer[~removed]})
 
 
 @dataclasses.dataclass
@@ -1555,6 +2028,11 @@ class FileTransferStartDownload(Message):
     def redundancy_key(self) -> str:
         return type(self).__name__ + "-" + self.transfer_uuid
 
+    @override
+    def dependency_key(self) -> Optional[Tuple[str, ...]]:
+        # Keyed by the transfer, so downloads don't hold up other messages.
+        return ("file_transfer", self.transfer_uuid)
+
 
 @dataclasses.dataclass
 class FileTransferPart(Message):
@@ -1571,6 +2049,14 @@ class FileTransferPart(Message):
             type(self).__name__ + "-" + self.transfer_uuid + "-" + str(self.part_index)
         )
 
+    @override
+    def dependency_key(self) -> Optional[Tuple[str, ...]]:
+        return ("file_transfer", self.transfer_uuid)
+
+    @override
+    def is_bulk(self) -> bool:
+        return True
+
 
 @dataclasses.dataclass
 class FileTransferPartAck(Message):
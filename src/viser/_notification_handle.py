@@ -40,10 +40,5 @@ class NotificationHandle(
         self._impl.websock_interface.queue_message(msg)
 
     def remove(self) -> None:
-        self._impl.websock_interface.get_message_buffer().remove_from_buffer(
-            # Don't send outdated GUI updates to new clients.
-            # This is brittle...
-            lambda message: getattr(message, "uuid", None) == self._impl.uuid
-        )
         msg = RemoveNotificationMessage(self._impl.uuid)
         self._impl.websock_interface.queue_message(msg)
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import heapq
+from typing import Dict, List, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+NodeKey = Tuple[int, int, int, int]
+"""Octree node, as `(depth, x, y, z)`. `x`, `y`, and `z` index the node's cell
+in a `2**depth` grid over the root bounding cube."""
+
+
+class PointCloudOctree:
+    """Octree for level-of-detail rendering of large point clouds.
+
+    Refinement is additive: each node stores a random subsample of the points
+    in its cell that aren't stored by any of its ancestors. Showing a node and
+    all of its ancestors gives a uniform subsample of the cell, and showing
+    children adds detail without resending anything.
+
+    Points are reordered once when the octree is built, so each node's points
+    are a contiguous slice of `points` and `colors`."""
+
+    def __init__(
+        self,
+        points: np.ndarray,
+        colors: np.ndarray,
+        max_points_per_node: int = 50_000,
+        max_depth: int = 16,
+        seed: int = 0,
+    ) -> None:
+        assert len(points.shape) == 2 and points.shape[-1] == 3
+        assert colors.shape in ((3,), points.shape)
+        assert 0 <= max_depth <= 16
+        num_points = points.shape[0]
+
+        self.lower = points.min(axis=0).astype(np.float64)
+        self.size = max(float((points.max(axis=0) - self.lower).max()), 1e-6)
+        """Side length of the root cell."""
+
+        # Integer cell coordinates at the finest level. Coarser cells are found
+        # by shifting these.
+        cells = np.empty((num_points, 3), dtype=np.uint16)
+        scale = (1 << max_depth) / self.size
+        chunk_size = 1 << 20
+        for start in range(0, num_points, chunk_size):
+            cells[start : start + chunk_size] = np.clip(
+                (points[start : start + chunk_size] - self.lower) * scale,
+                0,
+                (1 << max_depth) - 1,
+            )
+
+        # Assign points to nodes, one level at a time. Points are shuffled, so
+        # taking the first points in each cell gives a random subsample.
+        remaining = np.random.default_rng(seed).permutation(num_points)
+        taken: List[npt.NDArray[np.int64]] = []
+        num_taken = 0
+        self._range_from_key: Dict[NodeKey, Tuple[int, int]] = {}
+        for depth in range(max_depth + 1):
+            if len(remaining) == 0:
+                break
+            level_cells = (cells[remaining] >> (max_depth - depth)).astype(np.int64)
+            codes = (
+                (level_cells[:, 0] << (2 * depth))
+                | (level_cells[:, 1] << depth)
+                | level_cells[:, 2]
+            )
+            order = np.argsort(codes, kind="stable")
+            codes = codes[order]
+            remaining = remaining[order]
+
+            unique_codes, starts, counts = np.unique(
+                codes, return_index=True, return_counts=True
+            )
+            if depth == max_depth:
+                take = np.ones(len(codes), dtype=bool)
+            else:
+                rank = np.arange(len(codes)) - np.repeat(starts, counts)
+                take = rank < max_points_per_node
+                counts = np.minimum(counts, max_points_per_node)
+
+            stops = num_taken + np.cumsum(counts)
+            mask = (1 << depth) - 1
+            for code, stop, count in zip(
+                unique_codes.tolist(), stops.tolist(), counts.tolist()
+            ):
+                key = (depth, code >> (2 * depth), (code >> depth) & mask, code & mask)
+                self._range_from_key[key] = (stop - count, stop)
+            taken.append(remaining[take])
+            num_taken += int(counts.sum())
+            remaining = remaining[~take]
+
+        permutation = np.concatenate(taken)
+        self.points = points[permutation]
+        self.colors = colors if colors.shape == (3,) else colors[permutation]
+
+    def keys(self) -> List[NodeKey]:
+        return list(self._range_from_key.keys())
+
+    def get_slice(self, key: NodeKey) -> slice:
+        """Get the slice of `points` and `colors` that a node stores."""
+        return slice(*self._range_from_key[key])
+
+    def get_children(self, key: NodeKey) -> List[NodeKey]:
+        depth, x, y, z = key
+        children = []
+        for i in range(8):
+            child = (
+                depth + 1,
+                2 * x + (i >> 2),
+                2 * y + ((i >> 1) & 1),
+                2 * z + (i & 1),
+            )
+            if child in self._range_from_key:
+                children.append(child)
+        return children
+
+    def get_bounding_sphere(self, key: NodeKey) -> Tuple[np.ndarray, float]:
+        """Get the center and radius of a sphere containing a node's cell."""
+        depth, x, y, z = key
+        cell_size = self.size / (1 << depth)
+        center = self.lower + (np.array([x, y, z]) + 0.5) * cell_size
+        return center, cell_size * np.sqrt(3.0) / 2.0
+
+    def select(
+        self,
+        R_camera_local: np.ndarray,
+        t_camera_local: np.ndarray,
+        fov: float,
+        aspect: float,
+        image_height: int,
+        point_budget: int,
+        min_pixels: float = 1.0,
+    ) -> List[NodeKey]:
+        """Pick nodes to show for a camera, coarsest first.
+
+        Nodes are refined in order of their projected size on screen, until
+        the point budget is used up. Nodes outside of the view frustum and
+        nodes smaller than `min_pixels` are skipped. The root is always
+        included, and every selected node's parent is selected before it.
+
+        Args:
+            R_camera_local: Rotation from the point cloud's frame to the camera
+                frame. Cameras use the OpenCV convention: +Z forward, +Y down.
+            t_camera_local: Translation from the point cloud's frame to the
+                camera frame.
+            fov: Vertical field of view, in radians.
+            aspect: Image width divided by height.
+            image_height: Image height, in pixels.
+            point_budget: Maximum number of points to select.
+            min_pixels: Minimum projected radius of a node, in pixels.
+        """
+        tan_y = np.tan(fov / 2.0)
+        tan_x = tan_y * aspect
+        # Distances from a frustum plane scale by these, relative to |x| or |y|.
+        sec_x = np.sqrt(1.0 + tan_x**2)
+        sec_y = np.sqrt(1.0 + tan_y**2)
+        focal_px = image_height / 2.0 / tan_y
+
+        root: NodeKey = (0, 0, 0, 0)
+        heap: List[Tuple[float, NodeKey]] = [(-np.inf, root)]
+        out: List[NodeKey] = []
+        num_points = 0
+        while len(heap) > 0:
+            _, key = heapq.heappop(heap)
+            start, stop = self._range_from_key[key]
+            if num_points + stop - start > point_budget and len(out) > 0:
+                break
+            out.append(key)
+            num_points += stop - start
+
+            for child in self.get_children(key):
+                center, radius = self.get_bounding_sphere(child)
+                x, y, z = R_camera_local @ center + t_camera_local
+                if (
+                    z < -radius
+                    or abs(x) - z * tan_x > radius * sec_x
+                    or abs(y) - z * tan_y > radius * sec_y
+                ):
+                    continue
+                distance = np.sqrt(x**2 + y**2 + z**2)
+                projected_px = focal_px * radius / max(distance, 1e-6)
+                if projected_px < min_pixels:
+                    continue
+                heapq.heappush(heap, (-projected_px, child))
+        return out
@@ -6,7 +6,16 @@ import time
 import warnings
 from collections.abc import Coroutine
 from concurrent.futures import ThreadPoolExecutor
-from typing import TYPE_CHECKING, Callable, Tuple, TypeVar, Union, cast, get_args
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+    get_args,
+)
 
 import imageio.v3 as iio
 import numpy as np
@@ -14,7 +23,13 @@ from typing_extensions import Literal, ParamSpec, TypeAlias, assert_never
 
 from . import _messages
 from . import transforms as tf
-from ._assignable_props_api import colors_to_uint8
+from ._assignable_props_api import (
+    Quantization,
+    cast_scalars,
+    colors_to_uint8,
+    quantize_positions,
+)
+from ._point_cloud_octree import PointCloudOctree
 from ._scene_handles import (
     AmbientLightHandle,
     BatchedAxesHandle,
@@ -38,6 +53,7 @@ from ._scene_handles import (
     MeshSkinnedBoneHandle,
     MeshSkinnedHandle,
     PointCloudHandle,
+    PointCloudLodHandle,
     PointLightHandle,
     RectAreaLightHandle,
     SceneNodeHandle,
@@ -49,13 +65,18 @@ from ._scene_handles import (
     TransformControlsEvent,
     TransformControlsHandle,
     _ClickableSceneNodeHandle,
+    _node_name_key,
+    _PointCloudLodState,
     _TransformControlsState,
 )
+from ._splat_compression import pack_splats
 from ._threadpool_exceptions import print_threadpool_errors
+from .infra import PrefixTree
 
 if TYPE_CHECKING:
     import trimesh
 
+    from ._callback_scheduler import CallbackScheduler
     from ._viser import ClientHandle, ViserServer
     from .infra import ClientId
 
@@ -106,6 +127,32 @@ def _encode_image_binary(
     return media_type, binary
 
 
+def _cast_vertices(
+    vertices: np.ndarray, precision: Literal["float32", "quantized"]
+) -> tuple[np.ndarray, Quantization | None]:
+    if precision == "quantized":
+        return quantize_positions(vertices)
+    return vertices.astype(np.float32), None
+
+
+def _default_scalar_range(
+    scalars: np.ndarray,
+    colormap: str,
+    colormap_lut: np.ndarray | None,
+) -> tuple[float, float]:
+    # Discrete colormaps map each integer to one color.
+    if colormap_lut is not None:
+        return (0.0, float(max(colormap_lut.shape[0] - 1, 1)))
+    if colormap == "tab10":
+        return (0.0, 9.0)
+    finite = scalars[np.isfinite(scalars)]
+    if finite.size == 0:
+        return (0.0, 1.0)
+    lower = float(finite.min())
+    upper = float(finite.max())
+    return (lower, upper if upper > lower else lower + 1.0)
+
+
 TVector = TypeVar("TVector", bound=tuple)
 
 
@@ -128,10 +175,12 @@ class SceneApi:
         owner: ViserServer | ClientHandle,  # Who do I belong to?
         thread_executor: ThreadPoolExecutor,
         event_loop: asyncio.AbstractEventLoop,
+        callback_scheduler: CallbackScheduler,
     ) -> None:
         from ._viser import ViserServer
 
         self._thread_executor = thread_executor
+        self._callback_scheduler = callback_scheduler
         self._event_loop = event_loop
 
         self._owner = owner
@@ -148,6 +197,8 @@ class SceneApi:
             str, TransformControlsHandle
         ] = {}
         self._handle_from_node_name: dict[str, SceneNodeHandle] = {}
+        self._node_name_tree: PrefixTree[str] = PrefixTree()
+        """Index over scene node names, for finding the descendants of a node."""
 
         self._scene_pointer_cb: (
             Callable[[ScenePointerEvent], None | Coroutine] | None
@@ -260,6 +311,44 @@ class SceneApi:
                 )
             )
 
+    def set_poses(
+        self,
+        names: Sequence[str],
+        wxyzs: np.ndarray | Sequence[tuple[float, float, float, float]],
+        positions: np.ndarray | Sequence[tuple[float, float, float]],
+    ) -> None:
+        """Set the orientations and positions of many scene nodes at once.
+
+        This is equivalent to assigning `.wxyz` and `.position` for each scene
+        node, but all poses are sent to clients in a single message. This is
+        much cheaper for updating many nodes every frame, for example the
+        joints of a robot.
+
+        Args:
+            names: Names of the scene nodes to update.
+            wxyzs: Orientations of each scene node, as an array of shape (N, 4).
+            positions: Positions of each scene node, as an array of shape (N, 3).
+        """
+        names = tuple(names)
+        wxyzs = np.asarray(wxyzs, dtype=np.float32)
+        positions = np.asarray(positions, dtype=np.float32)
+        if wxyzs.shape != (len(names), 4) or positions.shape != (len(names), 3):
+            raise ValueError(
+                f"Expected wxyzs and positions with shapes ({len(names)}, 4) and"
+                f" ({len(names)}, 3), but got {wxyzs.shape} and {positions.shape}."
+            )
+
+        # Keep handle states in sync, without queueing per-node messages.
+        for name, wxyz, position in zip(names, wxyzs, positions):
+            handle = self._handle_from_node_name.get(name, None)
+            if handle is not None:
+                handle._impl.wxyz[:] = wxyz
+                handle._impl.position[:] = position
+
+        self._websock_interface.queue_message(
+            _messages.SetPosesMessage(names, wxyzs, positions)
+        )
+
     def set_global_visibility(self, visible: bool) -> None:
         """Set visibility for all scene nodes. If set to False, all scene nodes
         will be hidden.
@@ -1090,12 +1179,19 @@ class SceneApi:
         self,
         name: str,
         points: np.ndarray,
-        colors: np.ndarray | tuple[float, float, float],
+        colors: np.ndarray | tuple[float, float, float] | None = None,
         point_size: float = 0.1,
         point_shape: Literal[
             "square", "diamond", "circle", "rounded", "sparkle"
         ] = "square",
-        precision: Literal["float16", "float32"] = "float16",
+        precision: Literal["float16", "float32", "quantized"] = "float16",
+        max_points: int | None = None,
+        scalars: np.ndarray | None = None,
+        colormap: Literal[
+            "viridis", "plasma", "inferno", "magma", "turbo", "gray", "tab10"
+        ] = "viridis",
+        scalar_range: tuple[float, float] | None = None,
+        colormap_lut: np.ndarray | None = None,
         wxyz: tuple[float, float, float, float] | np.ndarray = (1.0, 0.0, 0.0, 0.0),
         position: tuple[float, float, float] | np.ndarray = (0.0, 0.0, 0.0),
         visible: bool = True,
@@ -1106,10 +1202,34 @@ class SceneApi:
             name: Name of scene node. Determines location in kinematic tree.
             points: Location of points. Should have shape (N, 3).
             colors: Colors of points. Should have shape (N, 3) or (3,).
+                Required unless `scalars` is set.
             point_size: Size of each point.
             point_shape: Shape to draw each point.
             precision: Precision of the point cloud data. The input points array
-                will be cast to this precision.
+                will be cast to this precision. "quantized" sends each point as
+                three uint16 offsets inside the point cloud's bounding box,
+                which is as compact as float16 but has uniform accuracy: about
+                1.5cm for a 1km wide map.
+            max_points: Capacity for streaming points with
+                :meth:`PointCloudHandle.append()`. Clients preallocate buffers
+                for this many points, and only appended points are sent. Once
+                the point cloud is full, appended points replace the oldest
+                ones.
+            scalars: Per-point scalar values or integer labels, like lidar
+                intensities or segmentation labels. Should have shape (N,).
+                If set, scalars are mapped to colors on the client, so
+                changing the colormap or range doesn't resend any per-point
+                data. uint8, uint16, float16, and float32 arrays are sent
+                as-is; other arrays are cast to the smallest of these that
+                fits.
+            colormap: Colormap for `scalars`. "tab10" is a categorical
+                colormap for labels.
+            scalar_range: Scalars that are mapped to the first and last colors
+                of the colormap. If None, this is the range of `scalars`, or
+                (0, K - 1) for categorical colormaps with K colors.
+            colormap_lut: Custom colormap, as a lookup table with shape (K, 3).
+                Entries are not interpolated, so integer labels in the
+                default `scalar_range` are mapped to their own entry.
             wxyz: Quaternion rotation to parent frame from local frame (R_pl).
             position: Translation to parent frame from local frame (t_pl).
             visible: Whether or not this scene node is initially visible.
@@ -1117,6 +1237,10 @@ class SceneApi:
         Returns:
             Handle for manipulating scene node.
         """
+        if colors is None:
+            if scalars is None:
+                raise ValueError("Either colors or scalars should be set.")
+            colors = (255, 255, 255)
         colors_cast = colors_to_uint8(np.asarray(colors))
         assert len(points.shape) == 2 and points.shape[-1] == 3, (
             "Shape of points should be (N, 3)."
@@ -1125,23 +1249,158 @@ class SceneApi:
             points.shape,
             (3,),
         }, "Shape of colors should be (N, 3) or (3,)."
+        assert max_points is None or points.shape[0] <= max_points, (
+            "Number of points should be at most max_points."
+        )
+        scalars_cast = None
+        if scalars is not None:
+            scalars_cast = cast_scalars(scalars)
+            assert scalars_cast.shape == points.shape[:1], (
+                "Shape of scalars should be (N,)."
+            )
+        if colormap_lut is not None:
+            colormap_lut = colors_to_uint8(np.asarray(colormap_lut))
+            assert len(colormap_lut.shape) == 2 and colormap_lut.shape[-1] == 3, (
+                "Shape of colormap_lut should be (K, 3)."
+            )
+        if scalar_range is None:
+            scalar_range = (
+                (0.0, 1.0)
+                if scalars_cast is None
+                else _default_scalar_range(scalars_cast, colormap, colormap_lut)
+            )
+        quantization = None
+        if precision == "quantized":
+            points_cast, quantization = quantize_positions(points)
+        else:
+            points_cast = points.astype(
+                {
+                    "float16": np.float16,
+                    "float32": np.float32,
+                }[precision]
+            )
+        # The cast points are a new array, so they can be shared with the handle
+        # without another copy.
+        points_cast.flags.writeable = False
         message = _messages.PointCloudMessage(
             name=name,
             props=_messages.PointCloudProps(
-                points=points.astype(
-                    {
-                        "float16": np.float16,
-                        "float32": np.float32,
-                    }[precision]
-                ),
+                points=points_cast,
                 colors=colors_cast,
+                scalars=scalars_cast,
+                scalars_dtype=(
+                    "float32"
+                    if scalars_cast is None
+                    else cast(
+                        Literal["uint8", "uint16", "float16", "float32"],
+                        scalars_cast.dtype.name,
+                    )
+                ),
+                colormap=colormap,
+                colormap_lut=colormap_lut,
+                scalar_range=(float(scalar_range[0]), float(scalar_range[1])),
                 point_size=point_size,
                 point_shape=point_shape,
                 precision=precision,
+                quantization=quantization,
+                max_points=max_points,
             ),
         )
         return PointCloudHandle._make(self, message, name, wxyz, position, visible)
 
+    def add_point_cloud_lod(
+        self,
+        name: str,
+        points: np.ndarray,
+        colors: np.ndarray | tuple[float, float, float],
+        point_size: float = 0.1,
+        point_shape: Literal[
+            "square", "diamond", "circle", "rounded", "sparkle"
+        ] = "square",
+        precision: Literal["float16", "float32", "quantized"] = "float32",
+        point_budget: int = 2_000_000,
+        max_points_per_node: int = 50_000,
+        throttle_hz: float = 5.0,
+        wxyz: tuple[float, float, float, float] | np.ndarray = (1.0, 0.0, 0.0, 0.0),
+        position: tuple[float, float, float] | np.ndarray = (0.0, 0.0, 0.0),
+        visible: bool = True,
+    ) -> PointCloudLodHandle:
+        """Add a point cloud that's streamed with level of detail. This is
+        useful for point clouds that are too large to send to clients in
+        full, like lidar maps with hundreds of millions of points.
+
+        The points are indexed in an octree, where each node stores a random
+        subsample of its cell. Each client is sent the nodes that are visible
+        from its camera, coarsest first, until `point_budget` points have been
+        sent. Nodes are added and removed as the camera moves.
+
+        Building the octree takes a few seconds for 10M points. The octree
+        keeps a reordered copy of `points` and `colors`.
+
+        Args:
+            name: Name of scene node. Determines location in kinematic tree.
+            points: Location of points. Should have shape (N, 3).
+            colors: Colors of points. Should have shape (N, 3) or (3,).
+            point_size: Size of each point.
+            point_shape: Shape to draw each point.
+            precision: Precision of the point cloud data sent to clients.
+                Quantized nodes are encoded inside their own bounding boxes,
+                so deeper nodes are more accurate.
+            point_budget: Maximum number of points to send to each client.
+            max_points_per_node: Maximum number of points in each octree node.
+                Smaller nodes make culling more precise, but require more
+                messages.
+            throttle_hz: Maximum rate at which each client's nodes are updated
+                as its camera moves.
+            wxyz: Quaternion rotation to parent frame from local frame (R_pl).
+            position: Translation to parent frame from local frame (t_pl).
+            visible: Whether or not this scene node is initially visible.
+
+        Returns:
+            Handle for manipulating scene node.
+        """
+        from ._viser import ViserServer
+
+        colors_cast = colors_to_uint8(np.asarray(colors))
+        assert len(points.shape) == 2 and points.shape[-1] == 3, (
+            "Shape of points should be (N, 3)."
+        )
+        assert colors_cast.shape in {
+            points.shape,
+            (3,),
+        }, "Shape of colors should be (N, 3) or (3,)."
+        octree = PointCloudOctree(
+            points, colors_cast, max_points_per_node=max_points_per_node
+        )
+
+        # The octree nodes are sent as children of a frame, so they move with
+        # it.
+        message = _messages.FrameMessage(
+            name=name,
+            props=_messages.FrameProps(
+                show_axes=False,
+                axes_length=0.5,
+                axes_radius=0.025,
+                origin_radius=0.05,
+                origin_color=(236, 236, 0),
+            ),
+        )
+        handle = PointCloudLodHandle._make(self, message, name, wxyz, position, visible)
+        handle._lod = _PointCloudLodState(
+            octree=octree,
+            point_size=point_size,
+            point_shape=point_shape,
+            precision=precision,
+            point_budget=point_budget,
+            throttle_hz=throttle_hz,
+        )
+        if isinstance(self._owner, ViserServer):
+            self._owner.on_client_connect(handle._attach_client)
+            self._owner.on_client_disconnect(handle._detach_client)
+        else:
+            handle._attach_client(self._owner)
+        return handle
+
     def add_mesh_skinned(
         self,
         name: str,
@@ -1225,6 +1484,7 @@ class SceneApi:
             name=name,
             props=_messages.SkinnedMeshProps(
                 vertices=vertices.astype(np.float32),
+                vertices_quantization=None,
                 faces=faces.astype(np.uint32),
                 color=_encode_rgb(color),
                 wireframe=wireframe,
@@ -1268,6 +1528,7 @@ class SceneApi:
         material: Literal["standard", "toon3", "toon5"] = "standard",
         flat_shading: bool = False,
         side: Literal["front", "back", "double"] = "front",
+        vertex_precision: Literal["float32", "quantized"] = "float32",
         wxyz: tuple[float, float, float, float] | np.ndarray = (1.0, 0.0, 0.0, 0.0),
         position: tuple[float, float, float] | np.ndarray = (0.0, 0.0, 0.0),
         visible: bool = True,
@@ -1290,6 +1551,9 @@ class SceneApi:
             flat_shading: Whether to do flat shading. This argument is ignored
                 when wireframe=True.
             side: Side of the surface to render ('front', 'back', 'double').
+            vertex_precision: Precision of the vertex positions sent to clients.
+                "quantized" sends each vertex as three uint16 offsets inside the
+                mesh's bounding box, which halves the size of the vertices.
             wxyz: Quaternion rotation to parent frame from local frame (R_pl).
             position: Translation from parent frame to local frame (t_pl).
             visible: Whether or not this mesh is initially visible.
@@ -1309,10 +1573,14 @@ class SceneApi:
                 f"Invalid combination of {wireframe=} and {flat_shading=}. Flat shading argument will be ignored.",
                 stacklevel=2,
             )
+        vertices_cast, vertices_quantization = _cast_vertices(
+            vertices, vertex_precision
+        )
         message = _messages.MeshMessage(
             name=name,
             props=_messages.MeshProps(
-                vertices=vertices.astype(np.float32),
+                vertices=vertices_cast,
+                vertices_quantization=vertices_quantization,
                 faces=faces.astype(np.uint32),
                 color=_encode_rgb(color),
                 wireframe=wireframe,
@@ -1377,6 +1645,7 @@ class SceneApi:
         material: Literal["standard", "toon3", "toon5"] = "standard",
         flat_shading: bool = False,
         side: Literal["front", "back", "double"] = "front",
+        vertex_precision: Literal["float32", "quantized"] = "float32",
         wxyz: tuple[float, float, float, float] | np.ndarray = (1.0, 0.0, 0.0, 0.0),
         position: tuple[float, float, float] | np.ndarray = (0.0, 0.0, 0.0),
         visible: bool = True,
@@ -1407,6 +1676,9 @@ class SceneApi:
             flat_shading: Whether to do flat shading. This argument is ignored
                 when wireframe=True.
             side: Side of the surface to render ('front', 'back', 'double').
+            vertex_precision: Precision of the vertex positions sent to clients.
+                "quantized" sends each vertex as three uint16 offsets inside the
+                mesh's bounding box, which halves the size of the vertices.
             wxyz: Quaternion rotation to parent frame from local frame (R_pl).
             position: Translation from parent frame to local frame (t_pl).
             visible: Whether or not these meshes are initially visible.
@@ -1438,10 +1710,14 @@ class SceneApi:
             batched_scales = np.asarray(batched_scales).astype(np.float32)
             assert batched_scales.shape in ((num_instances,), (num_instances, 3))
 
+        vertices_cast, vertices_quantization = _cast_vertices(
+            vertices, vertex_precision
+        )
         message = _messages.BatchedMeshesMessage(
             name=name,
             props=_messages.BatchedMeshesProps(
-                vertices=vertices.astype(np.float32),
+                vertices=vertices_cast,
+                vertices_quantization=vertices_quantization,
                 faces=faces.astype(np.uint32),
                 batched_wxyzs=batched_wxyzs.astype(np.float32),
                 batched_positions=batched_positions.astype(np.float32),
@@ -1544,6 +1820,7 @@ class SceneApi:
         wxyz: Tuple[float, float, float, float] | np.ndarray = (1.0, 0.0, 0.0, 0.0),
         position: Tuple[float, float, float] | np.ndarray = (0.0, 0.0, 0.0),
         visible: bool = True,
+        compression: Literal["none", "quantized"] = "none",
     ) -> GaussianSplatHandle:
         """Add a model to render using Gaussian Splatting.
 
@@ -1559,6 +1836,13 @@ class SceneApi:
             wxyz: R_parent_local transformation.
             position: t_parent_local transformation.
             visible: Initial visibility of scene node.
+            compression: How splats are sent to clients. "quantized" splats
+                take 16 bytes each instead of 32, and are streamed in
+                spatially coherent chunks, which clients start drawing before
+                the whole scene has arrived. Centers are quantized inside the
+                bounds of each block of 256 nearby splats, and covariances
+                are sent as a quantized rotation and log-scales, so this is
+                lossy. The handle's `buffer` contains the decoded splats.
 
         Returns:
             Scene node handle.
@@ -1569,35 +1853,28 @@ class SceneApi:
         assert opacities.shape == (num_gaussians, 1)
         assert covariances.shape == (num_gaussians, 3, 3)
 
-        # Get upper-triangular terms of covariance matrix.
-        cov_triu = covariances.reshape((-1, 9))[:, np.array([0, 1, 2, 4, 5, 8])]
-        buffer = np.concatenate(
-            [
-                # First texelFetch.
-                # - xyz (96 bits): centers.
-                centers.astype(np.float32).view(np.uint8),
-                # - w (32 bits): this is reserved for use by the renderer.
-                np.zeros((num_gaussians, 4), dtype=np.uint8),
-                # Second texelFetch.
-                # - xyz (96 bits): upper-triangular terms of covariance.
-                cov_triu.astype(np.float16).copy().view(np.uint8),
-                # - w (32 bits): rgba.
-                colors_to_uint8(rgbs),
-                colors_to_uint8(opacities),
-            ],
-            axis=-1,
-        ).view(np.uint32)
-        assert buffer.shape == (num_gaussians, 8)
+        # Each row contains:
+        # - xyz (96 bits): centers.
+        # - w (32 bits): this is reserved for use by the renderer.
+        # - xyz (96 bits): upper-triangular terms of covariance.
+        # - w (32 bits): rgba.
+        buffer = np.zeros((num_gaussians, 8), dtype=np.uint32)
+        pack_splats(buffer, centers, covariances, rgbs, opacities)
 
         message = _messages.GaussianSplatsMessage(
             name=name,
             props=_messages.GaussianSplatsProps(
-                buffer=buffer,
+                buffer=buffer
+                if compression == "none"
+                else np.zeros((0, 8), dtype=np.uint32),
             ),
         )
         node_handle = GaussianSplatHandle._make(
             self, message, name, wxyz, position, visible
         )
+        if compression == "quantized":
+            node_handle._compression = compression
+            node_handle._stream_splats(buffer)
         return node_handle
 
     def add_box(
@@ -1932,7 +2209,8 @@ class SceneApi:
         # Remove all scene nodes.
         handles = list(self._handle_from_node_name.values())
         for handle in handles:
-            if handle.name == "/WorldAxes":
+            # Handles can already be removed along with their parents.
+            if handle.name == "/WorldAxes" or handle._impl.removed:
                 continue
             handle.remove()
 
@@ -1979,12 +2257,15 @@ class SceneApi:
             target=handle,
         )
         for cb in handle._impl_aux.update_cb:
-            if asyncio.iscoroutinefunction(cb):
-                await cb(event)
-            else:
-                self._thread_executor.submit(cb, event).add_done_callback(
-                    print_threadpool_errors
-                )
+            # Updates are sent at drag rate; slow callbacks, including async
+            # ones, should only see the latest pose.
+            self._callback_scheduler.submit(
+                ("transform-controls", handle.name, cb),
+                cb,
+                event,
+                handle._impl.callback_stats,
+                handle._impl.rate_limit_from_cb.get(cb, None),
+            )
         if handle._impl_aux.sync_cb is not None:
             handle._impl_aux.sync_cb(client_id, handle)
 
@@ -2050,11 +2331,19 @@ class SceneApi:
                 screen_pos=message.screen_pos,
                 instance_index=message.instance_index,
             )
-            if asyncio.iscoroutinefunction(cb):
+            rate_limit = handle._impl.rate_limit_from_cb.get(cb, None)
+            if rate_limit is None and asyncio.iscoroutinefunction(cb):
+                self._callback_scheduler.count_invoked(handle._impl.callback_stats)
                 await cb(event)
             else:
-                self._thread_executor.submit(cb, event).add_done_callback(
-                    print_threadpool_errors
+                # Every click runs the callback, unless it's rate limited.
+                self._callback_scheduler.submit(
+                    ("click", handle.name, cb),
+                    cb,
+                    event,
+                    handle._impl.callback_stats,
+                    rate_limit,
+                    coalesce=False,
                 )
 
     async def _handle_scene_pointer_updates(
@@ -2228,8 +2517,9 @@ class SceneApi:
     def remove_by_name(self, name: str) -> None:
         """Helper to call `.remove()` on the scene node handles of the `name`
         element or any of its children."""
-        handle_from_node_name = self._handle_from_node_name.copy()
         name = name.rstrip("/")  # '/parent/' => '/parent'
-        for node_name, handle in handle_from_node_name.items():
-            if node_name == name or node_name.startswith(name + "/"):
+        for node_name in self._node_name_tree.values_under(_node_name_key(name)):
+            handle = self._handle_from_node_name.get(node_name, None)
+            # Handles can already be removed along with their parents.
+            if handle is not None and not handle._impl.removed:
                 handle.remove()
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import copy
 import dataclasses
+import threading
 import warnings
 from collections.abc import Coroutine
 from typing import (
@@ -10,11 +11,12 @@ from typing import (
     Callable,
     Dict,
     Generic,
+    Iterable,
     Literal,
     Protocol,
     TypeVar,
-    Union,
     cast,
+    overload,
 )
 
 import numpy as np
@@ -22,13 +24,35 @@ import numpy.typing as npt
 from typing_extensions import Self, override
 
 from . import _messages
-from ._assignable_props_api import AssignablePropsBase
+from . import transforms as tf
+from ._assignable_props_api import (
+    AssignablePropsBase,
+    cast_scalars,
+    colors_to_uint8,
+    dequantize_positions,
+    frozen_copy,
+    quantize_positions,
+    readonly_view,
+)
+from ._callback_scheduler import (
+    CallbackRateLimit,
+    CallbackStats,
+    make_callback_registrar,
+)
+from ._point_cloud_octree import NodeKey, PointCloudOctree
+from ._splat_compression import (
+    SPLATS_PER_CHUNK,
+    decode_splats,
+    encode_splats,
+    morton_order,
+    pack_splats,
+)
 from .infra._infra import WebsockClientConnection, WebsockServer
 
 if TYPE_CHECKING:
     from ._gui_api import GuiApi
     from ._scene_api import SceneApi
-    from ._viser import ClientHandle
+    from ._viser import CameraHandle, ClientHandle
     from .infra import ClientId
 
 
@@ -78,6 +102,19 @@ class _SceneNodeHandleState:
         Callable[[SceneNodePointerEvent[_ClickableSceneNodeHandle]], None | Coroutine]
     ] = dataclasses.field(default_factory=list)
     removed: bool = False
+    removed_with_parent: bool = False
+    """True if this node was removed because an ancestor was removed. The
+    client removes descendants automatically, so no message is needed."""
+    delta_updates: bool = False
+    rate_limit_from_cb: dict[Callable, CallbackRateLimit] = dataclasses.field(
+        default_factory=dict
+    )
+    callback_stats: CallbackStats = dataclasses.field(default_factory=CallbackStats)
+
+
+def _node_name_key(name: str) -> tuple[str, ...]:
+    """Key for indexing a scene node name by its position in the hierarchy."""
+    return tuple(name.split("/"))
 
 
 class _SceneNodeMessage(Protocol):
@@ -97,11 +134,35 @@ class SceneNodeHandle(AssignablePropsBase[_SceneNodeHandleState]):
             _messages.SceneNodeUpdateMessage(self._impl.name, {name: value})
         )
 
+    @override
+    def _array_patches_enabled(self) -> bool:
+        return self._impl.delta_updates
+
+    @override
+    def _queue_array_patch(
+        self, name: str, indices: npt.NDArray[np.uint32], values: np.ndarray
+    ) -> None:
+        self._impl.api._websock_interface.queue_message(
+            _messages.SceneNodeArrayPatchMessage(self._impl.name, name, indices, values)
+        )
+
     @property
     def name(self) -> str:
         """Read-only name of the scene node."""
         return self._impl.name
 
+    @property
+    def delta_updates(self) -> bool:
+        """Opt-in flag for sending array property assignments as deltas. When
+        True, assigning an array with the same shape as the current value only
+        sends the rows that changed. For example, recoloring a few points in a
+        large point cloud won't resend the whole `colors` array."""
+        return self._impl.delta_updates
+
+    @delta_updates.setter
+    def delta_updates(self, delta_updates: bool) -> None:
+        self._impl.delta_updates = delta_updates
+
     @classmethod
     def _make(
         cls: type[TSceneNodeHandle],
@@ -114,12 +175,23 @@ class SceneNodeHandle(AssignablePropsBase[_SceneNodeHandleState]):
     ) -> TSceneNodeHandle:
         """Create scene node: send state to client(s) and set up
         server-side state."""
-        # Send message.
+        # The handle's props share arrays with the message, which stays in the
+        # message buffer. Shared arrays are read-only, so arrays that the
+        # caller could still modify are copied once here. Assigning to a
+        # property replaces the array instead of modifying it.
         assert isinstance(message, _messages.Message)
+        for field in dataclasses.fields(message.props):
+            value = getattr(message.props, field.name)
+            if isinstance(value, np.ndarray):
+                setattr(message.props, field.name, frozen_copy(value))
+
+        # Send message.
         api._websock_interface.queue_message(message)
+        props = copy.copy(message.props)
 
-        out = cls(_SceneNodeHandleState(name, copy.deepcopy(message.props), api))
+        out = cls(_SceneNodeHandleState(name, props, api))
         api._handle_from_node_name[name] = out
+        api._node_name_tree.add(_node_name_key(name), name)
 
         out.wxyz = wxyz
         out.position = position
@@ -184,18 +256,44 @@ class SceneNodeHandle(AssignablePropsBase[_SceneNodeHandleState]):
         )
         self._impl.visible = visible
 
+    @property
+    def callback_stats(self) -> CallbackStats:
+        """Read-only counters for callbacks triggered by clients, like click
+        and transform control callbacks."""
+        return self._impl.callback_stats
+
     def remove(self) -> None:
-        """Remove the node from the scene."""
-        # Warn if already removed.
+        """Remove the node from the scene. Descendants of the node are removed
+        with it."""
+        # Warn if already removed. Nodes that were removed along with an
+        # ancestor can be removed again without a warning, for example when
+        # removing a list of nodes that includes both parents and children.
         if self._impl.removed:
-            warnings.warn(f"Attempted to remove already removed node: {self.name}")
+            if not self._impl.removed_with_parent:
+                warnings.warn(f"Attempted to remove already removed node: {self.name}")
             return
 
         self._impl.removed = True
-        self._impl.api._handle_from_node_name.pop(self._impl.name)
-        self._impl.api._websock_interface.queue_message(
-            _messages.RemoveSceneNodeMessage(self._impl.name)
-        )
+        api = self._impl.api
+        node_key = _node_name_key(self._impl.name)
+
+        # Clients remove the descendants of a node along with the node itself,
+        # so we do the same for server-side handles. Any messages queued for
+        # descendants are dropped from the message buffer by our own removal
+        # message.
+        for name in api._node_name_tree.values_under(node_key):
+            handle = api._handle_from_node_name.get(name, None)
+            if handle is None or handle is self or handle._impl.removed:
+                continue
+            handle._impl.removed_with_parent = True
+            handle.remove()
+
+        api._handle_from_node_name.pop(self._impl.name, None)
+        api._node_name_tree.discard(node_key, self._impl.name)
+        if not self._impl.removed_with_parent:
+            api._websock_interface.queue_message(
+                _messages.RemoveSceneNodeMessage(self._impl.name)
+            )
 
 
 @dataclasses.dataclass(frozen=True)
@@ -237,10 +335,34 @@ NoneOrCoroutine = TypeVar("NoneOrCoroutine", None, Coroutine)
 
 
 class _ClickableSceneNodeHandle(SceneNodeHandle):
+    @overload
     def on_click(
         self: Self,
         func: Callable[[SceneNodePointerEvent[Self]], NoneOrCoroutine],
-    ) -> Callable[[SceneNodePointerEvent[Self]], NoneOrCoroutine]:
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[[SceneNodePointerEvent[Self]], NoneOrCoroutine]: ...
+
+    @overload
+    def on_click(
+        self: Self,
+        func: None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[
+        [Callable[[SceneNodePointerEvent[Self]], NoneOrCoroutine]],
+        Callable[[SceneNodePointerEvent[Self]], NoneOrCoroutine],
+    ]: ...
+
+    def on_click(
+        self,
+        func: Callable | None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable:
         """Attach a callback for when a scene node is clicked.
 
         The callback can be either a standard function or an async function:
@@ -248,23 +370,22 @@ class _ClickableSceneNodeHandle(SceneNodeHandle):
         - Async functions (async def) will be executed in the event loop.
 
         Using async functions can be useful for reducing race conditions.
+
+        Use ``throttle_hz`` or ``debounce_sec`` to rate limit expensive callbacks;
+        see :doc:`/events`.
         """
         self._impl.api._websock_interface.queue_message(
             _messages.SetSceneNodeClickableMessage(self._impl.name, True)
         )
         if self._impl.click_cb is None:
             self._impl.click_cb = []
-        self._impl.click_cb.append(
-            cast(
-                Callable[
-                    [SceneNodePointerEvent[_ClickableSceneNodeHandle]],
-                    # `Union[X, Y]` instead of `X | Y` for Python 3.8 support.
-                    Union[None, Coroutine],
-                ],
-                func,
-            )
+        register = make_callback_registrar(
+            self._impl.click_cb,
+            self._impl.rate_limit_from_cb,
+            throttle_hz,
+            debounce_sec,
         )
-        return func
+        return register if func is None else register(func)
 
     def remove_click_callback(
         self, callback: Literal["all"] | Callable = "all"
@@ -275,9 +396,12 @@ class _ClickableSceneNodeHandle(SceneNodeHandle):
             callback: Either "all" to remove all callbacks, or a specific callback function to remove.
         """
         if callback == "all":
+            for cb in self._impl.click_cb:
+                self._impl.rate_limit_from_cb.pop(cb, None)
             self._impl.click_cb.clear()
         else:
             self._impl.click_cb = [cb for cb in self._impl.click_cb if cb != callback]
+            self._impl.rate_limit_from_cb.pop(callback, None)
         if len(self._impl.click_cb) == 0:
             self._impl.api._websock_interface.queue_message(
                 _messages.SetSceneNodeClickableMessage(self._impl.name, False)
@@ -408,6 +532,13 @@ class PointCloudHandle(
 ):
     """Handle for point clouds. Does not support click events."""
 
+    @override
+    def _decode_array(self, prop_name: str, value: np.ndarray) -> np.ndarray:
+        """Decodes quantized `points` to float32."""
+        if prop_name == "points" and self._impl.props.precision == "quantized":
+            return dequantize_positions(value, self._impl.props.quantization)
+        return value
+
     @override
     def _cast_array_dtypes(
         self,
@@ -415,13 +546,402 @@ class PointCloudHandle(
         prop_name: str,
         value: np.ndarray,
     ) -> np.ndarray:
-        """Casts assigned `points` based on the current value of `precision`."""
+        """Casts assigned `points` based on the current value of `precision`,
+        and assigned `scalars` to a dtype that can be sent to clients."""
         if prop_name == "points":
-            return value.astype(
-                {"float16": np.float16, "float32": np.float32}[self.precision]
+            if self.precision == "quantized":
+                value, quantization = quantize_positions(value)
+            else:
+                value = value.astype(
+                    {"float16": np.float16, "float32": np.float32}[self.precision]
+                )
+                quantization = None
+            if quantization != self._impl.props.quantization:
+                if np.array_equal(value, self._impl.props.points):
+                    # Points with the same codes, like scaled points, only
+                    # update the quantization. The decoded points change too.
+                    self.quantization = quantization
+                    if self._array_copies is not None:
+                        self._array_copies.pop("points", None)
+                else:
+                    # Sent with the points by `_queue_update()`.
+                    self._impl.props.quantization = quantization
+                    self._requantized = True
+            return value
+        if prop_name == "scalars":
+            value = cast_scalars(value)
+            self.scalars_dtype = cast(
+                Literal["uint8", "uint16", "float16", "float32"], value.dtype.name
             )
+            return value
+        if prop_name == "colormap_lut":
+            return colors_to_uint8(value)
         return super()._cast_array_dtypes(prop_hints, prop_name, value)
 
+    _requantized: bool = False
+    """True if `quantization` changed since points were last sent."""
+
+    @property
+    def precision(self) -> Literal["float16", "float32", "quantized"]:
+        """Precision of the point cloud. Assigning it re-encodes the current
+        points. Synchronized automatically when assigned."""
+        return self._impl.props.precision
+
+    @precision.setter
+    def precision(  # type: ignore
+        self, precision: Literal["float16", "float32", "quantized"]
+    ) -> None:
+        if precision == self._impl.props.precision:
+            return
+        points = self.points
+        self._impl.props.precision = precision
+        points = self._cast_array_dtypes(self._prop_hints, "points", points)
+        points.flags.writeable = False
+        self._impl.props.points = points
+        self._queue_update("precision", precision)
+
+    @override
+    def _queue_update(self, name: str, value: Any) -> None:
+        """Sends `points`, `precision`, and `quantization` in one update, so
+        clients never decode points with the wrong quantization."""
+        if name not in ("points", "precision"):
+            super()._queue_update(name, value)
+            return
+        self._requantized = False
+        self._impl.api._websock_interface.queue_message(
+            _messages.SceneNodeUpdateMessage(
+                self._impl.name,
+                {
+                    "points": self._impl.props.points,
+                    "precision": self._impl.props.precision,
+                    "quantization": self._impl.props.quantization,
+                },
+            )
+        )
+
+    @override
+    def _queue_array_patch(
+        self, name: str, indices: npt.NDArray[np.uint32], values: np.ndarray
+    ) -> None:
+        if name == "points" and self._requantized:
+            # All rows are encoded with the new quantization.
+            self._queue_update(name, self._impl.props.points)
+            return
+        super()._queue_array_patch(name, indices, values)
+
+    _append_state: tuple[np.ndarray, int] | None = None
+    """Points array after the last `append()`, and the row to write to next."""
+    _append_buffers: dict[str, np.ndarray] | None = None
+    """Buffers with `max_points` rows that `append()` writes into, by prop."""
+
+    def append(
+        self,
+        points: np.ndarray,
+        colors: np.ndarray | tuple[float, float, float] | None = None,
+        scalars: np.ndarray | None = None,
+    ) -> None:
+        """Append points to the point cloud. Requires `max_points` to be set
+        when the point cloud is created.
+
+        Only the new points are sent to clients, which write them into
+        preallocated buffers. Once the point cloud has `max_points` points,
+        new points replace the oldest ones.
+
+        Args:
+            points: Location of new points. Should have shape (N, 3). For
+                point clouds with `precision="quantized"`, new points are
+                encoded with the existing bounding box, and a ValueError is
+                raised if they're outside of it.
+            colors: Colors of new points. Should have shape (N, 3) or (3,).
+                Required if the point cloud has per-point colors, and should be
+                None if it has a single color.
+            scalars: Scalars of new points. Should have shape (N,). Required if
+                the point cloud has scalars, and should be None otherwise.
+                Scalars are cast to the dtype of the existing scalars. If those
+                are integers, a ValueError is raised for values that they can't
+                represent.
+        """
+        max_points = self._impl.props.max_points
+        if max_points is None:
+            raise ValueError(
+                "Points can only be appended to point clouds with `max_points` set."
+            )
+        current_points = self._impl.props.points
+        current_colors = self._impl.props.colors
+        if current_points.shape[0] > max_points:
+            raise ValueError(
+                f"Point cloud has {current_points.shape[0]} points, which is more"
+                f" than `max_points={max_points}`."
+            )
+        assert len(points.shape) == 2 and points.shape[-1] == 3, (
+            "Shape of points should be (N, 3)."
+        )
+        if self._impl.props.precision == "quantized":
+            # Appended points are encoded with the existing offset and scale.
+            points, _ = quantize_positions(points, self._impl.props.quantization)
+        else:
+            points = points.astype(current_points.dtype)
+        if current_colors.shape == (3,):
+            if colors is not None:
+                raise ValueError(
+                    "Point cloud has a single color, so colors can't be appended."
+                )
+            new_colors = None
+        else:
+            if colors is None:
+                raise ValueError(
+                    "Point cloud has per-point colors, which are required."
+                )
+            new_colors = np.broadcast_to(
+                colors_to_uint8(np.asarray(colors)), points.shape
+            ).copy()
+        current_scalars = self._impl.props.scalars
+        if current_scalars is None:
+            if scalars is not None:
+                raise ValueError(
+                    "Point cloud has no scalars, so scalars can't be appended."
+                )
+            new_scalars = None
+        else:
+            if scalars is None:
+                raise ValueError("Point cloud has scalars, which are required.")
+            # Scalars are cast with the same rules as assigned scalars. Integer
+            # scalars, like labels, can't be widened or converted from floats
+            # without re-sending every point.
+            new_scalars = cast_scalars(scalars)
+            if np.issubdtype(current_scalars.dtype, np.integer) and not np.can_cast(
+                new_scalars.dtype, current_scalars.dtype
+            ):
+                raise ValueError(
+                    f"Point cloud has {current_scalars.dtype} scalars, which can't"
+                    f" represent appended {new_scalars.dtype} scalars. Assign"
+                    " `scalars` with a wider dtype before appending."
+                )
+            new_scalars = new_scalars.astype(current_scalars.dtype)
+            assert new_scalars.shape == points.shape[:1], (
+                "Shape of scalars should be (N,)."
+            )
+
+        # Points that would be overwritten by the same append aren't sent.
+        points = points[-max_points:]
+        if new_colors is not None:
+            new_colors = new_colors[-max_points:]
+        if new_scalars is not None:
+            new_scalars = new_scalars[-max_points:]
+        points.flags.writeable = False
+        if new_colors is not None:
+            new_colors.flags.writeable = False
+        if new_scalars is not None:
+            new_scalars.flags.writeable = False
+
+        # Write the points in one or two contiguous chunks, wrapping around to
+        # the start once the point cloud is full.
+        if self._append_state is not None and self._append_state[0] is current_points:
+            offset = self._append_state[1]
+        else:
+            offset = current_points.shape[0] % max_points
+        num_points = points.shape[0]
+        start = 0
+        while start < num_points:
+            stop = start + min(num_points - start, max_points - offset)
+            chunk_colors = None if new_colors is None else new_colors[start:stop]
+            chunk_scalars = None if new_scalars is None else new_scalars[start:stop]
+            self._impl.api._websock_interface.queue_message(
+                _messages.PointCloudAppendMessage(
+                    self._impl.name,
+                    offset,
+                    points[start:stop],
+                    chunk_colors,
+                    chunk_scalars,
+                )
+            )
+            self._write_rows("points", offset, points[start:stop])
+            if chunk_colors is not None:
+                self._write_rows("colors", offset, chunk_colors)
+            if chunk_scalars is not None:
+                self._write_rows("scalars", offset, chunk_scalars)
+            offset = (offset + stop - start) % max_points
+            start = stop
+        self._append_state = (self._impl.props.points, offset)
+
+    def _write_rows(self, prop_name: str, offset: int, rows: np.ndarray) -> None:
+        """Write rows into an array prop, starting at `offset`. The array is
+        copied into a buffer with `max_points` rows by the first append, and
+        written in place by later appends. Messages only include the new rows,
+        so the buffer is never shared with the message buffer."""
+        if self._append_buffers is None:
+            self._append_buffers = {}
+        value = getattr(self._impl.props, prop_name)
+        buffer = self._append_buffers.get(prop_name, None)
+        stop = offset + rows.shape[0]
+        if buffer is None or value.base is not buffer:
+            assert self._impl.props.max_points is not None
+            buffer = np.empty(
+                (max(self._impl.props.max_points, stop),) + value.shape[1:],
+                dtype=value.dtype,
+            )
+            buffer[: value.shape[0]] = value
+            self._append_buffers[prop_name] = buffer
+        buffer[offset:stop] = rows
+        setattr(
+            self._impl.props,
+            prop_name,
+            readonly_view(buffer[: max(value.shape[0], stop)]),
+        )
+
+
+@dataclasses.dataclass
+class _PointCloudLodState:
+    octree: PointCloudOctree
+    point_size: float
+    point_shape: Literal["square", "diamond", "circle", "rounded", "sparkle"]
+    precision: Literal["float16", "float32", "quantized"]
+    point_budget: int
+    throttle_hz: float
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+    client_from_id: dict[int, ClientHandle] = dataclasses.field(default_factory=dict)
+    camera_cb_from_client_id: dict[int, Callable[[CameraHandle], None]] = (
+        dataclasses.field(default_factory=dict)
+    )
+    nodes_from_client_id: dict[int, dict[NodeKey, PointCloudHandle]] = (
+        dataclasses.field(default_factory=dict)
+    )
+    """Octree nodes that have been sent to each client."""
+
+
+class PointCloudLodHandle(SceneNodeHandle):
+    """Handle for point clouds that are streamed with level of detail. Each
+    client is sent the octree nodes that are visible from its camera, at the
+    density needed for their size on screen."""
+
+    _lod: _PointCloudLodState
+
+    @property
+    def point_budget(self) -> int:
+        """Maximum number of points to send to each client. Synchronized to
+        clients automatically when assigned."""
+        return self._lod.point_budget
+
+    @point_budget.setter
+    def point_budget(self, point_budget: int) -> None:
+        self._lod.point_budget = point_budget
+        for client in tuple(self._lod.client_from_id.values()):
+            self._update_client(client)
+
+    def _attach_client(self, client: ClientHandle) -> None:
+        """Start streaming to a client."""
+
+        def on_camera_update(camera: CameraHandle) -> None:
+            self._update_client(camera.client)
+
+        with self._lod.lock:
+            if self._impl.removed or client.client_id in self._lod.client_from_id:
+                return
+            self._lod.client_from_id[client.client_id] = client
+            self._lod.camera_cb_from_client_id[client.client_id] = on_camera_update
+            self._lod.nodes_from_client_id[client.client_id] = {}
+        client.camera.on_update(on_camera_update, throttle_hz=self._lod.throttle_hz)
+        if client.camera._state.update_timestamp != 0.0:
+            self._update_client(client)
+
+    def _detach_client(self, client: ClientHandle) -> None:
+        """Stop streaming to a client. Nodes that were already sent are removed
+        only on the server, since the client's copies are removed with this
+        node or with the client itself."""
+        with self._lod.lock:
+            self._lod.client_from_id.pop(client.client_id, None)
+            camera_cb = self._lod.camera_cb_from_client_id.pop(client.client_id, None)
+            for node_handle in self._lod.nodes_from_client_id.pop(
+                client.client_id, {}
+            ).values():
+                node_handle._impl.removed_with_parent = True
+                node_handle.remove()
+        if camera_cb is not None:
+            camera_state = client.camera._state
+            if camera_cb in camera_state.camera_cb:
+                camera_state.camera_cb.remove(camera_cb)
+            camera_state.rate_limit_from_cb.pop(camera_cb, None)
+
+    def _get_world_transform(self) -> tf.SE3:
+        """Get the transform from this node's frame to the world frame, from
+        the poses of its ancestors."""
+        api = self._impl.api
+        T_world_node = tf.SE3.identity()
+        parts = self._impl.name.split("/")
+        for i in range(1, len(parts) + 1):
+            handle = api._handle_from_node_name.get("/".join(parts[:i]), None)
+            if handle is not None:
+                T_world_node = T_world_node @ tf.SE3.from_rotation_and_translation(
+                    tf.SO3(handle.wxyz), handle.position
+                )
+        return T_world_node
+
+    def _update_client(self, client: ClientHandle) -> None:
+        """Send and remove octree nodes to match a client's camera."""
+        lod = self._lod
+        camera = client.camera
+        with lod.lock:
+            nodes = lod.nodes_from_client_id.get(client.client_id, None)
+            if self._impl.removed or nodes is None:
+                return
+            T_camera_local = (
+                tf.SE3.from_rotation_and_translation(
+                    tf.SO3(camera.wxyz), camera.position
+                ).inverse()
+                @ self._get_world_transform()
+            )
+            keys = lod.octree.select(
+                T_camera_local.rotation().as_matrix(),
+                T_camera_local.translation(),
+                fov=camera.fov,
+                aspect=camera.aspect,
+                image_height=camera.image_height,
+                point_budget=lod.point_budget,
+            )
+
+            keep = set(keys)
+            for key in tuple(nodes.keys()):
+                if key not in keep:
+                    nodes.pop(key).remove()
+
+            # Send coarse nodes first, so views refine progressively.
+            octree = lod.octree
+            for key in keys:
+                if key in nodes:
+                    continue
+                node_slice = octree.get_slice(key)
+                nodes[key] = client.scene.add_point_cloud(
+                    f"{self._impl.name}/lod_{key[0]}_{key[1]}_{key[2]}_{key[3]}",
+                    points=octree.points[node_slice],
+                    colors=(
+                        octree.colors
+                        if octree.colors.shape == (3,)
+                        else octree.colors[node_slice]
+                    ),
+                    point_size=lod.point_size,
+                    point_shape=lod.point_shape,
+                    precision=lod.precision,
+                )
+
+    @override
+    def remove(self) -> None:
+        was_removed = self._impl.removed
+        super().remove()
+        if was_removed:
+            return
+
+        from ._viser import ViserServer
+
+        owner = self._impl.api._owner
+        if isinstance(owner, ViserServer):
+            with owner._client_lock:
+                if self._attach_client in owner._client_connect_cb:
+                    owner._client_connect_cb.remove(self._attach_client)
+            if self._detach_client in owner._client_disconnect_cb:
+                owner._client_disconnect_cb.remove(self._detach_client)
+        for client in tuple(self._lod.client_from_id.values()):
+            self._detach_client(client)
+
 
 class BatchedAxesHandle(
     _ClickableSceneNodeHandle,
@@ -437,8 +957,36 @@ class FrameHandle(
     """Handle for coordinate frames."""
 
 
+class _MeshHandleBase(_ClickableSceneNodeHandle):
+    """Base class for handles of meshes whose vertices can be quantized."""
+
+    @override
+    def _decode_array(self, prop_name: str, value: np.ndarray) -> np.ndarray:
+        """Decodes quantized `vertices` to float32."""
+        quantization = self._impl.props.vertices_quantization
+        if prop_name == "vertices" and quantization is not None:
+            return dequantize_positions(value, quantization)
+        return value
+
+    @override
+    def _cast_array_dtypes(
+        self,
+        prop_hints: Dict[str, Any],
+        prop_name: str,
+        value: np.ndarray,
+    ) -> np.ndarray:
+        """Quantizes assigned `vertices` if the mesh was created with quantized
+        vertices."""
+        if prop_name == "vertices":
+            if self._impl.props.vertices_quantization is not None:
+                value, self.vertices_quantization = quantize_positions(value)
+                return value
+            return value.astype(np.float32)
+        return super()._cast_array_dtypes(prop_hints, prop_name, value)
+
+
 class MeshHandle(
-    _ClickableSceneNodeHandle,
+    _MeshHandleBase,
     _messages.MeshProps,
 ):
     """Handle for mesh objects."""
@@ -459,7 +1007,7 @@ class IcosphereHandle(
 
 
 class BatchedMeshHandle(
-    _ClickableSceneNodeHandle,
+    _MeshHandleBase,
     _messages.BatchedMeshesProps,
 ):
     """Handle for batched mesh objects."""
@@ -481,9 +1029,367 @@ class GaussianSplatHandle(
     **Work-in-progress.** Gaussian rendering is still under development.
     """
 
+    _compression: Literal["none", "quantized"] = "none"
+    """How splats are sent to clients."""
+    _client_order: npt.NDArray[np.int64] | None = None
+    """For quantized splats: the row in `buffer` of each row on clients.
+    Clients store splats in spatially coherent chunks."""
+    _chunk_starts: npt.NDArray[np.int64] | None = None
+    """For quantized splats: first client row of each streamed chunk. Chunks
+    that were emptied by pruning start where the next chunk starts."""
+    _patched_rows: Dict[int, npt.NDArray[np.int64]] | None = None
+    """For quantized splats: client rows of each chunk that were updated since
+    the chunk was streamed. These are sent to clients uncompressed."""
+
+    def _stream_splats(self, buffer: npt.NDArray[np.uint32]) -> None:
+        """Compress splats and stream them to clients in spatially coherent
+        chunks. The decoded splats are stored in `buffer`, so it matches what
+        clients render."""
+        # Chunks, updates, and prunes of the previous splats are superseded.
+        # Clients that haven't received them yet clear the splats first.
+        name = self._impl.name
+        self._impl.api._websock_interface.get_message_buffer().remove_from_buffer(
+            lambda message: (
+                isinstance(
+                    message,
+                    (
+                        _messages.GaussianSplatsChunkMessage,
+                        _messages.GaussianSplatsUpdateMessage,
+                        _messages.GaussianSplatsPruneMessage,
+                    ),
+                )
+                and message.name == name
+            )
+        )
+        self._client_order = morton_order(
+            np.ascontiguousarray(buffer[:, 0:3]).view(np.float32)
+        )
+        num_chunks = (buffer.shape[0] + SPLATS_PER_CHUNK - 1) // SPLATS_PER_CHUNK
+        self._chunk_starts = np.arange(num_chunks) * SPLATS_PER_CHUNK
+        self._patched_rows = {}
+        decoded = buffer.copy()
+        for chunk_index in range(num_chunks):
+            self._queue_chunk(decoded, chunk_index)
+        decoded.flags.writeable = False
+        self._impl.props.buffer = decoded
+
+    def _get_chunk_rows(self, chunk_index: int, num_gaussians: int) -> tuple[int, int]:
+        """Get the first and end client rows of a chunk."""
+        assert self._chunk_starts is not None
+        start = int(self._chunk_starts[chunk_index])
+        end = (
+            int(self._chunk_starts[chunk_index + 1])
+            if chunk_index + 1 < len(self._chunk_starts)
+            else num_gaussians
+        )
+        return start, end
+
+    def _queue_chunk(self, buffer: npt.NDArray[np.uint32], chunk_index: int) -> None:
+        """Compress one chunk of splats and send it to clients. Rows of
+        `buffer` in the chunk are replaced with the decoded splats."""
+        assert self._client_order is not None and self._patched_rows is not None
+        start, end = self._get_chunk_rows(chunk_index, buffer.shape[0])
+        rows = self._client_order[start:end]
+        bounds, packed = encode_splats(buffer[rows])
+        buffer[rows] = decode_splats(bounds, packed)
+        if self._patched_rows.pop(chunk_index, None) is not None:
+            # The chunk's update is superseded by the chunk.
+            self._remove_chunk_messages(
+                (chunk_index,), (_messages.GaussianSplatsUpdateMessage,)
+            )
+        self._impl.api._websock_interface.queue_message(
+            _messages.GaussianSplatsChunkMessage(
+                self._impl.name, chunk_index, start, buffer.shape[0], bounds, packed
+            )
+        )
+
+    def _remove_chunk_messages(
+        self,
+        chunk_indices: Iterable[int],
+        message_types: tuple[type[_messages.Message], ...],
+    ) -> None:
+        """Remove streamed chunks or updates of some chunks from the message
+        buffer, so new clients don't receive them."""
+        name = self._impl.name
+        removed = set(chunk_indices)
+        if len(removed) == 0:
+            return
+        self._impl.api._websock_interface.get_message_buffer().remove_from_buffer(
+            lambda message: (
+                isinstance(message, message_types)
+                and getattr(message, "name") == name
+                and getattr(message, "chunk_index") in removed
+            )
+        )
+
+    def _get_rows(
+        self, indices: slice | npt.NDArray[np.integer] | npt.NDArray[np.bool_]
+    ) -> npt.NDArray[np.int64]:
+        """Get row indices from a range, integer indices, or a boolean mask."""
+        num_gaussians = self._impl.props.buffer.shape[0]
+        if isinstance(indices, np.ndarray) and indices.dtype == np.bool_:
+            assert indices.shape == (num_gaussians,), (
+                f"Shape of mask should be ({num_gaussians},)."
+            )
+        return np.arange(num_gaussians)[indices]
+
+    def update(
+        self,
+        indices: slice | npt.NDArray[np.integer] | npt.NDArray[np.bool_],
+        centers: np.ndarray | None = None,
+        covariances: np.ndarray | None = None,
+        rgbs: np.ndarray | None = None,
+        opacities: np.ndarray | None = None,
+    ) -> None:
+        """Update some attributes of some splats, in place. This is cheaper
+        than creating the splats again, for example to visualize training.
+
+        For splats created with `compression="none"`, only the updated
+        attributes of the updated splats are sent: for example, updating
+        opacities sends 4 bytes per splat. Updated rows of quantized splats
+        are sent uncompressed, at 32 bytes per splat. Chunks of nearby splats
+        where many rows were updated are compressed and sent again instead.
+
+        Args:
+            indices: Splats to update, as a slice, integer indices, or a
+                boolean mask with shape (N,).
+            centers: New centers. Should have shape (M, 3).
+            covariances: New covariances. Should have shape (M, 3, 3).
+            rgbs: New colors. Should have shape (M, 3).
+            opacities: New opacities. Should have shape (M, 1).
+        """
+        rows = self._get_rows(indices)
+        num_rows = rows.shape[0]
+        assert centers is None or centers.shape == (num_rows, 3)
+        assert covariances is None or covariances.shape == (num_rows, 3, 3)
+        assert rgbs is None or rgbs.shape == (num_rows, 3)
+        assert opacities is None or opacities.shape == (num_rows, 1)
+
+        # Words of each row that contain updated attributes.
+        word_ranges = [
+            word_range
+            for word_range, attribute in (
+                ((0, 3), centers),
+                ((4, 7), covariances),
+                ((7, 8), rgbs),
+                ((7, 8), opacities),
+            )
+            if attribute is not None
+        ]
+        if num_rows == 0 or len(word_ranges) == 0:
+            return
+
+        buffer = self._impl.props.buffer.copy()
+        values = buffer[rows]
+        pack_splats(values, centers, covariances, rgbs, opacities)
+        buffer[rows] = values
+
+        if self._compression == "quantized":
+            self._queue_chunk_updates(buffer, rows)
+            buffer.flags.writeable = False
+            self._impl.props.buffer = buffer
+            return
+
+        buffer.flags.writeable = False
+        self._impl.props.buffer = buffer
+        first_word = min(start for start, _ in word_ranges)
+        end_word = max(end for _, end in word_ranges)
+
+        # Consecutive rows are sent as a range, instead of as indices.
+        consecutive = bool(np.all(np.diff(rows) == 1))
+        self._impl.api._websock_interface.queue_message(
+            _messages.GaussianSplatsUpdateMessage(
+                self._impl.name,
+                num_gaussians=buffer.shape[0],
+                start=int(rows[0]),
+                indices=None if consecutive else rows.astype(np.uint32),
+                word_range=(first_word, end_word),
+                values=np.ascontiguousarray(values[:, first_word:end_word]),
+            )
+        )
+
+    def _queue_chunk_updates(
+        self, buffer: npt.NDArray[np.uint32], rows: npt.NDArray[np.int64]
+    ) -> None:
+        """Send updated rows of quantized splats to clients, uncompressed. Each
+        chunk's update includes rows that were updated earlier, and replaces
+        the chunk's previous update in the message buffer. Chunks with many
+        updated rows are compressed and streamed again instead."""
+        assert self._client_order is not None and self._chunk_starts is not None
+        assert self._patched_rows is not None
+        client_from_row = np.empty_like(self._client_order)
+        client_from_row[self._client_order] = np.arange(self._client_order.shape[0])
+        client_rows = client_from_row[rows]
+        chunk_indices = (
+            np.searchsorted(self._chunk_starts, client_rows, side="right") - 1
+        )
+        for chunk_index in np.unique(chunk_indices).tolist():
+            patched = np.union1d(
+                self._patched_rows.get(chunk_index, np.zeros(0, dtype=np.int64)),
+                client_rows[chunk_indices == chunk_index],
+            )
+            # Uncompressed rows are twice the size of compressed ones. Once
+            # they'd be half the size of the chunk, send the chunk instead.
+            start, end = self._get_chunk_rows(chunk_index, buffer.shape[0])
+            if 4 * patched.shape[0] > end - start:
+                self._queue_chunk(buffer, chunk_index)
+                continue
+            self._patched_rows[chunk_index] = patched
+            self._impl.api._websock_interface.queue_message(
+                _messages.GaussianSplatsUpdateMessage(
+                    self._impl.name,
+                    num_gaussians=buffer.shape[0],
+                    start=int(patched[0]),
+                    indices=patched.astype(np.uint32),
+                    word_range=(0, 8),
+                    values=buffer[self._client_order[patched]],
+                    chunk_index=chunk_index,
+                )
+            )
+
+    def append(
+        self,
+        centers: np.ndarray,
+        covariances: np.ndarray,
+        rgbs: np.ndarray,
+        opacities: np.ndarray,
+    ) -> None:
+        """Append splats, for example after densification. Only the new splats
+        are sent to clients.
+
+        Args:
+            centers: Centers of new splats. Should have shape (M, 3).
+            covariances: Covariances of new splats. Should have shape (M, 3, 3).
+            rgbs: Colors of new splats. Should have shape (M, 3).
+            opacities: Opacities of new splats. Should have shape (M, 1).
+        """
+        num_new = centers.shape[0]
+        assert centers.shape == (num_new, 3)
+        assert covariances.shape == (num_new, 3, 3)
+        assert rgbs.shape == (num_new, 3)
+        assert opacities.shape == (num_new, 1)
+        if num_new == 0:
+            return
+
+        current = self._impl.props.buffer
+        num_current = current.shape[0]
+        buffer = np.zeros((num_current + num_new, 8), dtype=np.uint32)
+        buffer[:num_current] = current
+        pack_splats(buffer[num_current:], centers, covariances, rgbs, opacities)
+
+        if self._compression == "quantized":
+            assert self._client_order is not None and self._chunk_starts is not None
+            # New splats are streamed in chunks after the existing ones.
+            new_order = morton_order(centers) + num_current
+            self._client_order = np.concatenate([self._client_order, new_order])
+            first_chunk = len(self._chunk_starts)
+            self._chunk_starts = np.concatenate(
+                [
+                    self._chunk_starts,
+                    np.arange(num_current, num_current + num_new, SPLATS_PER_CHUNK),
+                ]
+            )
+            for chunk_index in range(first_chunk, len(self._chunk_starts)):
+                self._queue_chunk(buffer, chunk_index)
+            buffer.flags.writeable = False
+            self._impl.props.buffer = buffer
+            return
+
+        buffer.flags.writeable = False
+        self._impl.props.buffer = buffer
+        self._impl.api._websock_interface.queue_message(
+            _messages.GaussianSplatsUpdateMessage(
+                self._impl.name,
+                num_gaussians=buffer.shape[0],
+                start=num_current,
+                indices=None,
+                word_range=(0, 8),
+                values=buffer[num_current:],
+            )
+        )
+
+    def prune(
+        self, indices: slice | npt.NDArray[np.integer] | npt.NDArray[np.bool_]
+    ) -> None:
+        """Remove splats, for example after pruning low-opacity splats.
+        Remaining splats keep their order.
+
+        Clients are sent a mask with one bit per splat.
+
+        Args:
+            indices: Splats to remove, as a slice, integer indices, or a
+                boolean mask with shape (N,).
+        """
+        buffer = self._impl.props.buffer
+        removed = np.zeros(buffer.shape[0], dtype=bool)
+        removed[self._get_rows(indices)] = True
+        if not np.any(removed):
+            return
+        remaining = buffer[~removed]
+        remaining.flags.writeable = False
+        self._impl.props.buffer = remaining
+
+        if self._compression == "none":
+            self._impl.api._websock_interface.queue_message(
+                _messages.GaussianSplatsPruneMessage(
+                    self._impl.name, np.packbits(removed)
+                )
+            )
+            return
+
+        # Quantized splats are pruned in the order that clients store them.
+        # Chunks that were sent before keep their offsets, and clients (new or
+        # not) apply the mask after them.
+        assert self._client_order is not None and self._chunk_starts is not None
+        assert self._patched_rows is not None
+        removed_on_client = removed[self._client_order]
+        self._impl.api._websock_interface.queue_message(
+            _messages.GaussianSplatsPruneMessage(
+                self._impl.name, np.packbits(removed_on_client)
+            )
+        )
+
+        # Renumber rows, and move chunks and updated rows back past the
+        # removed splats.
+        num_removed_before = np.concatenate([[0], np.cumsum(removed_on_client)])
+        new_from_row = np.cumsum(~removed) - 1
+        was_empty = np.diff(self._chunk_starts, append=buffer.shape[0]) == 0
+        self._client_order = new_from_row[self._client_order[~removed_on_client]]
+        self._chunk_starts = self._chunk_starts - num_removed_before[self._chunk_starts]
+        for chunk_index, patched in tuple(self._patched_rows.items()):
+            patched = patched[~removed_on_client[patched]]
+            self._patched_rows[chunk_index] = patched - num_removed_before[patched]
+
+        # Chunks without splats left are no longer needed by new clients.
+        is_empty = np.diff(self._chunk_starts, append=remaining.shape[0]) == 0
+        emptied = np.flatnonzero(is_empty & ~was_empty).tolist()
+        for chunk_index in emptied:
+            self._patched_rows.pop(chunk_index, None)
+        self._remove_chunk_messages(
+            emptied,
+            (
+                _messages.GaussianSplatsChunkMessage,
+                _messages.GaussianSplatsUpdateMessage,
+            ),
+        )
+
+    @override
+    def _queue_update(self, name: str, value: Any) -> None:
+        if name == "buffer" and self._compression == "quantized":
+            # Clients clear the splats, then decode the new chunks.
+            super()._queue_update(name, np.zeros((0, 8), dtype=np.uint32))
+            self._stream_splats(value)
+            return
+        super()._queue_update(name, value)
+
+    @override
+    def _array_patches_enabled(self) -> bool:
+        # Compressed splats are only sent in chunks.
+        return self._compression == "none" and super()._array_patches_enabled()
+
 
 class MeshSkinnedHandle(
-    _ClickableSceneNodeHandle,
+    _MeshHandleBase,
     _messages.SkinnedMeshProps,
 ):
     """Handle for skinned mesh objects."""
@@ -651,9 +1557,34 @@ class TransformControlsHandle(
     def update_timestamp(self) -> float:
         return self._impl_aux.last_updated
 
+    @overload
     def on_update(
-        self, func: Callable[[TransformControlsEvent], NoneOrCoroutine]
-    ) -> Callable[[TransformControlsEvent], NoneOrCoroutine]:
+        self,
+        func: Callable[[TransformControlsEvent], NoneOrCoroutine],
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[[TransformControlsEvent], NoneOrCoroutine]: ...
+
+    @overload
+    def on_update(
+        self,
+        func: None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[
+        [Callable[[TransformControlsEvent], NoneOrCoroutine]],
+        Callable[[TransformControlsEvent], NoneOrCoroutine],
+    ]: ...
+
+    def on_update(
+        self,
+        func: Callable | None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable:
         """Attach a callback for when the gizmo is moved.
 
         The callback can be either a standard function or an async function:
@@ -661,9 +1592,17 @@ class TransformControlsHandle(
         - Async functions (async def) will be executed in the event loop.
 
         Using async functions can be useful for reducing race conditions.
+
+        Use ``throttle_hz`` or ``debounce_sec`` to rate limit expensive callbacks;
+        see :doc:`/events`.
         """
-        self._impl_aux.update_cb.append(func)
-        return func
+        register = make_callback_registrar(
+            self._impl_aux.update_cb,
+            self._impl.rate_limit_from_cb,
+            throttle_hz,
+            debounce_sec,
+        )
+        return register if func is None else register(func)
 
     def remove_update_callback(
         self, callback: Literal["all"] | Callable = "all"
@@ -674,11 +1613,14 @@ class TransformControlsHandle(
             callback: Either "all" to remove all callbacks, or a specific callback function to remove.
         """
         if callback == "all":
+            for cb in self._impl_aux.update_cb:
+                self._impl.rate_limit_from_cb.pop(cb, None)
             self._impl_aux.update_cb.clear()
         else:
             self._impl_aux.update_cb = [
                 cb for cb in self._impl_aux.update_cb if cb != callback
             ]
+            self._impl.rate_limit_from_cb.pop(callback, None)
 
     def on_drag_start(
         self, func: Callable[[TransformControlsEvent], NoneOrCoroutine]
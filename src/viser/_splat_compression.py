@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from . import transforms as tf
+from ._assignable_props_api import colors_to_uint8
+
+SPLATS_PER_BLOCK = 256
+"""Number of splats that share quantization bounds."""
+SPLATS_PER_CHUNK = 256 * SPLATS_PER_BLOCK
+"""Number of splats in each streamed chunk, about 1MB compressed."""
+
+_SQRT2 = np.sqrt(2.0)
+_TRIU_INDICES = np.array([0, 1, 2, 4, 5, 8])
+"""Indices of upper-triangular terms in flattened 3x3 matrices."""
+
+
+def pack_splats(
+    out: npt.NDArray[np.uint32],
+    centers: Optional[np.ndarray] = None,
+    covariances: Optional[np.ndarray] = None,
+    rgbs: Optional[np.ndarray] = None,
+    opacities: Optional[np.ndarray] = None,
+) -> None:
+    """Write splat attributes into `out`, a buffer with shape (N, 8) in the
+    layout of `GaussianSplatsProps.buffer`. Attributes that are None are left
+    unchanged, so they can be updated separately."""
+    if centers is not None:
+        out[:, 0:3] = np.ascontiguousarray(centers, dtype=np.float32).view(np.uint32)
+    if covariances is not None:
+        cov_triu = covariances.reshape((-1, 9))[:, _TRIU_INDICES]
+        out[:, 4:7] = np.ascontiguousarray(cov_triu, dtype=np.float16).view(np.uint32)
+    if rgbs is not None or opacities is not None:
+        rgbas = np.ascontiguousarray(out[:, 7]).view(np.uint8).reshape((-1, 4))
+        if rgbs is not None:
+            rgbas[:, 0:3] = colors_to_uint8(rgbs)
+        if opacities is not None:
+            rgbas[:, 3:4] = colors_to_uint8(opacities)
+        out[:, 7] = rgbas.view(np.uint32)[:, 0]
+
+
+def morton_order(centers: np.ndarray) -> npt.NDArray[np.int64]:
+    """Get an ordering of points along a Z-order curve, so consecutive points
+    are spatially coherent."""
+    if centers.shape[0] == 0:
+        return np.zeros((0,), dtype=np.int64)
+    lower = centers.min(axis=0)
+    extent = np.maximum(centers.max(axis=0) - lower, 1e-9)
+    cells = np.clip((centers - lower) / extent * 1023.0, 0, 1023).astype(np.int64)
+    codes = np.zeros(centers.shape[0], dtype=np.int64)
+    for bit in range(10):
+        for axis in range(3):
+            codes |= ((cells[:, axis] >> bit) & 1) << (3 * bit + 2 - axis)
+    return np.argsort(codes, kind="stable")
+
+
+def _block_bounds(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the per-block minimum and maximum of values with shape (N, 3)."""
+    num_blocks = -(-values.shape[0] // SPLATS_PER_BLOCK)
+    padded = np.empty((num_blocks * SPLATS_PER_BLOCK, 3), dtype=values.dtype)
+    padded[: values.shape[0]] = values
+    # Padding rows repeat the last value, so they don't affect the bounds.
+    padded[values.shape[0] :] = values[-1:]
+    blocks = padded.reshape((num_blocks, SPLATS_PER_BLOCK, 3))
+    return blocks.min(axis=1), blocks.max(axis=1)
+
+
+def _quantize(
+    values: np.ndarray, lower: np.ndarray, upper: np.ndarray, bits: Tuple[int, ...]
+) -> npt.NDArray[np.uint32]:
+    """Pack values with shape (N, 3) into one uint32 each, with `bits` bits
+    per axis, relative to per-block bounds."""
+    block = np.arange(values.shape[0]) // SPLATS_PER_BLOCK
+    lower = lower[block]
+    extent = upper[block] - lower
+    normalized = np.divide(
+        values - lower, extent, out=np.zeros_like(values), where=extent > 0
+    )
+    out = np.zeros(values.shape[0], dtype=np.uint32)
+    shift = 32
+    for axis, num_bits in enumerate(bits):
+        shift -= num_bits
+        max_code = (1 << num_bits) - 1
+        code = np.round(np.clip(normalized[:, axis], 0.0, 1.0) * max_code)
+        out |= code.astype(np.uint32) << shift
+    return out
+
+
+def _dequantize(
+    packed: npt.NDArray[np.uint32],
+    lower: np.ndarray,
+    upper: np.ndarray,
+    bits: Tuple[int, ...],
+) -> np.ndarray:
+    """Inverse of `_quantize()`."""
+    block = np.arange(packed.shape[0]) // SPLATS_PER_BLOCK
+    normalized = np.empty((packed.shape[0], 3), dtype=np.float64)
+    shift = 32
+    for axis, num_bits in enumerate(bits):
+        shift -= num_bits
+        max_code = (1 << num_bits) - 1
+        normalized[:, axis] = ((packed >> shift) & max_code) / max_code
+    return lower[block] + normalized * (upper[block] - lower[block])
+
+
+def encode_splats(
+    buffer: npt.NDArray[np.uint32],
+) -> Tuple[npt.NDArray[np.float32], npt.NDArray[np.uint32]]:
+    """Compress Gaussian splats to 16 bytes each. Takes a buffer with shape
+    (N, 8), in the layout of `GaussianSplatsProps.buffer`. Splats should
+    already be spatially ordered, for example with `morton_order()`.
+
+    Covariances are decomposed into a rotation and per-axis scales. Each block
+    of `SPLATS_PER_BLOCK` splats stores bounds for its centers and log-scales,
+    and each splat stores four uint32s:
+    - Center, as 11, 10, and 11 bits inside the block's bounds.
+    - Rotation, as the index of the largest quaternion term (2 bits) and the
+      other three terms (10 bits each).
+    - Log-scales, as 11, 10, and 11 bits inside the block's bounds.
+    - RGBA, as 8 bits each.
+
+    Returns:
+        Bounds with shape (ceil(N / SPLATS_PER_BLOCK), 12), as minimum
+        centers, maximum centers, minimum log-scales, and maximum log-scales;
+        and packed splats with shape (N, 4).
+    """
+    num_splats = buffer.shape[0]
+    assert buffer.shape == (num_splats, 8) and buffer.dtype == np.uint32
+    if num_splats == 0:
+        return np.zeros((0, 12), dtype=np.float32), np.zeros((0, 4), dtype=np.uint32)
+    centers = np.ascontiguousarray(buffer[:, 0:3]).view(np.float32)
+    cov_triu = np.ascontiguousarray(buffer[:, 4:7]).view(np.float16)
+    covariances = cov_triu.astype(np.float64)[:, np.array([0, 1, 2, 1, 3, 4, 2, 4, 5])]
+    covariances = covariances.reshape((num_splats, 3, 3))
+
+    # Decompose covariances into rotations and scales.
+    eigenvalues, eigenvectors = np.linalg.eigh(covariances.astype(np.float64))
+    eigenvectors[np.linalg.det(eigenvectors) < 0, :, 2] *= -1.0
+    log_scales = 0.5 * np.log(np.maximum(eigenvalues, 1e-12))
+    wxyz = tf.SO3.from_matrix(eigenvectors).wxyz
+
+    # Smallest-three quaternion encoding. The largest term is positive, so
+    # the other terms are in [-1/sqrt(2), 1/sqrt(2)].
+    largest = np.argmax(np.abs(wxyz), axis=-1)
+    wxyz = wxyz * np.sign(wxyz[np.arange(num_splats), largest])[:, None]
+    others = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])[largest]
+    terms = np.take_along_axis(wxyz, others, axis=-1)
+    terms = np.round(np.clip(terms * _SQRT2 * 0.5 + 0.5, 0.0, 1.0) * 1023.0)
+    terms = terms.astype(np.uint32)
+    rotations = (
+        (largest.astype(np.uint32) << 30)
+        | (terms[:, 0] << 20)
+        | (terms[:, 1] << 10)
+        | terms[:, 2]
+    )
+
+    center_lower, center_upper = _block_bounds(centers)
+    scale_lower, scale_upper = _block_bounds(log_scales.astype(np.float32))
+    bounds = np.concatenate(
+        [center_lower, center_upper, scale_lower, scale_upper], axis=-1
+    )
+    packed = np.stack(
+        [
+            _quantize(centers, center_lower, center_upper, (11, 10, 11)),
+            rotations,
+            _quantize(log_scales, scale_lower, scale_upper, (11, 10, 11)),
+            buffer[:, 7],
+        ],
+        axis=-1,
+    )
+    return bounds, packed
+
+
+def decode_splats(
+    bounds: npt.NDArray[np.float32], packed: npt.NDArray[np.uint32]
+) -> npt.NDArray[np.uint32]:
+    """Decode splats that were compressed with `encode_splats()`. Returns a
+    buffer with shape (N, 8), in the layout of `GaussianSplatsProps.buffer`."""
+    num_splats = packed.shape[0]
+    centers = _dequantize(packed[:, 0], bounds[:, 0:3], bounds[:, 3:6], (11, 10, 11))
+    scales = np.exp(
+        _dequantize(packed[:, 2], bounds[:, 6:9], bounds[:, 9:12], (11, 10, 11))
+    )
+
+    # Recover the largest quaternion term from the unit norm constraint.
+    largest = (packed[:, 1] >> 30).astype(np.int64)
+    terms = np.stack([(packed[:, 1] >> shift) & 1023 for shift in (20, 10, 0)], axis=-1)
+    terms = (terms / 1023.0 - 0.5) * 2.0 / _SQRT2
+    others = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])[largest]
+    wxyz = np.zeros((num_splats, 4))
+    np.put_along_axis(wxyz, others, terms, axis=-1)
+    wxyz[np.arange(num_splats), largest] = np.sqrt(
+        np.maximum(1.0 - np.sum(terms**2, axis=-1), 0.0)
+    )
+    rotations = tf.SO3(wxyz).as_matrix()
+    covariances = np.einsum("nik,nk,njk->nij", rotations, scales**2, rotations)
+
+    cov_triu = covariances.reshape((-1, 9))[:, _TRIU_INDICES]
+    buffer = np.zeros((num_splats, 8), dtype=np.uint32)
+    buffer[:, 0:3] = centers.astype(np.float32).view(np.uint32)
+    buffer[:, 4:7] = np.ascontiguousarray(cov_triu.astype(np.float16)).view(np.uint32)
+    buffer[:, 7] = packed[:, 3]
+    return buffer
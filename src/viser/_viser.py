@@ -23,12 +23,23 @@ from typing_extensions import Literal
 
 from . import _client_autobuild, _messages, infra
 from . import transforms as tf
+from ._callback_scheduler import (
+    CallbackRateLimit,
+    CallbackScheduler,
+    CallbackStats,
+    make_callback_registrar,
+)
 from ._gui_api import GuiApi, LiteralColor, _make_uuid
+from ._memory_budget import (
+    MessageMemoryUsage,
+    evict_oldest_scene_nodes,
+    get_memory_usage,
+)
 from ._notification_handle import NotificationHandle, _NotificationHandleState
 from ._scene_api import SceneApi, cast_vector
 from ._threadpool_exceptions import print_threadpool_errors
 from ._tunnel import ViserTunnel
-from .infra._infra import StateSerializer
+from .infra._infra import StateRecorder, StateSerializer
 
 
 class _BackwardsCompatibilityShim:
@@ -83,6 +94,10 @@ class _CameraHandleState:
     up_direction: npt.NDArray[np.float64]
     update_timestamp: float
     camera_cb: list[Callable[[CameraHandle], None | Coroutine]]
+    rate_limit_from_cb: dict[Callable, CallbackRateLimit] = dataclasses.field(
+        default_factory=dict
+    )
+    callback_stats: CallbackStats = dataclasses.field(default_factory=CallbackStats)
 
 
 class CameraHandle:
@@ -305,9 +320,34 @@ class CameraHandle:
             _messages.SetCameraUpDirectionMessage(cast_vector(up_direction, 3))
         )
 
+    @overload
     def on_update(
-        self, callback: Callable[[CameraHandle], NoneOrCoroutine]
-    ) -> Callable[[CameraHandle], NoneOrCoroutine]:
+        self,
+        callback: Callable[[CameraHandle], NoneOrCoroutine],
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[[CameraHandle], NoneOrCoroutine]: ...
+
+    @overload
+    def on_update(
+        self,
+        callback: None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable[
+        [Callable[[CameraHandle], NoneOrCoroutine]],
+        Callable[[CameraHandle], NoneOrCoroutine],
+    ]: ...
+
+    def on_update(
+        self,
+        callback: Callable | None = None,
+        *,
+        throttle_hz: float | None = None,
+        debounce_sec: float | None = None,
+    ) -> Callable:
         """Attach a callback to run when a new camera message is received.
 
         The callback can be either a standard function or an async function:
@@ -315,9 +355,22 @@ class CameraHandle:
         - Async functions (async def) will be executed in the event loop.
 
         Using async functions can be useful for reducing race conditions.
+
+        Use ``throttle_hz`` or ``debounce_sec`` to rate limit expensive callbacks;
+        see :doc:`/events`.
         """
-        self._state.camera_cb.append(callback)
-        return callback
+        register = make_callback_registrar(
+            self._state.camera_cb,
+            self._state.rate_limit_from_cb,
+            throttle_hz,
+            debounce_sec,
+        )
+        return register if callback is None else register(callback)
+
+    @property
+    def callback_stats(self) -> CallbackStats:
+        """Read-only counters for camera update callbacks."""
+        return self._state.callback_stats
 
     def get_render(
         self,
@@ -367,11 +420,17 @@ class ClientHandle(_BackwardsCompatibilityShim if not TYPE_CHECKING else object)
 
         # Public attributes.
         self.scene: SceneApi = SceneApi(
-            self, thread_executor=server._thread_executor, event_loop=server._event_loop
+            self,
+            thread_executor=server._thread_executor,
+            event_loop=server._event_loop,
+            callback_scheduler=server._callback_scheduler,
         )
         """Handle for interacting with the 3D scene."""
         self.gui: GuiApi = GuiApi(
-            self, thread_executor=server._thread_executor, event_loop=server._event_loop
+            self,
+            thread_executor=server._thread_executor,
+            event_loop=server._event_loop,
+            callback_scheduler=server._callback_scheduler,
         )
         """Handle for interacting with the GUI."""
         self.client_id: int = conn.client_id
@@ -635,11 +694,6 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
 
         self._thread_executor = ThreadPoolExecutor(max_workers=32)
 
-        # Run "garbage collector" on message buffer when new clients connect.
-        @server.on_client_connect
-        async def _(_: infra.WebsockClientConnection) -> None:
-            self._run_garbage_collector()
-
         # For new clients, register and add a handler for camera messages.
         @server.on_client_connect
         async def _(conn: infra.WebsockClientConnection) -> None:
@@ -667,6 +721,8 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
                     up_direction=np.array(message.up_direction),
                     update_timestamp=time.time(),
                     camera_cb=client.camera._state.camera_cb,
+                    rate_limit_from_cb=client.camera._state.rate_limit_from_cb,
+                    callback_stats=client.camera._state.callback_stats,
                 )
 
                 # We consider a client to be connected after the first camera message is
@@ -683,13 +739,18 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
                                     cb, client
                                 ).add_done_callback(print_threadpool_errors)
 
-                for camera_cb in client.camera._state.camera_cb:
-                    if asyncio.iscoroutinefunction(camera_cb):
-                        await camera_cb(client.camera)
-                    else:
-                        self._thread_executor.submit(
-                            camera_cb, client.camera
-                        ).add_done_callback(print_threadpool_errors)
+                camera_state = client.camera._state
+                for camera_cb in camera_state.camera_cb:
+                    # Camera messages are sent at pointer rate. Slow callbacks,
+                    # including async ones, should only see the latest camera
+                    # state.
+                    self._callback_scheduler.submit(
+                        ("camera", client.client_id, camera_cb),
+                        camera_cb,
+                        client.camera,
+                        camera_state.callback_stats,
+                        camera_state.rate_limit_from_cb.get(camera_cb, None),
+                    )
 
             conn.register_handler(_messages.ViewerCameraMessage, handle_camera_message)
 
@@ -712,14 +773,23 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
         # Start the server.
         server.start()
         self._event_loop = server._broadcast_buffer.event_loop
+        self._callback_scheduler = CallbackScheduler(
+            self._thread_executor, self._event_loop
+        )
 
         self.scene: SceneApi = SceneApi(
-            self, thread_executor=self._thread_executor, event_loop=self._event_loop
+            self,
+            thread_executor=self._thread_executor,
+            event_loop=self._event_loop,
+            callback_scheduler=self._callback_scheduler,
         )
         """Handle for interacting with the 3D scene."""
 
         self.gui: GuiApi = GuiApi(
-            self, thread_executor=self._thread_executor, event_loop=self._event_loop
+            self,
+            thread_executor=self._thread_executor,
+            event_loop=self._event_loop,
+            callback_scheduler=self._callback_scheduler,
         )
         """Handle for interacting with the GUI."""
 
@@ -778,67 +848,6 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
         self.gui.reset()
         self.gui.set_panel_label(label)
 
-    def _run_garbage_collector(self, force: bool = False) -> None:
-        """Clean up old messages. This is not elegant; a refactor of our
-        message persistence logic will significantly reduce complexity."""
-        buffer = self._websock_server._broadcast_buffer
-        with buffer.buffer_lock:
-            # Skip garbage collection if we have messages that are queeud but
-            # not yet processed by the window generators.
-            #
-            # This makes sure that we don't accidentally cull messages before
-            # they're sent to existing clients. RemoveSceneNodeMessage, for example,
-            # needs to be sent to old clients but not new ones.
-            if (
-                not force
-                and self._websock_server._broadcast_buffer.message_event.is_set()
-            ):
-                return
-
-            remove_message_ids: list[int] = []
-
-            remove_scene_names: set[str] = set()
-            remove_gui_uuids: set[str] = set()
-
-            for id, message in reversed(buffer.message_from_id.items()):
-                # Find scene nodes or GUI elements that were removed.
-                if isinstance(message, _messages.RemoveSceneNodeMessage):
-                    remove_message_ids.append(id)
-                    remove_scene_names.add(message.name)
-                elif isinstance(message, _messages.GuiRemoveMessage):
-                    remove_message_ids.append(id)
-                    remove_gui_uuids.add(message.uuid)
-                elif isinstance(message, _messages.GuiCloseModalMessage):
-                    remove_message_ids.append(id)
-
-                # For removed elements, no need to send any update messages.
-                if (
-                    isinstance(
-                        message,
-                        (
-                            _messages.SetPositionMessage,
-                            _messages.SetOrientationMessage,
-                            _messages.SetBonePositionMessage,
-                            _messages.SetBoneOrientationMessage,
-                            _messages.SetSceneNodeClickableMessage,
-                            _messages.SetSceneNodeVisibilityMessage,
-                        ),
-                    )
-                    and message.name in remove_scene_names
-                ):
-                    remove_message_ids.append(id)
-
-                if (
-                    isinstance(message, _messages.GuiUpdateMessage)
-                    and message.uuid in remove_gui_uuids
-                ):
-                    remove_message_ids.append(id)
-
-            # Remove old messages.
-            for id in remove_message_ids:
-                message = buffer.message_from_id.pop(id)
-                buffer.id_from_redundancy_key.pop(message.redundancy_key())
-
     def get_host(self) -> str:
         """Returns the host address of the Viser server.
 
@@ -933,6 +942,49 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
         with self._client_lock:
             return self._connected_clients.copy()
 
+    def get_memory_usage(self) -> MessageMemoryUsage:
+        """Get the estimated memory used by the scene and GUI state that the
+        server keeps for newly connected clients. This grows as uniquely named
+        scene nodes and GUI elements are added, and shrinks when they're
+        removed. See :meth:`set_memory_budget()` for bounding it.
+
+        Returns:
+            Memory usage, by message type and scene node.
+        """
+        return get_memory_usage(self._websock_server._broadcast_buffer)
+
+    def set_memory_budget(
+        self,
+        max_bytes: int | None,
+        on_exceeded: Literal["error", "evict_oldest"] = "error",
+        evictable: str = "*",
+    ) -> None:
+        """Bound the memory used by the scene and GUI state that the server
+        keeps for newly connected clients, as reported by
+        :meth:`get_memory_usage()`.
+
+        Args:
+            max_bytes: Maximum estimated size of the persisted state, or None
+                for no limit.
+            on_exceeded: What to do when a new scene node or update would
+                exceed the budget. `"error"` raises a `RuntimeError` from the
+                call that added it. `"evict_oldest"` removes the oldest scene
+                nodes that match `evictable` until there's enough room, and
+                raises a `RuntimeError` if that isn't possible.
+            evictable: Glob pattern for the names of scene nodes that can be
+                evicted, for example `"/frames/*"`. Descendants of evicted
+                nodes are removed with them.
+        """
+        buffer = self._websock_server._broadcast_buffer
+        buffer.max_message_bytes = max_bytes
+        if on_exceeded == "evict_oldest":
+            buffer.evict_fn = lambda num_bytes: evict_oldest_scene_nodes(
+                buffer, self.scene, evictable, num_bytes
+            )
+        else:
+            assert on_exceeded == "error"
+            buffer.evict_fn = None
+
     def on_client_connect(
         self, cb: Callable[[ClientHandle], NoneOrCoroutine]
     ) -> Callable[[ClientHandle], NoneOrCoroutine]:
@@ -1080,3 +1132,46 @@ class ViserServer(_BackwardsCompatibilityShim if not TYPE_CHECKING else object):
         for message in self._websock_server._broadcast_buffer.message_from_id.values():
             serializer._insert_message(message)
         return serializer
+
+    def get_scene_recorder(
+        self,
+        path: str | Path,
+        chunk_size_bytes: int = 1_000_000,
+        keyframe_interval_sec: float | None = 10.0,
+        keyframe_size_ratio: float = 1.0,
+    ) -> StateRecorder:
+        """Start streaming the scene state to a .viser file.
+
+        This is an alternative to :meth:`get_scene_serializer()` for long
+        recordings: messages are compressed and written to the file in chunks
+        as they're sent, instead of being kept in memory until the end. The
+        recorder should be closed when done, either via
+        :meth:`StateRecorder.close()` or by using it as a context manager.
+
+        Args:
+            path: Path of the .viser file to write.
+            chunk_size_bytes: Approximate number of uncompressed message bytes
+                to buffer before compressing and writing a chunk.
+            keyframe_interval_sec: Recording time between keyframes, which store
+                the full scene state and are used for seeking during playback.
+                If None, only the initial state is stored.
+            keyframe_size_ratio: Keyframes are only written once the messages
+                recorded since the last keyframe add up to this many times the
+                size of the scene state. For large scenes with small updates,
+                this keeps keyframes from dominating the file size. If 0,
+                keyframes are written every ``keyframe_interval_sec``.
+
+        Returns:
+            Recorder handle.
+        """
+        recorder = self._websock_server.get_message_recorder(
+            Path(path).open("wb"),
+            # Don't record GUI messages. This feels brittle.
+            filter=lambda message: "Gui" not in type(message).__name__,
+            chunk_size_bytes=chunk_size_bytes,
+            keyframe_interval_sec=keyframe_interval_sec,
+            keyframe_size_ratio=keyframe_size_ratio,
+        )
+        # Insert current scene state.
+        recorder.write_keyframe()
+        return recorder
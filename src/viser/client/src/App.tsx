@@ -196,6 +196,12 @@ function ViewerRoot() {
     // Skinned mesh state.
     skinnedMeshState: {},
 
+    // Buffers for point clouds with `max_points` set.
+    pointCloudBuffers: {},
+
+    // Buffers for Gaussian splats.
+    splatBuffers: {},
+
     // Global hover state tracking.
     hoveredElementsCount: 0,
   });
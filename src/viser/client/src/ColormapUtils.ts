@@ -0,0 +1,138 @@
+import * as THREE from "three";
+import { PointCloudMessage } from "./WebsocketMessages";
+
+type ColormapName = PointCloudMessage["props"]["colormap"];
+
+// Evenly spaced colors of each colormap. Continuous colormaps are linearly
+// interpolated between these.
+const colormapStops: { [key in ColormapName]: string[] } = {
+  viridis: [
+    "#440154",
+    "#482475",
+    "#414487",
+    "#355f8d",
+    "#2a788e",
+    "#21918c",
+    "#22a884",
+    "#44bf70",
+    "#7ad151",
+    "#bddf26",
+    "#fde725",
+  ],
+  plasma: [
+    "#0d0887",
+    "#41049d",
+    "#6a00a8",
+    "#8f0da4",
+    "#b12a90",
+    "#cc4778",
+    "#e16462",
+    "#f2844b",
+    "#fca636",
+    "#fcce25",
+    "#f0f921",
+  ],
+  inferno: [
+    "#000004",
+    "#160b39",
+    "#420a68",
+    "#6a176e",
+    "#932667",
+    "#bc3754",
+    "#dd513a",
+    "#f37819",
+    "#fca50a",
+    "#f6d746",
+    "#fcffa4",
+  ],
+  magma: [
+    "#000004",
+    "#140e36",
+    "#3b0f70",
+    "#641a80",
+    "#8c2981",
+    "#b73779",
+    "#de4968",
+    "#f7705c",
+    "#fe9f6d",
+    "#fecf92",
+    "#fcfdbf",
+  ],
+  turbo: [
+    "#23171b",
+    "#4958dd",
+    "#2f9ef5",
+    "#27d7c3",
+    "#4ef983",
+    "#96fa50",
+    "#dfdc32",
+    "#ffa323",
+    "#f45c17",
+    "#b82008",
+    "#900d00",
+  ],
+  gray: ["#000000", "#ffffff"],
+  tab10: [
+    "#1f77b4",
+    "#ff7f0e",
+    "#2ca02c",
+    "#d62728",
+    "#9467bd",
+    "#8c564b",
+    "#e377c2",
+    "#7f7f7f",
+    "#bcbd22",
+    "#17becf",
+  ],
+};
+
+// Categorical colormaps aren't interpolated.
+const categoricalColormaps: ColormapName[] = ["tab10"];
+
+/** Create a 1D texture for mapping scalars to colors. Custom lookup tables
+ * with shape (K, 3) take precedence over named colormaps, and aren't
+ * interpolated. The caller is responsible for disposing the texture. */
+export function createColormapTexture(
+  colormap: ColormapName,
+  lut: Uint8Array | null,
+): THREE.DataTexture {
+  let rgb: Uint8Array;
+  let interpolate: boolean;
+  if (lut !== null) {
+    rgb = lut;
+    interpolate = false;
+  } else {
+    const stops = colormapStops[colormap].map((hex) => {
+      const value = parseInt(hex.slice(1), 16);
+      return [(value >> 16) & 255, (value >> 8) & 255, value & 255];
+    });
+    interpolate = !categoricalColormaps.includes(colormap);
+    if (!interpolate) {
+      rgb = Uint8Array.from(stops.flat());
+    } else {
+      // Interpolate the stops into 256 colors.
+      rgb = new Uint8Array(256 * 3);
+      for (let i = 0; i < 256; i++) {
+        const position = (i / 255) * (stops.length - 1);
+        const lower = Math.min(Math.floor(position), stops.length - 2);
+        const weight = position - lower;
+        for (let c = 0; c < 3; c++) {
+          rgb[i * 3 + c] = Math.round(
+            stops[lower][c] * (1.0 - weight) + stops[lower + 1][c] * weight,
+          );
+        }
+      }
+    }
+  }
+
+  const size = Math.max(rgb.length / 3, 1);
+  const rgba = new Uint8Array(size * 4).fill(255);
+  for (let i = 0; i < rgb.length / 3; i++) {
+    rgba.set(rgb.subarray(i * 3, i * 3 + 3), i * 4);
+  }
+  const texture = new THREE.DataTexture(rgba, size, 1, THREE.RGBAFormat);
+  texture.magFilter = interpolate ? THREE.LinearFilter : THREE.NearestFilter;
+  texture.minFilter = interpolate ? THREE.LinearFilter : THREE.NearestFilter;
+  texture.needsUpdate = true;
+  return texture;
+}
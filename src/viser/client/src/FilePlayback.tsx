@@ -1,6 +1,6 @@
-import { decodeAsync, decode } from "@msgpack/msgpack";
+import { decode } from "@msgpack/msgpack";
 import { Message } from "./WebsocketMessages";
-import { decompress } from "fflate";
+import { gunzip, unzlibSync } from "fflate";
 
 import { useCallback, useContext, useEffect, useRef, useState } from "react";
 import { ViewerContext } from "./ViewerContext";
@@ -19,61 +19,166 @@ import {
   IconPlayerPlayFilled,
 } from "@tabler/icons-react";
 
-/** Download, decompress, and deserialize a file, which should be serialized
- * via msgpack and compressed via gzip. Also takes a hook for status updates. */
-async function deserializeGzippedMsgpackFile<T>(
+/** Download a file. Also takes a hook for status updates. */
+async function downloadFile(
   fileUrl: string,
   setStatus: (status: { downloaded: number; total: number }) => void,
-): Promise<T> {
+): Promise<Uint8Array> {
   const response = await fetch(fileUrl);
   if (!response.ok) {
     throw new Error(`Failed to fetch the file: ${response.statusText}`);
   }
-  return new Promise<T>((resolve) => {
-    const gzipTotalLength = parseInt(response.headers.get("Content-Length")!);
-    if (typeof DecompressionStream === "undefined") {
-      // Implementation without DecompressionStream.
-      console.log("DecompressionStream is unavailable. Using fallback.");
-      setStatus({ downloaded: 0.1 * gzipTotalLength, total: gzipTotalLength });
-      response.arrayBuffer().then((buffer) => {
-        setStatus({
-          downloaded: 0.8 * gzipTotalLength,
-          total: gzipTotalLength,
-        });
-        decompress(new Uint8Array(buffer), (error, result) => {
-          setStatus({
-            downloaded: 1.0 * gzipTotalLength,
-            total: gzipTotalLength,
-          });
-          resolve(decode(result) as T);
-        });
-      });
-    } else {
-      // Stream: fetch -> gzip -> msgpack.
-      let gzipReceived = 0;
-      const progressStream = // Count number of (compressed) bytes.
-        new TransformStream({
-          transform(chunk, controller) {
-            gzipReceived += chunk.length;
-            setStatus({ downloaded: gzipReceived, total: gzipTotalLength });
-            controller.enqueue(chunk);
-          },
-        });
-      decodeAsync(
-        response
-          .body!.pipeThrough(progressStream)
-          .pipeThrough(new DecompressionStream("gzip")),
-      ).then((val) => resolve(val as T));
-    }
-  });
+  const totalLength = parseInt(response.headers.get("Content-Length")!);
+  if (response.body === null) {
+    const buffer = await response.arrayBuffer();
+    setStatus({ downloaded: totalLength, total: totalLength });
+    return new Uint8Array(buffer);
+  }
+
+  // Read chunks as they arrive, so we can report progress.
+  const reader = response.body.getReader();
+  const chunks: Uint8Array[] = [];
+  let received = 0;
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    chunks.push(value);
+    received += value.length;
+    setStatus({ downloaded: received, total: totalLength });
+  }
+  const out = new Uint8Array(received);
+  let offset = 0;
+  for (const chunk of chunks) {
+    out.set(chunk, offset);
+    offset += chunk.length;
+  }
+  return out;
 }
 
+/** A span of a recording. Chunks contain timestamped messages, while
+ * keyframes contain the full scene state at their time and are used for
+ * seeking. Payloads are only decompressed when they're played. */
+interface RecordingSegment {
+  kind: "chunk" | "keyframe";
+  time: number;
+  decode: () => [number, Message][]; // (time in seconds, message).
+}
+
+interface Recording {
+  durationSeconds: number;
+  viserVersion: string;
+  segments: RecordingSegment[];
+  // Indices of keyframe segments, sorted by time.
+  keyframeIndices: number[];
+}
+
+/** Legacy recording format: msgpack, compressed via gzip. */
 interface SerializedMessages {
   durationSeconds: number;
   messages: [number, Message][]; // (time in seconds, message).
   viserVersion: string;
 }
 
+// Streaming recordings are written by `StateRecorder` on the server. They
+// start with a magic string, followed by records that each have a 1-byte kind
+// and a little-endian uint32 payload length.
+const RECORDING_MAGIC = new TextEncoder().encode("VISER\x00\x02\x00");
+
+function isStreamingRecording(data: Uint8Array): boolean {
+  return RECORDING_MAGIC.every((byte, i) => data[i] === byte);
+}
+
+function parseStreamingRecording(data: Uint8Array): Recording {
+  const view = new DataView(data.buffer, data.byteOffset, data.byteLength);
+  const recording: Recording = {
+    durationSeconds: 0.0,
+    viserVersion: "unknown",
+    segments: [],
+    keyframeIndices: [],
+  };
+  let durationSeconds: number | null = null;
+  let offset = RECORDING_MAGIC.length;
+  while (offset + 5 <= data.length) {
+    const kind = String.fromCharCode(data[offset]);
+    const length = view.getUint32(offset + 1, true);
+    const payload = data.subarray(offset + 5, offset + 5 + length);
+    offset += 5 + length;
+    if (payload.length < length) {
+      // The recording was truncated, for example if the writer crashed.
+      break;
+    }
+
+    if (kind === "H") {
+      recording.viserVersion = (
+        decode(payload) as { viserVersion: string }
+      ).viserVersion;
+    } else if (kind === "E") {
+      durationSeconds = (decode(payload) as { durationSeconds: number })
+        .durationSeconds;
+    } else if (kind === "C" || kind === "K") {
+      const time = view.getFloat64(payload.byteOffset - data.byteOffset, true);
+      const compressed = payload.subarray(8);
+      if (kind === "K") {
+        recording.keyframeIndices.push(recording.segments.length);
+      }
+      recording.segments.push({
+        kind: kind === "K" ? "keyframe" : "chunk",
+        time: time,
+        decode:
+          kind === "K"
+            ? () =>
+                (decode(unzlibSync(compressed)) as Message[]).map(
+                  (message): [number, Message] => [time, message],
+                )
+            : () => decode(unzlibSync(compressed)) as [number, Message][],
+      });
+    }
+  }
+  recording.durationSeconds =
+    durationSeconds ??
+    recording.segments[recording.segments.length - 1]?.time ??
+    0.0;
+  return recording;
+}
+
+async function parseRecording(data: Uint8Array): Promise<Recording> {
+  if (isStreamingRecording(data)) return parseStreamingRecording(data);
+
+  // Legacy format. This is played back as a single chunk.
+  const decompressed = await new Promise<Uint8Array>((resolve, reject) =>
+    gunzip(data, (error, result) =>
+      error === null ? resolve(result) : reject(error),
+    ),
+  );
+  const serialized = decode(decompressed) as SerializedMessages;
+  return {
+    durationSeconds: serialized.durationSeconds,
+    viserVersion: serialized.viserVersion,
+    segments: [
+      {
+        kind: "chunk",
+        time: serialized.messages[0]?.[0] ?? 0.0,
+        decode: () => serialized.messages,
+      },
+    ],
+    keyframeIndices: [],
+  };
+}
+
+/** Get the index of the last keyframe at or before a time, or -1 if there is
+ * none. */
+function findKeyframe(recording: Recording, time: number): number {
+  const keyframeIndices = recording.keyframeIndices;
+  let lo = 0;
+  let hi = keyframeIndices.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (recording.segments[keyframeIndices[mid]].time <= time) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo === 0 ? -1 : keyframeIndices[lo - 1];
+}
+
 export function PlaybackFromFile({ fileUrl }: { fileUrl: string }) {
   const viewer = useContext(ViewerContext)!;
   const viewerMutable = viewer.mutable.current; // Get mutable once
@@ -82,7 +187,7 @@ export function PlaybackFromFile({ fileUrl }: { fileUrl: string }) {
   const [status, setStatus] = useState({ downloaded: 0.0, total: 0.0 });
   const [playbackSpeed, setPlaybackSpeed] = useState("1x");
   const [paused, setPaused] = useState(false);
-  const [recording, setRecording] = useState<SerializedMessages | null>(null);
+  const [recording, setRecording] = useState<Recording | null>(null);
 
   // Instead of removing all of the existing scene nodes, we're just going to hide them.
   // This will prevent unnecessary remounting when messages are looped.
@@ -119,43 +224,69 @@ export function PlaybackFromFile({ fileUrl }: { fileUrl: string }) {
   const theme = useMantineTheme();
 
   useEffect(() => {
-    deserializeGzippedMsgpackFile<SerializedMessages>(fileUrl, setStatus).then(
-      (data) => {
+    downloadFile(fileUrl, setStatus)
+      .then(parseRecording)
+      .then((data) => {
         console.log(
           "File loaded! Saved with Viser version:",
           data.viserVersion,
         );
         setRecording(data);
-      },
-    );
+      });
   }, []);
 
-  const playbackMutable = useRef({ currentTime: 0.0, currentIndex: 0 });
+  const playbackMutable = useRef({
+    currentTime: 0.0,
+    // Index of the next segment to play.
+    segmentIndex: 0,
+    // Decoded messages from the current chunk.
+    messages: [] as [number, Message][],
+    messageIndex: 0,
+    // Set when the scene should be reset and restored from a keyframe.
+    needsSeek: true,
+  });
 
   const updatePlayback = useCallback(() => {
     if (recording === null) return;
     const mutable = playbackMutable.current;
 
+    if (mutable.needsSeek) {
+      // Reset the scene, then restore it from the latest keyframe before the
+      // current time. Messages after the keyframe are sent below.
+      resetScene();
+      const keyframeIndex = findKeyframe(recording, mutable.currentTime);
+      mutable.segmentIndex = Math.max(keyframeIndex + 1, 0);
+      mutable.messages =
+        keyframeIndex === -1 ? [] : recording.segments[keyframeIndex].decode();
+      mutable.messageIndex = 0;
+      mutable.needsSeek = false;
+    }
+
     // We have messages with times: [0.0, 0.01, 0.01, 0.02, 0.03]
     // We have our current time: 0.02
     // We want to get of a slice of all message _until_ the current time.
-    if (mutable.currentIndex == 0) {
-      // Reset the scene if sending the first message.
-      resetScene();
-    }
-    for (
-      ;
-      mutable.currentIndex < recording.messages.length &&
-      recording.messages[mutable.currentIndex][0] <= mutable.currentTime;
-      mutable.currentIndex++
-    ) {
-      const message = recording.messages[mutable.currentIndex][1];
-      viewerMutable.messageQueue.push(message);
+    while (true) {
+      if (mutable.messageIndex < mutable.messages.length) {
+        const [time, message] = mutable.messages[mutable.messageIndex];
+        if (time > mutable.currentTime) break;
+        viewerMutable.messageQueue.push(message);
+        mutable.messageIndex++;
+        continue;
+      }
+
+      // Move to the next chunk. Keyframes are only needed for seeking.
+      const segment = recording.segments[mutable.segmentIndex];
+      if (segment === undefined || segment.time > mutable.currentTime) break;
+      mutable.segmentIndex++;
+      if (segment.kind === "chunk") {
+        mutable.messages = segment.decode();
+        mutable.messageIndex = 0;
+      }
     }
 
     if (mutable.currentTime >= recording.durationSeconds) {
-      mutable.currentIndex = 0;
-      mutable.currentTime = recording.messages[0][0];
+      mutable.currentTime = 0.0;
+      mutable.needsSeek = true;
     }
     setCurrentTime(mutable.currentTime);
   }, [recording]);
@@ -171,8 +302,10 @@ export function PlaybackFromFile({ fileUrl }: { fileUrl: string }) {
         lastUpdate = now;
 
         updatePlayback();
+        const mutable = playbackMutable.current;
         if (
-          playbackMutable.current.currentIndex === recording.messages.length &&
+          mutable.segmentIndex === recording.segments.length &&
+          mutable.messageIndex === mutable.messages.length &&
           recording.durationSeconds === 0.0
         ) {
           clearInterval(interval);
@@ -204,12 +337,17 @@ export function PlaybackFromFile({ fileUrl }: { fileUrl: string }) {
 
   const updateCurrentTime = useCallback(
     (value: number) => {
-      if (value < playbackMutable.current.currentTime) {
-        // Going backwards is more expensive...
-        resetScene();
-        playbackMutable.current.currentIndex = 0;
+      const mutable = playbackMutable.current;
+      if (
+        value < mutable.currentTime ||
+        (recording !== null &&
+          findKeyframe(recording, value) >= mutable.segmentIndex)
+      ) {
+        // Going backwards, or skipping past a keyframe: restore the scene from
+        // the nearest keyframe instead of replaying every message.
+        mutable.needsSeek = true;
       }
-      playbackMutable.current.currentTime = value;
+      mutable.currentTime = value;
       setCurrentTime(value);
       setPaused(true);
       updatePlayback();
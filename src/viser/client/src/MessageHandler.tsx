@@ -10,6 +10,7 @@ import {
   FileTransferPart,
   FileTransferStartDownload,
   Message,
+  PointCloudMessage,
   SceneNodeMessage,
   isGuiComponentMessage,
   isSceneNodeMessage,
@@ -21,6 +22,14 @@ import { IconCheck, IconDownload } from "@tabler/icons-react";
 import { computeT_threeworld_world } from "./WorldTransformUtils";
 import { rootNodeTemplate } from "./SceneTreeState";
 import { GaussianSplatsContext } from "./Splatting/GaussianSplatsHelpers";
+import { decodeSplatChunk } from "./Splatting/SplatCompression";
+
+/** Get consecutive row indices, from `start` to `start + count`. */
+function rowRange(start: number, count: number): Uint32Array {
+  const rows = new Uint32Array(count);
+  for (let i = 0; i < count; i++) rows[i] = start + i;
+  return rows;
+}
 
 /** Returns a handler for all incoming messages. */
 function useMessageHandler(): (message: Message) => void {
@@ -29,6 +38,7 @@ function useMessageHandler(): (message: Message) => void {
 
   // We could reduce the redundancy here if we wanted to.
   // https://github.com/nerfstudio-project/viser/issues/39
+  const splatContext = React.useContext(GaussianSplatsContext)!;
   const updateSceneNode = viewer.useSceneTree((state) => state.updateSceneNode);
   const removeSceneNode = viewer.useSceneTree((state) => state.removeSceneNode);
   const addSceneNode = viewer.useSceneTree((state) => state.addSceneNode);
@@ -82,6 +92,127 @@ function useMessageHandler(): (message: Message) => void {
     addSceneNode(message);
   }
 
+  // Allocate buffers for a point cloud with `max_points` set, which appended
+  // points are written into.
+  function resetPointCloudBuffers(
+    name: string,
+    props: PointCloudMessage["props"],
+  ) {
+    if (props.max_points === null) {
+      delete viewerMutable.pointCloudBuffers[name];
+      return;
+    }
+    const bytesPerPoint = props.precision === "float32" ? 12 : 6;
+    const points = new Uint8Array(props.max_points * bytesPerPoint);
+    points.set(props.points);
+    let colors = null;
+    if (props.colors.length !== 3) {
+      colors = new Uint8Array(props.max_points * 3);
+      colors.set(props.colors);
+    }
+    const bytesPerScalar = {
+      uint8: 1,
+      uint16: 2,
+      float16: 2,
+      float32: 4,
+    }[props.scalars_dtype];
+    let scalars = null;
+    if (props.scalars !== null) {
+      scalars = new Uint8Array(props.max_points * bytesPerScalar);
+      scalars.set(props.scalars);
+    }
+    viewerMutable.pointCloudBuffers[name] = {
+      points: points,
+      colors: colors,
+      scalars: scalars,
+      bytesPerPoint: bytesPerPoint,
+      bytesPerScalar: bytesPerScalar,
+      count: props.points.length / bytesPerPoint,
+      dirtyRanges: [],
+    };
+  }
+
+  // Get the props of a point cloud, including points that have been appended
+  // since it was created or updated.
+  function getPointCloudProps(
+    name: string,
+    props: PointCloudMessage["props"],
+  ): PointCloudMessage["props"] {
+    const buffers = viewerMutable.pointCloudBuffers[name];
+    if (buffers === undefined) return props;
+    return {
+      ...props,
+      points: buffers.points.slice(0, buffers.count * buffers.bytesPerPoint),
+      colors:
+        buffers.colors === null
+          ? props.colors
+          : buffers.colors.slice(0, buffers.count * 3),
+      scalars:
+        buffers.scalars === null
+          ? props.scalars
+          : buffers.scalars.slice(0, buffers.count * buffers.bytesPerScalar),
+    };
+  }
+
+  // Copy the buffer of a Gaussian splat object into a buffer that streamed
+  // chunks and in-place updates are written into. Returns a view of the copy,
+  // which the renderer shares.
+  function resetSplatBuffer(name: string, buffer: Uint8Array): Uint8Array {
+    const splats = new Uint32Array(buffer.byteLength / 4);
+    new Uint8Array(splats.buffer).set(buffer);
+    const numGaussians = splats.length / 8;
+    viewerMutable.splatBuffers[name] = {
+      buffer: splats,
+      numGaussians: numGaussians,
+      numLoaded: numGaussians,
+      loadedEnd: numGaussians,
+      loadedChunks: new Set(),
+      numShown: numGaussians,
+    };
+    return new Uint8Array(splats.buffer);
+  }
+
+  // Set the number of splats in a splat buffer. Capacity is doubled when the
+  // buffer grows, so repeated appends don't copy every splat each time.
+  // Returns true if the buffer was reallocated.
+  function resizeSplatBuffer(name: string, numGaussians: number): boolean {
+    const state = viewerMutable.splatBuffers[name];
+    const reallocated = state.buffer.length < numGaussians * 8;
+    if (reallocated) {
+      const buffer = new Uint32Array(
+        Math.max(numGaussians, state.buffer.length / 4) * 8,
+      );
+      buffer.set(state.buffer.subarray(0, state.numGaussians * 8));
+      state.buffer = buffer;
+    }
+    state.numGaussians = numGaussians;
+    return reallocated;
+  }
+
+  // Pass the first `numShown` splats of a splat buffer to the renderer. This
+  // rebuilds the renderer.
+  function showSplats(name: string, numShown: number) {
+    const state = viewerMutable.splatBuffers[name];
+    state.numShown = numShown;
+    updateSceneNode(name, {
+      buffer: new Uint8Array(state.buffer.buffer, 0, numShown * 8 * 4),
+    });
+  }
+
+  // Copy splats that were updated in place to the renderer, without
+  // rebuilding it.
+  function patchSplats(
+    name: string,
+    rows: Uint32Array,
+    centersChanged: boolean,
+  ) {
+    splatContext.patchSplats.current?.(
+      viewerMutable.splatBuffers[name].buffer.buffer,
+      rows,
+      centersChanged,
+    );
+  }
+
   const fileDownloadHandler = useFileDownloadHandler();
 
   // Return message handler.
@@ -130,6 +261,27 @@ function useMessageHandler(): (message: Message) => void {
         }
       }
 
+      // Initialize point cloud buffers.
+      if (message.type === "PointCloudMessage") {
+        resetPointCloudBuffers(message.name, message.props);
+      } else {
+        delete viewerMutable.pointCloudBuffers[message.name];
+      }
+
+      // Initialize Gaussian splat buffers. The scene node gets a view of the
+      // buffer, which is updated in place.
+      if (message.type === "GaussianSplatsMessage") {
+        addSceneNodeMakeParents({
+          ...message,
+          props: {
+            ...message.props,
+            buffer: resetSplatBuffer(message.name, message.props.buffer),
+          },
+        });
+        return;
+      }
+      delete viewerMutable.splatBuffers[message.name];
+
       // Add scene node.
       addSceneNodeMakeParents(message);
       return;
@@ -137,9 +289,244 @@ function useMessageHandler(): (message: Message) => void {
 
     switch (message.type) {
       case "SceneNodeUpdateMessage": {
+        const node = viewer.useSceneTree.getState().nodeFromName[message.name];
+        if (
+          node?.message.type === "PointCloudMessage" &&
+          [
+            "points",
+            "colors",
+            "scalars",
+            "scalars_dtype",
+            "precision",
+            "max_points",
+          ].some((key) => key in message.updates)
+        ) {
+          // Buffers are reallocated, so appended points are carried over into
+          // the props.
+          const props = {
+            ...getPointCloudProps(message.name, node.message.props),
+            ...message.updates,
+          } as PointCloudMessage["props"];
+          resetPointCloudBuffers(message.name, props);
+          updateSceneNode(message.name, props);
+          return;
+        }
+        if (
+          node?.message.type === "GaussianSplatsMessage" &&
+          "buffer" in message.updates
+        ) {
+          // Splats are replaced. Compressed splats are replaced by an empty
+          // buffer, and new chunks will follow.
+          updateSceneNode(message.name, {
+            ...message.updates,
+            buffer: resetSplatBuffer(
+              message.name,
+              message.updates.buffer as Uint8Array,
+            ),
+          });
+          return;
+        }
         updateSceneNode(message.name, message.updates);
         return;
       }
+      // Patch some rows of an array property in place.
+      case "SceneNodeArrayPatchMessage": {
+        const node = viewer.useSceneTree.getState().nodeFromName[message.name];
+        // Point clouds with preallocated buffers are patched in place.
+        const buffers = viewerMutable.pointCloudBuffers[message.name];
+        const bufferArray =
+          message.prop_name === "points" ||
+          message.prop_name === "colors" ||
+          message.prop_name === "scalars"
+            ? buffers?.[message.prop_name]
+            : undefined;
+        const array =
+          bufferArray ??
+          (node?.message.props as { [key: string]: any })?.[message.prop_name];
+        if (!(array instanceof Uint8Array)) {
+          console.error(
+            `Attempted to patch non-existent array ${message.prop_name} of ${message.name}`,
+          );
+          return;
+        }
+        const indices = new Uint32Array(
+          message.indices.buffer.slice(
+            message.indices.byteOffset,
+            message.indices.byteOffset + message.indices.byteLength,
+          ),
+        );
+        const rowBytes = message.values.byteLength / indices.length;
+        for (let i = 0; i < indices.length; i++) {
+          array.set(
+            message.values.subarray(i * rowBytes, (i + 1) * rowBytes),
+            indices[i] * rowBytes,
+          );
+        }
+        if (buffers !== undefined && bufferArray) {
+          buffers.dirtyRanges.push([0, buffers.count]);
+          return;
+        }
+        // Assign a new view of the patched buffer, so components that read
+        // the array are re-rendered.
+        updateSceneNode(message.name, {
+          [message.prop_name]: new Uint8Array(
+            array.buffer,
+            array.byteOffset,
+            array.byteLength,
+          ),
+        });
+        return;
+      }
+      // Decode a chunk of compressed Gaussian splats.
+      case "GaussianSplatsChunkMessage": {
+        const state = viewerMutable.splatBuffers[message.name];
+        const numSplats = message.packed.byteLength / 16;
+        if (state === undefined || numSplats === 0) return;
+        const reallocated = resizeSplatBuffer(
+          message.name,
+          message.num_gaussians,
+        );
+        decodeSplatChunk(
+          new Float32Array(
+            message.bounds.buffer.slice(
+              message.bounds.byteOffset,
+              message.bounds.byteOffset + message.bounds.byteLength,
+            ),
+          ),
+          new Uint32Array(
+            message.packed.buffer.slice(
+              message.packed.byteOffset,
+              message.packed.byteOffset + message.packed.byteLength,
+            ),
+          ),
+          state.buffer,
+          message.offset,
+        );
+
+        // Chunks can arrive out of order: chunks that are sent again after an
+        // update replace the original chunks, at the end of the message
+        // buffer. Only the first copy of each chunk counts as loaded.
+        if (!state.loadedChunks.has(message.chunk_index)) {
+          state.loadedChunks.add(message.chunk_index);
+          state.numLoaded += numSplats;
+        }
+        state.loadedEnd = Math.max(state.loadedEnd, message.offset + numSplats);
+
+        // Changing the number of splats rebuilds the renderer, so loaded
+        // splats are shown at geometrically increasing counts. Rows that
+        // haven't been decoded yet are zero, which is fully transparent.
+        if (
+          reallocated ||
+          (state.numShown < state.loadedEnd &&
+            (state.loadedEnd >= 2 * state.numShown ||
+              state.numLoaded >= state.numGaussians))
+        ) {
+          showSplats(
+            message.name,
+            Math.min(state.loadedEnd, state.numGaussians),
+          );
+        } else if (message.offset + numSplats <= state.numShown) {
+          // Rows that are already shown are copied to the renderer in place.
+          patchSplats(message.name, rowRange(message.offset, numSplats), true);
+        }
+        return;
+      }
+      // Write some words of some rows of a splat buffer, in place.
+      case "GaussianSplatsUpdateMessage": {
+        const state = viewerMutable.splatBuffers[message.name];
+        if (state === undefined) {
+          console.error(
+            `Attempted to update non-existent splats ${message.name}`,
+          );
+          return;
+        }
+        const [firstWord, endWord] = message.word_range;
+        const numWords = endWord - firstWord;
+        const values = new Uint32Array(
+          message.values.buffer.slice(
+            message.values.byteOffset,
+            message.values.byteOffset + message.values.byteLength,
+          ),
+        );
+        const numRows = values.length / numWords;
+        if (numRows === 0) return;
+        const rows =
+          message.indices === null
+            ? rowRange(message.start, numRows)
+            : new Uint32Array(
+                message.indices.buffer.slice(
+                  message.indices.byteOffset,
+                  message.indices.byteOffset + message.indices.byteLength,
+                ),
+              );
+        const appended = message.num_gaussians > state.numGaussians;
+        resizeSplatBuffer(message.name, message.num_gaussians);
+        for (let i = 0; i < numRows; i++) {
+          state.buffer.set(
+            values.subarray(i * numWords, (i + 1) * numWords),
+            rows[i] * 8 + firstWord,
+          );
+        }
+        if (appended) {
+          // Appended splats.
+          state.numLoaded = state.numGaussians;
+          state.loadedEnd = state.numGaussians;
+          showSplats(message.name, state.numGaussians);
+        } else if (state.numShown === state.numGaussians) {
+          patchSplats(message.name, rows, firstWord < 3);
+        }
+        // Otherwise, compressed chunks are still loading. Updated rows are
+        // shown with the next chunk.
+        return;
+      }
+      // Remove some rows of a splat buffer.
+      case "GaussianSplatsPruneMessage": {
+        const state = viewerMutable.splatBuffers[message.name];
+        if (state === undefined) {
+          console.error(
+            `Attempted to prune non-existent splats ${message.name}`,
+          );
+          return;
+        }
+        let numRemaining = 0;
+        for (let i = 0; i < state.numGaussians; i++) {
+          if ((message.mask[i >> 3] >> (7 - (i & 7))) & 1) continue;
+          state.buffer.copyWithin(numRemaining * 8, i * 8, i * 8 + 8);
+          numRemaining++;
+        }
+        state.numGaussians = numRemaining;
+        state.numLoaded = numRemaining;
+        state.loadedEnd = numRemaining;
+        showSplats(message.name, numRemaining);
+        return;
+      }
+      // Write appended points into a point cloud's preallocated buffers.
+      case "PointCloudAppendMessage": {
+        const buffers = viewerMutable.pointCloudBuffers[message.name];
+        if (buffers === undefined) {
+          console.error(
+            `Attempted to append to point cloud ${message.name} without max_points`,
+          );
+          return;
+        }
+        const numPoints = message.points.length / buffers.bytesPerPoint;
+        buffers.points.set(
+          message.points,
+          message.offset * buffers.bytesPerPoint,
+        );
+        if (message.colors !== null && buffers.colors !== null) {
+          buffers.colors.set(message.colors, message.offset * 3);
+        }
+        if (message.scalars !== null && buffers.scalars !== null) {
+          buffers.scalars.set(
+            message.scalars,
+            message.offset * buffers.bytesPerScalar,
+          );
+        }
+        buffers.count = Math.max(buffers.count, message.offset + numPoints);
+        buffers.dirtyRanges.push([message.offset, numPoints]);
+        return;
+      }
       // Set the share URL.
       case "ShareUrlUpdated": {
         setShareUrl(message.share_url);
@@ -356,6 +743,45 @@ function useMessageHandler(): (message: Message) => void {
         });
         break;
       }
+      // Set the poses of many scene nodes, in a single state update.
+      case "SetPosesMessage": {
+        const wxyzs = new Float32Array(
+          message.wxyzs.buffer.slice(
+            message.wxyzs.byteOffset,
+            message.wxyzs.byteOffset + message.wxyzs.byteLength,
+          ),
+        );
+        const positions = new Float32Array(
+          message.positions.buffer.slice(
+            message.positions.byteOffset,
+            message.positions.byteOffset + message.positions.byteLength,
+          ),
+        );
+        viewer.useSceneTree.setState((state) => {
+          message.names.forEach((name, i) => {
+            const currentAttrs = state.nodeAttributesFromName[name] || {};
+            state.nodeAttributesFromName[name] = {
+              ...currentAttrs,
+              wxyz: [
+                wxyzs[i * 4],
+                wxyzs[i * 4 + 1],
+                wxyzs[i * 4 + 2],
+                wxyzs[i * 4 + 3],
+              ],
+              position: [
+                positions[i * 3],
+                positions[i * 3 + 1],
+                positions[i * 3 + 2],
+              ],
+              poseUpdateState:
+                currentAttrs.poseUpdateState !== "waitForMakeObject"
+                  ? "needsUpdate"
+                  : currentAttrs.poseUpdateState,
+            };
+          });
+        });
+        break;
+      }
       case "SetSceneNodeVisibilityMessage": {
         const currentAttrs =
           viewer.useSceneTree.getState().nodeAttributesFromName[message.name] ||
@@ -428,6 +854,10 @@ function useMessageHandler(): (message: Message) => void {
 
         if (viewerMutable.skinnedMeshState[message.name] !== undefined)
           delete viewerMutable.skinnedMeshState[message.name];
+        if (viewerMutable.pointCloudBuffers[message.name] !== undefined)
+          delete viewerMutable.pointCloudBuffers[message.name];
+        if (viewerMutable.splatBuffers[message.name] !== undefined)
+          delete viewerMutable.splatBuffers[message.name];
         return;
       }
       // Set the clickability of a particular scene node.
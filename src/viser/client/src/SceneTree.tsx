@@ -553,13 +553,22 @@ function createObjectFactory(
           <SplatObject
             ref={ref}
             buffer={
-              new Uint32Array(
-                message.props.buffer.buffer.slice(
-                  message.props.buffer.byteOffset,
-                  message.props.buffer.byteOffset +
-                    message.props.buffer.byteLength,
-                ),
-              )
+              // Splat buffers are aligned views of buffers from the message
+              // handler, which are updated in place. Sharing memory lets the
+              // renderer copy updated rows.
+              message.props.buffer.byteOffset % 4 === 0
+                ? new Uint32Array(
+                    message.props.buffer.buffer,
+                    message.props.buffer.byteOffset,
+                    message.props.buffer.byteLength / 4,
+                  )
+                : new Uint32Array(
+                    message.props.buffer.buffer.slice(
+                      message.props.buffer.byteOffset,
+                      message.props.buffer.byteOffset +
+                        message.props.buffer.byteLength,
+                    ),
+                  )
             }
           >
             {children}
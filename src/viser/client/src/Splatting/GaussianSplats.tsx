@@ -50,6 +50,7 @@ export function SplatRenderContext({
         useGaussianSplatStore: store,
         updateCamera: React.useRef(null),
         meshPropsRef: React.useRef(null),
+        patchSplats: React.useRef(null),
       }}
     >
       <SplatRenderer />
@@ -77,7 +78,8 @@ export const SplatObject = React.forwardRef<
   const name = React.useMemo(() => uuidv4(), [buffer]);
 
   React.useEffect(() => {
-    setBuffer(name, buffer);
+    // Compressed splats start empty, and are filled in as chunks arrive.
+    if (buffer.length > 0) setBuffer(name, buffer);
     return () => {
       removeBuffer(name);
       delete nodeRefFromId.current[name];
@@ -299,6 +301,52 @@ function SplatRendererImpl() {
   );
   splatContext.updateCamera.current = updateCamera;
 
+  // Copy updated rows into the texture, without rebuilding the renderer.
+  // Sorting only needs to be updated if centers changed.
+  const patchSplats = React.useCallback(
+    function patchSplats(
+      buffer: ArrayBufferLike,
+      rows: Uint32Array,
+      centersChanged: boolean,
+    ) {
+      let offset = 0;
+      for (const groupBuffer of Object.values(groupBufferFromId)) {
+        if (groupBuffer.buffer !== buffer) {
+          offset += groupBuffer.length;
+          continue;
+        }
+        const textureData = meshProps.textureBuffer.image.data as Uint32Array;
+        for (const row of rows) {
+          if (row * 8 >= groupBuffer.length) continue;
+          for (let word = 0; word < 8; word++) {
+            // Word 3 contains the group index.
+            if (word === 3) continue;
+            const value = groupBuffer[row * 8 + word];
+            textureData[offset + row * 8 + word] = value;
+            merged.gaussianBuffer[offset + row * 8 + word] = value;
+          }
+        }
+        meshProps.textureBuffer.needsUpdate = true;
+        if (centersChanged) {
+          postToWorker({
+            setBuffer: merged.gaussianBuffer,
+            setGroupIndices: merged.groupIndices,
+          });
+          postToWorker({ setTz_camera_groups: Tz_camera_groups });
+          (async () => {
+            SorterRef.current = new (await MakeSorterModulePromise()).Sorter(
+              merged.gaussianBuffer,
+              merged.groupIndices,
+            );
+          })();
+        }
+        return;
+      }
+    },
+    [meshProps],
+  );
+  splatContext.patchSplats.current = patchSplats;
+
   useFrame((state, delta) => {
     const mesh = meshRef.current;
     if (
@@ -285,4 +285,14 @@ export const GaussianSplatsContext = React.createContext<{
   meshPropsRef: React.MutableRefObject<ReturnType<
     typeof useGaussianMeshProps
   > | null>;
+  // Copy rows of a splat object's buffer to the renderer, after they're
+  // updated in place. `buffer` is the underlying buffer of the object's array.
+  patchSplats: React.MutableRefObject<
+    | null
+    | ((
+        buffer: ArrayBufferLike,
+        rows: Uint32Array,
+        centersChanged: boolean,
+      ) => void)
+  >;
 } | null>(null);
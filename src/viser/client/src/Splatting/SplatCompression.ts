@@ -0,0 +1,92 @@
+/** Decoding for compressed Gaussian splats, which are streamed in chunks by
+ * `GaussianSplatsChunkMessage`. Encoding is implemented in
+ * `viser/_splat_compression.py`. */
+
+import * as THREE from "three";
+
+const SPLATS_PER_BLOCK = 256;
+
+/** Unpack three quantized values from a uint32, with 11, 10, and 11 bits. */
+function unpack111011(
+  packed: number,
+  bounds: Float32Array,
+  lowerIndex: number,
+  upperIndex: number,
+  out: number[],
+) {
+  const normalized = [
+    (packed >>> 21) / 2047.0,
+    ((packed >>> 11) & 1023) / 1023.0,
+    (packed & 2047) / 2047.0,
+  ];
+  for (let i = 0; i < 3; i++) {
+    const lower = bounds[lowerIndex + i];
+    out[i] = lower + normalized[i] * (bounds[upperIndex + i] - lower);
+  }
+}
+
+/** Decode a chunk of compressed splats into `out`, starting at splat
+ * `offset`. `out` uses the uncompressed layout, with 8 uint32s per splat:
+ * float32 centers, a reserved word, float16 upper-triangular covariance
+ * terms, and RGBA. */
+export function decodeSplatChunk(
+  bounds: Float32Array,
+  packed: Uint32Array,
+  out: Uint32Array,
+  offset: number,
+) {
+  const outFloat = new Float32Array(out.buffer, out.byteOffset, out.length);
+  const center = [0, 0, 0];
+  const logScale = [0, 0, 0];
+  const wxyz = [0, 0, 0, 0];
+  const numSplats = packed.length / 4;
+  for (let i = 0; i < numSplats; i++) {
+    const block = Math.floor(i / SPLATS_PER_BLOCK) * 12;
+    unpack111011(packed[i * 4], bounds, block, block + 3, center);
+    unpack111011(packed[i * 4 + 2], bounds, block + 6, block + 9, logScale);
+
+    // Rotations are stored as the index of the largest quaternion term,
+    // followed by the other three terms.
+    const rotation = packed[i * 4 + 1];
+    const largest = rotation >>> 30;
+    let sumSquares = 0.0;
+    for (let j = 0, k = 0; j < 4; j++) {
+      if (j === largest) continue;
+      const term =
+        (((rotation >>> (20 - 10 * k)) & 1023) / 1023.0 - 0.5) * Math.SQRT2;
+      wxyz[j] = term;
+      sumSquares += term * term;
+      k++;
+    }
+    wxyz[largest] = Math.sqrt(Math.max(1.0 - sumSquares, 0.0));
+    const [w, x, y, z] = wxyz;
+    const R = [
+      [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+      [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+      [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)],
+    ];
+
+    // Covariance is R @ diag(scale ** 2) @ R.T.
+    const variance = logScale.map((s) => Math.exp(2.0 * s));
+    const cov = (a: number, b: number) =>
+      R[a][0] * R[b][0] * variance[0] +
+      R[a][1] * R[b][1] * variance[1] +
+      R[a][2] * R[b][2] * variance[2];
+
+    const outIndex = (offset + i) * 8;
+    outFloat[outIndex] = center[0];
+    outFloat[outIndex + 1] = center[1];
+    outFloat[outIndex + 2] = center[2];
+    out[outIndex + 3] = 0;
+    out[outIndex + 4] =
+      THREE.DataUtils.toHalfFloat(cov(0, 0)) |
+      (THREE.DataUtils.toHalfFloat(cov(0, 1)) << 16);
+    out[outIndex + 5] =
+      THREE.DataUtils.toHalfFloat(cov(0, 2)) |
+      (THREE.DataUtils.toHalfFloat(cov(1, 1)) << 16);
+    out[outIndex + 6] =
+      THREE.DataUtils.toHalfFloat(cov(1, 2)) |
+      (THREE.DataUtils.toHalfFloat(cov(2, 2)) << 16);
+    out[outIndex + 7] = packed[i * 4 + 3];
+  }
+}
@@ -3,6 +3,7 @@ import { useFrame, useThree } from "@react-three/fiber";
 import { OutlinesIfHovered } from "./OutlinesIfHovered";
 import React from "react";
 import { HoverableContext } from "./HoverContext";
+import { ViewerContext } from "./ViewerContext";
 import * as THREE from "three";
 import {
   CameraFrustumMessage,
@@ -11,6 +12,7 @@ import {
 } from "./WebsocketMessages";
 import { BatchedMeshHoverOutlines } from "./mesh/BatchedMeshHoverOutlines";
 import { rgbToInt } from "./mesh/MeshUtils";
+import { createColormapTexture } from "./ColormapUtils";
 import { MeshBasicMaterial } from "three";
 
 const originGeom = new THREE.SphereGeometry(1.0);
@@ -20,6 +22,11 @@ const PointCloudMaterial = /* @__PURE__ */ shaderMaterial(
     scale: 1.0,
     point_ball_norm: 0.0,
     uniformColor: new THREE.Color(1, 1, 1),
+    quantizationOffset: new THREE.Vector3(0, 0, 0),
+    quantizationScale: new THREE.Vector3(1, 1, 1),
+    colormap: null as THREE.Texture | null,
+    colormapSize: 1.0,
+    scalarRange: new THREE.Vector2(0, 1),
   },
   `
   precision mediump float;
@@ -28,15 +35,31 @@ const PointCloudMaterial = /* @__PURE__ */ shaderMaterial(
   varying vec3 vColor; // in the vertex shader
   uniform float scale;
   uniform vec3 uniformColor;
+  uniform vec3 quantizationOffset;
+  uniform vec3 quantizationScale;
+
+  #ifdef USE_SCALARS
+  attribute float scalar;
+  uniform sampler2D colormap;
+  uniform float colormapSize;
+  uniform vec2 scalarRange;
+  #endif
 
   void main() {
-      vPosition = position;
-      #ifdef USE_COLOR
+      // Decode quantized positions. This is the identity for float positions.
+      vPosition = quantizationOffset + position * quantizationScale;
+      #ifdef USE_SCALARS
+      // Look up the scalar's color, sampling at texel centers.
+      float t = clamp(
+          (scalar - scalarRange.x) / (scalarRange.y - scalarRange.x), 0.0, 1.0);
+      float u = (t * (colormapSize - 1.0) + 0.5) / colormapSize;
+      vColor = texture2D(colormap, vec2(u, 0.5)).rgb;
+      #elif defined(USE_COLOR)
       vColor = color;
       #else
       vColor = uniformColor;
       #endif
-      vec4 world_pos = modelViewMatrix * vec4(position, 1.0);
+      vec4 world_pos = modelViewMatrix * vec4(vPosition, 1.0);
       gl_Position = projectionMatrix * world_pos;
       gl_PointSize = (scale / -world_pos.z);
   }
@@ -63,21 +86,53 @@ export const PointCloud = React.forwardRef<
   PointCloudMessage & { children?: React.ReactNode }
 >(function PointCloud({ children, ...message }, ref) {
   const getThreeState = useThree((state) => state.get);
+  const viewerMutable = React.useContext(ViewerContext)!.mutable.current;
 
   const props = message.props;
 
+  // Point clouds with `max_points` set are drawn from preallocated buffers,
+  // which appended points are written into. These are reallocated when the
+  // points, colors, or scalars props change.
+  const buffers = React.useMemo(
+    () => viewerMutable.pointCloudBuffers[message.name],
+    [
+      message.name,
+      props.points,
+      props.colors,
+      props.scalars,
+      props.max_points,
+    ],
+  );
+
   // Create geometry using useMemo for better performance.
   const geometry = React.useMemo(() => {
     const geometry = new THREE.BufferGeometry();
+    const points = buffers?.points ?? props.points;
+    const colors = buffers?.colors ?? props.colors;
+    const scalars = buffers?.scalars ?? props.scalars;
 
-    if (message.props.precision === "float16") {
+    if (message.props.precision === "quantized") {
+      // Quantized points are decoded in the vertex shader.
+      geometry.setAttribute(
+        "position",
+        new THREE.Uint16BufferAttribute(
+          new Uint16Array(
+            points.buffer.slice(
+              points.byteOffset,
+              points.byteOffset + points.byteLength,
+            ),
+          ),
+          3,
+        ),
+      );
+    } else if (message.props.precision === "float16") {
       geometry.setAttribute(
         "position",
         new THREE.Float16BufferAttribute(
           new Uint16Array(
-            props.points.buffer.slice(
-              props.points.byteOffset,
-              props.points.byteOffset + props.points.byteLength,
+            points.buffer.slice(
+              points.byteOffset,
+              points.byteOffset + points.byteLength,
             ),
           ),
           3,
@@ -88,9 +143,9 @@ export const PointCloud = React.forwardRef<
         "position",
         new THREE.Float32BufferAttribute(
           new Float32Array(
-            props.points.buffer.slice(
-              props.points.byteOffset,
-              props.points.byteOffset + props.points.byteLength,
+            points.buffer.slice(
+              points.byteOffset,
+              points.byteOffset + points.byteLength,
             ),
           ),
           3,
@@ -99,23 +154,77 @@ export const PointCloud = React.forwardRef<
     }
 
     // Add color attribute if needed.
-    if (props.colors.length > 3) {
+    if (colors.length > 3) {
       geometry.setAttribute(
         "color",
-        new THREE.BufferAttribute(new Uint8Array(props.colors), 3, true),
+        new THREE.BufferAttribute(new Uint8Array(colors), 3, true),
       );
-    } else if (props.colors.length < 3) {
-      console.error(`Invalid color buffer length, got ${props.colors.length}`);
+    } else if (colors.length < 3) {
+      console.error(`Invalid color buffer length, got ${colors.length}`);
     }
 
+    // Add scalar attribute if needed. Scalars are mapped to colors in the
+    // vertex shader.
+    if (scalars !== null) {
+      const bytes = scalars.buffer.slice(
+        scalars.byteOffset,
+        scalars.byteOffset + scalars.byteLength,
+      );
+      geometry.setAttribute(
+        "scalar",
+        {
+          uint8: () => new THREE.Uint8BufferAttribute(new Uint8Array(bytes), 1),
+          uint16: () =>
+            new THREE.Uint16BufferAttribute(new Uint16Array(bytes), 1),
+          float16: () =>
+            new THREE.Float16BufferAttribute(new Uint16Array(bytes), 1),
+          float32: () =>
+            new THREE.Float32BufferAttribute(new Float32Array(bytes), 1),
+        }[props.scalars_dtype](),
+      );
+    }
+
+    if (buffers !== undefined) {
+      // Write appended points directly into the attribute arrays.
+      const position = geometry.attributes.position.array;
+      buffers.points = new Uint8Array(
+        position.buffer,
+        position.byteOffset,
+        position.byteLength,
+      );
+      if (buffers.colors !== null) {
+        buffers.colors = geometry.attributes.color.array as Uint8Array;
+      }
+      if (buffers.scalars !== null) {
+        const scalar = geometry.attributes.scalar.array;
+        buffers.scalars = new Uint8Array(
+          scalar.buffer,
+          scalar.byteOffset,
+          scalar.byteLength,
+        );
+      }
+      buffers.dirtyRanges = [];
+      geometry.setDrawRange(0, buffers.count);
+    }
     return geometry;
-  }, [props.points, props.colors]);
+  }, [
+    buffers,
+    props.points,
+    props.colors,
+    props.scalars,
+    props.scalars_dtype,
+  ]);
 
   // Create material using useMemo for better performance.
+  const hasScalars = props.scalars !== null;
   const material = React.useMemo(() => {
     const material = new PointCloudMaterial();
+    const colors = buffers?.colors ?? props.colors;
 
-    if (props.colors.length > 3) {
+    if (hasScalars) {
+      material.defines = { USE_SCALARS: "" };
+      material.vertexColors = false;
+    } else if (colors.length > 3) {
       material.vertexColors = true;
     } else {
       material.vertexColors = false;
@@ -127,7 +236,7 @@ export const PointCloud = React.forwardRef<
     }
 
     return material;
-  }, [props.colors]);
+  }, [buffers, props.colors, hasScalars]);
 
   // Clean up resources when component unmounts.
   React.useEffect(() => {
@@ -149,8 +258,56 @@ export const PointCloud = React.forwardRef<
     }[props.point_shape];
   }, [props.point_shape, material]);
 
+  // Update the offset and scale for decoding quantized points. Uniform values
+  // are replaced instead of modified, since they're shared between materials.
+  React.useEffect(() => {
+    const quantization =
+      props.precision === "quantized" ? props.quantization : null;
+    material.uniforms.quantizationOffset.value = new THREE.Vector3().fromArray(
+      quantization?.[0] ?? [0, 0, 0],
+    );
+    material.uniforms.quantizationScale.value = new THREE.Vector3().fromArray(
+      quantization?.[1] ?? [1, 1, 1],
+    );
+  }, [props.precision, props.quantization, material]);
+
+  // Update the colormap for scalars.
+  const colormap = React.useMemo(
+    () => createColormapTexture(props.colormap, props.colormap_lut),
+    [props.colormap, props.colormap_lut],
+  );
+  React.useEffect(() => {
+    material.uniforms.colormap.value = colormap;
+    material.uniforms.colormapSize.value = colormap.image.width;
+    material.uniforms.scalarRange.value = new THREE.Vector2(
+      props.scalar_range[0],
+      props.scalar_range[1],
+    );
+  }, [colormap, props.scalar_range, material]);
+  React.useEffect(() => {
+    return () => colormap.dispose();
+  }, [colormap]);
+
   const rendererSize = new THREE.Vector2();
   useFrame(() => {
+    // Upload appended points.
+    if (buffers !== undefined && buffers.dirtyRanges.length > 0) {
+      const attributes = Object.values(
+        geometry.attributes,
+      ) as THREE.BufferAttribute[];
+      for (const attribute of attributes) {
+        for (const [start, count] of buffers.dirtyRanges) {
+          attribute.addUpdateRange(
+            start * attribute.itemSize,
+            count * attribute.itemSize,
+          );
+        }
+        attribute.needsUpdate = true;
+      }
+      geometry.setDrawRange(0, buffers.count);
+      buffers.dirtyRanges = [];
+    }
+
     // Match point scale to behavior of THREE.PointsMaterial().
     // point px height / actual height = point meters height / frustum meters height
     // frustum meters height = math.tan(fov / 2.0) * z
@@ -55,6 +55,33 @@ export type ViewerMutable = {
     };
   };
 
+  // Preallocated buffers for point clouds with `max_points` set. Appended
+  // points are written into these, and uploaded to the GPU by the point cloud.
+  pointCloudBuffers: {
+    [name: string]: {
+      points: Uint8Array; // max_points * 3 coordinates, as float16 or float32.
+      colors: Uint8Array | null; // max_points * 3, or null for a single color.
+      scalars: Uint8Array | null; // max_points scalars, or null if unset.
+      bytesPerPoint: number;
+      bytesPerScalar: number;
+      count: number;
+      dirtyRanges: [number, number][]; // Written rows, as [start, count].
+    };
+  };
+
+  // Buffers for Gaussian splats. Streamed chunks, in-place updates, and
+  // appended splats are written into these.
+  splatBuffers: {
+    [name: string]: {
+      buffer: Uint32Array; // numGaussians * 8 or more, uncompressed layout.
+      numGaussians: number;
+      numLoaded: number; // Number of splats decoded from streamed chunks.
+      loadedEnd: number; // One past the last splat decoded from chunks.
+      loadedChunks: Set<number>; // Indices of chunks that have been decoded.
+      numShown: number; // Number of splats passed to the renderer.
+    };
+  };
+
   // Global hover state tracking.
   hoveredElementsCount: number;
 };
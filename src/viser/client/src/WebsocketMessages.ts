@@ -123,9 +123,25 @@ export interface PointCloudMessage {
   props: {
     points: Uint8Array;
     colors: Uint8Array;
+    scalars: Uint8Array | null;
+    scalars_dtype: "uint8" | "uint16" | "float16" | "float32";
+    colormap:
+      | "viridis"
+      | "plasma"
+      | "inferno"
+      | "magma"
+      | "turbo"
+      | "gray"
+      | "tab10";
+    colormap_lut: Uint8Array | null;
+    scalar_range: [number, number];
     point_size: number;
     point_shape: "square" | "diamond" | "circle" | "rounded" | "sparkle";
-    precision: "float16" | "float32";
+    precision: "float16" | "float32" | "quantized";
+    quantization:
+      | [[number, number, number], [number, number, number]]
+      | null;
+    max_points: number | null;
   };
 }
 /** Directional light message.
@@ -220,6 +236,9 @@ export interface MeshMessage {
   name: string;
   props: {
     vertices: Uint8Array;
+    vertices_quantization:
+      | [[number, number, number], [number, number, number]]
+      | null;
     faces: Uint8Array;
     color: [number, number, number];
     wireframe: boolean;
@@ -279,6 +298,9 @@ export interface SkinnedMeshMessage {
   name: string;
   props: {
     vertices: Uint8Array;
+    vertices_quantization:
+      | [[number, number, number], [number, number, number]]
+      | null;
     faces: Uint8Array;
     color: [number, number, number];
     wireframe: boolean;
@@ -307,6 +329,9 @@ export interface BatchedMeshesMessage {
     batched_scales: Uint8Array | null;
     lod: "auto" | "off" | [number, number][];
     vertices: Uint8Array;
+    vertices_quantization:
+      | [[number, number, number], [number, number, number]]
+      | null;
     faces: Uint8Array;
     color: [number, number, number];
     wireframe: boolean;
@@ -1056,6 +1081,19 @@ export interface SetPositionMessage {
   name: string;
   position: [number, number, number];
 }
+/** Server -> client message to set the orientations and positions of many
+ * scene nodes at once.
+ *
+ * As with all other messages, transforms take the `T_parent_local` convention.
+ *
+ * (automatically generated)
+ */
+export interface SetPosesMessage {
+  type: "SetPosesMessage";
+  names: string[];
+  wxyzs: Uint8Array;
+  positions: Uint8Array;
+}
 /** Client -> server message when a transform control is updated.
  *
  * As with all other messages, transforms take the `T_parent_local` convention.
@@ -1167,6 +1205,32 @@ export interface SceneNodeUpdateMessage {
   name: string;
   updates: { [key: string]: any };
 }
+/** Sent server->client to update some rows of an array property of a scene
+ * node in place. Rows are indexed along the first axis of the array.
+ *
+ * (automatically generated)
+ */
+export interface SceneNodeArrayPatchMessage {
+  type: "SceneNodeArrayPatchMessage";
+  name: string;
+  prop_name: string;
+  indices: Uint8Array;
+  values: Uint8Array;
+}
+/** Sent server->client to write points into a point cloud that has
+ * `max_points` set. Points are written starting at row `offset`, and the
+ * point cloud grows if they go past its current end.
+ *
+ * (automatically generated)
+ */
+export interface PointCloudAppendMessage {
+  type: "PointCloudAppendMessage";
+  name: string;
+  offset: number;
+  points: Uint8Array;
+  colors: Uint8Array | null;
+  scalars: Uint8Array | null;
+}
 /** Message from server->client to configure parts of the GUI.
  *
  * (automatically generated)
@@ -1208,6 +1272,52 @@ export interface ThemeConfigurationMessage {
       ]
     | null;
 }
+/** Sent server->client to stream a chunk of compressed Gaussian splats.
+ * Chunks are decoded into rows `offset` to `offset + N` of the buffer, and
+ * clients start drawing splats before every chunk has arrived. Splats in
+ * each chunk are spatially coherent, and share quantization bounds in
+ * blocks of 256.
+ *
+ * (automatically generated)
+ */
+export interface GaussianSplatsChunkMessage {
+  type: "GaussianSplatsChunkMessage";
+  name: string;
+  chunk_index: number;
+  offset: number;
+  num_gaussians: number;
+  bounds: Uint8Array;
+  packed: Uint8Array;
+}
+/** Sent server->client to write some words of some rows of a Gaussian
+ * splat buffer, in place. For example, updating colors only sends the RGBA
+ * word of each updated splat. Splats grow if rows go past the current end.
+ *
+ * For compressed splats, updates are uncompressed rows of one chunk, which
+ * are written over the decoded chunk.
+ *
+ * (automatically generated)
+ */
+export interface GaussianSplatsUpdateMessage {
+  type: "GaussianSplatsUpdateMessage";
+  name: string;
+  num_gaussians: number;
+  start: number;
+  indices: Uint8Array | null;
+  word_range: [number, number];
+  values: Uint8Array;
+  chunk_index: number | null;
+}
+/** Sent server->client to remove some rows of a Gaussian splat buffer.
+ * Remaining splats keep their order.
+ *
+ * (automatically generated)
+ */
+export interface GaussianSplatsPruneMessage {
+  type: "GaussianSplatsPruneMessage";
+  name: string;
+  mask: Uint8Array;
+}
 /** Message from server->client requesting a render from a specified camera
  * pose.
  *
@@ -1383,6 +1493,7 @@ export type Message =
   | SetCameraFovMessage
   | SetOrientationMessage
   | SetPositionMessage
+  | SetPosesMessage
   | TransformControlsUpdateMessage
   | TransformControlsDragStartMessage
   | TransformControlsDragEndMessage
@@ -1395,7 +1506,12 @@ export type Message =
   | GuiCloseModalMessage
   | GuiUpdateMessage
   | SceneNodeUpdateMessage
+  | SceneNodeArrayPatchMessage
+  | PointCloudAppendMessage
   | ThemeConfigurationMessage
+  | GaussianSplatsChunkMessage
+  | GaussianSplatsUpdateMessage
+  | GaussianSplatsPruneMessage
   | GetRenderRequestMessage
   | GetRenderResponseMessage
   | FileTransferStartUpload
@@ -1,6 +1,5 @@
-import { encode, decode } from "@msgpack/msgpack";
+import { encode, decode, ExtensionCodec } from "@msgpack/msgpack";
 import { Message } from "./WebsocketMessages";
-import AwaitLock from "await-lock";
 import { VISER_VERSION } from "./VersionInfo";
 
 export type WsWorkerIncoming =
@@ -18,6 +17,88 @@ export type WsWorkerOutgoing =
     }
   | { type: "message_batch"; messages: Message[] };
 
+/** Frame carrying part of a message that's too large to send at once. Bulk
+ * messages are split into fragments on the server, so they can be interleaved
+ * with higher-priority messages. */
+interface MessageFragment {
+  fragmentId: number;
+  fragmentIndex: number;
+  fragmentCount: number;
+  data: Uint8Array;
+}
+
+/** Reference to a large buffer that the server sends over HTTP, instead of
+ * inline. Assets are content-addressed, so browsers can cache them. */
+class AssetRef {
+  constructor(public readonly hash: string) {}
+}
+
+const ASSET_EXT_CODE = 1;
+const extensionCodec = new ExtensionCodec();
+extensionCodec.register({
+  type: ASSET_EXT_CODE,
+  encode: () => null,
+  decode: (data: Uint8Array) =>
+    new AssetRef(
+      Array.from(data, (byte) => byte.toString(16).padStart(2, "0")).join(""),
+    ),
+});
+
+const ASSET_FETCH_ATTEMPTS = 3;
+
+/** Fetch an asset, retrying with a short delay if the request fails. */
+async function fetchAsset(url: URL): Promise<Uint8Array> {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      const response = await fetch(url);
+      if (!response.ok) {
+        throw new Error(`Failed to fetch ${url}: ${response.status}`);
+      }
+      return new Uint8Array(await response.arrayBuffer());
+    } catch (error) {
+      if (attempt >= ASSET_FETCH_ATTEMPTS) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 250 * attempt));
+    }
+  }
+}
+
+/** Replace asset references in decoded messages with the asset contents.
+ * Assets are fetched in parallel. Rejects if an asset can't be fetched. */
+async function resolveAssets(messages: Message[], server: string) {
+  const refs: [any, string, AssetRef][] = [];
+  const collectRefs = (obj: any) => {
+    for (const key in obj) {
+      const value = obj[key];
+      if (value instanceof AssetRef) {
+        refs.push([obj, key, value]);
+      } else if (
+        value !== null &&
+        typeof value === "object" &&
+        !ArrayBuffer.isView(value)
+      ) {
+        collectRefs(value);
+      }
+    }
+  };
+  collectRefs(messages);
+  if (refs.length === 0) return;
+
+  const baseUrl = server.replace(/^ws/, "http");
+  const assetFromHash = new Map<string, Promise<Uint8Array>>();
+  for (const [, , ref] of refs) {
+    if (assetFromHash.has(ref.hash)) continue;
+    assetFromHash.set(
+      ref.hash,
+      fetchAsset(new URL(`/assets/${ref.hash}`, baseUrl)),
+    );
+  }
+  await Promise.all(
+    refs.map(async ([obj, key, ref]) => {
+      obj[key] = await assetFromHash.get(ref.hash)!;
+    }),
+  );
+}
+
 // Helper function to collect all ArrayBuffer objects. This is used for postMessage() move semantics.
 function collectArrayBuffers(obj: any, buffers: Set<ArrayBufferLike>) {
   if (obj instanceof ArrayBuffer) {
@@ -36,7 +117,32 @@ function collectArrayBuffers(obj: any, buffers: Set<ArrayBufferLike>) {
 {
   let server: string | null = null;
   let ws: WebSocket | null = null;
-  const orderLock = new AwaitLock();
+
+  // Fragments of messages that haven't been fully received yet.
+  let fragmentsFromId = new Map<number, Uint8Array[]>();
+
+  /** Add a fragment. Returns the reassembled message if this was its last
+   * fragment, and an empty list otherwise. */
+  const addFragment = (fragment: MessageFragment): Message[] => {
+    let parts = fragmentsFromId.get(fragment.fragmentId);
+    if (parts === undefined) {
+      parts = [];
+      fragmentsFromId.set(fragment.fragmentId, parts);
+    }
+    parts[fragment.fragmentIndex] = fragment.data;
+    const numReceived = parts.filter((part) => part !== undefined).length;
+    if (numReceived < fragment.fragmentCount) return [];
+
+    fragmentsFromId.delete(fragment.fragmentId);
+    const size = parts.reduce((total, part) => total + part.length, 0);
+    const buffer = new Uint8Array(size);
+    let offset = 0;
+    for (const part of parts) {
+      buffer.set(part, offset);
+      offset += part.length;
+    }
+    return [decode(buffer, { extensionCodec }) as Message];
+  };
 
   const postOutgoing = (
     data: WsWorkerOutgoing,
@@ -53,6 +159,7 @@ function collectArrayBuffers(obj: any, buffers: Set<ArrayBufferLike>) {
     const protocol = `viser-v${VISER_VERSION}`;
     console.log(`Connecting to: ${server!} with protocol: ${protocol}`);
     ws = new WebSocket(server!, [protocol]);
+    fragmentsFromId = new Map();
 
     // Timeout is necessary when we're connecting to an SSH/tunneled port.
     const retryTimeout = setTimeout(() => {
@@ -103,29 +210,55 @@ function collectArrayBuffers(obj: any, buffers: Set<ArrayBufferLike>) {
       }
     };
 
-    ws.onmessage = async (event) => {
-      // Reduce websocket backpressure.
-      const messagePromise = new Promise<Message[]>((resolve) => {
-        (event.data.arrayBuffer() as Promise<ArrayBuffer>).then((buffer) => {
-          resolve(decode(new Uint8Array(buffer)) as Message[]);
-        });
-      });
+    // Frames are handled in a pipeline. Each frame is decoded and its assets
+    // are fetched as soon as it arrives, without holding up other frames, but
+    // batches are delivered in the order that their frames were received.
+    const socket = ws;
+    let assembled: Promise<unknown> = Promise.resolve();
+    let delivered: Promise<void> = Promise.resolve();
+
+    ws.onmessage = (event) => {
+      // Frames are either windows of messages, or message fragments.
+      const framePromise = (async () => {
+        const buffer = await (event.data as Blob).arrayBuffer();
+        return decode(new Uint8Array(buffer), { extensionCodec }) as
+          | Message[]
+          | MessageFragment;
+      })();
 
-      // Try our best to handle messages in order. If this takes more than 1 second, we give up. :)
-      await orderLock.acquireAsync({ timeout: 10000 }).catch(() => {
-        console.log("Order lock timed out.");
-        orderLock.release();
+      // Fragments need to be reassembled in order.
+      const messagesPromise = assembled.then(async () => {
+        const frame = await framePromise;
+        return Array.isArray(frame) ? frame : addFragment(frame);
       });
-      try {
-        const messages = await messagePromise;
+      assembled = messagesPromise.catch(() => undefined);
+      const resolvedPromise = messagesPromise.then(async (messages) => {
+        await resolveAssets(messages, server!);
+        return messages;
+      });
+
+      delivered = delivered.then(async () => {
+        let messages: Message[];
+        try {
+          messages = await resolvedPromise;
+        } catch (error) {
+          // Skipping the batch would leave the scene out of sync with the
+          // server. Reconnecting makes the server send its state again.
+          if (socket.readyState === WebSocket.OPEN) {
+            console.error("Failed to receive messages, reconnecting:", error);
+            socket.close();
+          }
+          return;
+        }
+        // Batches from connections that were closed are stale.
+        if (socket.readyState !== WebSocket.OPEN) return;
+        if (messages.length === 0) return;
         const arrayBuffers = collectArrayBuffers(messages, new Set());
         postOutgoing(
           { type: "message_batch", messages: messages },
           Array.from(arrayBuffers),
         );
-      } finally {
-        orderLock.acquired && orderLock.release();
-      }
+      });
     };
   };
 
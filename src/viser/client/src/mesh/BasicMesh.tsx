@@ -1,6 +1,6 @@
 import React from "react";
 import * as THREE from "three";
-import { createStandardMaterial } from "./MeshUtils";
+import { createPositionAttribute, createStandardMaterial } from "./MeshUtils";
 import { MeshMessage } from "../WebsocketMessages";
 import { OutlinesIfHovered } from "../OutlinesIfHovered";
 
@@ -31,15 +31,9 @@ export const BasicMesh = React.forwardRef<
     const geometry = new THREE.BufferGeometry();
     geometry.setAttribute(
       "position",
-      new THREE.BufferAttribute(
-        new Float32Array(
-          message.props.vertices.buffer.slice(
-            message.props.vertices.byteOffset,
-            message.props.vertices.byteOffset +
-              message.props.vertices.byteLength,
-          ),
-        ),
-        3,
+      createPositionAttribute(
+        message.props.vertices,
+        message.props.vertices_quantization,
       ),
     );
     geometry.setIndex(
@@ -56,7 +50,11 @@ export const BasicMesh = React.forwardRef<
     geometry.computeVertexNormals();
     geometry.computeBoundingSphere();
     return geometry;
-  }, [message.props.vertices.buffer, message.props.faces.buffer]);
+  }, [
+    message.props.vertices.buffer,
+    message.props.vertices_quantization,
+    message.props.faces.buffer,
+  ]);
 
   // Clean up geometry when it changes.
   React.useEffect(() => {
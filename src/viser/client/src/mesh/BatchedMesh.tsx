@@ -1,6 +1,6 @@
 import React, { useMemo } from "react";
 import * as THREE from "three";
-import { createStandardMaterial } from "./MeshUtils";
+import { createPositionAttribute, createStandardMaterial } from "./MeshUtils";
 import { BatchedMeshesMessage } from "../WebsocketMessages";
 import { InstancedMesh2 } from "@three.ez/instanced-mesh";
 import { ViewerContext } from "../ViewerContext";
@@ -51,15 +51,9 @@ export const BatchedMesh = React.forwardRef<
     const geometry = new THREE.BufferGeometry();
     geometry.setAttribute(
       "position",
-      new THREE.BufferAttribute(
-        new Float32Array(
-          message.props.vertices.buffer.slice(
-            message.props.vertices.byteOffset,
-            message.props.vertices.byteOffset +
-              message.props.vertices.byteLength,
-          ),
-        ),
-        3,
+      createPositionAttribute(
+        message.props.vertices,
+        message.props.vertices_quantization,
       ),
     );
     geometry.setIndex(
@@ -76,7 +70,11 @@ export const BatchedMesh = React.forwardRef<
     geometry.computeVertexNormals();
     geometry.computeBoundingSphere();
     return geometry;
-  }, [message.props.vertices.buffer, message.props.faces.buffer]);
+  }, [
+    message.props.vertices.buffer,
+    message.props.vertices_quantization,
+    message.props.faces.buffer,
+  ]);
 
   return (
     <group ref={ref}>
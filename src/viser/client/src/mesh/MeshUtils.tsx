@@ -133,3 +133,27 @@ export function createStandardMaterial(props: {
     return assertUnreachable(props.material);
   }
 }
+
+/**
+ * Create a position attribute from vertices sent by the server. Quantized
+ * vertices are decoded to float32, as `offset + code * scale`.
+ */
+export function createPositionAttribute(
+  vertices: Uint8Array,
+  quantization: [[number, number, number], [number, number, number]] | null,
+): THREE.BufferAttribute {
+  const buffer = vertices.buffer.slice(
+    vertices.byteOffset,
+    vertices.byteOffset + vertices.byteLength,
+  );
+  if (quantization === null) {
+    return new THREE.BufferAttribute(new Float32Array(buffer), 3);
+  }
+  const [offset, scale] = quantization;
+  const codes = new Uint16Array(buffer);
+  const positions = new Float32Array(codes.length);
+  for (let i = 0; i < codes.length; i++) {
+    positions[i] = offset[i % 3] + codes[i] * scale[i % 3];
+  }
+  return new THREE.BufferAttribute(positions, 3);
+}
@@ -1,6 +1,6 @@
 import React from "react";
 import * as THREE from "three";
-import { createStandardMaterial } from "./MeshUtils";
+import { createPositionAttribute, createStandardMaterial } from "./MeshUtils";
 import { SkinnedMeshMessage } from "../WebsocketMessages";
 import { OutlinesIfHovered } from "../OutlinesIfHovered";
 import { ViewerContext } from "../ViewerContext";
@@ -39,15 +39,9 @@ export const SkinnedMesh = React.forwardRef<
     const geometry = new THREE.BufferGeometry();
     geometry.setAttribute(
       "position",
-      new THREE.BufferAttribute(
-        new Float32Array(
-          message.props.vertices.buffer.slice(
-            message.props.vertices.byteOffset,
-            message.props.vertices.byteOffset +
-              message.props.vertices.byteLength,
-          ),
-        ),
-        3,
+      createPositionAttribute(
+        message.props.vertices,
+        message.props.vertices_quantization,
       ),
     );
     geometry.setIndex(
@@ -145,6 +139,7 @@ export const SkinnedMesh = React.forwardRef<
     return { geometry, skeleton };
   }, [
     message.props.vertices.buffer,
+    message.props.vertices_quantization,
     message.props.faces.buffer,
     message.props.skin_indices.buffer,
     message.props.skin_weights?.buffer,
@@ -147,13 +147,19 @@ class ViserUrdf:
     def update_cfg(self, configuration: np.ndarray) -> None:
         """Update the joint angles of the visualized URDF."""
         self._urdf.update_cfg(configuration)
-        for joint, frame_handle in zip(
-            self._urdf.joint_map.values(), self._joint_frames
-        ):
-            assert isinstance(joint, yourdfpy.Joint)
-            T_parent_child = self._urdf.get_transform(joint.child, joint.parent)
-            frame_handle.wxyz = tf.SO3.from_matrix(T_parent_child[:3, :3]).wxyz
-            frame_handle.position = T_parent_child[:3, 3] * self._scale
+        T_parent_child = np.array(
+            [
+                self._urdf.get_transform(joint.child, joint.parent)
+                for joint in self._urdf.joint_map.values()
+            ]
+        ).reshape((-1, 4, 4))
+
+        # Send all joint poses in a single message.
+        self._target.scene.set_poses(
+            [frame_handle.name for frame_handle in self._joint_frames],
+            tf.SO3.from_matrix(T_parent_child[:, :3, :3]).wxyz,
+            T_parent_child[:, :3, 3] * self._scale,
+        )
 
     def get_actuated_joint_limits(
         self,
@@ -11,12 +11,15 @@ These are what `viser` runs on under-the-hood, and generally won't be useful unl
 you're building a web-based application from scratch.
 """
 
+from ._async_message_buffer import ClientWindowStats as ClientWindowStats
 from ._infra import ClientId as ClientId
+from ._infra import StateRecorder as StateRecorder
 from ._infra import StateSerializer as StateSerializer
 from ._infra import WebsockClientConnection as WebsockClientConnection
 from ._infra import WebsockMessageHandler as WebsockMessageHandler
 from ._infra import WebsockServer as WebsockServer
 from ._messages import Message as Message
+from ._prefix_tree import PrefixTree as PrefixTree
 from ._typescript_interface_gen import (
     TypeScriptAnnotationOverride as TypeScriptAnnotationOverride,
 )
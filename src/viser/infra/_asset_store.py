@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import http
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import msgspec
+import numpy as np
+from websockets.datastructures import Headers
+from websockets.http11 import Request, Response
+
+ASSET_EXT_CODE = 1
+"""msgpack extension type for asset references. The payload is the asset's
+hash, as raw bytes."""
+
+_ASSET_PATH_PATTERN = re.compile(r"^/assets/([0-9a-f]{32})$")
+
+
+@dataclasses.dataclass
+class _Asset:
+    data: memoryview
+    refcount: int = 0
+    released_time: Optional[float] = None
+    """Time when the refcount last dropped to zero."""
+
+
+class AssetStore:
+    """Content-addressed store for large binary buffers in outgoing messages.
+
+    Buffers are replaced in encoded messages by references to their hash, and
+    clients fetch them over HTTP from `/assets/<hash>`. Identical buffers are
+    stored once, and browsers can cache them across reconnects.
+
+    Buffers are referenced, not copied. Message buffers acquire the assets
+    that their persisted messages refer to, and release them when the messages
+    are removed. Unreferenced assets are kept for a grace period, so clients
+    can still fetch assets for messages that were sent just before they were
+    culled."""
+
+    def __init__(
+        self, min_size_bytes: int = 1024 * 1024, release_grace_sec: float = 60.0
+    ) -> None:
+        self.min_size_bytes = min_size_bytes
+        self.release_grace_sec = release_grace_sec
+        self._lock = threading.Lock()
+        self._asset_from_hash: Dict[str, _Asset] = {}
+        self._num_bytes = 0
+
+    @property
+    def num_bytes(self) -> int:
+        """Total size of stored assets."""
+        return self._num_bytes
+
+    def offload(self, obj: Any) -> Tuple[Any, Tuple[str, ...]]:
+        """Replace large arrays and bytes in an object with asset references,
+        and add them to the store. Returns the new object, which can be
+        encoded with `encode_msgpack()`, and the hashes that it refers to.
+
+        Dicts and dataclasses are traversed recursively. New assets start
+        unreferenced, so they're dropped after the grace period unless they're
+        acquired."""
+        # Sweep first, so the new assets can be acquired before they expire.
+        self._sweep()
+        hashes: List[str] = []
+        out = self._offload(obj, hashes)
+        return out, tuple(hashes)
+
+    def _offload(self, value: Any, hashes: List[str]) -> Any:
+        if isinstance(value, np.ndarray):
+            if value.nbytes < self.min_size_bytes:
+                return value
+            return self._add(
+                np.ascontiguousarray(value).reshape(-1).view(np.uint8).data, hashes
+            )
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            if len(value) < self.min_size_bytes:
+                return value
+            return self._add(memoryview(value).cast("B"), hashes)
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            fields = vars(value)
+            out = self._offload(fields, hashes)
+            return value if out is fields else out
+        if isinstance(value, dict):
+            out = {k: self._offload(v, hashes) for k, v in value.items()}
+            if all(out[k] is v for k, v in value.items()):
+                return value
+            return out
+        return value
+
+    def _add(self, data: memoryview, hashes: List[str]) -> msgspec.msgpack.Ext:
+        # hashlib releases the GIL for large buffers.
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        asset_hash = digest.hex()
+        with self._lock:
+            if asset_hash not in self._asset_from_hash:
+                self._asset_from_hash[asset_hash] = _Asset(
+                    data, released_time=time.monotonic()
+                )
+                self._num_bytes += len(data)
+        hashes.append(asset_hash)
+        return msgspec.msgpack.Ext(ASSET_EXT_CODE, digest)
+
+    def acquire(self, hashes: Sequence[str]) -> None:
+        """Add a reference to some assets."""
+        with self._lock:
+            for asset_hash in hashes:
+                asset = self._asset_from_hash.get(asset_hash, None)
+                if asset is not None:
+                    asset.refcount += 1
+                    asset.released_time = None
+
+    def release(self, hashes: Sequence[str]) -> None:
+        """Remove a reference to some assets."""
+        now = time.monotonic()
+        with self._lock:
+            for asset_hash in hashes:
+                asset = self._asset_from_hash.get(asset_hash, None)
+                if asset is None:
+                    continue
+                asset.refcount -= 1
+                if asset.refcount == 0:
+                    asset.released_time = now
+
+    def get(self, asset_hash: str) -> Optional[memoryview]:
+        """Get an asset's contents, or None if it isn't in the store."""
+        asset = self._asset_from_hash.get(asset_hash, None)
+        return None if asset is None else asset.data
+
+    def _sweep(self) -> None:
+        """Drop unreferenced assets whose grace period has passed."""
+        cutoff = time.monotonic() - self.release_grace_sec
+        with self._lock:
+            for asset_hash, asset in tuple(self._asset_from_hash.items()):
+                if (
+                    asset.refcount == 0
+                    and asset.released_time is not None
+                    and asset.released_time < cutoff
+                ):
+                    self._asset_from_hash.pop(asset_hash)
+                    self._num_bytes -= len(asset.data)
+
+    def handle(self, request: Request) -> Optional[Response]:
+        """Serve an asset over HTTP. Returns None if the request isn't for an
+        asset."""
+        match = _ASSET_PATH_PATTERN.match(request.path.partition("?")[0])
+        if match is None:
+            return None
+        self._sweep()
+        asset_hash = match.group(1)
+        data = self.get(asset_hash)
+        if data is None:
+            return Response(http.HTTPStatus.NOT_FOUND, "NOT FOUND", Headers())
+
+        # Assets are content-addressed, so they never change.
+        headers = [
+            ("Cache-Control", "public, max-age=31536000, immutable"),
+            ("ETag", f'"{asset_hash}"'),
+            ("Access-Control-Allow-Origin", "*"),
+        ]
+        if asset_hash in request.headers.get("If-None-Match", ""):
+            return Response(
+                http.HTTPStatus.NOT_MODIFIED, "Not Modified", Headers(headers), b""
+            )
+        headers.append(("Content-Type", "application/octet-stream"))
+        headers.append(("Content-Length", str(len(data))))
+        return Response(http.HTTPStatus.OK, "OK", Headers(headers), data)  # type: ignore
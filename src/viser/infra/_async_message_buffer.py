@@ -2,11 +2,103 @@ from __future__ import annotations
 
 import asyncio
 import dataclasses
+import functools
+import itertools
+import os
 import threading
+import time
 from asyncio.events import AbstractEventLoop
-from typing import AsyncGenerator, Callable, Dict, List, Sequence
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    AsyncGenerator,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-from ._messages import Message
+import msgspec
+
+from ._asset_store import AssetStore
+from ._messages import (
+    Message,
+    encode_msgpack,
+    encode_msgpack_spliced,
+    estimate_nbytes,
+    splice_buffers,
+)
+from ._prefix_tree import PrefixTree
+
+
+@dataclasses.dataclass(frozen=True)
+class ClientWindowStats:
+    """Flow-control statistics for one client reading from a message buffer."""
+
+    queue_depth: int
+    """Number of buffered messages that haven't been sent to the client yet."""
+    lag_sec: float
+    """Age of the oldest message that hasn't been sent to the client yet."""
+    send_latency_sec: float
+    """Smoothed time spent encoding, sending, and draining each window."""
+    window_size: int
+    """Current maximum number of messages per window."""
+    window_duration_sec: float
+    """Current delay between windows."""
+
+
+@functools.lru_cache(maxsize=None)
+def _can_compact(message_type: type) -> bool:
+    """Returns True if messages of a given type can be folded into earlier
+    messages, via `Message.compact_into()`."""
+    return message_type.compact_into is not Message.compact_into  # type: ignore
+
+
+_encode_executor: Optional[ThreadPoolExecutor] = None
+_encode_executor_lock = threading.Lock()
+
+
+def _get_encode_executor() -> ThreadPoolExecutor:
+    """Get the thread pool used for encoding large messages. This is shared by
+    all buffers, and created on first use."""
+    global _encode_executor
+    with _encode_executor_lock:
+        if _encode_executor is None:
+            _encode_executor = ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="viser-encode"
+            )
+        return _encode_executor
+
+
+def _pack_window(
+    encoded: Sequence[bytes | memoryview], min_splice_bytes: int
+) -> bytes | memoryview:
+    """Pack message encodings into a msgpack array. A msgpack array is a header
+    followed by its encoded elements, so no re-encoding is needed."""
+    splices: List[Tuple[bytes, bytes, bytes | memoryview]] = []
+    parts: List[msgspec.Raw] = []
+    for message_encoded in encoded:
+        if len(message_encoded) < min_splice_bytes:
+            parts.append(msgspec.Raw(message_encoded))
+        else:
+            token = os.urandom(16)
+            splices.append((token, b"", message_encoded))
+            parts.append(msgspec.Raw(token))
+    skeleton = msgspec.msgpack.encode(tuple(parts))
+    return skeleton if len(splices) == 0 else splice_buffers(skeleton, splices)
+
+
+@dataclasses.dataclass
+class _ClientWindowState:
+    last_sent_id: int
+    window_size: int
+    window_duration_sec: float
+    send_latency_sec: float = 0.0
+    atomic_group_from_id: Dict[int, int] = dataclasses.field(default_factory=dict)
+    """Atomic blocks of the messages in the last window, by message ID."""
 
 
 @dataclasses.dataclass
@@ -29,8 +121,121 @@ class AsyncMessageBuffer:
 
     max_window_size: int = 128
     window_duration_sec: float = 1.0 / 60.0
+
+    adaptive_windowing: bool = True
+    """Adapt window sizes and durations to each client's send latency. Clients
+    that can't keep up get larger, less frequent windows, which gives the
+    redundancy key logic in `push()` more time to cull superseded messages."""
+    max_adaptive_window_size: int = 1024
+    max_adaptive_window_duration_sec: float = 0.5
+
     done: bool = False
     atomic_counter: int = 0
+    _atomic_group: int = 0
+    """ID of the current or most recent atomic block."""
+    _atomic_group_from_id: Dict[int, int] = dataclasses.field(default_factory=dict)
+    """Atomic block that each message was pushed in, for messages that were
+    pushed in one. Messages from the same block are sent together."""
+
+    encode_cache_max_bytes: int = 256 * 1024 * 1024
+    """Byte budget for cached message encodings. Only used for persistent
+    buffers, which are read by more than one client."""
+    _encoded_from_id: OrderedDict[int, bytes | memoryview] = dataclasses.field(
+        default_factory=OrderedDict
+    )
+    _encoded_bytes: int = 0
+
+    asset_store: Optional[AssetStore] = None
+    """Store for large buffers in outgoing messages. If set, encodings refer to
+    assets in the store, which clients fetch over HTTP."""
+    _asset_hashes_from_id: Dict[int, Tuple[str, ...]] = dataclasses.field(
+        default_factory=dict
+    )
+    """Assets referenced by each persisted message."""
+
+    max_message_bytes: Optional[int] = None
+    """Byte budget for persisted messages, estimated from the sizes of their
+    arrays and bytes. Pushing a message that would exceed it calls `evict_fn`,
+    then raises a `RuntimeError` if the buffer is still over budget. Removal
+    messages are always accepted."""
+    evict_fn: Optional[Callable[[int], None]] = None
+    """Called with a number of bytes to free when the message budget would be
+    exceeded. This runs without `buffer_lock`, so it can push messages, for
+    example to remove objects."""
+    _message_bytes: int = 0
+    _nbytes_from_id: Dict[int, int] = dataclasses.field(default_factory=dict)
+    """Estimated size of each persisted message."""
+    _evicting: bool = False
+
+    fragment_size_bytes: int = 512 * 1024
+    """Maximum size of each websocket frame for bulk messages. Larger messages
+    are split into fragments, which are interleaved with other messages and
+    reassembled by the client."""
+
+    encode_in_thread_min_bytes: int = 1024 * 1024
+    """Messages that are estimated to be larger than this are encoded in a
+    worker thread, so they don't stall the event loop. Smaller messages are
+    encoded inline, which has lower latency."""
+    _encode_future_from_id: Dict[int, asyncio.Future[bytes | memoryview]] = (
+        dataclasses.field(default_factory=dict)
+    )
+    """Encodings that are in progress in the worker thread. Clients that need
+    the same message share the same future."""
+
+    _push_time_from_id: Dict[int, float] = dataclasses.field(default_factory=dict)
+    _keys_from_id: Dict[int, Tuple[Optional[str], Optional[Tuple[str, ...]]]] = (
+        dataclasses.field(default_factory=dict)
+    )
+    """Redundancy and dependency keys of each buffered message."""
+    _ids_from_dependency_key: PrefixTree[int] = dataclasses.field(
+        default_factory=PrefixTree
+    )
+    """Index from dependency keys (scene node names, GUI element uuids) to the
+    IDs of buffered messages that belong to them."""
+    _removal_ids: Deque[int] = dataclasses.field(default_factory=deque)
+    """IDs of persisted removal messages. These need to be sent to clients that
+    are already connected, but not to new ones."""
+    _compaction_ids: Deque[int] = dataclasses.field(default_factory=deque)
+    """IDs of persisted messages that may be folded into earlier messages for
+    the same object, once they've been sent to every connected client."""
+    _window_state_from_client_id: Dict[int, _ClientWindowState] = dataclasses.field(
+        default_factory=dict
+    )
+    _wakeup_pending: bool = False
+
+    @property
+    def message_bytes(self) -> int:
+        """Estimated total size of persisted messages."""
+        return self._message_bytes
+
+    def _remove_message(self, message_id: int) -> Message:
+        """Remove a message from the buffer. Should be called with
+        `buffer_lock` held."""
+        message = self.message_from_id.pop(message_id)
+        self._push_time_from_id.pop(message_id, None)
+        redundancy_key, dependency_key = self._keys_from_id.pop(message_id)
+        if (
+            redundancy_key is not None
+            and self.id_from_redundancy_key.get(redundancy_key, None) == message_id
+        ):
+            self.id_from_redundancy_key.pop(redundancy_key)
+        if dependency_key is not None:
+            self._ids_from_dependency_key.discard(dependency_key, message_id)
+        self._message_bytes -= self._nbytes_from_id.pop(message_id, 0)
+        self._atomic_group_from_id.pop(message_id, None)
+        self._drop_encoding(message_id)
+        return message
+
+    def _drop_encoding(self, message_id: int) -> None:
+        """Drop the cached encoding of a message, and release the assets that
+        it refers to. Should be called with `buffer_lock` held."""
+        encoded = self._encoded_from_id.pop(message_id, None)
+        if encoded is not None:
+            self._encoded_bytes -= len(encoded)
+        hashes = self._asset_hashes_from_id.pop(message_id, None)
+        if hashes is not None:
+            assert self.asset_store is not None
+            self.asset_store.release(hashes)
 
     def remove_from_buffer(self, match_fn: Callable[[Message], bool]) -> None:
         """Remove messages that match some condition."""
@@ -41,56 +246,330 @@ class AsyncMessageBuffer:
                 lambda kv_pair: match_fn(self.message_from_id[kv_pair[0]]),
                 tuple(self.message_from_id.items()),
             ):
-                self.message_from_id.pop(id)
-                self.id_from_redundancy_key.pop(message.redundancy_key())
+                self._remove_message(id)
+
+    def encode_message(
+        self,
+        message_id: int,
+        message: Message,
+        in_worker_thread: bool = False,
+        use_asset_store: bool = True,
+    ) -> bytes | memoryview:
+        """Get the msgpack encoding of a message from this buffer.
+
+        For persistent buffers, encodings are cached by message ID. Each
+        message is encoded once, and the bytes are shared by the windows of
+        every connected client.
+
+        If `in_worker_thread` is set, large arrays are copied without holding
+        the GIL, and the encoding is returned as a memoryview.
+
+        If the buffer has an asset store, large buffers are replaced with
+        asset references. Set `use_asset_store=False` to get a self-contained
+        encoding instead, for example for saving to a file."""
+        if self.asset_store is not None and not use_asset_store:
+            # Cached encodings refer to assets, so we can't use them.
+            return message.serialize()
+
+        if self.persistent_messages:
+            encoded = self._encoded_from_id.get(message_id, None)
+            if encoded is not None:
+                return encoded
+
+        # Encode outside of the lock; this can be slow for large messages.
+        obj = message.as_serializable_dict()
+        hashes: Tuple[str, ...] = ()
+        if self.asset_store is not None:
+            obj, hashes = self.asset_store.offload(obj)
+        encoded = (
+            encode_msgpack_spliced(obj, self.encode_in_thread_min_bytes)
+            if in_worker_thread
+            else encode_msgpack(obj)
+        )
+        if not self.persistent_messages:
+            # The message has already been removed from the buffer. Its
+            # assets are kept for the asset store's grace period, which gives
+            # the client time to fetch them.
+            return encoded
+
+        with self.buffer_lock:
+            # Don't cache messages that were culled while we were encoding.
+            if self.message_from_id.get(message_id, None) is not message:
+                return encoded
+
+            # Persisted messages hold a reference to their assets, until
+            # they're removed from the buffer.
+            if len(hashes) > 0 and message_id not in self._asset_hashes_from_id:
+                assert self.asset_store is not None
+                self.asset_store.acquire(hashes)
+                self._asset_hashes_from_id[message_id] = hashes
+
+            if len(encoded) > self.encode_cache_max_bytes:
+                return encoded
+            if message_id not in self._encoded_from_id:
+                self._encoded_from_id[message_id] = encoded
+                self._encoded_bytes += len(encoded)
+
+            # Evict least recently added encodings if we're over budget.
+            while self._encoded_bytes > self.encode_cache_max_bytes:
+                _, evicted = self._encoded_from_id.popitem(last=False)
+                self._encoded_bytes -= len(evicted)
+        return encoded
+
+    async def encode_window(
+        self, window: Sequence[Tuple[int, Message]]
+    ) -> List[bytes | memoryview]:
+        """Get the msgpack encodings of a window of messages, in order.
+
+        Large messages are encoded in a worker thread while the event loop
+        keeps serving other clients. Must be called from the event loop."""
+        encoded: List[bytes | memoryview | asyncio.Future[bytes | memoryview]] = []
+        for message_id, message in window:
+            cached = self._encoded_from_id.get(message_id, None)
+            if cached is not None:
+                encoded.append(cached)
+            elif estimate_nbytes(message) < self.encode_in_thread_min_bytes:
+                encoded.append(self.encode_message(message_id, message))
+            else:
+                future = self._encode_future_from_id.get(message_id, None)
+                if future is None:
+                    future = self.event_loop.run_in_executor(
+                        _get_encode_executor(),
+                        self.encode_message,
+                        message_id,
+                        message,
+                        True,
+                    )
+                    self._encode_future_from_id[message_id] = future
+                    future.add_done_callback(
+                        lambda _, message_id=message_id: (
+                            self._encode_future_from_id.pop(message_id, None)
+                        )
+                    )
+                encoded.append(future)
+
+        out: List[bytes | memoryview] = []
+        for item in encoded:
+            # Futures can be shared with other clients, so they shouldn't be
+            # cancelled if this client disconnects.
+            out.append(
+                await asyncio.shield(item) if isinstance(item, asyncio.Future) else item
+            )
+        return out
+
+    async def pack_window(
+        self, encoded: Sequence[bytes | memoryview]
+    ) -> bytes | memoryview:
+        """Pack message encodings into a single msgpack array. Large windows
+        are packed in a worker thread."""
+        if sum(map(len, encoded)) < self.encode_in_thread_min_bytes:
+            return _pack_window(encoded, self.encode_in_thread_min_bytes)
+        return await self.event_loop.run_in_executor(
+            _get_encode_executor(),
+            _pack_window,
+            encoded,
+            self.encode_in_thread_min_bytes,
+        )
 
     def push(self, message: Message) -> None:
         """Push a new message to our buffer, and remove old redundant ones."""
 
         assert isinstance(message, Message)
 
-        # Add message to buffer.
+        # Compute keys outside of the lock, to keep the critical section short
+        # when many threads are pushing.
         redundancy_key = message.redundancy_key()
+        dependency_key = message.dependency_key()
+        removes_dependents = dependency_key is not None and message.removes_dependents()
+        push_time = time.time()
+        nbytes = estimate_nbytes(message) if self.persistent_messages else 0
+        if self.max_message_bytes is not None and not removes_dependents:
+            self._check_budget(nbytes, redundancy_key)
+
+        # Add message to buffer.
         with self.buffer_lock:
             new_message_id = self.message_counter
             self.message_from_id[new_message_id] = message
+            if self.persistent_messages:
+                self._nbytes_from_id[new_message_id] = nbytes
+                self._message_bytes += nbytes
+            self._push_time_from_id[new_message_id] = push_time
+            self._keys_from_id[new_message_id] = (redundancy_key, dependency_key)
+            if self.atomic_counter > 0:
+                self._atomic_group_from_id[new_message_id] = self._atomic_group
             self.message_counter += 1
 
             # If an existing message with the same key already exists in our buffer, we
             # don't need the old one anymore. :-)
-            if (
-                redundancy_key is not None
-                and redundancy_key in self.id_from_redundancy_key
-            ):
-                old_message_id = self.id_from_redundancy_key.pop(redundancy_key)
-                self.message_from_id.pop(old_message_id)
-            self.id_from_redundancy_key[redundancy_key] = new_message_id
-
-            # Pulse message event to notify consumers that a new message is
-            # available.
-            #
-            # We set this both inside and outside of the event loop.
-            #
-            # This call is necessary so we can read the value immedaitely
-            # in synchronous logic.
-            self.message_event.set()
-            if self.atomic_counter == 0:
-                # This call is necessary to make sure that awaiting tasks are
-                # triggered correctly.
-                #
-                # If we're in an atomic block, this will happen when
-                # atomic_end() is called.
-                self.event_loop.call_soon_threadsafe(self.message_event.set)
+            if redundancy_key is not None:
+                if redundancy_key in self.id_from_redundancy_key:
+                    self._remove_message(self.id_from_redundancy_key[redundancy_key])
+                self.id_from_redundancy_key[redundancy_key] = new_message_id
+
+            # Index the message by the object that it belongs to. When that
+            # object is removed, all of its messages and its descendants'
+            # messages can be dropped without scanning the whole buffer.
+            if dependency_key is not None:
+                if removes_dependents:
+                    for id in self._ids_from_dependency_key.pop_subtree(dependency_key):
+                        self._remove_message(id)
+                    if self.persistent_messages:
+                        self._removal_ids.append(new_message_id)
+                else:
+                    self._ids_from_dependency_key.add(dependency_key, new_message_id)
+                    if self.persistent_messages and _can_compact(type(message)):
+                        self._compaction_ids.append(new_message_id)
+            if len(self._removal_ids) > 0 or len(self._compaction_ids) > 0:
+                self._compact()
+
+        # Notify consumers that a new message is available. If we're in an
+        # atomic block, this will happen when atomic_end() is called.
+        if self.atomic_counter == 0:
+            self._notify()
+
+    def _check_budget(self, nbytes: int, redundancy_key: Optional[str]) -> None:
+        """Make room for a new message in the byte budget, or raise a
+        `RuntimeError`. Messages that replace an older one with the same
+        redundancy key only need room for the difference in size."""
+        max_bytes = self.max_message_bytes
+        assert max_bytes is not None
+
+        def get_excess_bytes() -> int:
+            with self.buffer_lock:
+                replaced_id = (
+                    None
+                    if redundancy_key is None
+                    else self.id_from_redundancy_key.get(redundancy_key, None)
+                )
+                replaced_nbytes = (
+                    0 if replaced_id is None else self._nbytes_from_id[replaced_id]
+                )
+                return self._message_bytes + nbytes - replaced_nbytes - max_bytes
+
+        excess_bytes = get_excess_bytes()
+        if excess_bytes <= 0:
+            return
+        if self.evict_fn is not None and not self._evicting:
+            self._evicting = True
+            try:
+                self.evict_fn(excess_bytes)
+            finally:
+                self._evicting = False
+            excess_bytes = get_excess_bytes()
+            if excess_bytes <= 0:
+                return
+        raise RuntimeError(
+            f"Message buffer is over its budget of {max_bytes} bytes;"
+            f" a message of about {nbytes} bytes would exceed it by"
+            f" {excess_bytes} bytes."
+        )
+
+    def get_message_sizes(
+        self,
+    ) -> List[Tuple[int, Message, Optional[Tuple[str, ...]], int]]:
+        """Get the ID, message, dependency key, and estimated size in bytes of
+        each persisted message, in the order that they were pushed. Sizes count
+        arrays and bytes exactly, which dominate the size of large messages."""
+        with self.buffer_lock:
+            return [
+                (
+                    message_id,
+                    message,
+                    self._keys_from_id[message_id][1],
+                    self._nbytes_from_id.get(message_id, 0),
+                )
+                for message_id, message in self.message_from_id.items()
+            ]
+
+    def _notify(self) -> None:
+        """Wake up window generators that are waiting for messages.
+
+        Wakeups are coalesced: at most one is pending at a time, so pushing
+        many messages in a tight loop doesn't flood the event loop with
+        callbacks."""
+        if self._wakeup_pending:
+            return
+        # The flag is set first, because the wakeup can run on the event loop
+        # thread before `call_soon_threadsafe()` returns.
+        self._wakeup_pending = True
+        try:
+            self.event_loop.call_soon_threadsafe(self._wakeup)
+        except BaseException:
+            # For example, the event loop is closed. No wakeup is pending.
+            self._wakeup_pending = False
+            raise
+
+    def _wakeup(self) -> None:
+        # Clear the flag before setting the event: messages pushed after this
+        # point will schedule a new wakeup.
+        self._wakeup_pending = False
+        self.message_event.set()
+
+    def _compact(self) -> None:
+        """Compact the part of the buffer that has already been sent to every
+        client that's reading from it. Only new clients will read these
+        messages, so:
+        - Removal messages can be dropped. New clients never received the
+          removed object.
+        - Updates can be folded into earlier messages for the same object. For
+          example, props updates are folded into the message that created a
+          scene node.
+
+        Should be called with `buffer_lock` held."""
+        min_sent_id = min(
+            (
+                state.last_sent_id
+                for state in tuple(self._window_state_from_client_id.values())
+            ),
+            default=self.message_counter - 1,
+        )
+        while len(self._removal_ids) > 0 and self._removal_ids[0] <= min_sent_id:
+            message_id = self._removal_ids.popleft()
+            # The removal message may already be culled, for example if the
+            # object was re-created with the same name.
+            if message_id in self.message_from_id:
+                self._remove_message(message_id)
+
+        while len(self._compaction_ids) > 0 and self._compaction_ids[0] <= min_sent_id:
+            message_id = self._compaction_ids.popleft()
+            message = self.message_from_id.get(message_id, None)
+            if message is None:
+                continue
+            dependency_key = self._keys_from_id[message_id][1]
+            assert dependency_key is not None
+            base_id = min(self._ids_from_dependency_key.get(dependency_key))
+            if base_id == message_id:
+                continue
+            compacted = message.compact_into(self.message_from_id[base_id])
+            if compacted is None:
+                continue
+
+            # Replacing the base message keeps its position in the buffer.
+            self.message_from_id[base_id] = compacted
+            compacted_nbytes = estimate_nbytes(compacted)
+            self._message_bytes += compacted_nbytes - self._nbytes_from_id[base_id]
+            self._nbytes_from_id[base_id] = compacted_nbytes
+            self._drop_encoding(base_id)
+            self._remove_message(message_id)
 
     def atomic_start(self) -> None:
         """Start an atomic block. No new messages/windows should be sent."""
+        if self.atomic_counter == 0:
+            self._atomic_group += 1
         self.atomic_counter += 1
 
+    def window_atomic_groups(self, client_id: int) -> Dict[int, int]:
+        """Get the atomic blocks that messages in the last window for a client
+        were pushed in, by message ID. Messages that weren't pushed in an
+        atomic block are omitted."""
+        state = self._window_state_from_client_id.get(client_id, None)
+        return {} if state is None else state.atomic_group_from_id
+
     def atomic_end(self) -> None:
         """End an atomic block."""
         self.atomic_counter -= 1
         if self.atomic_counter == 0:
-            self.event_loop.call_soon_threadsafe(self.message_event.set)
+            self._notify()
 
     def flush(self) -> None:
         """Flush the message buffer; signals to yield a message window immediately."""
@@ -106,50 +585,160 @@ class AsyncMessageBuffer:
         # Pulse flush event to skip any windowing delay.
         self.event_loop.call_soon_threadsafe(self.flush_event.set)
 
+    def get_client_stats(self, client_id: int) -> Optional[ClientWindowStats]:
+        """Get flow-control statistics for a client that's reading from this
+        buffer. Returns None if the client isn't currently reading."""
+        state = self._window_state_from_client_id.get(client_id, None)
+        if state is None:
+            return None
+
+        with self.buffer_lock:
+            # Message IDs are increasing, so unsent messages are at the end of
+            # the buffer.
+            unsent_ids = tuple(
+                itertools.takewhile(
+                    lambda id: id > state.last_sent_id, reversed(self.message_from_id)
+                )
+            )
+            lag_sec = (
+                time.time() - self._push_time_from_id[unsent_ids[-1]]
+                if len(unsent_ids) > 0
+                else 0.0
+            )
+        return ClientWindowStats(
+            queue_depth=len(unsent_ids),
+            lag_sec=lag_sec,
+            send_latency_sec=state.send_latency_sec,
+            window_size=state.window_size,
+            window_duration_sec=state.window_duration_sec,
+        )
+
+    def _update_window_state(
+        self, state: _ClientWindowState, send_latency_sec: float
+    ) -> None:
+        """Update a client's window size and duration from a send latency
+        measurement."""
+        state.send_latency_sec = 0.8 * state.send_latency_sec + 0.2 * send_latency_sec
+        if not self.adaptive_windowing:
+            return
+
+        # If sending a window takes longer than the window duration, the
+        # client is falling behind. Back off proportionally.
+        slowdown = state.send_latency_sec / self.window_duration_sec
+        state.window_duration_sec = min(
+            max(self.window_duration_sec, 2.0 * state.send_latency_sec),
+            self.max_adaptive_window_duration_sec,
+        )
+        state.window_size = int(
+            min(
+                max(self.max_window_size, self.max_window_size * slowdown),
+                self.max_adaptive_window_size,
+            )
+        )
+
     async def window_generator(
         self, client_id: int
-    ) -> AsyncGenerator[Sequence[Message], None]:
-        """Async iterator over messages. Loops infinitely, and waits when no messages
-        are available."""
+    ) -> AsyncGenerator[Sequence[Tuple[int, Message]], None]:
+        """Async iterator over windows of (message ID, message) pairs. Loops
+        infinitely, and waits when no messages are available."""
+
+        state = _ClientWindowState(
+            last_sent_id=-1,
+            window_size=self.max_window_size,
+            window_duration_sec=self.window_duration_sec,
+        )
+        self._window_state_from_client_id[client_id] = state
+        try:
+            async for window in self._window_generator(client_id, state):
+                yield window
+        finally:
+            self._window_state_from_client_id.pop(client_id, None)
 
-        last_sent_id = -1
+    async def _window_generator(
+        self, client_id: int, state: _ClientWindowState
+    ) -> AsyncGenerator[Sequence[Tuple[int, Message]], None]:
         flush_wait = self.event_loop.create_task(self.flush_event.wait())
+        first_window = self.persistent_messages
         while not self.done:
-            window: List[Message] = []
+            window: List[Tuple[int, Message]] = []
+            atomic_group_from_id: Dict[int, int] = {}
+            if first_window and self.atomic_counter == 0:
+                # New clients receive everything that's already buffered in a
+                # single bulk window, instead of replaying the buffer one
+                # window at a time. Superseded messages in this part of the
+                # buffer have already been compacted away by `_compact()`.
+                first_window = False
+                with self.buffer_lock:
+                    state.last_sent_id = self.message_counter - 1
+                    window = [
+                        (id, message)
+                        for id, message in self.message_from_id.items()
+                        if message.excluded_self_client != client_id
+                    ]
+                    atomic_group_from_id = dict(self._atomic_group_from_id)
+
             most_recent_message_id = self.message_counter - 1
             while (
-                last_sent_id < most_recent_message_id
-                and len(window) < self.max_window_size
+                state.last_sent_id < most_recent_message_id
+                and (
+                    len(window) < state.window_size
+                    # Atomic blocks aren't split between windows.
+                    or (
+                        self._atomic_group_from_id.get(state.last_sent_id + 1, None)
+                        == atomic_group_from_id.get(state.last_sent_id, -1)
+                    )
+                )
                 # We should only be polling for new messages if we aren't in an atomic block.
                 and self.atomic_counter == 0
             ):
-                last_sent_id += 1
+                # Read the message before advancing `last_sent_id`: removal
+                # messages are dropped as soon as every client has advanced
+                # past them.
+                message_id = state.last_sent_id + 1
+                atomic_group = self._atomic_group_from_id.get(message_id, None)
+                if atomic_group is not None:
+                    atomic_group_from_id[message_id] = atomic_group
                 if self.persistent_messages:
-                    message = self.message_from_id.get(last_sent_id, None)
+                    message = self.message_from_id.get(message_id, None)
                 else:
                     # If we're not persisting messages, remove them from the buffer.
                     with self.buffer_lock:
-                        message = self.message_from_id.pop(last_sent_id, None)
-                        if message is not None:
-                            redundancy_key = message.redundancy_key()
-                            self.id_from_redundancy_key.pop(redundancy_key, None)
+                        message = None
+                        if message_id in self.message_from_id:
+                            message = self._remove_message(message_id)
+                state.last_sent_id = message_id
 
                 if message is not None and message.excluded_self_client != client_id:
-                    window.append(message)
+                    window.append((message_id, message))
+
+            if len(self._removal_ids) > 0 or len(self._compaction_ids) > 0:
+                with self.buffer_lock:
+                    self._compact()
 
             if len(window) > 0:
-                # Yield a window!
+                # Yield a window! The consumer resumes us after the window is
+                # sent, which gives us a measurement of the send latency.
+                state.atomic_group_from_id = atomic_group_from_id
+                send_start = time.time()
                 yield window
+                self._update_window_state(state, time.time() - send_start)
             else:
                 # Wait for a new message to come in.
                 await self.message_event.wait()
                 self.message_event.clear()
 
-            # Add a delay if either (a) we failed to yield or (b) there's currently no messages to send.
+            # Add a delay if either (a) we failed to yield, (b) there's
+            # currently no messages to send, or (c) the client is falling
+            # behind. In the last case, the delay lets more redundant messages
+            # get culled before the next window.
             most_recent_message_id = self.message_counter - 1
-            if len(window) == 0 or most_recent_message_id == last_sent_id:
+            if (
+                len(window) == 0
+                or most_recent_message_id == state.last_sent_id
+                or state.window_duration_sec > self.window_duration_sec
+            ):
                 done, pending = await asyncio.wait(
-                    [flush_wait], timeout=self.window_duration_sec
+                    [flush_wait], timeout=state.window_duration_sec
                 )
                 del pending
                 if flush_wait in done and not self.done:
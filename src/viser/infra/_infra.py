@@ -5,31 +5,43 @@ import asyncio
 import contextlib
 import dataclasses
 import gzip
-import http
+import itertools
 import logging
-import mimetypes
 import queue
+import struct
 import threading
+import zlib
 from asyncio.events import AbstractEventLoop
+from collections import deque
 from collections.abc import Coroutine
 from pathlib import Path
-from typing import Any, Callable, Generator, NewType, TypeVar
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Generator,
+    Iterator,
+    Mapping,
+    NewType,
+    Sequence,
+    TypeVar,
+)
 
 import msgspec
 import rich
 import websockets.asyncio.server
-import websockets.datastructures
 import websockets.exceptions
 from typing_extensions import Literal, assert_never, override
-from websockets import Headers
 from websockets.asyncio.server import ServerConnection
 from websockets.http11 import Request, Response
 from websockets.typing import Subprotocol
 
 import viser  # Import for version checking
 
+from ._asset_store import AssetStore
 from ._async_message_buffer import AsyncMessageBuffer
 from ._messages import Message
+from ._static_files import StaticFileServer
 
 
 @dataclasses.dataclass
@@ -54,7 +66,7 @@ class StateSerializer:
         self._handler = handler
         self._filter = filter
         self._time: float = 0.0
-        self._messages: list[tuple[float, dict[str, Any]]] = []
+        self._messages: list[tuple[float, msgspec.Raw]] = []
 
     def _insert_message(self, message: Message) -> None:
         """Insert a message into the recorded file."""
@@ -63,7 +75,7 @@ class StateSerializer:
         # GUI messages.
         if not self._filter(message):
             return
-        self._messages.append((self._time, message.as_serializable_dict()))
+        self._messages.append((self._time, msgspec.Raw(message.serialize())))
 
     def insert_sleep(self, duration: float) -> None:
         """Insert a sleep into the recorded file. This can be useful for
@@ -97,6 +109,169 @@ class StateSerializer:
         return gzip.compress(packed_bytes, compresslevel=9)
 
 
+# Streaming recordings are a sequence of records, each with a 1-byte kind and a
+# little-endian uint32 payload length. Legacy recordings are gzip-compressed
+# msgpack, which we can tell apart by their first bytes.
+_RECORDING_MAGIC = b"VISER\x00\x02\x00"
+_RECORD_HEADER = struct.Struct("<cI")
+_RECORD_TIME = struct.Struct("<d")
+
+
+class StateRecorder:
+    """Handle for streaming messages to a ``.viser`` file as they are sent.
+
+    Unlike :class:`StateSerializer`, messages are not kept in memory: they are
+    compressed in chunks and appended to the file, so memory use doesn't grow
+    with recording length. Keyframes containing the full scene state are
+    written periodically, which lets the playback client seek without
+    replaying the recording from the start. Keyframes are skipped until enough
+    messages have been recorded since the last one, relative to the size of
+    the scene, so large scenes with small updates aren't re-encoded every
+    interval.
+
+    Files written by this class can be played back the same way as
+    :meth:`StateSerializer.serialize()` outputs."""
+
+    def __init__(
+        self,
+        handler: WebsockMessageHandler,
+        filter: Callable[[Message], bool],
+        file: IO[bytes],
+        chunk_size_bytes: int = 1_000_000,
+        keyframe_interval_sec: float | None = 10.0,
+        keyframe_size_ratio: float = 1.0,
+    ):
+        self._handler = handler
+        self._filter = filter
+        self._file = file
+        self._chunk_size_bytes = chunk_size_bytes
+        self._keyframe_interval_sec = keyframe_interval_sec
+        self._keyframe_size_ratio = keyframe_size_ratio
+        # Reentrant, because pushing a message can push other messages, for
+        # example when the message buffer evicts objects.
+        self._lock = threading.RLock()
+        self._time: float = 0.0
+
+        # Messages in the current chunk, which hasn't been written yet.
+        self._chunk_start_time: float = 0.0
+        self._chunk: list[tuple[float, msgspec.Raw]] = []
+        self._chunk_bytes = 0
+        self._last_keyframe_time: float | None = None
+        # Size of the messages recorded since the last keyframe.
+        self._bytes_since_keyframe = 0
+
+        self._file.write(_RECORDING_MAGIC)
+        self._write_record(
+            b"H", msgspec.msgpack.encode({"viserVersion": viser.__version__})
+        )
+
+    def _write_record(self, kind: bytes, payload: bytes) -> None:
+        self._file.write(_RECORD_HEADER.pack(kind, len(payload)))
+        self._file.write(payload)
+
+    def _flush_chunk(self) -> None:
+        """Compress and write the current chunk. Should be called with `_lock`
+        held."""
+        if len(self._chunk) == 0:
+            return
+        self._write_record(
+            b"C",
+            _RECORD_TIME.pack(self._chunk_start_time)
+            + zlib.compress(msgspec.msgpack.encode(self._chunk)),
+        )
+        self._chunk = []
+        self._chunk_bytes = 0
+
+    def _write_keyframe(self) -> None:
+        """Write the current scene state as a keyframe. Should be called with
+        `_lock` held."""
+        buffer = self._handler.get_message_buffer()
+        with buffer.buffer_lock:
+            messages = list(buffer.message_from_id.items())
+
+        # Removals in the buffer are only kept for connected clients; they
+        # aren't needed to reconstruct the state.
+        state = [
+            msgspec.Raw(
+                buffer.encode_message(message_id, message, use_asset_store=False)
+            )
+            for message_id, message in messages
+            if self._filter(message) and not message.removes_dependents()
+        ]
+        self._flush_chunk()
+        self._write_record(
+            b"K",
+            _RECORD_TIME.pack(self._time)
+            + zlib.compress(msgspec.msgpack.encode(state)),
+        )
+        self._last_keyframe_time = self._time
+        self._bytes_since_keyframe = 0
+
+    def _insert_message(self, message: Message) -> None:
+        """Insert a message into the recorded file."""
+        if not self._filter(message):
+            return
+        serialized = message.serialize()
+        with self._lock:
+            if self._file.closed:
+                return
+            if len(self._chunk) == 0:
+                self._chunk_start_time = self._time
+            self._chunk.append((self._time, msgspec.Raw(serialized)))
+            self._chunk_bytes += len(serialized)
+            self._bytes_since_keyframe += len(serialized)
+            if self._chunk_bytes >= self._chunk_size_bytes:
+                self._flush_chunk()
+
+    def write_keyframe(self) -> None:
+        """Write a keyframe with the current scene state. This is done
+        automatically every ``keyframe_interval_sec`` seconds of recording
+        time, but can also be called manually."""
+        with self._lock:
+            assert not self._file.closed, "close() was already called!"
+            self._write_keyframe()
+
+    def insert_sleep(self, duration: float) -> None:
+        """Insert a sleep into the recorded file. This can be useful for
+        dynamic 3D data."""
+        with self._lock:
+            assert not self._file.closed, "close() was already called!"
+            self._time += duration
+            if self._keyframe_interval_sec is None:
+                return
+            if (
+                self._last_keyframe_time is not None
+                and self._time - self._last_keyframe_time < self._keyframe_interval_sec
+            ):
+                return
+            # Seeking replays the messages since the last keyframe. If they're
+            # small compared to the scene, replaying them is cheaper than
+            # encoding the whole scene again.
+            scene_bytes = self._handler.get_message_buffer().message_bytes
+            if self._bytes_since_keyframe >= self._keyframe_size_ratio * scene_bytes:
+                self._write_keyframe()
+
+    def close(self) -> None:
+        """Write any remaining messages and close the file. Should only be
+        called once."""
+        with self._lock:
+            assert not self._file.closed, "close() was already called!"
+            self._flush_chunk()
+            self._write_record(
+                b"E", msgspec.msgpack.encode({"durationSeconds": self._time})
+            )
+            self._file.close()
+        if self._handler._record_handle is self:
+            self._handler._record_handle = None
+
+    def __enter__(self) -> StateRecorder:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        if not self._file.closed:
+            self.close()
+
+
 class WebsockMessageHandler:
     """Mix-in for adding message handling to a class."""
 
@@ -108,7 +283,7 @@ class WebsockMessageHandler:
         self._locked_thread_id = -1
 
         # Set to None if not recording.
-        self._record_handle: StateSerializer | None = None
+        self._record_handle: StateSerializer | StateRecorder | None = None
 
     def get_message_serializer(
         self, filter: Callable[[Message], bool]
@@ -119,6 +294,27 @@ class WebsockMessageHandler:
         self._record_handle = StateSerializer(self, filter)
         return self._record_handle
 
+    def get_message_recorder(
+        self,
+        file: IO[bytes],
+        filter: Callable[[Message], bool],
+        chunk_size_bytes: int = 1_000_000,
+        keyframe_interval_sec: float | None = 10.0,
+        keyframe_size_ratio: float = 1.0,
+    ) -> StateRecorder:
+        """Start streaming messages that are sent to a file. The file is
+        closed when the returned recorder is closed."""
+        assert self._record_handle is None, "Already recording."
+        self._record_handle = StateRecorder(
+            self,
+            filter,
+            file,
+            chunk_size_bytes,
+            keyframe_interval_sec,
+            keyframe_size_ratio,
+        )
+        return self._record_handle
+
     def register_handler(
         self,
         message_cls: type[TMessage],
@@ -159,10 +355,19 @@ class WebsockMessageHandler:
 
     def queue_message(self, message: Message) -> None:
         """Wrapped method for sending messages."""
-        if self._record_handle is not None:
-            self._record_handle._insert_message(message)
+        record_handle = self._record_handle
+        if isinstance(record_handle, StateRecorder):
+            # Push and record while holding the recorder lock. Otherwise, a
+            # keyframe written in between would include the message, which
+            # would then be replayed again from the next chunk.
+            with record_handle._lock:
+                self.get_message_buffer().push(message)
+                record_handle._insert_message(message)
+            return
 
         self.get_message_buffer().push(message)
+        if record_handle is not None:
+            record_handle._insert_message(message)
 
     @contextlib.contextmanager
     def atomic(self) -> Generator[None, None, None]:
@@ -317,8 +522,16 @@ class WebsockServer(WebsockMessageHandler):
         asyncio.set_event_loop(event_loop)
         self._stop_event = asyncio.Event()
         self._background_event_loop = event_loop
+        # Large buffers in outgoing messages are served over HTTP from a
+        # content-addressed store, instead of being sent over the websocket.
+        # This requires the HTTP server, and a client that receives windows.
+        asset_store = (
+            AssetStore()
+            if self._http_server_root is not None and self._client_api_version == 1
+            else None
+        )
         self._broadcast_buffer = AsyncMessageBuffer(
-            event_loop, persistent_messages=True
+            event_loop, persistent_messages=True, asset_store=asset_store
         )
 
         count_lock = asyncio.Lock()
@@ -359,13 +572,34 @@ class WebsockServer(WebsockMessageHandler):
                     return  # Exit handler to prevent further processing.
 
             client_state = _ClientHandleState(
-                AsyncMessageBuffer(event_loop, persistent_messages=False),
+                AsyncMessageBuffer(
+                    event_loop, persistent_messages=False, asset_store=asset_store
+                ),
                 event_loop,
             )
             client_connection = WebsockClientConnection(client_id, client_state)
             self._client_state_from_id[client_id] = client_state
 
+            # Newest message for each coalesce key that hasn't been handled yet.
+            pending_from_coalesce_key: dict[str, Message] = {}
+
+            async def handle_latest(coalesce_key: str) -> None:
+                message = pending_from_coalesce_key.pop(coalesce_key)
+                await asyncio.gather(
+                    self._handle_incoming_message(client_id, message),
+                    client_connection._handle_incoming_message(client_id, message),
+                )
+
             def handle_incoming(message: Message) -> None:
+                coalesce_key = message.coalesce_key()
+                if coalesce_key is not None:
+                    # If a message with the same key is already waiting, just
+                    # replace it with the newer one.
+                    if coalesce_key not in pending_from_coalesce_key:
+                        event_loop.create_task(handle_latest(coalesce_key))
+                    pending_from_coalesce_key[coalesce_key] = message
+                    return
+
                 event_loop.create_task(
                     self._handle_incoming_message(client_id, message)
                 )
@@ -388,6 +622,9 @@ class WebsockServer(WebsockMessageHandler):
                     " messages"
                 )
 
+            # Fragments from both producers share the same connection, so their
+            # IDs need to be unique per connection.
+            fragment_ids = itertools.count()
             try:
                 # For each client: infinite loop over producers (which send messages)
                 # and consumers (which receive messages).
@@ -397,12 +634,14 @@ class WebsockServer(WebsockMessageHandler):
                         client_state.message_buffer,
                         client_id,
                         self._client_api_version,
+                        fragment_ids,
                     ),
                     _message_producer(
                         connection,
                         self._broadcast_buffer,
                         client_id,
                         self._client_api_version,
+                        fragment_ids,
                     ),
                     _message_consumer(connection, handle_incoming, message_class),
                 )
@@ -435,12 +674,13 @@ class WebsockServer(WebsockMessageHandler):
                     )
 
         # Host client on the same port as the websocket.
-        file_cache: dict[Path, bytes] = {}
-        file_cache_gzipped: dict[Path, bytes] = {}
+        static_files = (
+            StaticFileServer(http_server_root) if http_server_root is not None else None
+        )
 
         filter_added = False
 
-        def viser_http_server(
+        async def viser_http_server(
             connection: ServerConnection,
             request: Request,
         ) -> Response | None:
@@ -462,72 +702,13 @@ class WebsockServer(WebsockMessageHandler):
             if request.headers.get("Upgrade") == "websocket":
                 return None
 
-            # Strip out search params, get relative path.
-            path = request.path
-            path = path.partition("?")[0]
-            relpath = str(Path(path).relative_to("/"))
-            if relpath == ".":
-                relpath = "index.html"
-            assert http_server_root is not None
-
-            source_path = http_server_root / relpath
-            if not source_path.exists():
-                return Response(http.HTTPStatus.NOT_FOUND, "NOT FOUND", Headers())
-
-            use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
-
-            # First, try some known MIME types. Using guess_type() can cause
-            # problems for Javascript on some Windows machines.
-            #
-            # Some references:
-            #     https://github.com/nerfstudio-project/viser/issues/256#issuecomment-2369684252
-            #     https://bugs.python.org/issue43975
-            #     https://github.com/golang/go/issues/32350#issuecomment-525111557
-            #
-            # We're assuming UTF-8, this is mostly reasonable but might want to revisit.
-            mime_type = {
-                ".css": "text/css; charset=utf-8",
-                ".gif": "image/gif",
-                ".htm": "text/html; charset=utf-8",
-                ".html": "text/html; charset=utf-8",
-                ".jpg": "image/jpeg",
-                ".js": "application/javascript",
-                ".wasm": "application/wasm",
-                ".pdf": "application/pdf",
-                ".png": "image/png",
-                ".svg": "image/svg+xml",
-                ".xml": "text/xml; charset=utf-8",
-            }.get(Path(path).suffix.lower(), None)
-            if mime_type is None:
-                mime_type = mimetypes.guess_type(relpath)[0]
-            if mime_type is None:
-                mime_type = "application/octet-stream"
-
-            if source_path not in file_cache:
-                file_cache[source_path] = source_path.read_bytes()
-            if use_gzip:
-                if source_path not in file_cache_gzipped:
-                    file_cache_gzipped[source_path] = gzip.compress(
-                        file_cache[source_path]
-                    )
-                response_payload = file_cache_gzipped[source_path]
-            else:
-                response_payload = file_cache[source_path]
+            if asset_store is not None:
+                response = asset_store.handle(request)
+                if response is not None:
+                    return response
 
-            response_headers = {
-                "Content-Type": mime_type,
-                "Content-Length": str(len(response_payload)),
-                "Content-Encoding": "gzip" if use_gzip else "identity",
-            }
-
-            # Try to read + send over file.
-            return Response(
-                http.HTTPStatus.OK,
-                "OK",
-                websockets.datastructures.Headers(**response_headers),
-                response_payload,
-            )
-            # return (http.HTTPStatus.OK, response_headers, response_payload)
+            assert static_files is not None
+            return await static_files.handle(request)
 
         async def start_server() -> None:
             port_attempt = port
@@ -569,29 +750,183 @@ class WebsockServer(WebsockMessageHandler):
         rich.print("[bold](viser)[/bold] Server stopped")
 
 
+def _keys_related(a: tuple[str, ...] | None, b: tuple[str, ...] | None) -> bool:
+    """Returns True if one dependency key is a prefix of the other. Messages
+    without a dependency key, like GUI resets, may affect any object, so
+    they're related to every message."""
+    if a is None or b is None:
+        return True
+    n = min(len(a), len(b))
+    return a[:n] == b[:n]
+
+
+@dataclasses.dataclass
+class _LaneItem:
+    encoded: bytes | memoryview
+    dependency_key: tuple[str, ...] | None
+    fragment_id: int | None
+    """Set for bulk messages that need to be split into fragments."""
+    atomic_group: int | None
+    offset: int = 0
+
+
+class _BulkLane:
+    """Low-priority lane for bulk messages, which are sent one fragment at a
+    time. Other messages can overtake them, unless they belong to the same
+    object (or to a parent or child of it), in which case they wait in the
+    lane to keep their order. Messages from an atomic block are kept together:
+    if one of them waits in the lane, they all do."""
+
+    def __init__(self, fragment_size_bytes: int, fragment_ids: Iterator[int]) -> None:
+        self._fragment_size_bytes = fragment_size_bytes
+        self._fragment_ids = fragment_ids
+        self._items: deque[_LaneItem] = deque()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def route(
+        self,
+        window: Sequence[tuple[int, Message]],
+        encoded: Sequence[bytes | memoryview],
+        atomic_group_from_id: Mapping[int, int],
+    ) -> list[bytes | memoryview]:
+        """Add bulk messages from a window to the lane, and return the
+        encodings of the messages that can be sent right away."""
+        urgent = []
+        start = 0
+        while start < len(window):
+            # Messages from the same atomic block are adjacent, and are routed
+            # together.
+            atomic_group = atomic_group_from_id.get(window[start][0], None)
+            stop = start + 1
+            while (
+                atomic_group is not None
+                and stop < len(window)
+                and atomic_group_from_id.get(window[stop][0], None) == atomic_group
+            ):
+                stop += 1
+            items = [
+                _LaneItem(
+                    message_encoded,
+                    message.dependency_key(),
+                    next(self._fragment_ids)
+                    if len(message_encoded) > self._fragment_size_bytes
+                    else None,
+                    atomic_group,
+                )
+                for (_, message), message_encoded in zip(
+                    window[start:stop], encoded[start:stop]
+                )
+            ]
+            if any(
+                message.is_bulk() or item.fragment_id is not None
+                for (_, message), item in zip(window[start:stop], items)
+            ) or any(
+                (atomic_group is not None and queued.atomic_group == atomic_group)
+                or _keys_related(item.dependency_key, queued.dependency_key)
+                for item in items
+                for queued in self._items
+            ):
+                self._items.extend(items)
+            else:
+                urgent.extend(item.encoded for item in items)
+            start = stop
+        return urgent
+
+    def next_frame(self) -> bytes | memoryview | None:
+        """Get the next frame to send from the lane: either a fragment of a
+        bulk message, or None if the next message should be sent whole. In
+        that case, it can be taken with `pop_whole()`."""
+        item = self._items[0]
+        if item.fragment_id is None:
+            return None
+        size = len(item.encoded)
+        fragment_count = -(-size // self._fragment_size_bytes)
+        end = min(item.offset + self._fragment_size_bytes, size)
+        frame = msgspec.msgpack.encode(
+            {
+                "fragmentId": item.fragment_id,
+                "fragmentIndex": item.offset // self._fragment_size_bytes,
+                "fragmentCount": fragment_count,
+                "data": memoryview(item.encoded)[item.offset : end],
+            }
+        )
+        item.offset = end
+        if end == size:
+            self._items.popleft()
+        return frame
+
+    def pop_whole(self) -> bytes | memoryview:
+        return self._items.popleft().encoded
+
+
 async def _message_producer(
     websocket: ServerConnection,
     buffer: AsyncMessageBuffer,
     client_id: int,
     client_api_version: Literal[0, 1],
+    fragment_ids: Iterator[int],
 ) -> None:
-    """Infinite loop to broadcast windows of messages from a buffer."""
+    """Infinite loop to broadcast windows of messages from a buffer.
+
+    For clients that receive windows, messages are sent in two priority
+    classes. Bulk messages are split into fragments, which are sent when no
+    other messages are waiting, so large assets don't block interactive
+    traffic."""
     window_generator = buffer.window_generator(client_id)
-    while not buffer.done:
-        outgoing = await window_generator.__anext__()
-        if client_api_version == 1:
-            serialized = msgspec.msgpack.encode(
-                tuple(message.as_serializable_dict() for message in outgoing)
-            )
-            assert isinstance(serialized, bytes)
-            await websocket.send(serialized)
-        elif client_api_version == 0:
-            for msg in outgoing:
-                serialized = msgspec.msgpack.encode(msg.as_serializable_dict())
-                assert isinstance(serialized, bytes)
+    if client_api_version == 0:
+        while not buffer.done:
+            outgoing = await window_generator.__anext__()
+            for serialized in await buffer.encode_window(outgoing):
                 await websocket.send(serialized)
-        else:
-            assert_never(client_api_version)
+        return
+    elif client_api_version != 1:
+        assert_never(client_api_version)
+
+    lane = _BulkLane(buffer.fragment_size_bytes, fragment_ids)
+    next_window: asyncio.Future[Sequence[tuple[int, Message]]] | None = None
+    try:
+        while not buffer.done:
+            if next_window is None:
+                next_window = asyncio.ensure_future(window_generator.__anext__())
+            if len(lane) == 0:
+                await asyncio.wait([next_window])
+
+            if next_window.done():
+                try:
+                    outgoing = next_window.result()
+                except StopAsyncIteration:
+                    # The buffer is done.
+                    break
+                finally:
+                    next_window = None
+
+                # Encodings are shared between clients reading from the same
+                # buffer. Large messages are encoded in a worker thread; we
+                # only await the bytes, so other clients are still served in
+                # the meantime.
+                encoded = await buffer.encode_window(outgoing)
+                urgent = lane.route(
+                    outgoing, encoded, buffer.window_atomic_groups(client_id)
+                )
+                if len(urgent) > 0:
+                    await websocket.send(await buffer.pack_window(urgent))
+                continue
+
+            # No new messages are waiting: send the next frame of bulk data.
+            frame = lane.next_frame()
+            if frame is None:
+                frame = await buffer.pack_window([lane.pop_whole()])
+            await websocket.send(frame)
+
+            # Yield to the event loop, so new windows are picked up between
+            # fragments even if sends don't block.
+            await asyncio.sleep(0)
+    finally:
+        # The event loop may already be closed if the server was stopped.
+        if next_window is not None and not next_window.get_loop().is_closed():
+            next_window.cancel()
 
 
 async def _message_consumer(
@@ -6,12 +6,26 @@ from __future__ import annotations
 import abc
 import dataclasses
 import functools
+import os
 import warnings
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type, TypeVar, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 import msgspec
 import numpy as np
-from typing_extensions import get_args, get_origin, get_type_hints
+from typing_extensions import Literal, get_args, get_origin, get_type_hints
 
 if TYPE_CHECKING:
     from ._infra import ClientId
@@ -98,6 +112,189 @@ def _prepare_for_serialization(value: Any, annotation: object) -> Any:
     return value
 
 
+def _enc_hook(obj: Any) -> Any:
+    """Encoding hook for types that msgspec can't handle natively."""
+    # For arrays, we serialize underlying data directly. The client is responsible for
+    # reading using the correct dtype. Contiguous arrays are encoded straight
+    # from their buffer, without any intermediate copies.
+    if isinstance(obj, np.ndarray):
+        return obj.data if obj.flags.c_contiguous else np.ascontiguousarray(obj).data
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise NotImplementedError(f"Cannot serialize object of type {type(obj)}")
+
+
+_encoder = msgspec.msgpack.Encoder(enc_hook=_enc_hook)
+
+
+def encode_msgpack(obj: Any) -> bytes:
+    """Encode an object to msgpack, with support for numpy arrays and scalars."""
+    return _encoder.encode(obj)
+
+
+def splice_buffers(
+    skeleton: bytes, splices: Sequence[Tuple[bytes, bytes, Any]]
+) -> memoryview:
+    """Build a msgpack buffer from a skeleton, replacing each placeholder token
+    with a header followed by the contents of a large buffer.
+
+    Large buffers are copied with numpy, which releases the GIL. This lets
+    worker threads assemble large messages without stalling other threads,
+    unlike msgspec, which holds the GIL while copying."""
+    positions = sorted(
+        (skeleton.index(token), token, header, np.frombuffer(buffer, dtype=np.uint8))
+        for token, header, buffer in splices
+    )
+    out = np.empty(
+        len(skeleton)
+        + sum(
+            len(header) + len(data) - len(token) for _, token, header, data in positions
+        ),
+        dtype=np.uint8,
+    )
+    skeleton_array = np.frombuffer(skeleton, dtype=np.uint8)
+    src = dst = 0
+    for position, token, header, data in positions:
+        out[dst : dst + position - src] = skeleton_array[src:position]
+        dst += position - src
+        out[dst : dst + len(header)] = np.frombuffer(header, dtype=np.uint8)
+        dst += len(header)
+        out[dst : dst + len(data)] = data
+        dst += len(data)
+        src = position + len(token)
+    out[dst:] = skeleton_array[src:]
+    return out.data
+
+
+def encode_msgpack_spliced(obj: Any, min_splice_bytes: int) -> memoryview:
+    """Encode an object to msgpack, like `encode_msgpack()`, but splice in
+    arrays larger than `min_splice_bytes` with `splice_buffers()`."""
+    # msgpack bin32 headers are only minimal for buffers of at least 64KB.
+    min_splice_bytes = max(min_splice_bytes, 1 << 16)
+    splices: List[Tuple[bytes, bytes, Any]] = []
+
+    def enc_hook(obj: Any) -> Any:
+        if isinstance(obj, np.ndarray) and obj.nbytes >= min_splice_bytes:
+            # Encoded as a bin8 placeholder; replaced with a bin32 header and
+            # the array's data.
+            token = os.urandom(16)
+            splices.append(
+                (
+                    b"\xc4\x10" + token,
+                    b"\xc6" + obj.nbytes.to_bytes(4, "big"),
+                    np.ascontiguousarray(obj).reshape(-1).view(np.uint8),
+                )
+            )
+            return token
+        return _enc_hook(obj)
+
+    skeleton = msgspec.msgpack.Encoder(enc_hook=enc_hook).encode(obj)
+    return splice_buffers(skeleton, splices)
+
+
+def estimate_nbytes(value: Any) -> int:
+    """Cheaply estimate the size of a value after msgpack encoding. Arrays and
+    bytes dominate the size of large messages, and are counted exactly."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(map(estimate_nbytes, value))
+    if isinstance(value, dict):
+        return sum(map(estimate_nbytes, value.values()))
+    if dataclasses.is_dataclass(value) or isinstance(value, Message):
+        return sum(map(estimate_nbytes, vars(value).values()))
+    return 8
+
+
+def _is_natively_encodable(annotation: Any) -> bool:
+    """Returns True if values with some type annotation can be passed directly
+    to `encode_msgpack()`, without a `_prepare_for_serialization()` pass."""
+    if annotation in (str, bytes, bool, int, float, type(None)):
+        return True
+    if dataclasses.is_dataclass(annotation):
+        return all(
+            map(_is_natively_encodable, get_type_hints_cached(annotation).values())  # type: ignore
+        )
+
+    origin = get_origin(annotation)
+    if origin is Literal:
+        return True
+    if origin is np.ndarray:
+        return True
+    if origin in (Union, tuple):
+        return all(
+            _is_natively_encodable(arg) for arg in get_args(annotation) if arg != ...
+        )
+    return False
+
+
+@functools.lru_cache(maxsize=None)
+def _get_field_serializers(cls: Type[Any]) -> Dict[str, Callable[[Any], Any]]:
+    """Compile per-field serializers for a message type.
+
+    This is done once per class. Fields that msgspec can encode directly, which
+    includes numpy arrays and `*Props` dataclasses made of arrays and scalars,
+    are passed through as-is. Everything else falls back to the recursive
+    `_prepare_for_serialization()`."""
+    return {
+        k: (lambda value: value)
+        if _is_natively_encodable(hint)
+        else functools.partial(_prepare_for_serialization, annotation=hint)
+        for k, hint in get_type_hints_cached(cls).items()
+    }
+
+
+def _is_typed_decodable(annotation: Any) -> bool:
+    """Returns True if values with some type annotation can be decoded directly
+    by msgspec into the types that we expect: tuples, floats, and so on.
+    Annotations containing `Any` are excluded, since msgspec decodes these into
+    lists and dicts."""
+    if annotation in (str, bytes, bool, int, float, type(None)):
+        return True
+    if dataclasses.is_dataclass(annotation):
+        hints = get_type_hints_cached(annotation)  # type: ignore
+        return all(
+            _is_typed_decodable(hints[field.name])
+            for field in dataclasses.fields(annotation)
+        )
+
+    origin = get_origin(annotation)
+    if origin is Literal:
+        return True
+    if origin in (Union, tuple):
+        return all(
+            _is_typed_decodable(arg) for arg in get_args(annotation) if arg != ...
+        )
+    return False
+
+
+class _MessageTypeTag(msgspec.Struct):
+    """Reads only the `type` field of a serialized message."""
+
+    type: str
+
+
+_type_tag_decoder = msgspec.msgpack.Decoder(_MessageTypeTag)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_typed_decoder(cls: Type[Any]) -> Optional[msgspec.msgpack.Decoder]:
+    """Get a msgspec decoder that builds a message type directly from bytes,
+    or None if the message type needs the generic decoding path.
+
+    This is done once per class. Typed decoders produce tuples and floats
+    from the dataclass annotations, which saves a recursive pass over each
+    incoming message."""
+    if not dataclasses.is_dataclass(cls) or not _is_typed_decodable(cls):
+        return None
+    try:
+        return msgspec.msgpack.Decoder(cls)
+    except TypeError:
+        return None
+
+
 T = TypeVar("T", bound="Message")
 
 
@@ -114,15 +311,19 @@ class Message(abc.ABC):
     send synchronization information to other clients."""
 
     def as_serializable_dict(self) -> Dict[str, Any]:
-        """Convert a Python Message object into bytes."""
+        """Convert a Python Message object into a dictionary that can be encoded
+        with `encode_msgpack()`. Arrays and `*Props` dataclasses are kept as-is,
+        and encoded directly by msgspec."""
         message_type = type(self)
-        hints = get_type_hints_cached(message_type)
-        out = {
-            k: _prepare_for_serialization(v, hints[k]) for k, v in vars(self).items()
-        }
+        serializers = _get_field_serializers(message_type)
+        out = {k: serializers[k](v) for k, v in vars(self).items()}
         out["type"] = message_type.__name__
         return out
 
+    def serialize(self) -> bytes:
+        """Convert a Python Message object into bytes."""
+        return encode_msgpack(self.as_serializable_dict())
+
     @classmethod
     def _from_serializable_dict(cls, mapping: Dict[str, Any]) -> Dict[str, Any]:
         """Convert a dict message back into a Python Message object."""
@@ -137,6 +338,18 @@ class Message(abc.ABC):
     @classmethod
     def deserialize(cls, message: bytes) -> Message:
         """Convert bytes into a Python Message object."""
+        message_type = cls._subclass_from_type_string()[
+            _type_tag_decoder.decode(message).type
+        ]
+        decoder = _get_typed_decoder(message_type)
+        if decoder is not None:
+            try:
+                return decoder.decode(message)
+            except msgspec.ValidationError:
+                # For example, tuples with more elements than annotated. The
+                # generic path is more lenient.
+                pass
+
         mapping = msgspec.msgpack.decode(message)
 
         # msgpack deserializes to lists by default, but all of our annotations use
@@ -175,10 +388,59 @@ class Message(abc.ABC):
         return _get_subclasses(cls)
 
     @abc.abstractmethod
-    def redundancy_key(self) -> str:
+    def redundancy_key(self) -> Optional[str]:
         """Returns a unique key for this message, used for detecting redundant
-        messages.
+        messages, or None if no later message makes this one redundant.
 
         For example: if we send 1000 "set value" messages for the same GUI element, we
         should only keep the latest message.
         """
+
+    def dependency_key(self) -> Optional[Tuple[str, ...]]:
+        """Returns a key for the object (for example, a scene node or GUI
+        element) that this message belongs to, or None.
+
+        Message buffers index messages by this key, so all messages for an
+        object can be dropped when the object is removed. Keys are
+        hierarchical: removing an object also drops messages for objects whose
+        keys it prefixes.
+        """
+        return None
+
+    def compact_into(self, base: Message) -> Optional[Message]:
+        """Fold this message into `base`, an earlier message with the same
+        dependency key. Returns the combined message, or None if the messages
+        can't be combined.
+
+        Persistent message buffers use this to compact messages that have
+        already been sent to every connected client: for example, a props
+        update can be folded into the message that created an object, so new
+        clients never receive superseded props.
+        """
+        del base
+        return None
+
+    def coalesce_key(self) -> Optional[str]:
+        """For messages sent by clients: returns a key if this message only
+        carries the latest state of something, like a camera pose, or None.
+
+        When several messages with the same key from the same client are
+        waiting to be handled, only the newest one is handled.
+        """
+        return None
+
+    def is_bulk(self) -> bool:
+        """Returns True for messages that carry bulk data, like large assets or
+        file transfer parts. Bulk messages are sent in a low-priority lane, so
+        they don't hold up interactive messages.
+
+        Messages that are too large to send in one frame are treated as bulk
+        messages regardless of this method.
+        """
+        return False
+
+    def removes_dependents(self) -> bool:
+        """Returns True if this message removes the object identified by
+        `dependency_key()`. When pushed, all buffered messages for the object
+        and its descendants are dropped."""
+        return False
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import Dict, Generic, Hashable, Iterator, List, Set, Tuple, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+
+
+@dataclasses.dataclass
+class _PrefixTreeNode(Generic[T]):
+    values: Set[T] = dataclasses.field(default_factory=set)
+    children: Dict[str, _PrefixTreeNode[T]] = dataclasses.field(default_factory=dict)
+
+
+class PrefixTree(Generic[T]):
+    """Index from tuple keys to sets of values. Supports reading or removing
+    all values under a key prefix, in time proportional to the size of the
+    subtree.
+
+    Used to index hierarchical names: for example, scene node `/robot/arm` can
+    be stored under the key `("", "robot", "arm")`."""
+
+    def __init__(self) -> None:
+        self._root: _PrefixTreeNode[T] = _PrefixTreeNode()
+
+    def __len__(self) -> int:
+        return sum(len(node.values) for node in self._iter_nodes(self._root))
+
+    def add(self, key: Tuple[str, ...], value: T) -> None:
+        """Add a value under a key."""
+        node = self._root
+        for part in key:
+            child = node.children.get(part, None)
+            if child is None:
+                child = node.children[part] = _PrefixTreeNode()
+            node = child
+        node.values.add(value)
+
+    def discard(self, key: Tuple[str, ...], value: T) -> None:
+        """Remove a value from a key, if it exists. Empty branches are pruned."""
+        path = self._find_path(key)
+        if path is None:
+            return
+        path[-1].values.discard(value)
+        self._prune_path(key, path)
+
+    def get(self, key: Tuple[str, ...]) -> Set[T]:
+        """Get the values stored at exactly this key."""
+        node = self._find(key)
+        return set() if node is None else set(node.values)
+
+    def values_under(self, key: Tuple[str, ...]) -> List[T]:
+        """Get all values at a key or any of its descendants."""
+        node = self._find(key)
+        if node is None:
+            return []
+        return [value for n in self._iter_nodes(node) for value in n.values]
+
+    def pop_subtree(self, key: Tuple[str, ...]) -> List[T]:
+        """Remove and return all values at a key or any of its descendants."""
+        out = self.values_under(key)
+        if len(key) == 0:
+            self._root = _PrefixTreeNode()
+            return out
+
+        # Detach the subtree, then prune empty ancestors.
+        path = self._find_path(key[:-1])
+        if path is not None:
+            path[-1].children.pop(key[-1], None)
+            self._prune_path(key[:-1], path)
+        return out
+
+    def _find(self, key: Tuple[str, ...]) -> _PrefixTreeNode[T] | None:
+        node = self._root
+        for part in key:
+            child = node.children.get(part, None)
+            if child is None:
+                return None
+            node = child
+        return node
+
+    def _find_path(self, key: Tuple[str, ...]) -> List[_PrefixTreeNode[T]] | None:
+        """Get the nodes along a key's path, starting from the root."""
+        path = [self._root]
+        for part in key:
+            child = path[-1].children.get(part, None)
+            if child is None:
+                return None
+            path.append(child)
+        return path
+
+    def _prune_path(self, key: Tuple[str, ...], path: List[_PrefixTreeNode[T]]) -> None:
+        """Remove empty nodes along a key's path, from the bottom up."""
+        for i in range(len(key), 0, -1):
+            node = path[i]
+            if len(node.values) > 0 or len(node.children) > 0:
+                break
+            path[i - 1].children.pop(key[i - 1])
+
+    def _iter_nodes(self, node: _PrefixTreeNode[T]) -> Iterator[_PrefixTreeNode[T]]:
+        stack = [node]
+        while len(stack) > 0:
+            node = stack.pop()
+            yield node
+            stack.extend(node.children.values())
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import gzip
+import hashlib
+import http
+import mimetypes
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from websockets.datastructures import Headers
+from websockets.http11 import Request, Response
+
+# First, try some known MIME types. Using guess_type() can cause problems for
+# Javascript on some Windows machines.
+#
+# Some references:
+#     https://github.com/nerfstudio-project/viser/issues/256#issuecomment-2369684252
+#     https://bugs.python.org/issue43975
+#     https://github.com/golang/go/issues/32350#issuecomment-525111557
+#
+# We're assuming UTF-8, this is mostly reasonable but might want to revisit.
+_MIME_TYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".gif": "image/gif",
+    ".htm": "text/html; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+    ".jpg": "image/jpeg",
+    ".js": "application/javascript",
+    ".wasm": "application/wasm",
+    ".pdf": "application/pdf",
+    ".png": "image/png",
+    ".svg": "image/svg+xml",
+    ".xml": "text/xml; charset=utf-8",
+}
+
+# Files that are worth compressing. Images are already compressed.
+_COMPRESSIBLE_SUFFIXES = {
+    ".css",
+    ".htm",
+    ".html",
+    ".js",
+    ".json",
+    ".map",
+    ".svg",
+    ".ttf",
+    ".txt",
+    ".wasm",
+    ".xml",
+}
+_MIN_COMPRESS_BYTES = 1024
+
+# Vite writes content-hashed bundles to `assets/`, like `assets/index-BnK2s8wW.js`.
+# These never change, so they can be cached forever.
+_HASHED_ASSET_PATTERN = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+
+# Encodings in order of preference, with the suffixes of precompressed files.
+_ENCODING_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _is_compressible(path: Path) -> bool:
+    return path.suffix.lower() in _COMPRESSIBLE_SUFFIXES
+
+
+def precompress_directory(root: Path) -> None:
+    """Write compressed copies of the compressible files in a directory, next
+    to the originals: `.gz` always, and `.br` if the `brotli` package is
+    installed. Run after building the client, so the HTTP server doesn't need
+    to compress anything at runtime."""
+    try:
+        import brotli  # type: ignore
+    except ImportError:
+        brotli = None
+
+    for path in root.glob("**/*"):
+        if not path.is_file() or not _is_compressible(path):
+            continue
+        content = path.read_bytes()
+        if len(content) < _MIN_COMPRESS_BYTES:
+            continue
+        path.with_name(path.name + ".gz").write_bytes(
+            gzip.compress(content, compresslevel=9, mtime=0)
+        )
+        if brotli is not None:
+            path.with_name(path.name + ".br").write_bytes(brotli.compress(content))
+
+
+@dataclasses.dataclass(frozen=True)
+class _StaticFile:
+    mtime_ns: int
+    content: bytes
+    etag: str
+    """Strong ETag for the uncompressed content."""
+    encoded: Dict[str, bytes]
+    """Compressed variants of the content, from content-coding to bytes."""
+
+
+def _parse_accept_encoding(header: str) -> Set[str]:
+    """Get the content-codings accepted by a client."""
+    out = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0.0:
+            out.add(coding.strip().lower())
+    return out
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into an inclusive `(start, end)` tuple.
+    Returns None for ranges that can't be satisfied. Raises ValueError for
+    headers that we don't support, which should be ignored."""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        raise ValueError(header)
+    start_str, _, end_str = spec.strip().partition("-")
+    if start_str == "":
+        # Suffix range: the last N bytes.
+        suffix_length = int(end_str)
+        if suffix_length == 0:
+            return None
+        return max(size - suffix_length, 0), size - 1
+    start = int(start_str)
+    end = size - 1 if end_str == "" else min(int(end_str), size - 1)
+    if start > end:
+        if end_str != "" and int(end_str) < start:
+            raise ValueError(header)
+        return None
+    return start, end
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an `If-None-Match` header against the ETag of a file. Tags for
+    compressed variants, which have an encoding suffix, also match."""
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').partition("-")[0] == etag.strip('"'):
+            return True
+    return False
+
+
+class StaticFileServer:
+    """Serves files from a directory over HTTP. Used for the client build.
+
+    - Files are read and compressed in a thread, then cached in memory.
+      Precompressed `.br` and `.gz` files next to the originals are used if
+      they exist; otherwise, compressible files are gzipped once.
+    - Responses have strong ETags, and conditional requests get
+      `304 Not Modified`.
+    - Content-hashed assets are marked as immutable; everything else is
+      revalidated on each load.
+    - Single byte ranges are supported, for large files.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self._root = root.absolute()
+        self._cache: Dict[Path, _StaticFile] = {}
+        self._cache_lock = threading.Lock()
+
+    async def handle(self, request: Request) -> Response:
+        # Strip out search params, get relative path.
+        path = request.path.partition("?")[0]
+        relpath = path.lstrip("/")
+        if relpath == "":
+            relpath = "index.html"
+        source_path = self._root / relpath
+
+        # Don't serve anything outside of the root directory.
+        try:
+            source_path.resolve().relative_to(self._root.resolve())
+        except ValueError:
+            return self._not_found()
+        try:
+            stat = source_path.stat()
+        except OSError:
+            return self._not_found()
+        if not source_path.is_file():
+            return self._not_found()
+
+        file = self._cache.get(source_path, None)
+        if file is None or file.mtime_ns != stat.st_mtime_ns:
+            file = await asyncio.get_running_loop().run_in_executor(
+                None, self._load, source_path, stat.st_mtime_ns
+            )
+
+        mime_type = _MIME_TYPES.get(source_path.suffix.lower(), None)
+        if mime_type is None:
+            mime_type = mimetypes.guess_type(relpath)[0]
+        if mime_type is None:
+            mime_type = "application/octet-stream"
+
+        headers: List[Tuple[str, str]] = [
+            (
+                "Cache-Control",
+                "public, max-age=31536000, immutable"
+                if _HASHED_ASSET_PATTERN.match(Path(relpath).as_posix())
+                else "no-cache",
+            ),
+            ("Vary", "Accept-Encoding"),
+            ("Accept-Ranges", "bytes"),
+        ]
+
+        # Pick an encoding. Byte ranges are always served from the uncompressed
+        # content, so offsets are stable across clients.
+        range_header = request.headers.get("Range", None)
+        encoding = "identity"
+        if range_header is None:
+            accepted = _parse_accept_encoding(
+                request.headers.get("Accept-Encoding", "")
+            )
+            for coding, _ in _ENCODING_SUFFIXES:
+                if coding in accepted and coding in file.encoded:
+                    encoding = coding
+                    break
+
+        etag = file.etag if encoding == "identity" else f'{file.etag[:-1]}-{encoding}"'
+        headers.append(("ETag", etag))
+
+        # Conditional requests. We use weak comparison, so revalidation still
+        # works for any of the encodings that we might have sent before.
+        if_none_match = request.headers.get("If-None-Match", None)
+        if if_none_match is not None and _etag_matches(if_none_match, file.etag):
+            return Response(
+                http.HTTPStatus.NOT_MODIFIED, "Not Modified", Headers(headers), b""
+            )
+
+        headers.append(("Content-Type", mime_type))
+        if encoding != "identity":
+            payload = file.encoded[encoding]
+            headers.append(("Content-Encoding", encoding))
+            headers.append(("Content-Length", str(len(payload))))
+            return Response(http.HTTPStatus.OK, "OK", Headers(headers), payload)
+
+        # Range requests. `If-Range` makes the range conditional on the content
+        # being unchanged.
+        size = len(file.content)
+        if_range = request.headers.get("If-Range", None)
+        if range_header is not None and (if_range is None or if_range == file.etag):
+            try:
+                byte_range = _parse_range(range_header, size)
+            except ValueError:
+                pass
+            else:
+                if byte_range is None:
+                    headers.append(("Content-Range", f"bytes */{size}"))
+                    headers.append(("Content-Length", "0"))
+                    return Response(
+                        http.HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                        "Range Not Satisfiable",
+                        Headers(headers),
+                        b"",
+                    )
+                start, end = byte_range
+                payload = file.content[start : end + 1]
+                headers.append(("Content-Range", f"bytes {start}-{end}/{size}"))
+                headers.append(("Content-Length", str(len(payload))))
+                return Response(
+                    http.HTTPStatus.PARTIAL_CONTENT,
+                    "Partial Content",
+                    Headers(headers),
+                    payload,
+                )
+
+        headers.append(("Content-Length", str(size)))
+        return Response(http.HTTPStatus.OK, "OK", Headers(headers), file.content)
+
+    def _load(self, source_path: Path, mtime_ns: int) -> _StaticFile:
+        """Read a file and its compressed variants. Runs in a thread."""
+        content = source_path.read_bytes()
+        encoded: Dict[str, bytes] = {}
+        for coding, suffix in _ENCODING_SUFFIXES:
+            precompressed_path = source_path.with_name(source_path.name + suffix)
+            if (
+                precompressed_path.is_file()
+                and precompressed_path.stat().st_mtime_ns >= mtime_ns
+            ):
+                encoded[coding] = precompressed_path.read_bytes()
+        if (
+            "gzip" not in encoded
+            and _is_compressible(source_path)
+            and len(content) >= _MIN_COMPRESS_BYTES
+        ):
+            encoded["gzip"] = gzip.compress(content, mtime=0)
+
+        file = _StaticFile(
+            mtime_ns=mtime_ns,
+            content=content,
+            etag='"' + hashlib.blake2b(content, digest_size=16).hexdigest() + '"',
+            encoded=encoded,
+        )
+        with self._cache_lock:
+            self._cache[source_path] = file
+        return file
+
+    def _not_found(self) -> Response:
+        return Response(http.HTTPStatus.NOT_FOUND, "NOT FOUND", Headers())
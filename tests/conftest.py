@@ -0,0 +1,40 @@
+from typing import Generator, List
+
+import pytest
+
+import viser
+import viser._client_autobuild
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--benchmarks",
+        action="store_true",
+        help="Run tests marked with `benchmark`, which are skipped by default.",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line("markers", "benchmark: slow performance benchmark.")
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: List[pytest.Item]
+) -> None:
+    if config.getoption("--benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="Benchmarks only run with `--benchmarks`.")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def server() -> Generator[viser.ViserServer, None, None]:
+    """A server for tests that inspect the messages it sends. The server is
+    stopped after the test."""
+    # Mock the client autobuild to avoid building the client.
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+    server = viser.ViserServer(verbose=False)
+    yield server
+    server.stop()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import urllib.request
+
+import msgspec
+import numpy as np
+import websockets
+
+import viser
+import viser._client_autobuild
+from viser import _messages
+from viser.infra._asset_store import ASSET_EXT_CODE, AssetStore
+from viser.infra._async_message_buffer import AsyncMessageBuffer
+from viser.infra._messages import encode_msgpack
+
+
+def _make_point_cloud_message(name: str, points: np.ndarray) -> _messages.Message:
+    return _messages.PointCloudMessage(
+        name=name,
+        props=_messages.PointCloudProps(
+            points=points,
+            colors=np.zeros((points.shape[0], 3), dtype=np.uint8),
+            scalars=None,
+            scalars_dtype="float32",
+            colormap="viridis",
+            colormap_lut=None,
+            scalar_range=(0.0, 1.0),
+            point_size=0.1,
+            point_shape="square",
+            precision="float32",
+            quantization=None,
+            max_points=None,
+        ),
+    )
+
+
+def test_offload_deduplicates_buffers() -> None:
+    store = AssetStore(min_size_bytes=5000, release_grace_sec=0.0)
+    points = np.random.normal(size=(1000, 3)).astype(np.float32)
+    message = _make_point_cloud_message("/points", points)
+
+    obj, hashes = store.offload(message.as_serializable_dict())
+    _, hashes_copy = store.offload(
+        _make_point_cloud_message("/copy", points.copy()).as_serializable_dict()
+    )
+    assert len(hashes) == 1
+    assert hashes == hashes_copy
+    assert store.num_bytes == points.nbytes
+
+    # Small buffers are kept inline, and large ones are replaced by references.
+    decoded = msgspec.msgpack.decode(encode_msgpack(obj))
+    ext = decoded["props"]["points"]
+    assert isinstance(ext, msgspec.msgpack.Ext)
+    assert ext.code == ASSET_EXT_CODE
+    assert bytes(ext.data).hex() == hashes[0]
+    assert isinstance(decoded["props"]["colors"], bytes)
+    assert bytes(store.get(hashes[0])) == points.tobytes()  # type: ignore
+
+    # The original message shouldn't be modified.
+    assert message.props.points is points  # type: ignore
+
+    # Unreferenced assets are dropped after the grace period.
+    store.acquire(hashes)
+    store.offload({"other": np.zeros(2000, dtype=np.float32)})
+    assert store.get(hashes[0]) is not None
+    store.release(hashes)
+    store.offload({"other": np.zeros(2000, dtype=np.float32)})
+    assert store.get(hashes[0]) is None
+
+
+def test_persisted_messages_hold_assets() -> None:
+    event_loop = asyncio.new_event_loop()
+    store = AssetStore(min_size_bytes=5000, release_grace_sec=0.0)
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=True, asset_store=store)
+    points = np.random.normal(size=(1000, 3)).astype(np.float32)
+    buffer.push(_make_point_cloud_message("/a", points))
+    buffer.push(_make_point_cloud_message("/b", points))
+    for message_id, message in buffer.message_from_id.items():
+        buffer.encode_message(message_id, message)
+
+    (asset_hash,) = {
+        h for hashes in buffer._asset_hashes_from_id.values() for h in hashes
+    }
+
+    # Self-contained encodings can still be requested, for example for saving
+    # to a file.
+    assert buffer.encode_message(
+        0, buffer.message_from_id[0], use_asset_store=False
+    ) == (buffer.message_from_id[0].serialize())
+
+    # The asset should be kept until both messages are removed.
+    buffer.push(_messages.RemoveSceneNodeMessage("/a"))
+    store.offload({})
+    assert store.get(asset_hash) is not None
+    buffer.push(_messages.RemoveSceneNodeMessage("/b"))
+    store.offload({"x": np.zeros(2000, dtype=np.float32)})
+    assert store.get(asset_hash) is None
+    event_loop.close()
+
+
+def test_assets_are_served_over_http() -> None:
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+    server = viser.ViserServer(verbose=False)
+    glb_data = np.random.bytes(2_000_000)
+    server.scene.add_glb("/big", glb_data)
+
+    async def receive_messages() -> list[dict]:
+        async with websockets.connect(
+            f"ws://localhost:{server.get_port()}",
+            subprotocols=[websockets.Subprotocol(f"viser-v{viser.__version__}")],
+        ) as websocket:
+            messages = []
+            try:
+                while True:
+                    frame = await asyncio.wait_for(websocket.recv(), 1.0)
+                    messages.extend(msgspec.msgpack.decode(frame))  # type: ignore
+            except asyncio.TimeoutError:
+                pass
+            return messages
+
+    messages = asyncio.run(receive_messages())
+    (glb_message,) = [m for m in messages if m["type"] == "GlbMessage"]
+    ref = glb_message["props"]["glb_data"]
+    assert isinstance(ref, msgspec.msgpack.Ext)
+
+    url = f"http://localhost:{server.get_port()}/assets/{bytes(ref.data).hex()}"
+    with urllib.request.urlopen(url) as response:
+        assert response.read() == glb_data
+        assert "immutable" in response.headers["Cache-Control"]
+    server.stop()
@@ -0,0 +1,139 @@
+import asyncio
+
+import numpy as np
+
+import viser
+from viser import _messages
+from viser.infra._async_message_buffer import AsyncMessageBuffer
+
+
+def test_delta_updates_send_changed_rows(server: viser.ViserServer) -> None:
+    """With delta updates enabled, recoloring some points should only send the
+    rows that changed."""
+    num_points = 100_000
+    handle = server.scene.add_point_cloud(
+        "/points",
+        points=np.random.normal(size=(num_points, 3)),
+        colors=np.zeros((num_points, 3), dtype=np.uint8),
+    )
+    handle.delta_updates = True
+
+    # Record pushed messages. With no clients connected, the buffer compacts
+    # them away immediately.
+    buffer = server._websock_server._broadcast_buffer
+    pushed = []
+    orig_push = buffer.push
+    buffer.push = lambda message: (pushed.append(message), orig_push(message))  # type: ignore
+
+    colors = handle.colors.copy()
+    changed = np.random.choice(num_points, size=num_points // 20, replace=False)
+    colors[changed] = 255
+    handle.colors = colors
+
+    (message,) = pushed
+    assert isinstance(message, _messages.SceneNodeArrayPatchMessage)
+    assert message.prop_name == "colors"
+    np.testing.assert_array_equal(message.indices, np.sort(changed))
+    np.testing.assert_array_equal(message.values, colors[np.sort(changed)])
+    assert len(message.serialize()) < colors.nbytes // 5
+    np.testing.assert_array_equal(handle.colors, colors)
+
+    # Compacting the patch should give the same colors as the handle.
+    (creation_message,) = [
+        m
+        for m in buffer.message_from_id.values()
+        if isinstance(m, _messages.PointCloudMessage)
+    ]
+    np.testing.assert_array_equal(creation_message.props.colors, colors)
+
+    # Large changes should fall back to sending the whole array.
+    handle.colors = np.full((num_points, 3), 128, dtype=np.uint8)
+    assert isinstance(pushed[-1], _messages.SceneNodeUpdateMessage)
+
+
+def test_delta_updates_are_opt_in(server: viser.ViserServer) -> None:
+    handle = server.scene.add_batched_axes(
+        "/axes",
+        batched_wxyzs=np.tile(np.array([1.0, 0.0, 0.0, 0.0]), (100, 1)),
+        batched_positions=np.zeros((100, 3)),
+    )
+    buffer = server._websock_server._broadcast_buffer
+    pushed = []
+    orig_push = buffer.push
+    buffer.push = lambda message: (pushed.append(message), orig_push(message))  # type: ignore
+
+    positions = handle.batched_positions.copy()
+    positions[3] = 1.0
+    handle.batched_positions = positions
+    assert isinstance(pushed[-1], _messages.SceneNodeUpdateMessage)
+
+    handle.delta_updates = True
+    positions[5] = 1.0
+    handle.batched_positions = positions
+    assert isinstance(pushed[-1], _messages.SceneNodeArrayPatchMessage)
+    np.testing.assert_array_equal(pushed[-1].indices, [5])
+
+
+def test_patches_are_not_culled() -> None:
+    """Patches for the same property touch different rows, so they shouldn't
+    supersede each other in the message buffer."""
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=False)
+    for i in range(3):
+        buffer.push(
+            _messages.SceneNodeArrayPatchMessage(
+                "/points",
+                "colors",
+                np.array([i], dtype=np.uint32),
+                np.zeros((1, 3), dtype=np.uint8),
+            )
+        )
+    assert len(buffer.message_from_id) == 3
+    event_loop.close()
+
+
+def test_patches_are_compacted_in_place() -> None:
+    """Compacting a patch copies the patched array once. Later patches are
+    written into the same buffer."""
+    base = _messages.BatchedAxesMessage(
+        "/axes",
+        _messages.BatchedAxesProps(
+            batched_wxyzs=np.zeros((100, 4), dtype=np.float32),
+            batched_positions=np.zeros((100, 3), dtype=np.float32),
+            batched_scales=None,
+            axes_length=0.5,
+            axes_radius=0.025,
+        ),
+    )
+
+    def patch(message: _messages.Message, row: int) -> _messages.BatchedAxesMessage:
+        out = _messages.SceneNodeArrayPatchMessage(
+            "/axes",
+            "batched_positions",
+            np.array([row], dtype=np.uint32),
+            np.ones((1, 3), dtype=np.float32),
+        ).compact_into(message)
+        assert isinstance(out, _messages.BatchedAxesMessage)
+        return out
+
+    first = patch(base, 0)
+    second = patch(first, 1)
+    assert not np.shares_memory(
+        first.props.batched_positions, base.props.batched_positions
+    )
+    assert np.shares_memory(
+        second.props.batched_positions, first.props.batched_positions
+    )
+    np.testing.assert_array_equal(second.props.batched_positions[:3, 0], [1, 1, 0])
+
+    # Encodings copy the buffer, so later patches don't change them.
+    encoded = second.serialize()
+    third = patch(second, 2)
+    assert np.shares_memory(
+        third.props.batched_positions, second.props.batched_positions
+    )
+    np.testing.assert_array_equal(third.props.batched_positions[:3, 0], [1, 1, 1])
+    decoded = _messages.Message.deserialize(encoded)
+    assert isinstance(decoded, _messages.BatchedAxesMessage)
+    positions = np.frombuffer(decoded.props["batched_positions"], np.float32)
+    np.testing.assert_array_equal(positions.reshape(-1, 3)[:3, 0], [1, 1, 0])
@@ -1,3 +1,8 @@
+import warnings
+
+import numpy as np
+import pytest
+
 import viser
 import viser._client_autobuild
 
@@ -20,8 +25,6 @@ def test_remove_scene_node() -> None:
 
     assert len(internal_message_dict) > orig_len
     server.scene.reset()
-    assert len(internal_message_dict) > orig_len
-    server._run_garbage_collector(force=True)
     assert len(internal_message_dict) == orig_len
 
 
@@ -47,8 +50,6 @@ def test_remove_gui_element() -> None:
 
     assert len(internal_message_dict) > orig_len
     server.gui.reset()
-    assert len(internal_message_dict) > orig_len
-    server._run_garbage_collector(force=True)
     assert len(internal_message_dict) == orig_len
 
 
@@ -71,6 +72,67 @@ def test_remove_gui_in_modal() -> None:
 
     assert len(internal_message_dict) > orig_len
     modal.close()
-    assert len(internal_message_dict) > orig_len
-    server._run_garbage_collector(force=True)
     assert len(internal_message_dict) == orig_len
+
+
+def test_remove_scene_subtree() -> None:
+    """Removing a parent node should remove the handles and persisted messages
+    of all of its descendants."""
+
+    # Mock the client autobuild to avoid building the client.
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+
+    server = viser.ViserServer()
+    buffer = server._websock_server._broadcast_buffer
+
+    def replay_size() -> int:
+        """Number of bytes that would be sent to a newly connected client."""
+        return sum(
+            len(message.serialize()) for message in buffer.message_from_id.values()
+        )
+
+    orig_replay_size = replay_size()
+    orig_handles = set(server.scene._handle_from_node_name.keys())
+
+    for i in range(20):
+        server.scene.add_frame("/robot")
+        for j in range(10):
+            link = server.scene.add_frame(f"/robot/link_{j}")
+            link.position = (float(i), float(j), 0.0)
+            server.scene.add_point_cloud(
+                f"/robot/link_{j}/points",
+                points=np.random.normal(size=(1000, 3)),
+                colors=(255, 0, 0),
+            )
+        # "detached" is an implicit node, without a handle of its own.
+        server.scene.add_label(f"/robot/link_0/detached/label_{i}", "label")
+        assert replay_size() > orig_replay_size
+
+        # Removing the parent should remove every descendant.
+        if i % 2 == 0:
+            server.scene.remove_by_name("/robot")
+        else:
+            server.scene._handle_from_node_name["/robot"].remove()
+        assert set(server.scene._handle_from_node_name.keys()) == orig_handles
+        assert replay_size() == orig_replay_size
+
+
+def test_remove_child_after_parent() -> None:
+    """Removing a node that was already removed along with its parent should
+    be a silent no-op."""
+
+    # Mock the client autobuild to avoid building the client.
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+
+    server = viser.ViserServer()
+    parent = server.scene.add_frame("/a")
+    child = server.scene.add_frame("/a/b")
+
+    parent.remove()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        child.remove()
+
+    # Removing a node twice should still warn.
+    with pytest.warns(UserWarning):
+        parent.remove()
@@ -0,0 +1,291 @@
+from typing import List, Tuple
+
+import numpy as np
+
+import viser
+import viser.transforms as tf
+from viser import _messages
+from viser._assignable_props_api import colors_to_uint8
+from viser._splat_compression import decode_splats
+from viser.infra import Message
+
+
+def _get_chunks(
+    server: viser.ViserServer,
+) -> List[_messages.GaussianSplatsChunkMessage]:
+    return [
+        m
+        for m in server._websock_server._broadcast_buffer.message_from_id.values()
+        if isinstance(m, _messages.GaussianSplatsChunkMessage)
+    ]
+
+
+def _record_messages(server: viser.ViserServer) -> List[Message]:
+    messages: List[Message] = []
+    queue_message = server._websock_server.queue_message
+
+    def record(message: Message) -> None:
+        messages.append(message)
+        queue_message(message)
+
+    server._websock_server.queue_message = record  # type: ignore
+    return messages
+
+
+def _compact(base: Message, messages: List[Message]) -> Message:
+    for message in messages:
+        compacted = message.compact_into(base)
+        assert compacted is not None
+        base = compacted
+    return base
+
+
+def _make_splats(
+    num_gaussians: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    centers = rng.uniform(-5.0, 5.0, size=(num_gaussians, 3))
+    rotations = tf.SO3.sample_uniform(rng, batch_axes=(num_gaussians,)).as_matrix()
+    scales = np.exp(rng.uniform(-5.0, -2.0, size=(num_gaussians, 3)))
+    covariances = np.einsum("nik,nk,njk->nij", rotations, scales**2, rotations)
+    rgbs = rng.uniform(size=(num_gaussians, 3))
+    opacities = rng.uniform(size=(num_gaussians, 1))
+    return centers, covariances, rgbs, opacities
+
+
+def test_compressed_splats_are_streamed_in_chunks(server: viser.ViserServer) -> None:
+    centers, covariances, rgbs, opacities = _make_splats(100_000)
+    handle = server.scene.add_gaussian_splats(
+        "/splats", centers, covariances, rgbs, opacities, compression="quantized"
+    )
+
+    # The creation message doesn't include any splats.
+    (message,) = [
+        m
+        for m in server._websock_server._broadcast_buffer.message_from_id.values()
+        if isinstance(m, _messages.GaussianSplatsMessage)
+    ]
+    assert message.props.buffer.shape == (0, 8)
+
+    # Splats are sent in chunks, which are about half the size of the
+    # uncompressed buffer.
+    chunks = _get_chunks(server)
+    assert [chunk.offset for chunk in chunks] == [0, 65536]
+    assert all(chunk.num_gaussians == 100_000 for chunk in chunks)
+    assert sum(len(chunk.serialize()) for chunk in chunks) < 100_000 * 16.5
+
+    # The handle contains the decoded splats, in their original order.
+    assert handle.buffer.shape == (100_000, 8)
+    decoded_centers = handle.buffer[:, 0:3].copy().view(np.float32)
+    np.testing.assert_allclose(decoded_centers, centers, atol=0.02)
+    cov_triu = handle.buffer[:, 4:7].copy().view(np.float16).astype(np.float64)
+    expected_triu = covariances.reshape((-1, 9))[:, np.array([0, 1, 2, 4, 5, 8])]
+    np.testing.assert_allclose(cov_triu, expected_triu, atol=1e-4)
+    rgbas = np.concatenate([colors_to_uint8(rgbs), colors_to_uint8(opacities)], axis=-1)
+    np.testing.assert_array_equal(handle.buffer[:, 7], rgbas.view(np.uint32)[:, 0])
+
+
+def test_assigned_splats_are_restreamed(server: viser.ViserServer) -> None:
+    centers, covariances, rgbs, opacities = _make_splats(1000)
+    handle = server.scene.add_gaussian_splats(
+        "/splats", centers, covariances, rgbs, opacities, compression="quantized"
+    )
+    (chunk,) = _get_chunks(server)
+
+    buffer = handle.buffer.copy()
+    buffer[:, 0:3] = (centers + 1.0).astype(np.float32).view(np.uint32)
+    handle.buffer = buffer
+
+    # The new chunk replaces the old one.
+    (new_chunk,) = _get_chunks(server)
+    assert new_chunk is not chunk
+    np.testing.assert_allclose(
+        handle.buffer[:, 0:3].copy().view(np.float32), centers + 1.0, atol=0.02
+    )
+
+
+def test_uncompressed_splats(server: viser.ViserServer) -> None:
+    centers, covariances, rgbs, opacities = _make_splats(1000)
+    handle = server.scene.add_gaussian_splats(
+        "/splats", centers, covariances, rgbs, opacities, compression="none"
+    )
+    assert len(_get_chunks(server)) == 0
+    np.testing.assert_array_equal(
+        handle.buffer[:, 0:3].copy().view(np.float32), centers.astype(np.float32)
+    )
+
+
+def test_partial_updates(server: viser.ViserServer) -> None:
+    centers, covariances, rgbs, opacities = _make_splats(1000)
+    handle = server.scene.add_gaussian_splats(
+        "/splats", centers, covariances, rgbs, opacities, compression="none"
+    )
+    (message,) = [
+        m
+        for m in server._websock_server._broadcast_buffer.message_from_id.values()
+        if isinstance(m, _messages.GaussianSplatsMessage)
+    ]
+    messages = _record_messages(server)
+
+    # Updating opacities only sends the RGBA word of each updated splat.
+    mask = np.arange(1000) % 3 == 0
+    handle.update(mask, opacities=np.zeros((mask.sum(), 1)))
+    # Consecutive rows are sent as a range.
+    handle.update(slice(10, 20), centers=np.zeros((10, 3)))
+    updates = [
+        m for m in messages if isinstance(m, _messages.GaussianSplatsUpdateMessage)
+    ]
+    assert len(updates) == len(messages) == 2
+    assert updates[0].indices is not None
+    assert updates[0].values.shape == (mask.sum(), 1)
+    assert updates[1].indices is None
+    assert updates[1].values.shape == (10, 3)
+
+    rgbas = handle.buffer[:, 7].copy().view(np.uint8).reshape((-1, 4))
+    np.testing.assert_array_equal(rgbas[mask, 3], 0)
+    np.testing.assert_array_equal(rgbas[:, :3], colors_to_uint8(rgbs))
+    np.testing.assert_array_equal(handle.buffer[10:20, 0:3], 0)
+
+    # Updates can be folded into the message that created the splats.
+    compacted = _compact(message, messages)
+    assert isinstance(compacted, _messages.GaussianSplatsMessage)
+    np.testing.assert_array_equal(compacted.props.buffer, handle.buffer)
+
+
+def test_append_and_prune(server: viser.ViserServer) -> None:
+    centers, covariances, rgbs, opacities = _make_splats(1000)
+    handle = server.scene.add_gaussian_splats(
+        "/splats",
+        centers[:800],
+        covariances[:800],
+        rgbs[:800],
+        opacities[:800],
+        compression="none",
+    )
+    (message,) = [
+        m
+        for m in server._websock_server._broadcast_buffer.message_from_id.values()
+        if isinstance(m, _messages.GaussianSplatsMessage)
+    ]
+    messages = _record_messages(server)
+    handle.append(centers[800:], covariances[800:], rgbs[800:], opacities[800:])
+    handle.prune(opacities[:, 0] < 0.5)
+    assert isinstance(messages[0], _messages.GaussianSplatsUpdateMessage)
+    assert isinstance(messages[1], _messages.GaussianSplatsPruneMessage)
+    assert messages[1].mask.nbytes == 125
+    compacted = _compact(message, list(messages))
+    assert isinstance(compacted, _messages.GaussianSplatsMessage)
+
+    expected = server.scene.add_gaussian_splats(
+        "/expected",
+        centers[opacities[:, 0] >= 0.5],
+        covariances[opacities[:, 0] >= 0.5],
+        rgbs[opacities[:, 0] >= 0.5],
+        opacities[opacities[:, 0] >= 0.5],
+        compression="none",
+    )
+    np.testing.assert_array_equal(handle.buffer, expected.buffer)
+    np.testing.assert_array_equal(compacted.props.buffer, expected.buffer)
+
+
+def _replay(messages: List[Message]) -> np.ndarray:
+    """Apply chunks, updates, and prunes to a splat buffer, like a client."""
+    buffer = np.zeros((0, 8), dtype=np.uint32)
+    for m in messages:
+        if isinstance(m, _messages.GaussianSplatsChunkMessage):
+            resized = np.zeros((m.num_gaussians, 8), dtype=np.uint32)
+            resized[: min(buffer.shape[0], m.num_gaussians)] = buffer[: m.num_gaussians]
+            buffer = resized
+            buffer[m.offset : m.offset + m.packed.shape[0]] = decode_splats(
+                m.bounds, m.packed
+            )
+        elif isinstance(m, _messages.GaussianSplatsUpdateMessage):
+            assert m.indices is not None and m.word_range == (0, 8)
+            buffer[m.indices] = m.values
+        elif isinstance(m, _messages.GaussianSplatsPruneMessage):
+            removed = np.unpackbits(m.mask, count=buffer.shape[0]).astype(bool)
+            buffer = buffer[~removed]
+    return buffer
+
+
+def _get_buffered(server: viser.ViserServer) -> List[Message]:
+    return list(server._websock_server._broadcast_buffer.message_from_id.values())
+
+
+def test_quantized_updates_send_rows(server: viser.ViserServer) -> None:
+    centers, covariances, rgbs, opacities = _make_splats(100_000)
+    handle = server.scene.add_gaussian_splats(
+        "/splats", centers, covariances, rgbs, opacities, compression="quantized"
+    )
+    assert handle._client_order is not None
+    num_chunk_messages = len(_get_buffered(server))
+
+    # Updated rows are sent uncompressed, in one message per chunk.
+    messages = _record_messages(server)
+    rows = handle._client_order[:100]
+    handle.update(rows, rgbs=np.zeros((100, 3)))
+    (update,) = messages
+    assert isinstance(update, _messages.GaussianSplatsUpdateMessage)
+    assert update.chunk_index == 0
+    assert update.values.shape == (100, 8)
+    rgbas = handle.buffer[:, 7].copy().view(np.uint8).reshape((-1, 4))
+    np.testing.assert_array_equal(rgbas[rows, :3], 0)
+
+    # Later updates to the chunk replace the earlier one in the buffer.
+    handle.update(handle._client_order[50:150], opacities=np.zeros((100, 1)))
+    assert len(_get_buffered(server)) == num_chunk_messages + 1
+    assert messages[-1].values.shape == (150, 8)  # type: ignore
+
+    # Chunks where many rows were updated are compressed and sent again.
+    handle.update(slice(0, 100_000, 2), opacities=np.ones((50_000, 1)))
+    assert all(
+        isinstance(m, _messages.GaussianSplatsChunkMessage) for m in messages[2:]
+    )
+    assert len(_get_buffered(server)) == num_chunk_messages
+    np.testing.assert_array_equal(
+        _replay(_get_buffered(server)), handle.buffer[handle._client_order]
+    )
+
+
+def test_quantized_append_and_prune(server: viser.ViserServer) -> None:
+    centers, covariances, rgbs, opacities = _make_splats(200_000)
+    handle = server.scene.add_gaussian_splats(
+        "/splats", centers, covariances, rgbs, opacities, compression="quantized"
+    )
+    assert handle._client_order is not None
+    handle.update(handle._client_order[10:20], rgbs=np.zeros((10, 3)))
+
+    # Appended splats are streamed in new chunks.
+    messages = _record_messages(server)
+    handle.append(centers[:10], covariances[:10], rgbs[:10], opacities[:10])
+    (chunk,) = messages
+    assert isinstance(chunk, _messages.GaussianSplatsChunkMessage)
+    assert (chunk.chunk_index, chunk.offset) == (4, 200_000)
+
+    # Pruning only sends a mask, in the order that clients store splats.
+    pruned = opacities[:, 0] < 0.3
+    handle.prune(np.concatenate([pruned, np.zeros(10, dtype=bool)]))
+    (prune,) = messages[1:]
+    assert isinstance(prune, _messages.GaussianSplatsPruneMessage)
+    assert prune.mask.nbytes == (200_010 + 7) // 8
+    assert handle.buffer.shape[0] == 200_010 - pruned.sum()
+
+    # Rows are updated and chunks are sent again in the new order. Clients
+    # that replay the buffer apply them after the prune.
+    assert handle._client_order is not None
+    handle.update(handle._client_order[:20], opacities=np.zeros((20, 1)))
+    handle.update(slice(0, 1000), centers=centers[:1000] + 1.0)
+    np.testing.assert_array_equal(
+        _replay(_get_buffered(server)), handle.buffer[handle._client_order]
+    )
+
+    # Chunks without splats left are removed from the buffer.
+    handle.prune(slice(-10, None))
+    assert all(
+        m.chunk_index != 4
+        for m in _get_buffered(server)
+        if isinstance(m, _messages.GaussianSplatsChunkMessage)
+    )
+    np.testing.assert_array_equal(
+        _replay(_get_buffered(server)), handle.buffer[handle._client_order]
+    )
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import msgspec
+import pytest
+import websockets
+
+import viser
+import viser._client_autobuild
+from viser._callback_scheduler import (
+    CallbackRateLimit,
+    CallbackScheduler,
+    CallbackStats,
+)
+
+
+def _make_scheduler() -> tuple[CallbackScheduler, ThreadPoolExecutor]:
+    thread_executor = ThreadPoolExecutor(max_workers=8)
+    return CallbackScheduler(thread_executor, asyncio.new_event_loop()), thread_executor
+
+
+def test_scheduler_runs_latest_event_once_at_a_time() -> None:
+    scheduler, thread_executor = _make_scheduler()
+    stats = CallbackStats()
+
+    lock = threading.Lock()
+    inflight = 0
+    max_inflight = 0
+    events = []
+
+    def slow_callback(event: int) -> None:
+        nonlocal inflight, max_inflight
+        with lock:
+            inflight += 1
+            max_inflight = max(max_inflight, inflight)
+        time.sleep(0.05)
+        with lock:
+            inflight -= 1
+            events.append(event)
+
+    for i in range(100):
+        scheduler.submit("key", slow_callback, i, stats)
+    time.sleep(0.3)
+    thread_executor.shutdown(wait=True)
+
+    assert max_inflight == 1
+    assert events == [0, 99]
+    assert stats == CallbackStats(num_invoked=2, num_dropped=98)
+
+
+def test_scheduler_throttle() -> None:
+    scheduler, thread_executor = _make_scheduler()
+    stats = CallbackStats()
+    rate_limit = CallbackRateLimit(throttle_hz=10.0)
+    events = []
+
+    # Submit events at ~200Hz for 0.5 seconds.
+    for i in range(100):
+        scheduler.submit("key", events.append, i, stats, rate_limit)
+        time.sleep(0.005)
+    time.sleep(0.2)
+    thread_executor.shutdown(wait=True)
+
+    assert 3 <= len(events) <= 9
+    assert events[0] == 0
+    assert events[-1] == 99
+    assert stats.num_invoked == len(events)
+    assert stats.num_dropped == 100 - len(events)
+
+
+def test_scheduler_debounce() -> None:
+    scheduler, thread_executor = _make_scheduler()
+    stats = CallbackStats()
+    rate_limit = CallbackRateLimit(debounce_sec=0.1)
+    events = []
+
+    for i in range(50):
+        scheduler.submit("key", events.append, i, stats, rate_limit)
+        time.sleep(0.002)
+    assert events == []
+    time.sleep(0.3)
+    thread_executor.shutdown(wait=True)
+
+    assert events == [49]
+    assert stats == CallbackStats(num_invoked=1, num_dropped=49)
+
+
+def test_scheduler_runs_every_event_without_coalescing() -> None:
+    scheduler, thread_executor = _make_scheduler()
+    stats = CallbackStats()
+    events = []
+    for i in range(20):
+        scheduler.submit("key", events.append, i, stats, coalesce=False)
+    thread_executor.shutdown(wait=True)
+    assert sorted(events) == list(range(20))
+    assert stats == CallbackStats(num_invoked=20, num_dropped=0)
+
+
+def test_scheduler_coalesces_async_callbacks() -> None:
+    """Async callbacks should be coalesced and throttled while they run in the
+    event loop."""
+    thread_executor = ThreadPoolExecutor(max_workers=8)
+    event_loop = asyncio.new_event_loop()
+    loop_thread = threading.Thread(target=event_loop.run_forever)
+    loop_thread.start()
+    scheduler = CallbackScheduler(thread_executor, event_loop)
+
+    inflight = 0
+    max_inflight = 0
+    events = []
+
+    async def slow_callback(event: int) -> None:
+        nonlocal inflight, max_inflight
+        inflight += 1
+        max_inflight = max(max_inflight, inflight)
+        await asyncio.sleep(0.05)
+        inflight -= 1
+        events.append(event)
+
+    stats = CallbackStats()
+    for i in range(100):
+        scheduler.submit("key", slow_callback, i, stats)
+    time.sleep(0.3)
+    assert max_inflight == 1
+    assert events == [0, 99]
+    assert stats == CallbackStats(num_invoked=2, num_dropped=98)
+
+    # Throttled async callbacks run at most `throttle_hz` times per second.
+    events.clear()
+    stats = CallbackStats()
+    for i in range(50):
+        scheduler.submit(
+            "throttled", slow_callback, i, stats, CallbackRateLimit(throttle_hz=5.0)
+        )
+        time.sleep(0.005)
+    time.sleep(0.5)
+    assert events[0] == 0
+    assert events[-1] == 49
+    assert 2 <= len(events) <= 8
+    assert stats.num_invoked == len(events)
+
+    event_loop.call_soon_threadsafe(event_loop.stop)
+    loop_thread.join()
+    event_loop.close()
+    thread_executor.shutdown(wait=True)
+
+
+def test_rate_limit_options() -> None:
+    with pytest.raises(ValueError):
+        CallbackRateLimit(throttle_hz=10.0, debounce_sec=0.1)
+
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+    server = viser.ViserServer(verbose=False)
+    slider = server.gui.add_slider(
+        "Slider", min=0.0, max=1.0, step=0.1, initial_value=0.0
+    )
+
+    @slider.on_update(throttle_hz=10.0)
+    def _(event: viser.GuiEvent) -> None: ...
+
+    @slider.on_update
+    def plain(event: viser.GuiEvent) -> None: ...
+
+    assert len(slider._impl.update_cb) == 2
+    assert slider._impl.rate_limit_from_cb == {_: CallbackRateLimit(throttle_hz=10.0)}
+    slider.remove_update_callback(_)
+    assert slider._impl.update_cb == [plain]
+    assert slider._impl.rate_limit_from_cb == {}
+    assert slider.callback_stats == viser.CallbackStats()
+    server.stop()
+
+
+def test_camera_messages_are_coalesced() -> None:
+    """Camera updates sent faster than a callback can handle them shouldn't
+    queue up: the callback should run a few times, ending with the newest
+    camera state."""
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+    server = viser.ViserServer(verbose=False)
+
+    positions = []
+    clients = []
+
+    @server.on_client_connect
+    def _(client: viser.ClientHandle) -> None:
+        clients.append(client)
+
+        @client.camera.on_update
+        def _(camera: viser.CameraHandle) -> None:
+            time.sleep(0.05)
+            positions.append(tuple(camera.position))
+
+    def camera_message(x: float) -> bytes:
+        return msgspec.msgpack.encode(
+            {
+                "type": "ViewerCameraMessage",
+                "wxyz": [1.0, 0.0, 0.0, 0.0],
+                "position": [x, 0.0, 0.0],
+                "fov": 1.0,
+                "near": 0.01,
+                "far": 1000.0,
+                "image_height": 480,
+                "image_width": 640,
+                "look_at": [0.0, 0.0, 0.0],
+                "up_direction": [0.0, 0.0, 1.0],
+            }
+        )
+
+    async def send_camera_messages() -> None:
+        async with websockets.connect(
+            f"ws://localhost:{server.get_port()}",
+            subprotocols=[websockets.Subprotocol(f"viser-v{viser.__version__}")],
+        ) as websocket:
+            for i in range(200):
+                await websocket.send(camera_message(float(i)))
+            await asyncio.sleep(1.0)
+
+    asyncio.run(send_camera_messages())
+    server.stop()
+    (client,) = clients
+
+    assert 1 <= len(positions) < 20
+    assert positions[-1] == (199.0, 0.0, 0.0)
+    assert client.camera.callback_stats.num_invoked == len(positions)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import viser
+
+
+def _add_cloud(server: viser.ViserServer, name: str, num_points: int = 100_000):
+    return server.scene.add_point_cloud(
+        name,
+        points=np.zeros((num_points, 3), dtype=np.float32),
+        colors=np.zeros((num_points, 3), dtype=np.uint8),
+        precision="float32",
+    )
+
+
+def test_memory_usage(server: viser.ViserServer) -> None:
+    cloud_bytes = 100_000 * (12 + 3)
+    initial = server.get_memory_usage()
+
+    handle = _add_cloud(server, "/clouds/a")
+    _add_cloud(server, "/clouds/b")
+    usage = server.get_memory_usage()
+    assert cloud_bytes * 2 <= usage.total_bytes - initial.total_bytes
+    assert usage.total_bytes - initial.total_bytes < cloud_bytes * 2 + 10_000
+    assert usage.bytes_from_message_type["PointCloudMessage"] >= cloud_bytes * 2
+    assert cloud_bytes <= usage.bytes_from_scene_node["/clouds/a"] < cloud_bytes * 2
+    assert usage.bytes_under("/clouds") == usage.bytes_under("/clouds/")
+    assert cloud_bytes * 2 <= usage.bytes_under("/clouds") < cloud_bytes * 3
+
+    # Updates are folded into the original message, so they shouldn't be
+    # counted twice.
+    handle.colors = np.full((100_000, 3), 255, dtype=np.uint8)
+    assert server.get_memory_usage().total_bytes == usage.total_bytes
+
+    # Re-adding a node with the same name replaces it.
+    _add_cloud(server, "/clouds/a")
+    assert server.get_memory_usage().total_bytes == usage.total_bytes
+
+    server.scene.remove_by_name("/clouds")
+    assert server.get_memory_usage().total_bytes == initial.total_bytes
+
+
+def test_memory_budget_error(server: viser.ViserServer) -> None:
+    server.set_memory_budget(server.get_memory_usage().total_bytes + 2_000_000)
+    _add_cloud(server, "/a")
+    with pytest.raises(RuntimeError):
+        _add_cloud(server, "/b")
+
+    # The failed node shouldn't have been added.
+    assert "/b" not in server.get_memory_usage().bytes_from_scene_node
+
+    # Replacing a node only needs room for the difference in size.
+    _add_cloud(server, "/a")
+    server.set_memory_budget(None)
+    _add_cloud(server, "/b")
+
+
+def test_memory_budget_eviction(server: viser.ViserServer) -> None:
+    server.set_memory_budget(
+        server.get_memory_usage().total_bytes + 5_000_000,
+        on_exceeded="evict_oldest",
+        evictable="/frames/*",
+    )
+    _add_cloud(server, "/keep")
+    for i in range(5):
+        _add_cloud(server, f"/frames/{i}")
+
+    # The oldest frames should be evicted, with their server-side handles.
+    nodes = server.get_memory_usage().bytes_from_scene_node
+    assert "/keep" in nodes
+    assert "/frames/3" in nodes and "/frames/4" in nodes
+    assert "/frames/0" not in nodes and "/frames/1" not in nodes
+    assert "/frames/0" not in server.scene._handle_from_node_name
+
+    # Nodes that don't match the pattern aren't evicted.
+    with pytest.raises(RuntimeError):
+        _add_cloud(server, "/other", num_points=1_000_000)
+    assert "/keep" in server.get_memory_usage().bytes_from_scene_node
@@ -0,0 +1,416 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import msgspec
+import numpy as np
+import pytest
+
+from viser import _messages
+from viser.infra._async_message_buffer import AsyncMessageBuffer
+
+
+def _make_point_cloud_message(name: str, num_points: int) -> _messages.Message:
+    return _messages.PointCloudMessage(
+        name=name,
+        props=_messages.PointCloudProps(
+            points=np.random.normal(size=(num_points, 3)).astype(np.float16),
+            colors=np.random.randint(0, 255, size=(num_points, 3), dtype=np.uint8),
+            scalars=None,
+            scalars_dtype="float32",
+            colormap="viridis",
+            colormap_lut=None,
+            scalar_range=(0.0, 1.0),
+            point_size=0.1,
+            point_shape="square",
+            precision="float16",
+            quantization=None,
+            max_points=None,
+        ),
+    )
+
+
+def _read_windows(
+    buffer: AsyncMessageBuffer, num_clients: int
+) -> list[list[bytes | memoryview]]:
+    """Read one window per client, and encode it the same way that
+    `_message_producer()` does."""
+
+    async def read_window(client_id: int) -> list[bytes | memoryview]:
+        window_generator = buffer.window_generator(client_id)
+        window = await window_generator.__anext__()
+        await window_generator.aclose()
+        return await buffer.encode_window(window)
+
+    async def read_all() -> list[list[bytes | memoryview]]:
+        return await asyncio.gather(*[read_window(i) for i in range(num_clients)])
+
+    return buffer.event_loop.run_until_complete(read_all())
+
+
+def test_broadcast_messages_are_encoded_once(monkeypatch) -> None:
+    """Each persistent message should be encoded once, regardless of how many
+    clients are reading from the buffer."""
+    encode_count = 0
+    orig_as_serializable_dict = _messages.Message.as_serializable_dict
+
+    def counting_as_serializable_dict(self):
+        nonlocal encode_count
+        encode_count += 1
+        return orig_as_serializable_dict(self)
+
+    monkeypatch.setattr(
+        _messages.Message, "as_serializable_dict", counting_as_serializable_dict
+    )
+
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=True)
+    for i in range(10):
+        buffer.push(_make_point_cloud_message(f"/points_{i}", 100))
+
+    windows = _read_windows(buffer, num_clients=20)
+    assert encode_count == 10
+    assert all(window == windows[0] for window in windows)
+
+    # Culled messages should also be dropped from the encoding cache.
+    buffer.push(_make_point_cloud_message("/points_0", 100))
+    assert len(buffer._encoded_from_id) == 9
+    event_loop.close()
+
+
+def test_encode_cache_respects_byte_budget() -> None:
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(
+        event_loop, persistent_messages=True, encode_cache_max_bytes=10_000
+    )
+    for i in range(10):
+        buffer.push(_make_point_cloud_message(f"/points_{i}", 500))
+    _read_windows(buffer, num_clients=2)
+    assert 0 < buffer._encoded_bytes <= 10_000
+    assert buffer._encoded_bytes == sum(map(len, buffer._encoded_from_id.values()))
+    event_loop.close()
+
+
+def test_large_messages_are_encoded_off_the_event_loop(monkeypatch) -> None:
+    """Large messages should be encoded once, in a worker thread, while small
+    messages are encoded inline. Windows should stay in order."""
+    thread_names = []
+    orig_as_serializable_dict = _messages.Message.as_serializable_dict
+
+    def recording_as_serializable_dict(self):
+        thread_names.append((self.name, threading.current_thread().name))
+        return orig_as_serializable_dict(self)
+
+    monkeypatch.setattr(
+        _messages.Message, "as_serializable_dict", recording_as_serializable_dict
+    )
+
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(
+        event_loop, persistent_messages=True, encode_in_thread_min_bytes=10_000
+    )
+    messages = [
+        _make_point_cloud_message("/small_0", 100),
+        _make_point_cloud_message("/large", 100_000),
+        _make_point_cloud_message("/small_1", 100),
+    ]
+    for message in messages:
+        buffer.push(message)
+
+    windows = _read_windows(buffer, num_clients=4)
+    assert all(window == windows[0] for window in windows)
+    assert isinstance(windows[0][1], memoryview)
+
+    thread_from_name = dict(thread_names)
+    assert len(thread_names) == 3
+    assert thread_from_name["/large"].startswith("viser-encode")
+    assert thread_from_name["/small_0"] == threading.current_thread().name
+
+    # Encodings from the worker thread should match the normal encoder.
+    assert [bytes(encoded) for encoded in windows[0]] == [
+        message.serialize() for message in messages
+    ]
+    packed = event_loop.run_until_complete(buffer.pack_window(windows[0]))
+    assert bytes(packed) == msgspec.msgpack.encode(
+        tuple(msgspec.Raw(message.serialize()) for message in messages)
+    )
+
+    assert len(buffer._encode_future_from_id) == 0
+    event_loop.close()
+
+
+def test_encode_cost_per_client(monkeypatch) -> None:
+    """With a shared encoding cache, the total encoding cost shouldn't depend
+    on the number of clients, so the cost per client goes down as the number
+    of clients goes up. This includes large messages, which are encoded in a
+    worker thread."""
+    encode_count = 0
+    orig_as_serializable_dict = _messages.Message.as_serializable_dict
+
+    def counting_as_serializable_dict(self):
+        nonlocal encode_count
+        encode_count += 1
+        return orig_as_serializable_dict(self)
+
+    monkeypatch.setattr(
+        _messages.Message, "as_serializable_dict", counting_as_serializable_dict
+    )
+
+    for num_clients in (1, 4, 16):
+        event_loop = asyncio.new_event_loop()
+        buffer = AsyncMessageBuffer(event_loop, persistent_messages=True)
+        for i in range(4):
+            buffer.push(_make_point_cloud_message(f"/points_{i}", 200_000))
+
+        encode_count = 0
+        windows = _read_windows(buffer, num_clients)
+        assert encode_count == 4
+        assert len(buffer._encoded_from_id) == 4
+        assert all(window == windows[0] for window in windows)
+        event_loop.close()
+
+
+def test_adaptive_windowing_for_slow_clients() -> None:
+    """Windows should get larger and less frequent for clients that can't keep
+    up, and redundant messages should be coalesced in the meantime."""
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=False)
+
+    async def slow_client() -> list:
+        window_generator = buffer.window_generator(0)
+        sent_windows = []
+        for _ in range(5):
+            window = await window_generator.__anext__()
+            sent_windows.append(window)
+
+            # While the slow client is "sending", a fast producer keeps updating
+            # the same scene node.
+            for i in range(100):
+                buffer.push(_messages.SetPositionMessage("/node", (i, 0.0, 0.0)))
+            await asyncio.sleep(0.1)
+
+        stats = buffer.get_client_stats(0)
+        assert stats is not None
+        assert stats.send_latency_sec > buffer.window_duration_sec
+        assert stats.window_duration_sec > buffer.window_duration_sec
+        assert stats.window_size > buffer.max_window_size
+        assert stats.queue_depth == 1
+        assert stats.lag_sec > 0.0
+        await window_generator.aclose()
+        return sent_windows
+
+    buffer.push(_messages.SetPositionMessage("/node", (0.0, 0.0, 0.0)))
+    sent_windows = event_loop.run_until_complete(slow_client())
+
+    # Each window should only contain the latest position.
+    assert all(len(window) == 1 for window in sent_windows)
+    assert buffer.get_client_stats(0) is None
+    event_loop.close()
+
+
+def test_removal_drops_dependent_messages() -> None:
+    """Removing a scene node should drop its buffered messages. The removal
+    itself should be kept until every connected client has sent it."""
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=True)
+
+    async def connected_client() -> list:
+        window_generator = buffer.window_generator(0)
+        buffer.push(_make_point_cloud_message("/points", 10))
+        first_window = await window_generator.__anext__()
+
+        buffer.push(_messages.SetPositionMessage("/points", (1.0, 0.0, 0.0)))
+        buffer.push(_messages.SetSceneNodeVisibilityMessage("/points", False))
+        buffer.push(_messages.RemoveSceneNodeMessage("/points"))
+
+        # Only the removal should be left, and it should wait for our client.
+        assert [type(m) for m in buffer.message_from_id.values()] == [
+            _messages.RemoveSceneNodeMessage
+        ]
+        second_window = await window_generator.__anext__()
+        await window_generator.aclose()
+        return [first_window, second_window]
+
+    windows = event_loop.run_until_complete(connected_client())
+    assert [type(m) for _, m in windows[0]] == [_messages.PointCloudMessage]
+    assert [type(m) for _, m in windows[1]] == [_messages.RemoveSceneNodeMessage]
+    assert len(buffer.message_from_id) == 0
+    assert len(buffer.id_from_redundancy_key) == 0
+    assert len(buffer._ids_from_dependency_key) == 0
+
+    # With no clients connected, removals don't need to be persisted at all.
+    buffer.push(_messages.SetPositionMessage("/frame", (0.0, 0.0, 0.0)))
+    buffer.push(_messages.RemoveSceneNodeMessage("/frame"))
+    assert len(buffer.message_from_id) == 0
+    event_loop.close()
+
+
+def test_updates_are_compacted_for_new_clients() -> None:
+    """Props updates should be folded into creation messages once every
+    connected client has received them."""
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=True)
+
+    async def connected_client() -> None:
+        window_generator = buffer.window_generator(0)
+        buffer.push(_make_point_cloud_message("/points", 10))
+        await window_generator.__anext__()
+
+        new_points = np.zeros((10, 3), dtype=np.float16)
+        buffer.push(_messages.SceneNodeUpdateMessage("/points", {"points": new_points}))
+        buffer.push(_messages.SceneNodeUpdateMessage("/points", {"point_size": 0.5}))
+
+        # The connected client hasn't received the updates yet.
+        assert len(buffer.message_from_id) == 3
+        window = await window_generator.__anext__()
+        assert [type(m) for _, m in window] == [_messages.SceneNodeUpdateMessage] * 2
+
+        # After they're sent, the updates should be folded into the creation
+        # message.
+        await window_generator.aclose()
+        buffer.push(_messages.SetPositionMessage("/points", (1.0, 0.0, 0.0)))
+        assert [type(m) for m in buffer.message_from_id.values()] == [
+            _messages.PointCloudMessage,
+            _messages.SetPositionMessage,
+        ]
+        (message, _) = buffer.message_from_id.values()
+        assert isinstance(message, _messages.PointCloudMessage)
+        assert message.props.points is new_points
+        assert message.props.point_size == 0.5
+
+    event_loop.run_until_complete(connected_client())
+    event_loop.close()
+
+
+def test_new_clients_receive_one_bulk_window() -> None:
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=True)
+    for i in range(buffer.max_window_size * 4):
+        buffer.push(_messages.SetPositionMessage(f"/node_{i}", (0.0, 0.0, 0.0)))
+    for i in range(100):
+        buffer.push(_messages.SetPositionMessage("/node_0", (float(i), 0.0, 0.0)))
+
+    (window,) = _read_windows(buffer, num_clients=1)
+    assert len(window) == buffer.max_window_size * 4
+    event_loop.close()
+
+
+def test_push_wakeups_are_coalesced() -> None:
+    """Pushing many messages shouldn't schedule more than one pending wakeup
+    on the event loop."""
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=True)
+
+    scheduled = 0
+    orig_call_soon_threadsafe = event_loop.call_soon_threadsafe
+
+    def counting_call_soon_threadsafe(*args):
+        nonlocal scheduled
+        scheduled += 1
+        return orig_call_soon_threadsafe(*args)
+
+    event_loop.call_soon_threadsafe = counting_call_soon_threadsafe  # type: ignore
+    for i in range(10_000):
+        buffer.push(_messages.SetPositionMessage(f"/node_{i % 100}", (i, 0.0, 0.0)))
+    assert scheduled == 1
+
+    # Once the pending wakeup runs, the next push should schedule a new one.
+    event_loop.run_until_complete(asyncio.sleep(0))
+    assert buffer.message_event.is_set()
+    buffer.push(_messages.SetPositionMessage("/node_0", (0.0, 0.0, 0.0)))
+    assert scheduled == 2
+    event_loop.close()
+
+
+def test_atomic_blocks_are_not_split_between_windows() -> None:
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=False)
+    buffer.max_window_size = 4
+    buffer.push(_messages.SetPositionMessage("/before", (0.0, 0.0, 0.0)))
+    buffer.atomic_start()
+    for i in range(10):
+        buffer.push(_messages.SetPositionMessage(f"/node_{i}", (i, 0.0, 0.0)))
+    buffer.atomic_end()
+    buffer.push(_messages.SetPositionMessage("/after", (0.0, 0.0, 0.0)))
+
+    (window,) = _read_windows(buffer, num_clients=1)
+    assert len(window) == 11
+    event_loop.close()
+
+
+def test_failed_wakeup_is_not_pending() -> None:
+    """If a wakeup can't be scheduled, later pushes should try again."""
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=True)
+    event_loop.close()
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            buffer.push(_messages.SetPositionMessage("/node_0", (0.0, 0.0, 0.0)))
+        assert not buffer._wakeup_pending
+
+
+def test_concurrent_pushes() -> None:
+    """Pushes from multiple producer threads shouldn't be lost."""
+    num_pushes = 48_000
+    for num_threads in (1, 4, 16):
+        event_loop = asyncio.new_event_loop()
+        buffer = AsyncMessageBuffer(event_loop, persistent_messages=True)
+
+        def producer(thread_index: int) -> None:
+            for i in range(num_pushes // num_threads):
+                buffer.push(
+                    _messages.SetPositionMessage(
+                        f"/node_{thread_index}_{i % 100}", (i, 0.0, 0.0)
+                    )
+                )
+
+        threads = [
+            threading.Thread(target=producer, args=(i,)) for i in range(num_threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert buffer.message_counter == num_pushes
+        assert len(buffer.message_from_id) == 100 * num_threads
+        event_loop.close()
+
+
+@pytest.mark.benchmark
+def test_benchmark_push_throughput() -> None:
+    """Benchmark: push throughput from multiple producer threads. Skipped unless
+    pytest is run with `--benchmarks`."""
+    num_pushes = 48_000
+    throughputs = {}
+    for num_threads in (1, 4, 16):
+        event_loop = asyncio.new_event_loop()
+        buffer = AsyncMessageBuffer(event_loop, persistent_messages=True)
+
+        def producer(thread_index: int) -> None:
+            for i in range(num_pushes // num_threads):
+                buffer.push(
+                    _messages.SetPositionMessage(
+                        f"/node_{thread_index}_{i % 100}", (i, 0.0, 0.0)
+                    )
+                )
+
+        threads = [
+            threading.Thread(target=producer, args=(i,)) for i in range(num_threads)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        throughputs[num_threads] = num_pushes / (time.perf_counter() - start)
+
+        assert buffer.message_counter == num_pushes
+        event_loop.close()
+
+    print(
+        "Push throughput: "
+        + ", ".join(f"{n} threads: {t:.0f} msg/s" for n, t in throughputs.items())
+    )
@@ -0,0 +1,256 @@
+import msgspec
+import numpy as np
+import pytest
+
+from viser import _messages
+from viser.infra import _messages as infra_messages
+from viser.infra._messages import (
+    _get_typed_decoder,
+    _is_natively_encodable,
+    _prepare_for_deserialization,
+    _prepare_for_serialization,
+    get_type_hints_cached,
+)
+
+
+def _serialize_reference(message: _messages.Message) -> bytes:
+    """Serialize a message by recursively preparing every field."""
+    hints = get_type_hints_cached(type(message))
+    out = {k: _prepare_for_serialization(v, hints[k]) for k, v in vars(message).items()}
+    out["type"] = type(message).__name__
+    return msgspec.msgpack.encode(out)
+
+
+def _make_messages() -> list:
+    num_points = 1000
+    points = np.random.normal(size=(num_points, 3))
+    mesh_props = _messages.MeshProps(
+        vertices=np.random.normal(size=(10, 3)).astype(np.float32),
+        vertices_quantization=None,
+        faces=np.random.randint(0, 10, size=(5, 3)).astype(np.uint32),
+        color=(90, 200, 255),
+        wireframe=False,
+        opacity=None,
+        flat_shading=False,
+        side="front",
+        material="standard",
+        cast_shadow=True,
+        receive_shadow=True,
+    )
+    return [
+        _messages.PointCloudMessage(
+            "/points",
+            _messages.PointCloudProps(
+                points=points.astype(np.float32),
+                colors=np.zeros((num_points, 3), dtype=np.uint8),
+                scalars=np.zeros((num_points,), dtype=np.float16),
+                scalars_dtype="float16",
+                colormap="turbo",
+                colormap_lut=None,
+                scalar_range=(-1.0, 1.0),
+                point_size=0.1,
+                point_shape="square",
+                precision="float32",
+                quantization=None,
+                max_points=None,
+            ),
+        ),
+        _messages.PointCloudMessage(
+            "/points_strided",
+            _messages.PointCloudProps(
+                # Non-contiguous array.
+                points=np.asfortranarray(points.astype(np.float16)),
+                colors=np.zeros((3,), dtype=np.uint8),
+                scalars=None,
+                scalars_dtype="float32",
+                colormap="viridis",
+                colormap_lut=np.zeros((4, 3), dtype=np.uint8),
+                scalar_range=(0.0, 3.0),
+                point_size=0.1,
+                point_shape="circle",
+                precision="float16",
+                quantization=None,
+                max_points=None,
+            ),
+        ),
+        _messages.MeshMessage("/mesh", mesh_props),
+        _messages.BatchedMeshesMessage(
+            "/batched",
+            _messages.BatchedMeshesProps(
+                **vars(mesh_props),
+                batched_wxyzs=np.zeros((4, 4), dtype=np.float32),
+                batched_positions=np.zeros((4, 3), dtype=np.float32),
+                batched_scales=None,
+                lod="auto",
+            ),
+        ),
+        _messages.GaussianSplatsMessage(
+            "/splats",
+            _messages.GaussianSplatsProps(
+                buffer=np.random.randint(0, 2**32, size=(100, 8), dtype=np.uint32)
+            ),
+        ),
+        _messages.GaussianSplatsChunkMessage(
+            "/splats",
+            0,
+            0,
+            300,
+            np.random.normal(size=(2, 12)).astype(np.float32),
+            np.random.randint(0, 2**32, size=(300, 4), dtype=np.uint32),
+        ),
+        _messages.GaussianSplatsUpdateMessage(
+            "/splats",
+            100,
+            0,
+            np.arange(0, 100, 2, dtype=np.uint32),
+            (7, 8),
+            np.random.randint(0, 2**32, size=(50, 1), dtype=np.uint32),
+        ),
+        _messages.GaussianSplatsPruneMessage(
+            "/splats", np.packbits(np.arange(100) % 2 == 0)
+        ),
+        _messages.SceneNodeUpdateMessage("/points", {"points": points[::2]}),
+        _messages.PointCloudAppendMessage(
+            "/points", 100, points[:10].astype(np.float32), None, None
+        ),
+        _messages.PointCloudAppendMessage(
+            "/points",
+            0,
+            points[:10].astype(np.float16),
+            np.zeros((10, 3), dtype=np.uint8),
+            np.arange(10, dtype=np.uint16),
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "props_cls",
+    [
+        _messages.PointCloudProps,
+        _messages.MeshProps,
+        _messages.GaussianSplatsProps,
+        _messages.BatchedMeshesProps,
+    ],
+)
+def test_props_are_natively_encodable(props_cls: type) -> None:
+    assert _is_natively_encodable(props_cls)
+
+
+def test_serialize_matches_reference() -> None:
+    for message in _make_messages():
+        assert msgspec.msgpack.decode(message.serialize()) == msgspec.msgpack.decode(
+            _serialize_reference(message)
+        )
+
+
+def _lists_to_tuples(obj):
+    if isinstance(obj, list):
+        return tuple(map(_lists_to_tuples, obj))
+    return obj
+
+
+def _deserialize_reference(raw: bytes) -> _messages.Message:
+    """Deserialize a message via the generic, untyped path."""
+    mapping = msgspec.msgpack.decode(raw)
+    message_type = _messages.Message._subclass_from_type_string()[mapping.pop("type")]
+    hints = get_type_hints_cached(message_type)
+    message = message_type(
+        **{
+            k: _prepare_for_deserialization(_lists_to_tuples(v), hints[k])
+            for k, v in mapping.items()
+        }
+    )
+    assert isinstance(message, _messages.Message)
+    return message
+
+
+def _make_incoming_messages() -> list:
+    # Incoming messages are encoded by the client, which doesn't distinguish
+    # between integers and floats.
+    return [
+        {
+            "type": "ViewerCameraMessage",
+            "wxyz": [1, 0, 0, 0],
+            "position": [0.5, 0, 2],
+            "fov": 1,
+            "near": 0.01,
+            "far": 1000,
+            "image_height": 480,
+            "image_width": 640,
+            "look_at": [0, 0, 0],
+            "up_direction": [0, 0, 1],
+        },
+        {
+            "type": "TransformControlsUpdateMessage",
+            "name": "/controls",
+            "wxyz": [1, 0, 0, 0],
+            "position": [1, 2.5, 3],
+        },
+        {
+            "type": "ScenePointerMessage",
+            "event_type": "rect-select",
+            "ray_origin": None,
+            "ray_direction": None,
+            "screen_pos": [[0, 0.5], [1, 1]],
+        },
+    ]
+
+
+def test_incoming_messages_use_typed_decoders() -> None:
+    for mapping in _make_incoming_messages():
+        message_type = _messages.Message._subclass_from_type_string()[mapping["type"]]
+        assert _get_typed_decoder(message_type) is not None
+
+        raw = msgspec.msgpack.encode(mapping)
+        message = _messages.Message.deserialize(raw)
+        assert message == _deserialize_reference(raw)
+        for value in vars(message).values():
+            assert not isinstance(value, list)
+        if isinstance(message, _messages.ViewerCameraMessage):
+            assert isinstance(message.fov, float)
+            assert all(isinstance(x, float) for x in message.wxyz)
+
+    # Messages with `Any` annotations fall back to the generic path.
+    assert _get_typed_decoder(_messages.GuiUpdateMessage) is None
+    message = _messages.Message.deserialize(
+        msgspec.msgpack.encode(
+            {"type": "GuiUpdateMessage", "uuid": "a", "updates": {"value": [1, 2]}}
+        )
+    )
+    assert message == _messages.GuiUpdateMessage("a", {"value": (1, 2)})
+
+
+def test_typed_decoders_fall_back_on_mismatch() -> None:
+    """Values that don't match the annotations should still be decoded by the
+    more lenient generic path."""
+    mapping = _make_incoming_messages()[1]
+    mapping["position"] = [1, 2, 3, 4]
+    with pytest.warns(UserWarning):
+        message = _messages.Message.deserialize(msgspec.msgpack.encode(mapping))
+    assert isinstance(message, _messages.TransformControlsUpdateMessage)
+    assert message.position == (1, 2, 3, 4)
+
+
+def test_typed_decoding_skips_generic_path(monkeypatch) -> None:
+    """Typed decoders should be built once per message type, and messages that
+    match their annotations shouldn't go through the recursive generic path."""
+    prepare_count = 0
+
+    def counting_prepare_for_deserialization(value, annotation):
+        nonlocal prepare_count
+        prepare_count += 1
+        return _prepare_for_deserialization(value, annotation)
+
+    monkeypatch.setattr(
+        infra_messages,
+        "_prepare_for_deserialization",
+        counting_prepare_for_deserialization,
+    )
+
+    raw = msgspec.msgpack.encode(_make_incoming_messages()[0])
+    _messages.Message.deserialize(raw)
+    num_decoders_built = _get_typed_decoder.cache_info().misses
+    for _ in range(100):
+        _messages.Message.deserialize(raw)
+    assert _get_typed_decoder.cache_info().misses == num_decoders_built
+    assert prepare_count == 0
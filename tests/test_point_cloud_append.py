@@ -0,0 +1,137 @@
+from typing import List
+
+import numpy as np
+import pytest
+
+import viser
+from viser import _messages
+from viser.infra import Message
+
+
+def _record_messages(server: viser.ViserServer) -> List[Message]:
+    messages: List[Message] = []
+    queue_message = server._websock_server.queue_message
+
+    def record(message: Message) -> None:
+        messages.append(message)
+        queue_message(message)
+
+    server._websock_server.queue_message = record  # type: ignore
+    return messages
+
+
+def _get_creation_message(server: viser.ViserServer) -> _messages.PointCloudMessage:
+    (message,) = [
+        m
+        for m in server._websock_server._broadcast_buffer.message_from_id.values()
+        if isinstance(m, _messages.PointCloudMessage)
+    ]
+    return message
+
+
+def test_append_sends_only_new_points(server: viser.ViserServer) -> None:
+    handle = server.scene.add_point_cloud(
+        "/points",
+        points=np.random.normal(size=(100_000, 3)),
+        colors=np.zeros((100_000, 3), dtype=np.uint8),
+        precision="float32",
+        max_points=200_000,
+    )
+    messages = _record_messages(server)
+
+    new_points = np.random.normal(size=(1000, 3)).astype(np.float32)
+    handle.append(new_points, colors=(1.0, 0.0, 0.0))
+    (message,) = messages
+    assert isinstance(message, _messages.PointCloudAppendMessage)
+    assert message.offset == 100_000
+    assert len(message.serialize()) < 1000 * (12 + 3) + 1000
+
+    assert handle.points.shape == (101_000, 3)
+    np.testing.assert_array_equal(handle.points[100_000:], new_points)
+    assert np.all(handle.colors[100_000:] == (255, 0, 0))
+    assert not handle._impl.props.points.flags.writeable
+
+    # The persisted message is updated, so new clients get every point.
+    np.testing.assert_array_equal(
+        _get_creation_message(server).props.points, handle.points
+    )
+
+
+def test_append_wraps_around(server: viser.ViserServer) -> None:
+    handle = server.scene.add_point_cloud(
+        "/points",
+        points=np.zeros((0, 3)),
+        colors=(0, 0, 255),
+        precision="float32",
+        max_points=10,
+    )
+    messages = _record_messages(server)
+    for i in range(4):
+        handle.append(np.full((4, 3), i))
+
+    # Once the point cloud is full, the oldest points are overwritten.
+    assert [m.offset for m in messages] == [0, 4, 8, 0, 2]  # type: ignore
+    np.testing.assert_array_equal(handle.points[:, 0], [2, 2, 3, 3, 3, 3, 1, 1, 2, 2])
+    np.testing.assert_array_equal(
+        _get_creation_message(server).props.points, handle.points
+    )
+
+    # Points that would immediately be overwritten aren't sent.
+    messages.clear()
+    handle.append(np.arange(25 * 3).reshape((25, 3)))
+    assert sum(m.points.shape[0] for m in messages) == 10  # type: ignore
+    np.testing.assert_array_equal(np.sort(handle.points[:, 0]), np.arange(15, 25) * 3)
+
+
+def test_append_errors(server: viser.ViserServer) -> None:
+    handle = server.scene.add_point_cloud(
+        "/points", points=np.zeros((10, 3)), colors=(255, 0, 0)
+    )
+    with pytest.raises(ValueError):
+        handle.append(np.zeros((10, 3)))
+
+    handle = server.scene.add_point_cloud(
+        "/points", points=np.zeros((10, 3)), colors=(255, 0, 0), max_points=100
+    )
+    with pytest.raises(ValueError):
+        handle.append(np.zeros((10, 3)), colors=np.zeros((10, 3)))
+
+
+def test_append_writes_in_place(server: viser.ViserServer) -> None:
+    handle = server.scene.add_point_cloud(
+        "/points",
+        points=np.zeros((0, 3)),
+        colors=np.zeros((0, 3), dtype=np.uint8),
+        precision="float32",
+        max_points=1000,
+    )
+
+    # Both the handle and the compacted creation message write appended points
+    # into buffers with `max_points` rows, instead of copying every time.
+    handle.append(np.zeros((100, 3)), colors=(0, 0, 0))
+    handle_buffer = handle._impl.props.points.base
+    message_buffer = _get_creation_message(server).props.points.base
+    assert handle_buffer is not None and handle_buffer.shape == (1000, 3)
+    assert message_buffer is not None and message_buffer.shape == (1000, 3)
+    for i in range(1, 10):
+        handle.append(np.full((100, 3), i), colors=(i, i, i))
+        assert handle._impl.props.points.base is handle_buffer
+        assert _get_creation_message(server).props.points.base is message_buffer
+
+    # Points that were already sent are overwritten in place too. Encodings,
+    # which may be shared with the asset store, get a copy of the points.
+    encoded = _get_creation_message(server).serialize()
+    handle.append(np.full((100, 3), 10.0), colors=(10, 10, 10))
+    assert handle._impl.props.points.base is handle_buffer
+    assert _get_creation_message(server).props.points.base is message_buffer
+    decoded = _messages.Message.deserialize(encoded)
+    assert isinstance(decoded, _messages.PointCloudMessage)
+    points = np.frombuffer(decoded.props["points"], np.float32)
+    assert np.all(points.reshape(-1, 3)[:100] == 0.0)
+    np.testing.assert_array_equal(
+        _get_creation_message(server).props.points, handle.points
+    )
+    np.testing.assert_array_equal(
+        _get_creation_message(server).props.colors, handle.colors
+    )
+    assert np.all(handle.points[:100] == 10.0)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import msgspec
+import numpy as np
+import websockets
+
+import viser
+import viser._client_autobuild
+from viser._point_cloud_octree import PointCloudOctree
+
+
+def _make_points(num_points: int) -> np.ndarray:
+    return np.random.uniform(-10.0, 10.0, size=(num_points, 3)).astype(np.float32)
+
+
+def test_octree_nodes() -> None:
+    points = _make_points(200_000)
+    colors = np.random.randint(0, 255, size=points.shape, dtype=np.uint8)
+    octree = PointCloudOctree(points, colors, max_points_per_node=5_000)
+
+    # Every point should be stored by exactly one node, inside of its cell.
+    slices = [octree.get_slice(key) for key in octree.keys()]
+    assert sum(s.stop - s.start for s in slices) == points.shape[0]
+    assert max(s.stop - s.start for s in slices) <= 5_000
+    np.testing.assert_array_equal(
+        np.sort(octree.points.view(np.uint32), axis=None),
+        np.sort(points.view(np.uint32), axis=None),
+    )
+    for key in octree.keys():
+        center, radius = octree.get_bounding_sphere(key)
+        node_points = octree.points[octree.get_slice(key)]
+        assert np.all(np.linalg.norm(node_points - center, axis=-1) <= radius * 1.001)
+        for child in octree.get_children(key):
+            assert child[0] == key[0] + 1
+
+
+def test_octree_selection() -> None:
+    octree = PointCloudOctree(_make_points(500_000), np.zeros(3), 5_000)
+
+    def select(position: tuple[float, float, float], point_budget: int):
+        # Camera looking along +Z in the local frame.
+        return octree.select(
+            np.eye(3),
+            -np.array(position),
+            fov=1.0,
+            aspect=1.0,
+            image_height=1000,
+            point_budget=point_budget,
+        )
+
+    # Far away, the whole cloud is small on screen.
+    assert select((0.0, 0.0, -1e5), point_budget=100_000) == [(0, 0, 0, 0)]
+
+    # Close up, nodes in front of the camera are refined, and nodes behind it
+    # are culled.
+    near = select((0.0, 0.0, 0.0), point_budget=100_000)
+    assert max(key[0] for key in near) >= 2
+    assert sum(s.stop - s.start for s in map(octree.get_slice, near)) <= 100_000
+    for key in near[1:]:
+        center, radius = octree.get_bounding_sphere(key)
+        assert center[2] > -radius
+
+    # Selections are closed under taking parents, so refinement is additive.
+    keys = set(near)
+    for depth, x, y, z in near:
+        if depth > 0:
+            assert (depth - 1, x // 2, y // 2, z // 2) in keys
+
+
+def test_point_cloud_lod_streaming() -> None:
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+    server = viser.ViserServer(verbose=False)
+    handle = server.scene.add_point_cloud_lod(
+        "/map",
+        points=_make_points(500_000),
+        colors=(255, 0, 0),
+        point_budget=100_000,
+        max_points_per_node=5_000,
+        throttle_hz=100.0,
+    )
+
+    def camera_message(position: list[float], wxyz: list[float]) -> bytes:
+        return msgspec.msgpack.encode(
+            {
+                "type": "ViewerCameraMessage",
+                "wxyz": wxyz,
+                "position": position,
+                "fov": 1.0,
+                "near": 0.01,
+                "far": 1000.0,
+                "image_height": 480,
+                "image_width": 640,
+                "look_at": [0.0, 0.0, 0.0],
+                "up_direction": [0.0, 0.0, 1.0],
+            }
+        )
+
+    async def receive(websocket, duration_sec: float) -> list[dict]:
+        messages = []
+        end_time = time.time() + duration_sec
+        try:
+            while True:
+                frame = await asyncio.wait_for(
+                    websocket.recv(), max(end_time - time.time(), 0.01)
+                )
+                messages.extend(msgspec.msgpack.decode(frame))
+        except asyncio.TimeoutError:
+            pass
+        return messages
+
+    async def run() -> tuple[list[dict], list[dict]]:
+        async with websockets.connect(
+            f"ws://localhost:{server.get_port()}",
+            subprotocols=[websockets.Subprotocol(f"viser-v{viser.__version__}")],
+            max_size=None,
+        ) as websocket:
+            # Camera inside of the cloud, looking along +Z.
+            await websocket.send(camera_message([0.0, 0.0, -5.0], [1.0, 0, 0, 0]))
+            first = await receive(websocket, 1.0)
+            # Turn around, to look along -Z.
+            await websocket.send(camera_message([0.0, 0.0, -5.0], [0.0, 1.0, 0, 0]))
+            second = await receive(websocket, 1.0)
+            return first, second
+
+    first, second = asyncio.run(run())
+    added = [m for m in first if m["type"] == "PointCloudMessage"]
+    assert len(added) > 1
+    assert all(m["name"].startswith("/map/lod_") for m in added)
+    num_points = sum(len(m["props"]["points"]) // 12 for m in added)
+    assert num_points <= 100_000
+
+    # Turning around should remove nodes that are out of view, and add new
+    # ones.
+    assert any(m["type"] == "RemoveSceneNodeMessage" for m in second)
+    assert any(m["type"] == "PointCloudMessage" for m in second)
+
+    # Disconnected clients are dropped, and removing the handle should stop
+    # streaming to new clients.
+    deadline = time.time() + 2.0
+    while len(handle._lod.nodes_from_client_id) > 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert handle._lod.nodes_from_client_id == {}
+    handle.remove()
+    assert handle._lod.nodes_from_client_id == {}
+    assert handle._attach_client not in server._client_connect_cb
+    server.stop()
@@ -0,0 +1,115 @@
+from typing import List
+
+import numpy as np
+import pytest
+
+import viser
+from viser import _messages
+from viser.infra import Message
+
+
+def _record_messages(server: viser.ViserServer) -> List[Message]:
+    messages: List[Message] = []
+    queue_message = server._websock_server.queue_message
+
+    def record(message: Message) -> None:
+        messages.append(message)
+        queue_message(message)
+
+    server._websock_server.queue_message = record  # type: ignore
+    return messages
+
+
+def test_scalars_are_sent_instead_of_colors(server: viser.ViserServer) -> None:
+    intensities = np.random.uniform(10.0, 20.0, size=(10_000,))
+    handle = server.scene.add_point_cloud(
+        "/points",
+        points=np.random.normal(size=(10_000, 3)),
+        scalars=intensities.astype(np.float16),
+        colormap="turbo",
+    )
+    assert handle.scalars is not None
+    assert handle.scalars.dtype == np.float16
+    assert handle.scalars_dtype == "float16"
+    assert handle.colors.shape == (3,)
+    np.testing.assert_allclose(handle.scalar_range, (10.0, 20.0), atol=1e-2)
+
+    # Changing the colormap or range doesn't resend per-point data.
+    messages = _record_messages(server)
+    handle.colormap = "gray"
+    handle.scalar_range = (0.0, 100.0)
+    assert all(isinstance(m, _messages.SceneNodeUpdateMessage) for m in messages)
+    assert sum(len(m.serialize()) for m in messages) < 200
+
+    # Assigned scalars can change dtype.
+    handle.scalars = (np.arange(10_000) % 300).astype(np.uint16)
+    assert handle.scalars is not None
+    assert handle.scalars.dtype == np.uint16
+    assert handle.scalars_dtype == "uint16"
+    handle.scalars = None
+    assert handle.scalars is None
+
+    with pytest.raises(ValueError):
+        server.scene.add_point_cloud("/empty", points=np.zeros((10, 3)))
+
+
+def test_label_range_defaults_to_colormap_size(server: viser.ViserServer) -> None:
+    labels = np.random.randint(0, 5, size=(1000,))
+    handle = server.scene.add_point_cloud(
+        "/points", points=np.zeros((1000, 3)), scalars=labels, colormap="tab10"
+    )
+    assert handle.scalars is not None
+    assert handle.scalars.dtype == np.uint8
+    assert handle.scalar_range == (0.0, 9.0)
+
+    lut = np.random.randint(0, 255, size=(32, 3))
+    handle = server.scene.add_point_cloud(
+        "/points", points=np.zeros((1000, 3)), scalars=labels, colormap_lut=lut
+    )
+    assert handle.colormap_lut is not None
+    assert handle.colormap_lut.dtype == np.uint8
+    assert handle.scalar_range == (0.0, 31.0)
+
+
+def test_append_scalars(server: viser.ViserServer) -> None:
+    handle = server.scene.add_point_cloud(
+        "/points",
+        points=np.zeros((0, 3)),
+        scalars=np.zeros((0,), dtype=np.float32),
+        scalar_range=(0.0, 1.0),
+        max_points=10,
+    )
+    messages = _record_messages(server)
+    for i in range(3):
+        handle.append(np.full((4, 3), i), scalars=np.full((4,), i / 2.0))
+    assert all(
+        isinstance(m, _messages.PointCloudAppendMessage) and m.scalars is not None
+        for m in messages
+    )
+    assert handle.scalars is not None
+    np.testing.assert_array_equal(
+        handle.scalars, [1.0, 1.0, 0.0, 0.0, 0.5, 0.5, 0.5, 0.5, 1.0, 1.0]
+    )
+    with pytest.raises(ValueError):
+        handle.append(np.zeros((4, 3)))
+
+
+def test_append_scalars_checks_integer_range(server: viser.ViserServer) -> None:
+    handle = server.scene.add_point_cloud(
+        "/points",
+        points=np.zeros((4, 3)),
+        scalars=np.arange(4),
+        max_points=10,
+    )
+    assert handle.scalars is not None and handle.scalars.dtype == np.uint8
+
+    # Labels that fit are cast to the existing dtype.
+    handle.append(np.zeros((2, 3)), scalars=np.array([5, 255]))
+    np.testing.assert_array_equal(handle.scalars, [0, 1, 2, 3, 5, 255])
+
+    # Labels that don't fit, and non-integer scalars, aren't truncated.
+    with pytest.raises(ValueError):
+        handle.append(np.zeros((1, 3)), scalars=np.array([256]))
+    with pytest.raises(ValueError):
+        handle.append(np.zeros((1, 3)), scalars=np.array([0.5]))
+    assert handle.points.shape == (6, 3)
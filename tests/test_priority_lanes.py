@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+from typing import Any, Callable
+
+import msgspec
+import numpy as np
+
+from viser import _messages
+from viser.infra._async_message_buffer import AsyncMessageBuffer
+from viser.infra._infra import _message_producer
+
+
+class _SlowWebsocket:
+    """Records frames, and simulates a slow connection."""
+
+    def __init__(self, on_send: Callable[[list[Any]], None]) -> None:
+        self.frames: list[Any] = []
+        self._on_send = on_send
+
+    async def send(self, frame: bytes | memoryview) -> None:
+        self.frames.append(msgspec.msgpack.decode(frame))
+        self._on_send(self.frames)
+        await asyncio.sleep(0.001)
+
+
+def _reassemble(frames: list[Any]) -> list[tuple[int, dict]]:
+    """Reassemble frames into (index of final frame, message) pairs, the same
+    way that the client does."""
+    out = []
+    fragments: dict[int, list[bytes]] = {}
+    for i, frame in enumerate(frames):
+        if isinstance(frame, list):
+            out.extend((i, message) for message in frame)
+            continue
+        parts = fragments.setdefault(frame["fragmentId"], [])
+        assert frame["fragmentIndex"] == len(parts)
+        parts.append(frame["data"])
+        if len(parts) == frame["fragmentCount"]:
+            out.append((i, msgspec.msgpack.decode(b"".join(parts))))
+    return out
+
+
+def test_bulk_messages_are_fragmented_and_interleaved() -> None:
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=False)
+    buffer.fragment_size_bytes = 64 * 1024
+
+    glb_data = np.random.bytes(5_000_000)
+    buffer.push(
+        _messages.GlbMessage(
+            "/big",
+            _messages.GlbProps(
+                glb_data=glb_data, scale=1.0, cast_shadow=False, receive_shadow=False
+            ),
+        )
+    )
+    # Depends on the GLB, so it should wait for it.
+    buffer.push(_messages.SetPositionMessage("/big", (1.0, 2.0, 3.0)))
+    # Doesn't depend on the GLB, so it can be sent right away.
+    buffer.push(_messages.SetPositionMessage("/other", (1.0, 2.0, 3.0)))
+
+    def on_send(frames: list[Any]) -> None:
+        # Interactive messages sent while the GLB is streaming shouldn't wait
+        # for it.
+        if len(frames) == 10:
+            buffer.push(_messages.GuiUpdateMessage("slider", {"value": 1.0}))
+        if any(
+            isinstance(frame, list) and frame[0]["type"] == "SetPositionMessage"
+            for frame in frames[1:]
+        ):
+            buffer.set_done()
+
+    websocket = _SlowWebsocket(on_send)
+    event_loop.run_until_complete(
+        _message_producer(
+            websocket,  # type: ignore
+            buffer,
+            client_id=0,
+            client_api_version=1,
+            fragment_ids=itertools.count(),
+        )
+    )
+    event_loop.close()
+
+    # Fragments should be bounded in size.
+    fragments = [frame for frame in websocket.frames if isinstance(frame, dict)]
+    assert len(fragments) > 1
+    assert all(len(frame["data"]) <= 64 * 1024 for frame in fragments)
+
+    messages = _reassemble(websocket.frames)
+    frame_from_name = {
+        str(message.get("name", message.get("uuid"))) + "-" + message["type"]: i
+        for i, message in messages
+    }
+    assert frame_from_name["/other-SetPositionMessage"] == 0
+    assert (
+        frame_from_name["slider-GuiUpdateMessage"] < frame_from_name["/big-GlbMessage"]
+    )
+    assert (
+        frame_from_name["/big-GlbMessage"] < frame_from_name["/big-SetPositionMessage"]
+    )
+
+    (glb_message,) = [
+        message for _, message in messages if message["type"] == "GlbMessage"
+    ]
+    assert glb_message["props"]["glb_data"] == glb_data
+
+
+def test_atomic_and_keyless_messages_wait_for_bulk_messages() -> None:
+    event_loop = asyncio.new_event_loop()
+    buffer = AsyncMessageBuffer(event_loop, persistent_messages=False)
+    buffer.fragment_size_bytes = 64 * 1024
+
+    def make_glb(name: str) -> _messages.GlbMessage:
+        return _messages.GlbMessage(
+            name,
+            _messages.GlbProps(
+                glb_data=np.random.bytes(1_000_000),
+                scale=1.0,
+                cast_shadow=False,
+                receive_shadow=False,
+            ),
+        )
+
+    buffer.push(make_glb("/big"))
+    # Messages without a dependency key may depend on anything.
+    buffer.push(_messages.ResetGuiMessage())
+    # The GLB in the atomic block goes to the bulk lane, so the rest of the
+    # block should too.
+    buffer.atomic_start()
+    buffer.push(_messages.SetPositionMessage("/other", (1.0, 2.0, 3.0)))
+    buffer.push(make_glb("/big2"))
+    buffer.atomic_end()
+
+    def on_send(frames: list[Any]) -> None:
+        if any(
+            message["type"] == "GlbMessage" and message["name"] == "/big2"
+            for _, message in _reassemble(frames)
+        ):
+            buffer.set_done()
+
+    websocket = _SlowWebsocket(on_send)
+    event_loop.run_until_complete(
+        _message_producer(
+            websocket,  # type: ignore
+            buffer,
+            client_id=0,
+            client_api_version=1,
+            fragment_ids=itertools.count(),
+        )
+    )
+    event_loop.close()
+
+    order = [
+        message["type"] + str(message.get("name", ""))
+        for _, message in _reassemble(websocket.frames)
+    ]
+    assert order == [
+        "GlbMessage/big",
+        "ResetGuiMessage",
+        "SetPositionMessage/other",
+        "GlbMessage/big2",
+    ]
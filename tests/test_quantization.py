@@ -0,0 +1,136 @@
+from typing import List, TypeVar
+
+import numpy as np
+import pytest
+
+import viser
+from viser import _messages
+from viser._assignable_props_api import dequantize_positions, quantize_positions
+from viser.infra import Message
+
+T = TypeVar("T")
+
+
+def _get_message(server: viser.ViserServer, message_type: type[T]) -> T:
+    (message,) = [
+        m
+        for m in server._websock_server._broadcast_buffer.message_from_id.values()
+        if isinstance(m, message_type)
+    ]
+    return message
+
+
+def test_quantized_positions_are_accurate_far_from_origin() -> None:
+    # A 1km wide map, 100km from the origin.
+    positions = np.random.uniform(0.0, 1000.0, size=(10_000, 3)) + 100_000.0
+    codes, quantization = quantize_positions(positions)
+    assert codes.dtype == np.uint16
+
+    # The error is at most half of a quantization step.
+    error = np.abs(dequantize_positions(codes, quantization) - positions)
+    assert np.all(error <= 1000.0 / 65535 / 2 + 0.01)
+    assert np.all(error < 0.02)
+
+    # Positions outside of fixed bounds can't be encoded.
+    with pytest.raises(ValueError):
+        quantize_positions(positions + 10.0, quantization)
+
+
+def test_quantized_point_cloud(server: viser.ViserServer) -> None:
+    points = np.random.uniform(-50.0, 50.0, size=(1000, 3))
+    handle = server.scene.add_point_cloud(
+        "/points", points=points, colors=(255, 0, 0), precision="quantized"
+    )
+    message = _get_message(server, _messages.PointCloudMessage)
+    assert message.props.points.dtype == np.uint16
+    assert message.props.points.nbytes == 1000 * 6
+    np.testing.assert_allclose(handle.points, points, atol=1e-3)
+
+    # Assigned points are quantized inside their own bounds.
+    handle.points = (points * 2.0).astype(np.float32)
+    np.testing.assert_allclose(handle.points, points * 2.0, atol=2e-3)
+    assert handle.quantization is not None
+    np.testing.assert_allclose(
+        handle.quantization[0], np.min(points * 2.0, axis=0), atol=1e-4
+    )
+
+    # Switching precision should change the dtype of the points.
+    handle.precision = "float32"
+    handle.points = points.astype(np.float32)
+    assert handle.quantization is None
+    assert handle.points.dtype == np.float32
+    np.testing.assert_allclose(handle.points, points, atol=1e-5)
+
+
+def test_precision_reencodes_points(server: viser.ViserServer) -> None:
+    points = np.random.uniform(-50.0, 50.0, size=(1000, 3))
+    handle = server.scene.add_point_cloud(
+        "/points", points=points, colors=(255, 0, 0), precision="float32"
+    )
+    messages: List[Message] = []
+    server._websock_server.queue_message = messages.append  # type: ignore
+
+    # Points, precision, and quantization are sent in a single update.
+    handle.precision = "quantized"
+    assert handle.quantization is not None
+    np.testing.assert_allclose(handle.points, points, atol=2e-3)
+    (update,) = messages
+    assert isinstance(update, _messages.SceneNodeUpdateMessage)
+    assert update.updates["precision"] == "quantized"
+    assert update.updates["quantization"] == handle.quantization
+    assert update.updates["points"].dtype == np.uint16
+
+    # Scaled points have the same codes, so only the quantization is sent.
+    messages.clear()
+    handle.points = handle.points * 2.0
+    (update,) = messages
+    assert isinstance(update, _messages.SceneNodeUpdateMessage)
+    assert update.updates == {"quantization": handle.quantization}
+    np.testing.assert_allclose(handle.points, points * 2.0, atol=4e-3)
+
+    messages.clear()
+    handle.precision = "float16"
+    (update,) = messages
+    assert isinstance(update, _messages.SceneNodeUpdateMessage)
+    assert update.updates["quantization"] is None
+    assert update.updates["points"].dtype == np.float16
+    np.testing.assert_allclose(handle.points, points * 2.0, atol=0.1)
+
+
+def test_quantized_point_cloud_append(server: viser.ViserServer) -> None:
+    points = np.random.uniform(-50.0, 50.0, size=(1000, 3))
+    handle = server.scene.add_point_cloud(
+        "/points",
+        points=points,
+        colors=(255, 0, 0),
+        precision="quantized",
+        max_points=2000,
+    )
+    handle.append(points[:10] * 0.5)
+    np.testing.assert_allclose(handle.points[1000:], points[:10] * 0.5, atol=1e-3)
+    with pytest.raises(ValueError):
+        handle.append(points[:10] * 2.0)
+
+
+def test_quantized_mesh(server: viser.ViserServer) -> None:
+    vertices = np.random.normal(size=(100, 3)) + 1000.0
+    faces = np.random.randint(0, 100, size=(50, 3))
+    handle = server.scene.add_mesh_simple(
+        "/mesh", vertices, faces, vertex_precision="quantized"
+    )
+    message = _get_message(server, _messages.MeshMessage)
+    assert message.props.vertices.dtype == np.uint16
+    np.testing.assert_allclose(handle.vertices, vertices, atol=1e-3)
+
+    handle.vertices = (vertices + 1.0).astype(np.float32)
+    np.testing.assert_allclose(handle.vertices, vertices + 1.0, atol=1e-3)
+
+    batched = server.scene.add_batched_meshes_simple(
+        "/batched",
+        vertices,
+        faces,
+        batched_wxyzs=np.array([[1.0, 0.0, 0.0, 0.0]]),
+        batched_positions=np.zeros((1, 3)),
+        vertex_precision="quantized",
+    )
+    np.testing.assert_allclose(batched.vertices, vertices, atol=1e-3)
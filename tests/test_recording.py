@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from pathlib import Path
+
+import msgspec
+import numpy as np
+
+import viser
+from viser.infra._infra import _RECORDING_MAGIC
+
+
+def _read_records(path: Path) -> list[tuple[bytes, bytes]]:
+    data = path.read_bytes()
+    assert data.startswith(_RECORDING_MAGIC)
+    offset = len(_RECORDING_MAGIC)
+    records = []
+    while offset < len(data):
+        kind, length = struct.unpack_from("<cI", data, offset)
+        offset += 5
+        records.append((kind, data[offset : offset + length]))
+        offset += length
+    return records
+
+
+def _decode_timed(payload: bytes) -> tuple[float, list]:
+    (time,) = struct.unpack_from("<d", payload)
+    return time, msgspec.msgpack.decode(zlib.decompress(payload[8:]))
+
+
+def test_recorder_streams_chunks_and_keyframes(
+    server: viser.ViserServer, tmp_path: Path
+) -> None:
+    server.scene.add_box("/box", color=(255, 0, 0), dimensions=(1, 1, 1))
+
+    path = tmp_path / "recording.viser"
+    with server.get_scene_recorder(
+        path,
+        chunk_size_bytes=10_000,
+        keyframe_interval_sec=1.0,
+        keyframe_size_ratio=0.0,
+    ) as recorder:
+        for i in range(300):
+            server.scene.add_point_cloud(
+                "/points",
+                points=np.random.normal(size=(100, 3)),
+                colors=(0, 0, 255),
+            )
+            server.scene.add_frame(f"/frame_{i}")
+            recorder.insert_sleep(0.05)
+
+            # Only the current chunk should be kept in memory.
+            assert recorder._chunk_bytes < 10_000
+
+    records = _read_records(path)
+    kinds = [kind for kind, _ in records]
+    assert kinds[0] == b"H"
+    assert kinds[1] == b"K"
+    assert kinds[-1] == b"E"
+    duration = msgspec.msgpack.decode(records[-1][1])["durationSeconds"]
+    assert np.isclose(duration, 300 * 0.05)
+
+    # Keyframes should be written about once per second of recording time.
+    keyframes = [_decode_timed(payload) for kind, payload in records if kind == b"K"]
+    assert 14 <= len(keyframes) <= 16
+
+    # Each keyframe should contain the full scene state at its time.
+    time, state = keyframes[-1]
+    names = {message.get("name") for message in state}
+    assert "/box" in names
+    assert "/points" in names
+    assert sum(name.startswith("/frame_") for name in names if name) == round(
+        time / 0.05
+    )
+
+    # Chunks should contain every recorded message, in order.
+    messages = [
+        message
+        for kind, payload in records
+        if kind == b"C"
+        for message in _decode_timed(payload)[1]
+    ]
+    assert sum(message["type"] == "FrameMessage" for _, message in messages) == 300
+    assert [t for t, _ in messages] == sorted(t for t, _ in messages)
+    assert messages[-1][1]["name"] == "/frame_299"
+
+
+def test_recorder_skips_keyframes_for_small_updates(
+    server: viser.ViserServer, tmp_path: Path
+) -> None:
+    server.scene.add_point_cloud(
+        "/points", points=np.random.normal(size=(100_000, 3)), colors=(0, 0, 255)
+    )
+
+    path = tmp_path / "recording.viser"
+    with server.get_scene_recorder(path, keyframe_interval_sec=1.0) as recorder:
+        # Small updates to a large scene: replaying them is cheaper than
+        # re-encoding the scene, so only the initial keyframe is written.
+        for i in range(100):
+            server.scene.add_frame("/frame", position=(i, 0.0, 0.0))
+            recorder.insert_sleep(0.1)
+        assert recorder._last_keyframe_time == 0.0
+
+        # Once the recorded messages are as large as the scene, keyframes are
+        # written again.
+        for i in range(20):
+            server.scene.add_point_cloud(
+                "/points",
+                points=np.random.normal(size=(100_000, 3)),
+                colors=(0, 0, 255),
+            )
+            recorder.insert_sleep(0.1)
+
+    kinds = [kind for kind, _ in _read_records(path)]
+    assert 2 <= kinds.count(b"K") <= 3
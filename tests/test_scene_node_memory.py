@@ -0,0 +1,84 @@
+import tracemalloc
+
+import numpy as np
+
+import viser
+from viser import _messages
+
+
+def _get_creation_message(server: viser.ViserServer) -> _messages.PointCloudMessage:
+    (message,) = [
+        m
+        for m in server._websock_server._broadcast_buffer.message_from_id.values()
+        if isinstance(m, _messages.PointCloudMessage)
+    ]
+    return message
+
+
+def test_add_point_cloud_does_not_duplicate_arrays(server: viser.ViserServer) -> None:
+    """Handles and persisted messages should share arrays, so large point clouds
+    are only stored once."""
+    num_points = 2_000_000
+    points = np.random.normal(size=(num_points, 3)).astype(np.float32)
+    colors = np.zeros((num_points, 3), dtype=np.uint8)
+
+    tracemalloc.start()
+    try:
+        handle = server.scene.add_point_cloud("/points", points=points, colors=colors)
+        retained_bytes, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    message = _get_creation_message(server)
+    message_bytes = message.props.points.nbytes + message.props.colors.nbytes
+    assert retained_bytes < message_bytes + 1024 * 1024
+    assert handle._impl.props.points is message.props.points
+    assert handle._impl.props.colors is message.props.colors
+
+
+def test_assignment_replaces_shared_arrays(server: viser.ViserServer) -> None:
+    colors = np.zeros((1000, 3), dtype=np.uint8)
+    handle = server.scene.add_point_cloud(
+        "/points", points=np.zeros((1000, 3)), colors=colors
+    )
+    message = _get_creation_message(server)
+
+    # The caller's arrays are copied, and stay writeable.
+    assert not np.shares_memory(message.props.colors, colors)
+    assert colors.flags.writeable
+
+    # Arrays read from the handle are writeable copies. Writing to them
+    # doesn't affect the persisted message.
+    handle.colors[0] = 255
+    assert handle.colors[0, 0] == 255
+    assert np.all(message.props.colors == 0)
+
+    # Assignment creates a new array, and leaves the persisted message alone.
+    new_colors = np.full((1000, 3), 255, dtype=np.uint8)
+    handle.colors = new_colors
+    np.testing.assert_array_equal(handle.colors, new_colors)
+    assert not np.shares_memory(handle.colors, new_colors)
+    assert np.all(message.props.colors == 0)
+
+
+def test_mutate_and_reassign_sends_update(server: viser.ViserServer) -> None:
+    """Modifying the array that was passed in and assigning it back should
+    send an update."""
+    colors = np.zeros((1000, 3), dtype=np.uint8)
+    handle = server.scene.add_point_cloud(
+        "/points", points=np.zeros((1000, 3)), colors=colors
+    )
+    buffer = server._websock_server._broadcast_buffer
+    message_counter = buffer.message_counter
+
+    colors[:] = 255
+    handle.colors = colors
+    assert buffer.message_counter == message_counter + 1
+    assert np.all(handle.colors == 255)
+
+    # The same should work for arrays read from the handle.
+    colors = handle.colors
+    colors[:] = 0
+    handle.colors = colors
+    assert buffer.message_counter == message_counter + 2
+    assert np.all(handle.colors == 0)
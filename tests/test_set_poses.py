@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import viser
+import viser._client_autobuild
+from viser import _messages
+
+
+def test_set_poses() -> None:
+    # Mock the client autobuild to avoid building the client.
+    viser._client_autobuild.ensure_client_is_built = lambda: None
+    server = viser.ViserServer()
+
+    server.scene.add_frame("/robot")
+    names = [f"/robot/joint_{i}" for i in range(60)]
+    handles = [server.scene.add_frame(name) for name in names]
+
+    buffer = server._websock_server._broadcast_buffer
+    pushed = []
+    orig_push = buffer.push
+    buffer.push = lambda message: (pushed.append(message), orig_push(message))  # type: ignore
+
+    wxyzs = np.tile(np.array([0.0, 1.0, 0.0, 0.0]), (60, 1))
+    positions = np.random.normal(size=(60, 3))
+    server.scene.set_poses(names, wxyzs, positions)
+
+    # All poses should be sent in a single message.
+    (message,) = pushed
+    assert isinstance(message, _messages.SetPosesMessage)
+    assert message.wxyzs.dtype == message.positions.dtype == np.float32
+
+    # Handles should be kept in sync.
+    for handle, wxyz, position in zip(handles, wxyzs, positions):
+        np.testing.assert_allclose(handle.wxyz, wxyz)
+        np.testing.assert_allclose(handle.position, position, rtol=1e-6)
+
+    # Assigning the same pose shouldn't send a new message.
+    handles[0].position = positions[0].astype(np.float32)
+    assert len(pushed) == 1
+
+    # Removing the subtree should drop the message.
+    server.scene.remove_by_name("/robot")
+    assert not any(
+        isinstance(m, _messages.SetPosesMessage)
+        for m in buffer.message_from_id.values()
+    )
+
+    with pytest.raises(ValueError):
+        server.scene.set_poses(names, wxyzs[:10], positions)
+    server.stop()
+
+
+def test_set_poses_dependency_key() -> None:
+    wxyzs = np.zeros((2, 4), np.float32)
+    positions = np.zeros((2, 3), np.float32)
+    message = _messages.SetPosesMessage(("/a/x", "/a/y"), wxyzs, positions)
+    assert message.dependency_key() == ("scene", "", "a")
+
+    # Nodes without a common ancestor below the root aren't keyed. The root key
+    # is used by messages like global visibility updates.
+    message = _messages.SetPosesMessage(("/a", "/b"), wxyzs, positions)
+    assert message.dependency_key() is None
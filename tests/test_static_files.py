@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import os
+from pathlib import Path
+
+from websockets.datastructures import Headers
+from websockets.http11 import Request, Response
+
+from viser.infra._static_files import StaticFileServer, precompress_directory
+
+
+def _get(server: StaticFileServer, path: str, **headers: str) -> Response:
+    request = Request(
+        path, Headers({k.replace("_", "-"): v for k, v in headers.items()})
+    )
+    return asyncio.run(server.handle(request))
+
+
+def _make_build(tmp_path: Path) -> Path:
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text("<html>" + "viser " * 1000 + "</html>")
+    (tmp_path / "assets" / "index-BnK2s8wW.js").write_text("console.log(0);" * 1000)
+    (tmp_path / "env.hdr").write_bytes(os.urandom(10_000))
+    return tmp_path
+
+
+def test_compression_and_caching(tmp_path: Path) -> None:
+    server = StaticFileServer(_make_build(tmp_path))
+
+    response = _get(server, "/?websocket=ws://localhost", Accept_Encoding="gzip, br")
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Content-Type"] == "text/html; charset=utf-8"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert gzip.decompress(response.body) == (tmp_path / "index.html").read_bytes()
+
+    # Hashed bundles are immutable.
+    response = _get(server, "/assets/index-BnK2s8wW.js")
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert "immutable" in response.headers["Cache-Control"]
+    assert response.body == (tmp_path / "assets" / "index-BnK2s8wW.js").read_bytes()
+
+    # Random data isn't compressed.
+    response = _get(server, "/env.hdr", Accept_Encoding="gzip")
+    assert "Content-Encoding" not in response.headers
+
+    assert _get(server, "/missing.js").status_code == 404
+    assert _get(server, "/../" + tmp_path.name + "/index.html").status_code == 200
+    assert _get(server, "/../../etc/passwd").status_code == 404
+    assert _get(server, "/assets").status_code == 404
+
+
+def test_precompressed_files_are_preferred(tmp_path: Path) -> None:
+    root = _make_build(tmp_path)
+    precompress_directory(root)
+    assert (root / "index.html.gz").exists()
+    assert not (root / "env.hdr.gz").exists()
+
+    # Brotli isn't required, but fake a precompressed file to check that it's
+    # served to clients that accept it.
+    (root / "index.html.br").write_bytes(b"brotli bytes")
+    server = StaticFileServer(root)
+    response = _get(server, "/index.html", Accept_Encoding="gzip, deflate, br")
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.body == b"brotli bytes"
+    response = _get(server, "/index.html", Accept_Encoding="gzip, br;q=0")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.body == (root / "index.html.gz").read_bytes()
+
+
+def test_etags(tmp_path: Path) -> None:
+    root = _make_build(tmp_path)
+    server = StaticFileServer(root)
+
+    identity = _get(server, "/index.html")
+    gzipped = _get(server, "/index.html", Accept_Encoding="gzip")
+    assert identity.headers["ETag"] != gzipped.headers["ETag"]
+    assert identity.headers["Vary"] == "Accept-Encoding"
+
+    for etag in (identity.headers["ETag"], gzipped.headers["ETag"]):
+        response = _get(server, "/index.html", If_None_Match=etag)
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["ETag"] == identity.headers["ETag"]
+
+    # Changing the file changes the ETag.
+    (root / "index.html").write_text("<html>new</html>")
+    os.utime(root / "index.html", ns=(0, 0))
+    response = _get(server, "/index.html", If_None_Match=identity.headers["ETag"])
+    assert response.status_code == 200
+    assert response.body == b"<html>new</html>"
+
+
+def test_ranges(tmp_path: Path) -> None:
+    root = _make_build(tmp_path)
+    server = StaticFileServer(root)
+    content = (root / "env.hdr").read_bytes()
+
+    response = _get(server, "/env.hdr", Range="bytes=100-199")
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == "bytes 100-199/10000"
+    assert response.body == content[100:200]
+
+    response = _get(server, "/env.hdr", Range="bytes=9000-")
+    assert response.body == content[9000:]
+    response = _get(server, "/env.hdr", Range="bytes=-500")
+    assert response.body == content[-500:]
+    response = _get(server, "/env.hdr", Range="bytes=9500-20000")
+    assert response.headers["Content-Range"] == "bytes 9500-9999/10000"
+
+    # Ranges are served uncompressed.
+    response = _get(server, "/index.html", Range="bytes=0-5", Accept_Encoding="gzip")
+    assert response.status_code == 206
+    assert response.body == b"<html>"
+
+    response = _get(server, "/env.hdr", Range="bytes=10000-")
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "bytes */10000"
+
+    # Unsupported or stale ranges return the whole file.
+    for headers in (
+        {"Range": "bytes=0-1, 5-6"},
+        {"Range": "bytes=0-1", "If-Range": '"stale"'},
+    ):
+        request = Request("/env.hdr", Headers(headers))
+        response = asyncio.run(server.handle(request))
+        assert response.status_code == 200
+        assert response.body == content